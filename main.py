@@ -8,6 +8,7 @@ Supports command-line flags:
   python main_pyside.py --auto-stop 3600        # Stop after 1 hour
   python main_pyside.py --headless              # No GUI (headless mode)
   python main_pyside.py --tray                  # Start minimized to system tray
+  python main_pyside.py --headless --virtual-camera raw_debug  # Replay frames without a camera
 """
 import sys
 import os
@@ -43,6 +44,7 @@ def main():
   python main_pyside.py --auto-start --auto-stop 3600  # Capture for 1 hour then stop
   python main_pyside.py --headless              # Headless mode (no GUI)
   python main_pyside.py --tray                  # Start minimized to system tray
+  python main_pyside.py --headless --virtual-camera raw_debug  # Replay frames without a camera
         """)
     
     parser.add_argument('--auto-start', action='store_true',
@@ -53,13 +55,16 @@ def main():
                        help='Run without GUI - captures images based on saved config')
     parser.add_argument('--tray', action='store_true',
                        help='Start minimized to system tray (requires pystray)')
+    parser.add_argument('--virtual-camera', metavar='SOURCE', nargs='?', const='',
+                       help='Headless only: simulated camera replaying FITS/PNG frames from SOURCE '
+                            '(synthetic sky if omitted), for benchmarks and soak tests')
     
     args = parser.parse_args()
     
     # Headless mode - no GUI at all
     if args.headless:
         from services.headless_runner import run_headless
-        success = run_headless(auto_stop=args.auto_stop)
+        success = run_headless(auto_stop=args.auto_stop, virtual_camera=args.virtual_camera)
         sys.exit(0 if success else 1)
     
     # Enable high DPI scaling
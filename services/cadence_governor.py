@@ -0,0 +1,263 @@
+"""
+Adaptive capture cadence driven by how fast the scene changes
+
+A fixed capture_interval spends the same CPU, disk and upload on a static,
+roof-closed daytime scene as on a fast-changing dusk. CadenceGovernor looks
+at cheap per-frame change metrics and stretches the interval (up to a
+ceiling) while the scene is stable, dropping straight back to the base
+interval when it changes:
+
+- scene brightness: frame mean divided by exposure x gain factor, so auto
+  exposure corrections do not count as change
+- structure: mean absolute difference of a 32x32 thumbnail of the metering
+  sample, each normalized by its own mean
+- ML state: a new roof status or sky condition; a closed roof stretches
+  twice as fast
+
+CadenceReport counts per night (noon to noon) the frames captured, the
+frames the fixed base interval would have taken, process CPU-seconds and
+bytes written, so the savings show up in the log and in the web /status
+(metadata 'CADENCE').
+
+Config:
+    "cadence": {
+        "enabled": false,
+        "max_interval": 60.0,          # Ceiling in seconds (the base is zwo_interval)
+        "stretch": 1.5,                # Interval multiplier per stable step
+        "stable_frames": 3,            # Stable frames before each stretch
+        "brightness_threshold": 0.05,  # Relative scene brightness change that counts as change
+        "difference_threshold": 0.03   # Thumbnail difference (fraction of its mean) that counts as change
+    }
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .exposure_solver import gain_factor
+
+
+THUMBNAIL_SIZE = 32
+
+
+def thumbnail(frame, size=THUMBNAIL_SIZE):
+    """
+    Block-mean float32 thumbnail of about size x size.
+
+    Args:
+        frame: 2D array (e.g. the Bayer metering sample) or RGB array (green is used)
+        size: Target width and height
+
+    Returns:
+        2D float32 array
+    """
+    if frame.ndim == 3:
+        frame = frame[..., 1]
+    height, width = frame.shape
+    step_y, step_x = max(1, height // size), max(1, width // size)
+    rows, cols = height // step_y, width // step_x
+    blocks = frame[:rows * step_y, :cols * step_x].reshape(rows, step_y, cols, step_x)
+    return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+
+def night_of(timestamp):
+    """Night a timestamp belongs to, named after its evening date (nights run noon to noon)"""
+    return (datetime.fromtimestamp(timestamp) - timedelta(hours=12)).date().isoformat()
+
+
+def _ml_state():
+    """Roof status and sky condition from the last ML prediction (empty when ML is off)"""
+    try:
+        from .ml_service import get_ml_service
+        return get_ml_service().get_last_results()
+    except Exception:
+        return {}
+
+
+class CadenceReport:
+    """Per-night frames, fixed-cadence equivalent, CPU-seconds and bytes written"""
+
+    def __init__(self, clock=time.time, cpu_clock=time.process_time):
+        """
+        Args:
+            clock: Wall clock (tests)
+            cpu_clock: Process CPU clock (tests)
+        """
+        self._clock = clock
+        self._cpu_clock = cpu_clock
+        self._lock = threading.Lock()
+        self._start(clock())
+
+    def _start(self, now):
+        self.night = night_of(now)
+        self.frames = 0
+        self.fixed_frames = 0.0  # Frames the base interval would have taken over the same time
+        self.bytes_written = 0
+        self._cpu_start = self._cpu_clock()
+
+    def record_frame(self, interval, base_interval):
+        """
+        Count a frame taken at interval (seconds until the next one).
+
+        Returns:
+            Summary dict of the previous night when this frame starts a new one, else None
+        """
+        now = self._clock()
+        with self._lock:
+            finished = None
+            if night_of(now) != self.night:
+                finished = self._summary()
+                self._start(now)
+            self.frames += 1
+            self.fixed_frames += interval / base_interval
+            return finished
+
+    def record_output(self, nbytes):
+        """Count bytes written (saved files) for the current night"""
+        with self._lock:
+            self.bytes_written += nbytes
+
+    def summary(self):
+        """Current night so far (see _summary)"""
+        with self._lock:
+            return self._summary()
+
+    def _summary(self):
+        fixed = max(self.fixed_frames, self.frames)
+        return {
+            'night': self.night,
+            'frames': self.frames,
+            'fixed_frames': round(fixed),
+            'frames_saved': round(fixed - self.frames),
+            'saved_percent': round(100.0 * (fixed - self.frames) / fixed, 1) if fixed else 0.0,
+            'cpu_seconds': round(self._cpu_clock() - self._cpu_start, 1),
+            'bytes_written': self.bytes_written,
+        }
+
+
+class CadenceGovernor:
+    """Capture interval that stretches while the scene is stable and tightens on change"""
+
+    def __init__(self, base_interval, max_interval=60.0, stretch=1.5, stable_frames=3,
+                 brightness_threshold=0.05, difference_threshold=0.03, ml_state=_ml_state,
+                 log=None, report=None):
+        """
+        Args:
+            base_interval: Interval while the scene changes (seconds)
+            max_interval: Ceiling while the scene is stable (seconds)
+            stretch: Interval multiplier per stable step
+            stable_frames: Consecutive stable frames before each stretch
+            brightness_threshold: Relative scene brightness change that counts as change
+            difference_threshold: Thumbnail difference (fraction of its mean) that counts as change
+            ml_state: Callable() -> dict with roof_status/sky_condition (None = ignore ML)
+            log: Optional callable(message) for interval changes and nightly reports
+            report: CadenceReport (default: a new one)
+        """
+        self.base_interval = base_interval
+        self.max_interval = max(max_interval, base_interval)
+        self.stretch = stretch
+        self.stable_frames = stable_frames
+        self.brightness_threshold = brightness_threshold
+        self.difference_threshold = difference_threshold
+        self.ml_state = ml_state
+        self.log = log or (lambda message: None)
+        self.report = report or CadenceReport()
+        self.interval = base_interval
+        self.last_change = None  # Reason of the last tightening
+
+        self._level = None
+        self._thumbnail = None
+        self._ml = None
+        self._stable = 0
+
+    @classmethod
+    def from_config(cls, settings, base_interval, log=None):
+        """Governor from the 'cadence' config section"""
+        return cls(base_interval,
+                   max_interval=settings.get('max_interval', 60.0),
+                   stretch=settings.get('stretch', 1.5),
+                   stable_frames=settings.get('stable_frames', 3),
+                   brightness_threshold=settings.get('brightness_threshold', 0.05),
+                   difference_threshold=settings.get('difference_threshold', 0.03),
+                   log=log)
+
+    def set_base_interval(self, seconds):
+        """Change the base interval (the ceiling never drops below it)"""
+        self.base_interval = seconds
+        self.max_interval = max(self.max_interval, seconds)
+        self.interval = min(max(self.interval, seconds), self.max_interval)
+
+    def observe(self, sample, mean, exposure_seconds, gain):
+        """
+        Update the interval from one developed frame.
+
+        Args:
+            sample: Metering sample (2D Bayer sample or RGB image)
+            mean: Frame mean brightness (from the frame statistics)
+            exposure_seconds: Exposure of the frame
+            gain: Gain of the frame
+
+        Returns:
+            Interval until the next capture (seconds)
+        """
+        reasons = []
+        first = self._level is None  # Nothing to compare against yet: neither change nor stable
+
+        level = mean / max(exposure_seconds * gain_factor(gain), 1e-9)
+        if self._level is not None:
+            delta = (level - self._level) / max(self._level, 1e-9)
+            if abs(delta) > self.brightness_threshold:
+                reasons.append(f"brightness {delta:+.0%}")
+        self._level = level
+
+        thumb = thumbnail(sample)
+        thumb /= max(float(thumb.mean()), 1.0)
+        if self._thumbnail is not None and self._thumbnail.shape == thumb.shape:
+            difference = float(np.mean(np.abs(thumb - self._thumbnail)))
+            if difference > self.difference_threshold:
+                reasons.append(f"difference {difference:.3f}")
+        self._thumbnail = thumb
+
+        ml = self.ml_state() if self.ml_state else {}
+        state = (ml.get('roof_status'), ml.get('sky_condition'))
+        if self._ml is not None and state != self._ml:
+            reasons.append(f"roof/sky {self._ml[0]}/{self._ml[1]} -> {state[0]}/{state[1]}")
+        self._ml = state
+
+        if reasons:
+            self._stable = 0
+            self.last_change = ', '.join(reasons)
+            if self.interval > self.base_interval:
+                self.log(f"Cadence: scene change ({self.last_change}), interval {self.base_interval:.1f}s")
+            self.interval = self.base_interval
+        elif not first:
+            self._stable += 1
+            if self._stable >= self.stable_frames and self.interval < self.max_interval:
+                self._stable = 0
+                factor = self.stretch ** 2 if state[0] == 'Closed' else self.stretch
+                self.interval = min(self.interval * factor, self.max_interval)
+                self.log(f"Cadence: scene stable, interval {self.interval:.1f}s")
+
+        finished = self.report.record_frame(self.interval, self.base_interval)
+        if finished:
+            self.log(self.format_summary(finished))
+        return self.interval
+
+    def record_output(self, nbytes):
+        """Count bytes of a saved frame"""
+        self.report.record_output(nbytes)
+
+    def stats(self):
+        """JSON-safe interval and per-night savings (metadata 'CADENCE', web /status)"""
+        stats = self.report.summary()
+        stats['interval'] = round(self.interval, 2)
+        stats['base_interval'] = self.base_interval
+        return stats
+
+    @staticmethod
+    def format_summary(summary):
+        """One log line for a night's report"""
+        return (f"Cadence night {summary['night']}: {summary['frames']} frames "
+                f"({summary['fixed_frames']} at the fixed interval, {summary['saved_percent']:.0f}% saved), "
+                f"{summary['cpu_seconds']:.0f} CPU-s, {summary['bytes_written'] / (1024 * 1024):.1f} MB written")
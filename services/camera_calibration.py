@@ -3,6 +3,7 @@ Camera calibration and auto-exposure algorithms for ZWO ASI cameras
 """
 import numpy as np
 from .camera_utils import calculate_brightness, check_clipping
+from .exposure_solver import ExposureSolver
 
 
 class CameraCalibration:
@@ -40,6 +41,18 @@ class CameraCalibration:
         self.clipping_threshold = 245
         self.clipping_prevention = True
         
+        # Calibration solver: model-based (None = legacy multipliers and interpolation)
+        self.exposure_solver = ExposureSolver()
+        
+        # Optional ExposurePriorTable and callable() -> observing conditions dict
+        # (sun_altitude, moon_illumination, roof_open) to start calibration from
+        self.exposure_priors = None
+        self.context_provider = None
+        
+        # Optional callable(profile_name) -> (width, height) that switches the
+        # camera's binning/ROI before a calibration exposure (None = full frame)
+        self.select_profile = None
+        
     def log(self, message):
         """Log message via callback"""
         if self.logger_callback:
@@ -68,8 +81,39 @@ class CameraCalibration:
         previous_brightness = None
         stalled_count = 0  # Track consecutive attempts with no brightness change
         
+        solver = self.exposure_solver
+        if solver is not None:
+            solver.reset()
+            solver.target_brightness = self.target_brightness
+            solver.max_exposure = self.max_exposure_sec
+            solver.saturation = self.clipping_threshold
+        
+        # Start from the prior recorded under these conditions, else the last
+        # converged exposure (the learned response slope carries over too)
+        context = self._exposure_context()
+        start = None
+        if context is not None:
+            start = self.exposure_priors.lookup(context, self.gain, self.target_brightness)
+            if start is not None:
+                self.log(f"  Starting from exposure prior: {start*1000:.2f}ms (sun {context['sun_altitude']:.1f}°)")
+        if start is None and solver is not None:
+            start = solver.seed_exposure(self.gain, self.exposure_seconds)
+            if start != self.exposure_seconds:
+                self.log(f"  Starting from last converged exposure: {start*1000:.2f}ms")
+        if start is not None:
+            self.exposure_seconds = max(0.000032, min(self.max_exposure_sec, start))
+            self.camera.set_control_value(self.asi.ASI_EXPOSURE, int(self.exposure_seconds * 1000000))
+        
         for attempt in range(max_attempts):
             try:
+                # Binned frames: a coarse probe until brightness is within 2x of
+                # target, then the (larger) calibration profile to converge
+                frame_size = None
+                if self.select_profile:
+                    coarse = (previous_brightness is None or
+                              not 0.5 <= previous_brightness / max(self.target_brightness, 1) <= 2.0)
+                    frame_size = self.select_profile('probe' if coarse else 'calibration')
+                
                 # REL-003: Use snapshot mode (consistent with capture_loop)
                 # Start exposure
                 self.camera.start_exposure()
@@ -94,10 +138,13 @@ class CameraCalibration:
                 # Get the captured data
                 data = self.camera.get_data_after_exposure()
                 
-                # Get camera dimensions for reshaping
-                camera_info = self.camera.get_camera_property()
-                width = camera_info['MaxWidth']
-                height = camera_info['MaxHeight']
+                # Get frame dimensions for reshaping
+                if frame_size:
+                    width, height = frame_size
+                else:
+                    camera_info = self.camera.get_camera_property()
+                    width = camera_info['MaxWidth']
+                    height = camera_info['MaxHeight']
                 
                 # Convert to numpy array for brightness calculation
                 # Use correct dtype based on RAW mode (RAW8 = uint8, RAW16 = uint16)
@@ -127,90 +174,31 @@ class CameraCalibration:
                 
                 # Store this measurement
                 calibration_history.append((self.exposure_seconds, brightness))
+                if solver is not None:
+                    solver.add(self.exposure_seconds, self.gain, brightness)
                 
                 self.log(f"Calibration attempt {attempt + 1}/{max_attempts}: brightness={brightness:.1f} (target={self.target_brightness})")
                 
                 # Check if we're within acceptable range (±20% of target)
                 if abs(brightness - self.target_brightness) < (self.target_brightness * 0.2):
                     self.log(f"Calibration complete! Final brightness: {brightness:.1f}")
+                    if solver is not None:
+                        solver.converged(self.exposure_seconds, self.gain)
+                    if context is not None:
+                        self.exposure_priors.record(context, self.exposure_seconds, self.gain, brightness)
                     return True
                 
-                # Try interpolation if we have at least 2 points with different brightness
-                new_exposure = None
-                if len(calibration_history) >= 2:
-                    # Check if we have points on both sides of target
-                    points_below = [(exp, b) for exp, b in calibration_history if b < self.target_brightness]
-                    points_above = [(exp, b) for exp, b in calibration_history if b > self.target_brightness]
-                    
-                    if points_below and points_above:
-                        # Get the closest point on each side
-                        closest_below = max(points_below, key=lambda x: x[1])  # Highest brightness below target
-                        closest_above = min(points_above, key=lambda x: x[1])  # Lowest brightness above target
-                        
-                        exp1, bright1 = closest_below
-                        exp2, bright2 = closest_above
-                        
-                        # Linear interpolation: exposure = exp1 + (target - bright1) * (exp2 - exp1) / (bright2 - bright1)
-                        if bright2 != bright1:
-                            interpolated_exp = exp1 + (self.target_brightness - bright1) * (exp2 - exp1) / (bright2 - bright1)
-                            
-                            # Validate interpolated value is reasonable
-                            if 0.000032 <= interpolated_exp <= self.max_exposure_sec:
-                                new_exposure = interpolated_exp
-                                self.log(f"  Using interpolation: {exp1*1000:.2f}ms (b={bright1:.0f}) <-> {exp2*1000:.2f}ms (b={bright2:.0f}) => {interpolated_exp*1000:.2f}ms")
-                
-                # If interpolation didn't work, use adaptive adjustment
-                if new_exposure is None:
-                    brightness_ratio = self.target_brightness / max(brightness, 1)  # Avoid divide by zero
-                    
-                    # Check if we're at max exposure and still below target
-                    at_max_exposure = abs(self.exposure_seconds - self.max_exposure_sec) < 0.001
-                    if at_max_exposure and brightness < self.target_brightness:
-                        self.log(f"  At maximum exposure ({self.max_exposure_sec*1000:.0f}ms) - accepting brightness {brightness:.1f} (target was {self.target_brightness})")
-                        self.log(f"Calibration complete at max exposure. Final brightness: {brightness:.1f}")
+                if solver is not None:
+                    new_exposure = solver.predict(self.gain)
+                    if new_exposure is None:
+                        self.log(f"  Exposure limit reached - accepting brightness {brightness:.1f} (target was {self.target_brightness})")
                         return True
-                    
-                    # Apply stall multiplier if progress has stalled
-                    stall_multiplier = 1.0
-                    if stalled_count >= 3:
-                        # If stalled for 3+ attempts, be much more aggressive
-                        stall_multiplier = 4.0
-                        self.log(f"  Progress stalled ({stalled_count} attempts) - applying 4x multiplier")
-                    elif stalled_count >= 2:
-                        # If stalled for 2 attempts, increase aggressiveness
-                        stall_multiplier = 2.5
-                        self.log(f"  Progress stalled ({stalled_count} attempts) - applying 2.5x multiplier")
-                    
-                    # Use more conservative adjustments to avoid overshooting
-                    if brightness < self.target_brightness * 0.5:
-                        # Very dark - significant increase
-                        adjustment_factor = min(brightness_ratio * 1.2 * stall_multiplier, 5.0)  # Increased cap with stall multiplier
-                    elif brightness < self.target_brightness * 0.8:
-                        # Somewhat dark - moderate increase
-                        adjustment_factor = min(brightness_ratio * 0.9 * stall_multiplier, 2.0)
-                    elif brightness > self.target_brightness * 2.0:
-                        # Very bright - significant decrease
-                        adjustment_factor = max(brightness_ratio * 0.8, 0.5)
-                    elif brightness > self.target_brightness * 1.2:
-                        # Somewhat bright - moderate decrease
-                        adjustment_factor = max(brightness_ratio * 0.9, 0.7)
-                    else:
-                        # Close to target - fine tune
-                        adjustment_factor = brightness_ratio * 0.95
-                    
-                    new_exposure = self.exposure_seconds * adjustment_factor
-                    
-                    # Check if we want to go higher but are at max
-                    if new_exposure > self.max_exposure_sec and brightness < self.target_brightness:
-                        self.log(f"  Reached maximum exposure limit ({self.max_exposure_sec*1000:.0f}ms)")
-                        # Actually SET the exposure to max before completing
-                        self.exposure_seconds = self.max_exposure_sec
-                        self.camera.set_control_value(self.asi.ASI_EXPOSURE, int(self.max_exposure_sec * 1000000))
-                        self.log(f"Calibration complete at max exposure. Brightness: {brightness:.1f} (target was {self.target_brightness})")
+                    self.log(f"  Model prediction: {self.exposure_seconds*1000:.2f}ms -> {new_exposure*1000:.2f}ms "
+                             f"(slope {solver.slope:.2f})")
+                else:
+                    new_exposure, finished = self._legacy_next_exposure(calibration_history, brightness, stalled_count)
+                    if finished:
                         return True
-                    
-                    new_exposure = max(0.000032, min(self.max_exposure_sec, new_exposure))
-                    self.log(f"  Adjusting exposure: {self.exposure_seconds*1000:.2f}ms -> {new_exposure*1000:.2f}ms (factor: {adjustment_factor:.2f})")
                 
                 self.exposure_seconds = new_exposure
                 self.camera.set_control_value(self.asi.ASI_EXPOSURE, int(new_exposure * 1000000))
@@ -222,6 +210,107 @@ class CameraCalibration:
         self.log(f"Calibration did not converge after {max_attempts} attempts. Continuing with current settings.")
         return False
     
+    def _exposure_context(self):
+        """Current observing conditions for the prior table, or None if priors are off/unavailable"""
+        if self.exposure_priors is None or self.context_provider is None:
+            return None
+        try:
+            context = self.context_provider()
+        except Exception as e:
+            self.log(f"  Exposure context unavailable: {e}")
+            return None
+        if not context or context.get('sun_altitude') is None:
+            return None
+        return context
+    
+    def _legacy_next_exposure(self, calibration_history, brightness, stalled_count):
+        """
+        Next calibration exposure from multipliers, stall detection and
+        interpolation between bracketing points (solver='legacy').
+        
+        Returns:
+            (new_exposure, finished) - finished is True when calibration
+            should end at the maximum exposure
+        """
+        # Try interpolation if we have at least 2 points with different brightness
+        new_exposure = None
+        if len(calibration_history) >= 2:
+            # Check if we have points on both sides of target
+            points_below = [(exp, b) for exp, b in calibration_history if b < self.target_brightness]
+            points_above = [(exp, b) for exp, b in calibration_history if b > self.target_brightness]
+            
+            if points_below and points_above:
+                # Get the closest point on each side
+                closest_below = max(points_below, key=lambda x: x[1])  # Highest brightness below target
+                closest_above = min(points_above, key=lambda x: x[1])  # Lowest brightness above target
+                
+                exp1, bright1 = closest_below
+                exp2, bright2 = closest_above
+                
+                # Linear interpolation: exposure = exp1 + (target - bright1) * (exp2 - exp1) / (bright2 - bright1)
+                if bright2 != bright1:
+                    interpolated_exp = exp1 + (self.target_brightness - bright1) * (exp2 - exp1) / (bright2 - bright1)
+                    
+                    # Validate interpolated value is reasonable
+                    if 0.000032 <= interpolated_exp <= self.max_exposure_sec:
+                        new_exposure = interpolated_exp
+                        self.log(f"  Using interpolation: {exp1*1000:.2f}ms (b={bright1:.0f}) <-> {exp2*1000:.2f}ms (b={bright2:.0f}) => {interpolated_exp*1000:.2f}ms")
+        
+        # If interpolation didn't work, use adaptive adjustment
+        if new_exposure is None:
+            brightness_ratio = self.target_brightness / max(brightness, 1)  # Avoid divide by zero
+            
+            # Check if we're at max exposure and still below target
+            at_max_exposure = abs(self.exposure_seconds - self.max_exposure_sec) < 0.001
+            if at_max_exposure and brightness < self.target_brightness:
+                self.log(f"  At maximum exposure ({self.max_exposure_sec*1000:.0f}ms) - accepting brightness {brightness:.1f} (target was {self.target_brightness})")
+                self.log(f"Calibration complete at max exposure. Final brightness: {brightness:.1f}")
+                return None, True
+            
+            # Apply stall multiplier if progress has stalled
+            stall_multiplier = 1.0
+            if stalled_count >= 3:
+                # If stalled for 3+ attempts, be much more aggressive
+                stall_multiplier = 4.0
+                self.log(f"  Progress stalled ({stalled_count} attempts) - applying 4x multiplier")
+            elif stalled_count >= 2:
+                # If stalled for 2 attempts, increase aggressiveness
+                stall_multiplier = 2.5
+                self.log(f"  Progress stalled ({stalled_count} attempts) - applying 2.5x multiplier")
+            
+            # Use more conservative adjustments to avoid overshooting
+            if brightness < self.target_brightness * 0.5:
+                # Very dark - significant increase
+                adjustment_factor = min(brightness_ratio * 1.2 * stall_multiplier, 5.0)  # Increased cap with stall multiplier
+            elif brightness < self.target_brightness * 0.8:
+                # Somewhat dark - moderate increase
+                adjustment_factor = min(brightness_ratio * 0.9 * stall_multiplier, 2.0)
+            elif brightness > self.target_brightness * 2.0:
+                # Very bright - significant decrease
+                adjustment_factor = max(brightness_ratio * 0.8, 0.5)
+            elif brightness > self.target_brightness * 1.2:
+                # Somewhat bright - moderate decrease
+                adjustment_factor = max(brightness_ratio * 0.9, 0.7)
+            else:
+                # Close to target - fine tune
+                adjustment_factor = brightness_ratio * 0.95
+            
+            new_exposure = self.exposure_seconds * adjustment_factor
+            
+            # Check if we want to go higher but are at max
+            if new_exposure > self.max_exposure_sec and brightness < self.target_brightness:
+                self.log(f"  Reached maximum exposure limit ({self.max_exposure_sec*1000:.0f}ms)")
+                # Actually SET the exposure to max before completing
+                self.exposure_seconds = self.max_exposure_sec
+                self.camera.set_control_value(self.asi.ASI_EXPOSURE, int(self.max_exposure_sec * 1000000))
+                self.log(f"Calibration complete at max exposure. Brightness: {brightness:.1f} (target was {self.target_brightness})")
+                return None, True
+            
+            new_exposure = max(0.000032, min(self.max_exposure_sec, new_exposure))
+            self.log(f"  Adjusting exposure: {self.exposure_seconds*1000:.2f}ms -> {new_exposure*1000:.2f}ms (factor: {adjustment_factor:.2f})")
+        
+        return new_exposure, False
+    
     def adjust_exposure_auto(self, img_array):
         """
         Adjust exposure based on image brightness
@@ -398,7 +487,7 @@ class CameraCalibration:
     
     def update_settings(self, exposure_seconds=None, gain=None, target_brightness=None,
                        max_exposure_sec=None, algorithm=None, percentile=None,
-                       clipping_threshold=None, clipping_prevention=None):
+                       clipping_threshold=None, clipping_prevention=None, solver=None):
         """
         Update calibration settings
         
@@ -411,6 +500,7 @@ class CameraCalibration:
             percentile: Percentile value for percentile algorithm
             clipping_threshold: Pixel value threshold for clipping detection
             clipping_prevention: Enable clipping prevention
+            solver: Calibration solver, 'model' or 'legacy'
         """
         if exposure_seconds is not None:
             self.exposure_seconds = exposure_seconds
@@ -428,3 +518,8 @@ class CameraCalibration:
             self.clipping_threshold = clipping_threshold
         if clipping_prevention is not None:
             self.clipping_prevention = clipping_prevention
+        if solver is not None:
+            if solver == 'legacy':
+                self.exposure_solver = None
+            elif self.exposure_solver is None:
+                self.exposure_solver = ExposureSolver()
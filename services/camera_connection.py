@@ -9,6 +9,8 @@ import time
 import threading
 from typing import Optional, List, Dict, Callable, Any
 
+from .capture_profiles import CaptureGeometry, DEFAULT_PROFILE, resolve_geometry
+
 
 class CameraConnection:
     """
@@ -50,6 +52,7 @@ class CameraConnection:
         # Current capture mode
         self.current_image_type = None  # ASI_IMG_RAW8 or ASI_IMG_RAW16
         self.current_bit_depth: int = 8  # 8 for RAW8, 16 for RAW16
+        self.capture_geometry: Optional[CaptureGeometry] = None  # Binning/ROI currently applied
         
         # Thread safety
         self._cleanup_lock = threading.Lock()
@@ -81,7 +84,11 @@ class CameraConnection:
             self.asi = asi
             self.log("zwoasi module imported successfully")
             
-            if self.sdk_path and os.path.exists(self.sdk_path):
+            if getattr(asi, 'VIRTUAL', False):
+                # Simulated backend (services/virtual_zwoasi.py) needs no SDK library
+                asi.init(self.sdk_path)
+                self.log("✓ Virtual ZWO SDK initialized")
+            elif self.sdk_path and os.path.exists(self.sdk_path):
                 self.log(f"Attempting SDK init with configured path: {self.sdk_path}")
                 asi.init(self.sdk_path)
                 self.log(f"✓ ZWO SDK initialized successfully from: {self.sdk_path}")
@@ -295,6 +302,7 @@ class CameraConnection:
                     image_type=self.asi.ASI_IMG_RAW8
                 )
                 self.camera.set_image_type(self.asi.ASI_IMG_RAW8)
+                self.capture_geometry = resolve_geometry(camera_info, DEFAULT_PROFILE)
                 self.log(f"  ROI: Full frame {camera_info['MaxWidth']}x{camera_info['MaxHeight']}")
             
             self.log(f"✓ Camera connection successful")
@@ -525,18 +533,43 @@ class CameraConnection:
             self.current_image_type = image_type
             self.current_bit_depth = 16 if use_raw16 else 8
             
-            # Set ROI to full frame
-            self.camera.set_roi(start_x=0, start_y=0, width=camera_info['MaxWidth'], 
-                               height=camera_info['MaxHeight'], bins=1, image_type=image_type)
+            # Set binning and ROI for the capture profile (full frame by default)
+            geometry = self.apply_capture_profile(settings.get('capture_profile', DEFAULT_PROFILE),
+                                                  force=True)
             self.camera.set_image_type(image_type)
             
             mode_str = "RAW16" if use_raw16 else "RAW8"
-            self.log(f"  ROI: Full frame {camera_info['MaxWidth']}x{camera_info['MaxHeight']} ({mode_str})")
+            self.log(f"  ROI: {geometry.width}x{geometry.height} bin {geometry.bins} "
+                     f"({geometry.profile} profile, {mode_str})")
             self.log("Camera configuration applied")
             
         except Exception as e:
             self.log(f"Error configuring camera: {e}")
     
+    def apply_capture_profile(self, profile: str, force: bool = False) -> CaptureGeometry:
+        """
+        Switch binning and ROI to a capture profile (between exposures).
+        
+        Args:
+            profile: Profile name from capture_profiles.PROFILES
+            force: Re-apply even if the profile is already active
+            
+        Returns:
+            CaptureGeometry now in effect
+        """
+        geometry = resolve_geometry(self.camera.get_camera_property(), profile)
+        if not force and geometry == self.capture_geometry:
+            return geometry
+        
+        image_type = self.current_image_type
+        if image_type is None:
+            image_type = self.asi.ASI_IMG_RAW8
+        self.camera.set_roi(start_x=geometry.start_x, start_y=geometry.start_y,
+                            width=geometry.width, height=geometry.height,
+                            bins=geometry.bins, image_type=image_type)
+        self.capture_geometry = geometry
+        return geometry
+    
     def _configure_white_balance(self, settings: Dict[str, Any]) -> None:
         """Configure white balance based on mode."""
         wb_mode = settings.get('wb_mode', 'asi_auto')
@@ -643,6 +676,7 @@ class CameraConnection:
             finally:
                 # Always clear camera reference even if close failed
                 self.camera = None
+                self.capture_geometry = None
                 self.log("Camera reference cleared")
     
     # =========================================================================
@@ -2,59 +2,17 @@
 Utility functions for ZWO ASI camera operations
 """
 import numpy as np
-from datetime import datetime
-
-
-def simple_debayer_rggb(raw_data, width, height):
-    """
-    Simple Bayer RGGB to RGB conversion using nearest neighbor interpolation
-    This is a fallback for when OpenCV is not available
-    
-    Args:
-        raw_data: Raw Bayer pattern data (numpy array)
-        width: Image width
-        height: Image height
-        
-    Returns:
-        RGB image as numpy array (height, width, 3)
-    """
-    # Reshape to 2D array
-    bayer = raw_data.reshape((height, width))
-    
-    # Create RGB image
-    rgb = np.zeros((height, width, 3), dtype=np.uint8)
-    
-    # RGGB pattern (Red at even rows/even cols, Blue at odd rows/odd cols)
-    # R at (0,0), G at (0,1) and (1,0), B at (1,1)
-    
-    # Red channel - copy from even rows, even columns
-    rgb[::2, ::2, 0] = bayer[::2, ::2]  # R positions
-    # Interpolate for other positions (simple nearest neighbor)
-    rgb[1::2, ::2, 0] = bayer[::2, ::2]  # Copy down
-    rgb[::2, 1::2, 0] = bayer[::2, ::2]  # Copy right
-    rgb[1::2, 1::2, 0] = bayer[::2, ::2]  # Copy diagonal
-    
-    # Green channel - average of two green positions
-    rgb[::2, 1::2, 1] = bayer[::2, 1::2]  # G at R row
-    rgb[1::2, ::2, 1] = bayer[1::2, ::2]  # G at B row
-    rgb[::2, ::2, 1] = (bayer[::2, 1::2].astype(np.uint16) + bayer[1::2, ::2].astype(np.uint16)) // 2  # Interpolate
-    rgb[1::2, 1::2, 1] = (bayer[::2, 1::2].astype(np.uint16) + bayer[1::2, ::2].astype(np.uint16)) // 2  # Interpolate
-    
-    # Blue channel - copy from odd rows, odd columns
-    rgb[1::2, 1::2, 2] = bayer[1::2, 1::2]  # B positions
-    # Interpolate for other positions
-    rgb[::2, 1::2, 2] = bayer[1::2, 1::2]  # Copy up
-    rgb[1::2, ::2, 2] = bayer[1::2, 1::2]  # Copy left
-    rgb[::2, ::2, 2] = bayer[1::2, 1::2]  # Copy diagonal
-    
-    return rgb
+from .capture_schedule import CaptureSchedule
+from .image_stats import HistogramStats
+from .debayer import debayer, to_uint8
 
 
 def is_within_scheduled_window(scheduled_capture_enabled, scheduled_start_time, scheduled_end_time):
     """
     Check if current time is within the scheduled capture window.
     Handles overnight captures (e.g., 17:00 - 09:00).
-    Returns True if scheduled capture is disabled or if within window.
+    Returns True if scheduled capture is disabled, the times are invalid or
+    if within window (see services/capture_schedule.py).
     
     Args:
         scheduled_capture_enabled: Whether scheduling is enabled
@@ -64,34 +22,10 @@ def is_within_scheduled_window(scheduled_capture_enabled, scheduled_start_time,
     Returns:
         True if within window or scheduling disabled, False otherwise
     """
-    if not scheduled_capture_enabled:
-        return True  # Always capture if scheduling is disabled
-    
-    try:
-        now = datetime.now()
-        current_time = now.time()
-        
-        # Parse start and end times
-        start_hour, start_min = map(int, scheduled_start_time.split(':'))
-        end_hour, end_min = map(int, scheduled_end_time.split(':'))
-        
-        start_time = now.replace(hour=start_hour, minute=start_min, second=0, microsecond=0).time()
-        end_time = now.replace(hour=end_hour, minute=end_min, second=0, microsecond=0).time()
-        
-        # Check if this is an overnight window (e.g., 17:00 - 09:00)
-        if start_time > end_time:
-            # Overnight: capture if after start OR before end (exclusive)
-            return current_time >= start_time or current_time < end_time
-        else:
-            # Same day: capture if between start and end (end exclusive)
-            return start_time <= current_time < end_time
-            
-    except Exception as e:
-        print(f"Error checking scheduled window: {e}")
-        return True  # Default to allowing capture on error
+    return CaptureSchedule(scheduled_capture_enabled, scheduled_start_time, scheduled_end_time).is_active()
 
 
-def calculate_brightness(img_array, algorithm='percentile', percentile=75):
+def calculate_brightness(img_array, algorithm='percentile', percentile=75, stats=None):
     """
     Calculate image brightness using specified algorithm
     
@@ -99,10 +33,21 @@ def calculate_brightness(img_array, algorithm='percentile', percentile=75):
         img_array: Image as numpy array
         algorithm: 'mean', 'median', or 'percentile'
         percentile: Percentile value for percentile algorithm (0-100)
+        stats: Optional precomputed HistogramStats for img_array
         
     Returns:
         Brightness value (0-255)
     """
+    if stats is None and img_array.dtype in (np.uint8, np.uint16):
+        stats = HistogramStats.from_array(img_array)
+    
+    if stats is not None:
+        if algorithm == 'median':
+            return stats.median()
+        elif algorithm == 'percentile':
+            return stats.percentile(percentile)
+        return stats.mean()  # 'mean' and default
+    
     if algorithm == 'mean':
         return np.mean(img_array)
     elif algorithm == 'median':
@@ -134,9 +79,10 @@ def check_clipping(img_array, clipping_threshold=245):
     return clipped_percent, is_clipping
 
 
-def debayer_raw_image(raw_data, width, height, bayer_pattern='BGGR', bit_depth=8, return_raw16=False):
+def debayer_raw_image(raw_data, width, height, bayer_pattern='BGGR', bit_depth=8, return_raw16=False,
+                      buffers=None, mode='bilinear'):
     """
-    Convert raw Bayer data to RGB using OpenCV (or fallback).
+    Convert raw Bayer data to RGB using OpenCV (or the numpy engine in services/debayer.py).
     
     Args:
         raw_data: Raw byte data from camera
@@ -145,6 +91,11 @@ def debayer_raw_image(raw_data, width, height, bayer_pattern='BGGR', bit_depth=8
         bayer_pattern: Bayer pattern string (RGGB, BGGR, GRBG, GBRG)
         bit_depth: Bit depth of raw data (8 for RAW8, 16 for RAW16)
         return_raw16: If True and bit_depth=16, include the full uint16 RGB in tuple
+        buffers: Optional FrameSlot (services/frame_pool.py); when given, the
+                 results are written into its rgb16/rgb_no_wb arrays and those
+                 arrays are returned instead of new allocations
+        mode: 'bilinear' (full resolution) or 'superpixel' (half resolution, one
+              pixel per 2x2 cell, for previews/metering/ML; buffers are not used)
         
     Returns:
         tuple: (img_rgb_uint8, img_rgb_raw16_or_None)
@@ -157,6 +108,15 @@ def debayer_raw_image(raw_data, width, height, bayer_pattern='BGGR', bit_depth=8
     else:
         img_array = np.frombuffer(raw_data, dtype=np.uint8).reshape((height, width))
     
+    if mode == 'superpixel':
+        # OpenCV has no superpixel demosaic; the numpy one is cheaper than any full-size debayer
+        img_rgb = debayer(img_array, bayer_pattern, mode='superpixel')
+        if bit_depth == 16:
+            return to_uint8(img_rgb), (img_rgb if return_raw16 else None)
+        return img_rgb, None
+    
+    rgb16 = buffers.rgb16 if buffers is not None else None
+    rgb8 = buffers.rgb_no_wb if buffers is not None else None
     try:
         import cv2
         bayer_map = {
@@ -166,31 +126,36 @@ def debayer_raw_image(raw_data, width, height, bayer_pattern='BGGR', bit_depth=8
             'GBRG': cv2.COLOR_BayerGB2RGB
         }
         bayer_code = bayer_map.get(bayer_pattern, cv2.COLOR_BayerBG2RGB)
-        img_rgb = cv2.cvtColor(img_array, bayer_code)
         
-        # For 16-bit data, create both versions
+        # Debayer straight into the pooled arrays when given (no intermediate copies)
         if bit_depth == 16:
-            img_rgb_raw16 = img_rgb.copy() if return_raw16 else None
-            # Scale 16-bit to 8-bit for standard processing pipeline (0-65535 -> 0-255)
-            img_rgb = (img_rgb / 257).astype(np.uint8)
+            img_rgb16 = cv2.cvtColor(img_array, bayer_code, dst=rgb16)
         else:
-            img_rgb_raw16 = None
-        
-        # Always return tuple for consistent unpacking (img_rgb, img_rgb_raw16_or_None)
-        return img_rgb, img_rgb_raw16
+            img_rgb = cv2.cvtColor(img_array, bayer_code, dst=rgb8)
     except ImportError:
-        result = simple_debayer_rggb(img_array, width, height)
-        # Always return tuple for consistent unpacking
-        return result, None
+        if bit_depth == 16:
+            img_rgb16 = debayer(img_array, bayer_pattern, out=rgb16)
+        else:
+            img_rgb = debayer(img_array, bayer_pattern, out=rgb8)
+    
+    # Always return tuple for consistent unpacking (img_rgb, img_rgb_raw16_or_None)
+    if bit_depth == 16:
+        # Scale 16-bit to 8-bit for standard processing pipeline (0-65535 -> 0-255), integer only
+        img_rgb = to_uint8(img_rgb16, out=rgb8)
+        return img_rgb, (img_rgb16 if return_raw16 else None)
+    return img_rgb, None
 
 
-def apply_white_balance(img_rgb, wb_config):
+def apply_white_balance(img_rgb, wb_config, out=None):
     """
     Apply software white balance adjustments to RGB image.
     
     Args:
         img_rgb: RGB numpy array
         wb_config: Dict with white balance settings
+        out: Optional preallocated uint8 RGB array for the result. Unused when
+             no software white balance applies, in which case img_rgb itself
+             is returned.
         
     Returns:
         Adjusted RGB numpy array
@@ -201,27 +166,26 @@ def apply_white_balance(img_rgb, wb_config):
     wb_mode = wb_config.get('mode', 'asi_auto')
     
     try:
-        import cv2
-        
+        # Both algorithms work on the RGB array directly and write into out
         if wb_mode == 'gray_world':
             from services.color_balance import apply_gray_world_robust
-            img_bgr = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
-            img_bgr = apply_gray_world_robust(
-                img_bgr,
+            return apply_gray_world_robust(
+                img_rgb,
                 low_pct=wb_config.get('gray_world_low_pct', 5),
-                high_pct=wb_config.get('gray_world_high_pct', 95)
+                high_pct=wb_config.get('gray_world_high_pct', 95),
+                out=out,
+                order='RGB'
             )
-            return cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
         
         elif wb_mode == 'manual' and wb_config.get('apply_software_gains', False):
             from services.color_balance import apply_manual_gains
-            img_bgr = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
-            img_bgr = apply_manual_gains(
-                img_bgr,
+            return apply_manual_gains(
+                img_rgb,
                 red_gain=wb_config.get('manual_red_gain', 1.0),
-                blue_gain=wb_config.get('manual_blue_gain', 1.0)
+                blue_gain=wb_config.get('manual_blue_gain', 1.0),
+                out=out,
+                order='RGB'
             )
-            return cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
     
     except ImportError:
         pass
@@ -233,12 +197,28 @@ def calculate_image_stats(img_array):
     """
     Calculate image statistics for metadata.
     
+    Integer images are answered from a single histogram pass
+    (see services/image_stats.py) instead of one full sort per statistic.
+    
     Args:
         img_array: Image as numpy array
         
     Returns:
         Dict with brightness, min, max, std_dev, percentiles
     """
+    if img_array.dtype in (np.uint8, np.uint16):
+        stats = HistogramStats.from_array(img_array)
+        return {
+            'mean': stats.mean(),
+            'median': stats.median(),
+            'min': int(stats.min()),
+            'max': int(stats.max()),
+            'std_dev': stats.std(),
+            'p25': stats.percentile(25),
+            'p75': stats.percentile(75),
+            'p95': stats.percentile(95),
+        }
+    
     return {
         'mean': np.mean(img_array),
         'median': np.median(img_array),
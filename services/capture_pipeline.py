@@ -0,0 +1,508 @@
+"""
+Pipelined capture support
+
+In pipelined mode the capture thread only exposes and reads out; every raw
+frame is handed to a separate processing thread (debayer, white balance,
+stats, stretch, overlays, encode) through a small bounded queue. When the
+processing stage falls behind, the oldest queued frame is dropped instead of
+stalling the camera, so cadence is set by the exposure alone.
+
+StageTimings records how long each stage takes so the stage limiting
+throughput is visible in logs and in the web /status output.
+
+With several cameras in one process, ProcessingPool runs a fixed set of
+worker threads for all of them: each camera submits to its own drop-oldest
+queue and the workers take frames round-robin across cameras, so a fast
+camera cannot starve a slow one.
+
+CoalescingFrameQueue feeds the GUI image processor: file-output frames keep
+a short ordered backlog within a byte budget, preview-only frames coalesce
+so only the newest is processed.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .logger import app_logger
+
+
+class StageTimings:
+    """Thread-safe per-stage timing statistics (seconds)"""
+
+    def __init__(self, smoothing=0.2):
+        """
+        Args:
+            smoothing: Weight of the newest sample in the moving average (0-1)
+        """
+        self.smoothing = smoothing
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        """Add one timing sample for a stage"""
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                self._stages[stage] = {'count': 1, 'last': seconds, 'avg': seconds, 'max': seconds}
+                return
+            entry['count'] += 1
+            entry['last'] = seconds
+            entry['avg'] += self.smoothing * (seconds - entry['avg'])
+            entry['max'] = max(entry['max'], seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        """Context manager that records the duration of its block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        """
+        Copy of the current statistics.
+
+        Returns:
+            Dict of stage -> {'count', 'last_ms', 'avg_ms', 'max_ms'}
+        """
+        with self._lock:
+            return {
+                stage: {
+                    'count': entry['count'],
+                    'last_ms': round(entry['last'] * 1000.0, 2),
+                    'avg_ms': round(entry['avg'] * 1000.0, 2),
+                    'max_ms': round(entry['max'] * 1000.0, 2),
+                }
+                for stage, entry in self._stages.items()
+            }
+
+    def bottleneck(self, stages=None):
+        """
+        Stage with the highest moving average.
+
+        Args:
+            stages: Optional subset of stage names to consider
+
+        Returns:
+            Tuple of (stage, avg_seconds), or (None, 0.0) if nothing recorded
+        """
+        with self._lock:
+            candidates = [(name, entry['avg']) for name, entry in self._stages.items()
+                          if stages is None or name in stages]
+        if not candidates:
+            return None, 0.0
+        return max(candidates, key=lambda item: item[1])
+
+    def summary(self):
+        """One-line summary for logging"""
+        parts = [f"{stage}={stats['avg_ms']:.0f}ms" for stage, stats in self.snapshot().items()]
+        return ", ".join(parts)
+
+    def reset(self):
+        """Forget all samples"""
+        with self._lock:
+            self._stages.clear()
+
+
+class FrameQueue:
+    """Bounded FIFO that drops the oldest item instead of blocking the producer"""
+
+    def __init__(self, maxsize=2):
+        """
+        Args:
+            maxsize: Maximum queued items (at least 1)
+        """
+        self.maxsize = max(1, int(maxsize))
+        self.dropped = 0
+        self._items = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item):
+        """
+        Queue an item, evicting the oldest one when full.
+
+        Returns:
+            The evicted item, or None
+        """
+        with self._cond:
+            evicted = None
+            if len(self._items) >= self.maxsize:
+                evicted = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+            return evicted
+
+    def get(self, timeout=None):
+        """
+        Take the oldest item.
+
+        Returns:
+            The item, or None on timeout or once closed and empty
+        """
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        """Wake consumers; get() returns None once the queue is empty"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class CoalescingFrameQueue:
+    """
+    Frame queue with a byte budget where the latest preview frame wins
+
+    Two kinds of items share one arrival-ordered queue:
+
+    - ordered items (file output) keep a small FIFO backlog; beyond backlog
+      items or max_bytes the oldest is dropped
+    - coalescing items (preview only) replace any queued coalescing item, so
+      a preview consumer only ever gets the newest frame
+
+    newest() lets a consumer working through the ordered backlog preview the
+    latest arrival without waiting for its turn.
+
+    Evicted items are returned from put() and not referenced by the queue
+    afterwards, so their buffers are released as soon as the caller lets go.
+    The newest item is always accepted, even if it alone exceeds max_bytes.
+    """
+
+    def __init__(self, backlog=3, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            backlog: Maximum queued ordered items (at least 1)
+            max_bytes: Budget for the bytes held by queued items
+        """
+        self.backlog = max(1, int(backlog))
+        self.max_bytes = max_bytes
+        self.dropped = 0  # Ordered items evicted (backlog or byte budget)
+        self.coalesced = 0  # Coalescing items superseded by a newer one
+        self.nbytes = 0
+        self._items = deque()  # (item, nbytes, coalesce)
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item, nbytes=0, coalesce=False):
+        """
+        Queue an item, evicting superseded or oldest items as needed.
+
+        Args:
+            item: Item to queue
+            nbytes: Bytes the item holds (counted against max_bytes)
+            coalesce: True for a preview-only item that replaces a queued one
+
+        Returns:
+            List of evicted items (oldest first)
+        """
+        with self._cond:
+            evicted = []
+            if coalesce:
+                for entry in [entry for entry in self._items if entry[2]]:
+                    self._remove(entry, evicted)
+                    self.coalesced += 1
+            self._items.append((item, nbytes, coalesce))
+            self.nbytes += nbytes
+
+            ordered = [entry for entry in self._items if not entry[2]]
+            while ordered and len(ordered) > self.backlog:
+                self._remove(ordered.pop(0), evicted)
+                self.dropped += 1
+            while self.nbytes > self.max_bytes and len(self._items) > 1:
+                self._remove(self._items[0], evicted)  # Never the new item, it is last
+                self.dropped += 1
+            self._cond.notify()
+            return evicted
+
+    def _remove(self, entry, evicted):
+        del self._items[next(index for index, queued in enumerate(self._items) if queued is entry)]
+        self.nbytes -= entry[1]
+        evicted.append(entry[0])
+
+    def get(self, timeout=None):
+        """
+        Take the oldest item.
+
+        Returns:
+            The item, or None on timeout or once closed and empty
+        """
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                item, nbytes, _ = self._items.popleft()
+                self.nbytes -= nbytes
+                return item
+            return None
+
+    def newest(self):
+        """The most recently queued item, left in the queue (None if empty)"""
+        with self._cond:
+            return self._items[-1][0] if self._items else None
+
+    def close(self):
+        """Wake consumers; get() returns None once the queue is empty"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class CapturePipeline:
+    """Processing thread fed by a drop-oldest FrameQueue"""
+
+    def __init__(self, process_fn, maxsize=2, timings=None, name="capture-pipeline"):
+        """
+        Args:
+            process_fn: Called with each queued item on the processing thread
+            maxsize: Queue depth before the oldest frame is dropped
+            timings: Optional StageTimings shared with the capture side
+            name: Thread name
+        """
+        self.process_fn = process_fn
+        self.timings = timings if timings is not None else StageTimings()
+        self.queue = FrameQueue(maxsize)
+        self.name = name
+        self.processed = 0
+        self._thread = None
+
+    @property
+    def dropped(self):
+        """Frames discarded because processing fell behind"""
+        return self.queue.dropped
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the processing thread"""
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """
+        Hand a frame to the processing stage (never blocks).
+
+        Returns:
+            True if queued without dropping an older frame
+        """
+        queued_at = time.perf_counter()
+        evicted = self.queue.put((queued_at, item))
+        if evicted is not None:
+            app_logger.warning(f"Processing behind capture: dropped oldest queued frame "
+                               f"({self.queue.dropped} dropped total)")
+            return False
+        return True
+
+    def stop(self, timeout=5.0):
+        """Process what is already queued, then stop the thread"""
+        self.queue.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                app_logger.warning(f"{self.name}: processing thread still busy after {timeout}s")
+            self._thread = None
+
+    def stats(self):
+        """Queue and timing statistics for status output"""
+        stage, avg = self.timings.bottleneck()
+        return {
+            'queued': len(self.queue),
+            'queue_size': self.queue.maxsize,
+            'processed': self.processed,
+            'dropped': self.queue.dropped,
+            'bottleneck': stage,
+            'bottleneck_ms': round(avg * 1000.0, 2),
+            'stages': self.timings.snapshot(),
+        }
+
+    def _run(self):
+        while True:
+            entry = self.queue.get(timeout=0.5)
+            if entry is None:
+                if self.queue.closed:
+                    break
+                continue
+            self._process(entry)
+
+    def _process(self, entry):
+        queued_at, item = entry
+        self.timings.record('queue_wait', time.perf_counter() - queued_at)
+        try:
+            self.process_fn(item)
+            self.processed += 1
+        except Exception as e:
+            app_logger.error(f"{self.name}: error processing frame: {e}")
+            import traceback
+            app_logger.debug(traceback.format_exc())
+
+
+class PoolSource(CapturePipeline):
+    """One camera's queue in a ProcessingPool (same interface as CapturePipeline)"""
+
+    def __init__(self, pool, process_fn, maxsize=2, timings=None, name="pool-source"):
+        super().__init__(process_fn, maxsize=maxsize, timings=timings, name=name)
+        self.pool = pool
+        self.busy = False  # A worker is processing one of its frames (frames stay in order)
+
+    @property
+    def running(self):
+        return self.pool.running
+
+    def start(self):
+        """Start the pool's workers (if not already running)"""
+        self.pool.start()
+
+    def submit(self, item):
+        queued = super().submit(item)
+        self.pool._wake()
+        return queued
+
+    def stop(self, timeout=5.0):
+        """Process what is already queued, then stop taking frames"""
+        self.queue.close()
+        self.pool._wake()
+        deadline = time.monotonic() + timeout
+        with self.pool._cond:
+            while (len(self.queue) or self.busy) and self.pool.running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    app_logger.warning(f"{self.name}: frames still queued after {timeout}s")
+                    break
+                self.pool._cond.wait(remaining)
+
+
+class ProcessingPool:
+    """Worker threads shared by several capture sources, serving them round-robin"""
+
+    def __init__(self, workers=2, name="processing-pool"):
+        """
+        Args:
+            workers: Number of processing threads
+            name: Thread name prefix
+        """
+        self.workers = max(1, int(workers))
+        self.name = name
+        self.sources = []
+        self._cursor = 0  # Source to try first on the next pick
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._threads = []
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def add_source(self, process_fn, maxsize=2, timings=None, name=None):
+        """
+        Register a capture source.
+
+        Args:
+            process_fn: Called with each of the source's frames on a worker thread
+            maxsize: Source queue depth before its oldest frame is dropped
+            timings: Optional StageTimings shared with the capture side
+            name: Source name for logging
+
+        Returns:
+            PoolSource to submit frames to
+        """
+        source = PoolSource(self, process_fn, maxsize=maxsize, timings=timings,
+                            name=name or f"{self.name}-{len(self.sources)}")
+        with self._cond:
+            self.sources.append(source)
+        return source
+
+    def start(self):
+        """Start the worker threads"""
+        with self._cond:
+            if self.running:
+                return
+            self._stopping = False
+            self._threads = [threading.Thread(target=self._run, name=f"{self.name}-{index}", daemon=True)
+                             for index in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=5.0):
+        """Process what is already queued, then stop the workers"""
+        for source in self.sources:
+            source.queue.close()
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+            if thread.is_alive():
+                app_logger.warning(f"{thread.name}: processing thread still busy after {timeout}s")
+        self._threads = []
+
+    def stats(self):
+        """Per-source statistics for status output"""
+        return {source.name: source.stats() for source in self.sources}
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _next_job(self):
+        """
+        Next (source, entry) to process, taking sources in turn; blocks until
+        a frame is available.
+
+        Returns:
+            The job, or None once stopping with nothing left to do
+        """
+        with self._cond:
+            while True:
+                count = len(self.sources)
+                for offset in range(count):
+                    source = self.sources[(self._cursor + offset) % count]
+                    if source.busy:
+                        continue
+                    entry = source.queue.get(timeout=0)
+                    if entry is not None:
+                        source.busy = True
+                        self._cursor = (self._cursor + offset + 1) % count
+                        return source, entry
+                if self._stopping:
+                    return None
+                self._cond.wait(0.5)
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                break
+            source, entry = job
+            try:
+                source._process(entry)
+            finally:
+                with self._cond:
+                    source.busy = False
+                    self._cond.notify_all()
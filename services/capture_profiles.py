@@ -0,0 +1,68 @@
+"""
+Capture profiles: sensor binning and ROI per use of a frame
+
+Published frames need the full sensor, but calibration only needs a
+brightness number and the ML classifiers only look at a few hundred pixels.
+Reading those frames out binned cuts readout, USB transfer and processing by
+bins^2. Each profile names the smallest frame width its consumer needs; the
+largest binning the camera supports that still meets it is used, and the
+full field of view is kept so brightness statistics stay comparable.
+"""
+from collections import namedtuple
+
+
+# min_width: narrowest binned frame the consumer can use (None = full resolution)
+CaptureProfile = namedtuple('CaptureProfile', 'name min_width')
+
+# Geometry actually applied to the camera (ROI coordinates are in binned pixels)
+CaptureGeometry = namedtuple('CaptureGeometry', 'profile bins start_x start_y width height')
+
+PROFILES = {
+    'full': CaptureProfile('full', None),  # Published frames
+    'calibration': CaptureProfile('calibration', 640),  # Rapid auto-exposure calibration
+    'probe': CaptureProfile('probe', 256),  # Coarse brightness probe (far from target)
+    'ml': CaptureProfile('ml', 256),  # ML-only capture (classifier inputs are 128-256 px)
+}
+
+DEFAULT_PROFILE = 'full'
+
+
+def get_profile(name):
+    """CaptureProfile for a name (unknown names fall back to full resolution)"""
+    return PROFILES.get(name, PROFILES[DEFAULT_PROFILE])
+
+
+def resolve_geometry(camera_info, profile):
+    """
+    Binning and ROI for a profile on a camera.
+
+    Args:
+        camera_info: zwoasi camera property dict (MaxWidth, MaxHeight, SupportedBins)
+        profile: CaptureProfile or profile name
+
+    Returns:
+        CaptureGeometry centred on the sensor; width is a multiple of 8 and
+        height and offsets are even, as the SDK requires (even offsets also
+        keep the Bayer phase)
+    """
+    if isinstance(profile, str):
+        profile = get_profile(profile)
+    max_width = camera_info['MaxWidth']
+    max_height = camera_info['MaxHeight']
+
+    bins = 1
+    if profile.min_width:
+        for candidate in sorted(camera_info.get('SupportedBins') or [1]):
+            if max_width // candidate >= profile.min_width:
+                bins = max(bins, candidate)
+
+    if bins == 1:
+        return CaptureGeometry(profile.name, 1, 0, 0, max_width, max_height)
+
+    binned_width = max_width // bins
+    binned_height = max_height // bins
+    width = binned_width - binned_width % 8
+    height = binned_height - binned_height % 2
+    start_x = ((binned_width - width) // 2) & ~1
+    start_y = ((binned_height - height) // 2) & ~1
+    return CaptureGeometry(profile.name, bins, start_x, start_y, width, height)
@@ -0,0 +1,199 @@
+"""
+Capture scheduling: when capture runs and when that next changes
+
+A CaptureSchedule answers "is capture on now?" and "when does that change
+next?", so capture loops sleep on an event until the next window boundary
+(or until capture is stopped) instead of polling the clock. Three modes:
+
+- disabled: always on
+- time: a daily local-time window from "HH:MM" to "HH:MM" (overnight windows
+  such as 17:00 - 09:00 wrap past midnight)
+- sun: on while the sun is below an altitude at the configured location
+  (e.g. -6 = civil dusk to civil dawn), boundaries from astral
+
+The GUI camera loop (ZWOCamera.capture_loop), the headless runner and the
+multi-camera runner all wait through CaptureSchedule.wait.
+
+Config:
+    "scheduled_capture_enabled": true,
+    "scheduled_capture_mode": "sun",        # "time" | "sun"
+    "scheduled_start_time": "17:00",        # time mode
+    "scheduled_end_time": "09:00",
+    "scheduled_sun_altitude": -6.0          # sun mode, location from weather.latitude/longitude
+"""
+from datetime import datetime, timedelta
+
+try:
+    from astral import Observer, SunDirection
+    from astral.sun import elevation, time_at_elevation
+    ASTRAL_AVAILABLE = True
+except ImportError:
+    ASTRAL_AVAILABLE = False
+
+from .logger import app_logger
+
+
+MODES = ('time', 'sun')
+
+# Longest single sleep: clock changes (DST, NTP steps) are picked up at least this often
+MAX_WAIT_SECONDS = 900.0
+# Shortest sleep, so a boundary computed a hair early cannot turn into a busy loop
+MIN_WAIT_SECONDS = 1.0
+# Days searched for a sun boundary before assuming polar day/night
+SUN_SEARCH_DAYS = 3
+
+
+def parse_hhmm(value):
+    """(hour, minute) from an "HH:MM" string (ValueError if malformed)"""
+    hour, minute = map(int, value.split(':'))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Time out of range: {value}")
+    return hour, minute
+
+
+class CaptureSchedule:
+    """Capture window: disabled (always on), a daily HH:MM window or a sun-altitude window"""
+
+    def __init__(self, enabled=False, start_time="17:00", end_time="09:00", mode='time',
+                 sun_altitude=-6.0, latitude=None, longitude=None):
+        """
+        Args:
+            enabled: False = capture is always on
+            start_time: Window start "HH:MM" (local time, time mode)
+            end_time: Window end "HH:MM", exclusive (time mode)
+            mode: 'time' or 'sun'
+            sun_altitude: Capture while the sun is below this many degrees (sun mode)
+            latitude: Observer latitude in degrees (sun mode)
+            longitude: Observer longitude in degrees (sun mode)
+        """
+        self.enabled = enabled
+        self.start_time = start_time
+        self.end_time = end_time
+        self.mode = mode if mode in MODES else 'time'
+        self.sun_altitude = float(sun_altitude)
+        self._start = self._end = None
+        self._observer = None
+
+        if not enabled:
+            return
+        if self.mode == 'sun':
+            if ASTRAL_AVAILABLE and latitude not in (None, '') and longitude not in (None, ''):
+                self._observer = Observer(latitude=float(latitude), longitude=float(longitude))
+            else:
+                app_logger.warning("Sun-altitude schedule needs astral and weather.latitude/longitude; "
+                                   f"using {start_time} - {end_time} instead")
+                self.mode = 'time'
+        if self.mode == 'time':
+            try:
+                self._start = parse_hhmm(start_time)
+                self._end = parse_hhmm(end_time)
+            except (ValueError, AttributeError) as e:
+                app_logger.warning(f"Invalid capture schedule {start_time} - {end_time} ({e}), capturing always")
+                self.enabled = False
+
+    @classmethod
+    def from_config(cls, config):
+        """Schedule from the scheduled_* settings and the weather location"""
+        weather = config.get('weather', {}) or {}
+        return cls(enabled=config.get('scheduled_capture_enabled', False),
+                   start_time=config.get('scheduled_start_time', '17:00'),
+                   end_time=config.get('scheduled_end_time', '09:00'),
+                   mode=config.get('scheduled_capture_mode', 'time'),
+                   sun_altitude=config.get('scheduled_sun_altitude', -6.0),
+                   latitude=weather.get('latitude'),
+                   longitude=weather.get('longitude'))
+
+    def describe(self):
+        """Human-readable window for logs"""
+        if not self.enabled:
+            return "always"
+        if self.mode == 'sun':
+            return f"sun below {self.sun_altitude:g}°"
+        return f"{self.start_time} - {self.end_time}"
+
+    def format_next_change(self, now=None):
+        """Next boundary for logs and status ("HH:MM", with the date if not today)"""
+        now = now or datetime.now()
+        change = self.next_change(now)
+        if change is None:
+            return "never"
+        return change.strftime('%H:%M' if change.date() == now.date() else '%Y-%m-%d %H:%M')
+
+    def is_active(self, now=None):
+        """
+        True if capture should run at now (local naive datetime, default: now).
+        """
+        if not self.enabled:
+            return True
+        now = now or datetime.now()
+        if self.mode == 'sun':
+            return elevation(self._observer, now.astimezone()) < self.sun_altitude
+
+        current = (now.hour, now.minute)
+        if self._start > self._end:
+            # Overnight: capture if after start OR before end (exclusive)
+            return current >= self._start or current < self._end
+        # Same day: capture if between start and end (end exclusive)
+        return self._start <= current < self._end
+
+    def next_change(self, now=None):
+        """
+        Next instant the window opens or closes after now.
+
+        Returns:
+            Local naive datetime, or None if the schedule never changes
+        """
+        if not self.enabled:
+            return None
+        now = now or datetime.now()
+        if self.mode == 'sun':
+            return self._next_sun_change(now)
+
+        candidates = []
+        for day in (0, 1):
+            for hour, minute in (self._start, self._end):
+                instant = now.replace(hour=hour, minute=minute, second=0, microsecond=0) + timedelta(days=day)
+                if instant > now:
+                    candidates.append(instant)
+        return min(candidates) if self._start != self._end else None
+
+    def wait(self, stop_event, now=None):
+        """
+        Block outside the window until it opens or stop_event is set.
+
+        Wakes at the next boundary (capped at MAX_WAIT_SECONDS so clock
+        changes are noticed), not on a polling interval.
+
+        Args:
+            stop_event: threading.Event set when capture stops
+            now: Current local time (tests)
+
+        Returns:
+            True if the window is open, False if stopped first
+        """
+        while not stop_event.is_set():
+            current = now or datetime.now()
+            if self.is_active(current):
+                return True
+            change = self.next_change(current)
+            seconds = (change - current).total_seconds() if change else MAX_WAIT_SECONDS
+            stop_event.wait(min(max(seconds, MIN_WAIT_SECONDS), MAX_WAIT_SECONDS))
+            now = None
+        return False
+
+    def _next_sun_change(self, now):
+        """Next time the sun crosses sun_altitude (rising or setting), searching a few days ahead"""
+        local_now = now.astimezone()
+        for day in range(-1, SUN_SEARCH_DAYS + 1):
+            date = (local_now + timedelta(days=day)).date()
+            crossings = []
+            for direction in (SunDirection.SETTING, SunDirection.RISING):
+                try:
+                    crossings.append(time_at_elevation(self._observer, self.sun_altitude, date, direction,
+                                                       tzinfo=local_now.tzinfo))
+                except ValueError:
+                    pass  # Sun never reaches the altitude that day (polar day/night)
+            upcoming = [instant for instant in crossings if instant > local_now]
+            if upcoming:
+                return min(upcoming).replace(tzinfo=None)
+        return now + timedelta(days=1)  # Polar day/night: look again tomorrow
@@ -1,13 +1,27 @@
 """
 Color balance / white balance algorithms
 """
-import cv2
 import numpy as np
 
+from .debayer import cfa_planes
+
+
+def _channel_indices(order):
+    """(red, green, blue) channel indices for a 'BGR' or 'RGB' array"""
+    return (2, 1, 0) if order == 'BGR' else (0, 1, 2)
+
+
+def _store_channel(out, index, values):
+    """Clip a float32 channel to 0-255 and write it into a uint8 output plane"""
+    np.clip(values, 0, 255, out=values)
+    out[:, :, index] = values
+
 
 def apply_gray_world_robust(img_bgr: np.ndarray,
                             low_pct: float = 5,
-                            high_pct: float = 95) -> np.ndarray:
+                            high_pct: float = 95,
+                            out: np.ndarray = None,
+                            order: str = 'BGR') -> np.ndarray:
     """
     Robust Gray World white balance.
     - Ignores extremes based on intensity percentiles.
@@ -17,12 +31,16 @@ def apply_gray_world_robust(img_bgr: np.ndarray,
         img_bgr: Input BGR image (uint8)
         low_pct: Lower percentile for intensity masking (0-20)
         high_pct: Upper percentile for intensity masking (80-100)
+        out: Optional uint8 array for the result (may be img_bgr itself)
+        order: Channel order of img_bgr and out ('BGR' or 'RGB')
     
     Returns:
         White-balanced BGR image (uint8)
     """
-    img = img_bgr.astype(np.float32)
-    b, g, r = cv2.split(img)
+    red, green, blue = _channel_indices(order)
+    r = img_bgr[:, :, red].astype(np.float32)
+    g = img_bgr[:, :, green].astype(np.float32)
+    b = img_bgr[:, :, blue].astype(np.float32)
 
     # Compute intensity to find reasonable mid-tone pixels
     intensity = 0.299 * r + 0.587 * g + 0.114 * b
@@ -31,14 +49,16 @@ def apply_gray_world_robust(img_bgr: np.ndarray,
     high = np.percentile(intensity, high_pct)
 
     mask = (intensity >= low) & (intensity <= high)
+    del intensity
 
     # Fallback in case mask is too small
     if np.count_nonzero(mask) < 100:
-        mask = np.ones_like(intensity, dtype=bool)
+        mask = np.ones_like(mask, dtype=bool)
 
     avg_r = np.mean(r[mask])
     avg_g = np.mean(g[mask])
     avg_b = np.mean(b[mask])
+    del mask
 
     target = (avg_r + avg_g + avg_b) / 3.0
 
@@ -54,20 +74,22 @@ def apply_gray_world_robust(img_bgr: np.ndarray,
     # This is especially important when gains differ significantly
     max_gain = max(gain_r, gain_g, gain_b)
     if max_gain > 1.05:  # Only dither if significant gain applied
-        dither_r = np.random.uniform(-0.5, 0.5, r.shape) + np.random.uniform(-0.5, 0.5, r.shape)
-        dither_g = np.random.uniform(-0.5, 0.5, g.shape) + np.random.uniform(-0.5, 0.5, g.shape)
-        dither_b = np.random.uniform(-0.5, 0.5, b.shape) + np.random.uniform(-0.5, 0.5, b.shape)
-        r += dither_r
-        g += dither_g
-        b += dither_b
+        for channel in (r, g, b):
+            channel += np.random.uniform(-0.5, 0.5, channel.shape) + np.random.uniform(-0.5, 0.5, channel.shape)
 
-    balanced = cv2.merge([b, g, r])
-    return np.clip(balanced, 0, 255).astype(np.uint8)
+    if out is None:
+        out = np.empty_like(img_bgr)
+    _store_channel(out, red, r)
+    _store_channel(out, green, g)
+    _store_channel(out, blue, b)
+    return out
 
 
 def apply_manual_gains(img_bgr: np.ndarray,
                        red_gain: float,
-                       blue_gain: float) -> np.ndarray:
+                       blue_gain: float,
+                       out: np.ndarray = None,
+                       order: str = 'BGR') -> np.ndarray:
     """
     Apply manual red/blue gains for white balance with dithering to reduce banding.
     
@@ -75,25 +97,171 @@ def apply_manual_gains(img_bgr: np.ndarray,
         img_bgr: Input BGR image (uint8)
         red_gain: Multiplier for red channel (0.1-4.0)
         blue_gain: Multiplier for blue channel (0.1-4.0)
+        out: Optional uint8 array for the result (may be img_bgr itself)
+        order: Channel order of img_bgr and out ('BGR' or 'RGB')
     
     Returns:
         White-balanced BGR image (uint8)
     """
-    img = img_bgr.astype(np.float32)
-    b, g, r = cv2.split(img)
-    
-    # Apply gains
-    r *= red_gain
-    b *= blue_gain
+    red, green, blue = _channel_indices(order)
+    if out is None:
+        out = np.empty_like(img_bgr)
+    if out is not img_bgr:
+        out[:, :, green] = img_bgr[:, :, green]
     
     # Add small triangular dither noise before rounding to reduce banding
     # This is especially important when gains > 1.0 cause quantization
-    if red_gain > 1.0 or blue_gain > 1.0:
-        # Triangular PDF dither: sum of two uniform distributions
-        dither_r = np.random.uniform(-0.5, 0.5, r.shape) + np.random.uniform(-0.5, 0.5, r.shape)
-        dither_b = np.random.uniform(-0.5, 0.5, b.shape) + np.random.uniform(-0.5, 0.5, b.shape)
-        r += dither_r
-        b += dither_b
+    dither = red_gain > 1.0 or blue_gain > 1.0
+    
+    # One float32 channel at a time instead of a float copy of the whole image
+    for index, gain in ((red, red_gain), (blue, blue_gain)):
+        channel = img_bgr[:, :, index].astype(np.float32)
+        channel *= gain
+        if dither:
+            # Triangular PDF dither: sum of two uniform distributions
+            channel += np.random.uniform(-0.5, 0.5, channel.shape) + np.random.uniform(-0.5, 0.5, channel.shape)
+        _store_channel(out, index, channel)
+    
+    return out
+
+
+def bayer_gray_world_gains(sample: np.ndarray,
+                           bayer_pattern: str = 'BGGR',
+                           low_pct: float = 5,
+                           high_pct: float = 95) -> tuple:
+    """
+    Robust Gray World gains estimated on a raw Bayer mosaic.
+    - Masks cells by the percentiles of their green sites (the intensity proxy).
+    - Uses masked means of the red, green and blue sites.
+    
+    Args:
+        sample: Bayer mosaic, usually a strided sample (services/debayer.py bayer_sample)
+        bayer_pattern: Pattern of the mosaic
+        low_pct: Lower percentile for intensity masking (0-20)
+        high_pct: Upper percentile for intensity masking (80-100)
+    
+    Returns:
+        (red, green, blue) gains
+    """
+    red, green_r, green_b, blue = cfa_planes(sample, bayer_pattern)
+    green = green_r.astype(np.float32)
+    green += green_b
+    green *= 0.5
+
+    low, high = np.percentile(green, (low_pct, high_pct))
+    mask = (green >= low) & (green <= high)
+
+    # Fallback in case mask is too small
+    if np.count_nonzero(mask) < 100:
+        mask = np.ones_like(mask, dtype=bool)
+
+    averages = [float(np.mean(red[mask])), float(np.mean(green[mask])), float(np.mean(blue[mask]))]
+    target = sum(averages) / 3.0
+    return tuple(target / (average + 1e-6) for average in averages)
+
+
+class BayerWhiteBalance:
+    """
+    Software white balance applied to the raw Bayer mosaic before debayering.
     
-    balanced = cv2.merge([b, g, r])
-    return np.clip(balanced, 0, 255).astype(np.uint8)
+    Each gain multiplies its CFA sites once, a third of the samples the RGB
+    frame has. Gray world gains are cached: they are re-estimated every
+    refresh_frames frames, when the scene brightness (mean green level)
+    changes by more than scene_change, or when the settings change.
+    """
+
+    def __init__(self, refresh_frames: int = 10, scene_change: float = 0.25):
+        """
+        Args:
+            refresh_frames: Frames between gray world estimates (overridden by
+                            white_balance.gray_world_refresh_frames)
+            scene_change: Relative brightness change that forces a new estimate
+        """
+        self.refresh_frames = refresh_frames
+        self.scene_change = scene_change
+        self.gains = None  # (red, green, blue) of the last frame, None = no software WB
+        self.estimates = 0  # Gray world estimates made (for diagnostics)
+        self._key = None
+        self._level = None
+        self._frames = 0
+        self._luts = {}
+
+    def update(self, sample: np.ndarray, wb_config: dict, bayer_pattern: str = 'BGGR'):
+        """
+        Gains for the next frame.
+        
+        Args:
+            sample: Sample of the frame's mosaic before white balance (bayer_sample)
+            wb_config: White balance settings (config 'white_balance')
+            bayer_pattern: Pattern of the mosaic
+        
+        Returns:
+            (red, green, blue) gains, or None when no software white balance applies
+        """
+        wb_config = wb_config or {}
+        mode = wb_config.get('mode', 'asi_auto')
+        if mode != 'gray_world':
+            self._key = None
+            if mode == 'manual' and wb_config.get('apply_software_gains', False):
+                self.gains = (wb_config.get('manual_red_gain', 1.0), 1.0,
+                              wb_config.get('manual_blue_gain', 1.0))
+            else:
+                self.gains = None
+            return self.gains
+
+        low_pct = wb_config.get('gray_world_low_pct', 5)
+        high_pct = wb_config.get('gray_world_high_pct', 95)
+        key = (bayer_pattern, low_pct, high_pct)
+        _, green_r, green_b, _ = cfa_planes(sample, bayer_pattern)
+        level = (float(green_r.mean()) + float(green_b.mean())) / 2
+
+        refresh_frames = wb_config.get('gray_world_refresh_frames', self.refresh_frames)
+        if key != self._key or self._frames >= refresh_frames or self._scene_changed(level):
+            self.gains = bayer_gray_world_gains(sample, bayer_pattern, low_pct, high_pct)
+            self.estimates += 1
+            self._key = key
+            self._level = level
+            self._frames = 0
+        self._frames += 1
+        return self.gains
+
+    def apply(self, bayer: np.ndarray, bayer_pattern: str = 'BGGR') -> np.ndarray:
+        """
+        Multiply the mosaic's sites by the current gains in place (clipped to the dtype range).
+        
+        Args:
+            bayer: Writable 2D uint8 or uint16 mosaic
+            bayer_pattern: Pattern of the mosaic
+        
+        Returns:
+            bayer
+        """
+        if self.gains is None:
+            return bayer
+        red_gain, green_gain, blue_gain = self.gains
+        red, green_r, green_b, blue = cfa_planes(bayer, bayer_pattern)
+        for plane, gain in ((red, red_gain), (green_r, green_gain), (green_b, green_gain), (blue, blue_gain)):
+            if abs(gain - 1.0) >= 1e-3:
+                plane[...] = self._lut(bayer.dtype, gain)[plane]
+        return bayer
+
+    def _scene_changed(self, level):
+        """True when the mean green level moved more than scene_change since the last estimate"""
+        if self._level is None:
+            return True
+        return abs(level - self._level) > self.scene_change * max(self._level, 1.0)
+
+    def _lut(self, dtype, gain):
+        """Rounded, clipped lookup table multiplying every possible sample value by gain"""
+        key = (np.dtype(dtype).str, round(gain, 4))
+        lut = self._luts.get(key)
+        if lut is None:
+            if len(self._luts) >= 8:
+                self._luts.clear()  # Gray world gains drift; keep only recent tables
+            top = np.iinfo(dtype).max
+            lut = np.arange(top + 1, dtype=np.float32)
+            lut *= gain
+            lut += 0.5
+            np.minimum(lut, top, out=lut)
+            lut = self._luts[key] = lut.astype(dtype)
+        return lut
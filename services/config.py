@@ -18,6 +18,8 @@ DEFAULT_CONFIG = {
     # Directory watch settings
     "watch_directory": "",
     "watch_recursive": True,
+    "watch_processing_mode": "thread",  # "thread" or "process" (worker processes for bursts)
+    "watch_workers": 2,  # Worker processes in "process" mode
     
     # Output settings
     "output_directory": os.path.join(os.getenv('LOCALAPPDATA'), APP_DATA_FOLDER, DEFAULT_OUTPUT_SUBFOLDER),
@@ -43,7 +45,12 @@ DEFAULT_CONFIG = {
         "rtsp_host": "127.0.0.1",
         "rtsp_port": 8554,
         "rtsp_stream_name": "asiwatchdog",
-        "rtsp_fps": 1.0
+        "rtsp_fps": 1.0,
+        "rtsp_width": 1280,  # Fixed stream resolution (frames are letterboxed)
+        "rtsp_height": 720,
+        "rtsp_keyframe_interval": 2.0,  # Seconds between repeats of an unchanged frame
+        "hls_enabled": False,  # HLS from the stream encoder, served by the web server at /hls/stream.m3u8
+        "hls_segments": 6  # Segments listed in the HLS playlist
     },
     
     # ZWO Camera settings
@@ -76,6 +83,8 @@ DEFAULT_CONFIG = {
     "zwo_auto_exposure": False,
     "zwo_max_exposure_ms": 30000.0,  # milliseconds (30 seconds default)
     "zwo_target_brightness": 100,  # Target mean brightness (0-255) for auto exposure
+    "zwo_calibration_solver": "model",  # "model" (fits sensor response, 2-3 frames) | "legacy"
+    "zwo_exposure_priors": True,  # Start calibration from exposures recorded by sun altitude/moon/roof
     "zwo_wb_r": 75,
     "zwo_wb_b": 99,
     "zwo_auto_wb": False,
@@ -83,10 +92,74 @@ DEFAULT_CONFIG = {
     "zwo_flip": 0,  # 0=None, 1=Horizontal, 2=Vertical, 3=Both
     "zwo_bayer_pattern": "BGGR",  # "RGGB", "BGGR", "GRBG", "GBRG"
     
+    # Several cameras in one process (headless): one capture thread per camera,
+    # a shared processing pool, images under <output_directory>/<id> and /cam/<id>/latest.
+    # Per-camera settings come from camera_profiles.
+    "multi_camera": {
+        "enabled": False,
+        "cameras": [],  # [{"name": "ZWO ASI676MC", "id": "allsky"}, {"name": "ZWO ASI224MC", "id": "pier"}]
+        "processing_workers": 2,
+    },
+    
+    # Simulated camera for benchmarks/soak tests (main.py --headless --virtual-camera [DIR])
+    "virtual_camera": {
+        "width": 1920,
+        "height": 1080,
+        "bit_depth": 12,
+        "bayer_pattern": "BGGR",
+        "scene_level": 0.5,  # Synthetic sky mean (fraction of full scale) at 1 s, gain 0
+        "gamma": 1.0,  # Brightness ~ (exposure x gain) ** gamma
+        "pedestal": 0.0,  # Black level (fraction of full scale)
+        "noise": 0.0,
+        "exposure_scale": 1.0,  # Real seconds per exposure second (0 = instant)
+        "readout_ms": 20.0,
+        "failure_rate": 0.0,  # Probability of a failed exposure
+        "video_timeout_rate": 0.0,
+        "disconnect_after": None,  # Frames before the camera drops off the bus
+    },
+    
+    # Pipelined capture: expose the next frame while the previous one is processed
+    "zwo_pipelined_capture": False,
+    "zwo_pipeline_queue_size": 2,  # Raw frames queued for processing before the oldest is dropped
+    
+    # GUI image processor queue: ordered file-output backlog within a pixel memory budget
+    "processing_backlog": 3,  # Frames waiting for file output before the oldest is dropped
+    "processing_queue_mb": 256,  # Pixel data queued frames may hold before the oldest is dropped
+    
+    # Video-mode capture: continuous readout instead of one snapshot exposure per frame
+    "zwo_capture_mode": "snapshot",  # "snapshot" | "video" | "auto" (video for short exposures)
+    "zwo_video_max_exposure_ms": 1000.0,  # Longest exposure captured in video mode when "auto"
+    
+    # Binning/ROI profile for captured frames: "full" to publish, "ml" when frames only feed
+    # the ML classifiers (calibration always uses binned frames)
+    "zwo_capture_profile": "full",
+    
     # Scheduled capture settings
     "scheduled_capture_enabled": False,
     "scheduled_start_time": "17:00",  # 5:00 PM
     "scheduled_end_time": "09:00",    # 9:00 AM (next day for overnight captures)
+    "scheduled_capture_mode": "time",  # "time" (start/end above) | "sun" (sun below scheduled_sun_altitude)
+    "scheduled_sun_altitude": -6.0,   # Degrees; -6 = civil dusk to dawn (location from weather latitude/longitude)
+    
+    # Adaptive cadence: stretch zwo_interval up to max_interval while the scene is stable
+    "cadence": {
+        "enabled": False,
+        "max_interval": 60.0,  # Ceiling in seconds
+        "stretch": 1.5,  # Interval multiplier per stable step
+        "stable_frames": 3,  # Stable frames before each stretch
+        "brightness_threshold": 0.05,  # Relative scene brightness change that counts as change
+        "difference_threshold": 0.03  # Thumbnail difference (fraction of its mean) that counts as change
+    },
+    
+    # Processing budget: shed optional work (in shed_order) while frames take longer than the interval allows
+    "qos": {
+        "enabled": False,
+        "budget": 0.8,  # Processing budget as a fraction of the capture interval
+        "restore_below": 0.5,  # Restore a step when under this fraction of the budget
+        "degrade_frames": 2,  # Consecutive frames over budget before shedding a step
+        "restore_frames": 5,  # Consecutive frames with headroom before restoring one
+        "shed_order": ["ml", "stretch", "dev_mode", "encode"]  # ML on alternate frames, 8-bit LUT stretch, no dev-mode saves, fast encode
+    },
     
     # White Balance configuration
     "white_balance": {
@@ -94,7 +167,9 @@ DEFAULT_CONFIG = {
         "manual_red_gain": 1.0,
         "manual_blue_gain": 1.0,
         "gray_world_low_pct": 5,
-        "gray_world_high_pct": 95
+        "gray_world_high_pct": 95,
+        "gray_world_refresh_frames": 10,  # Re-estimate gray world gains every N frames (or on a scene change)
+        "bayer_domain": True  # Balance the raw RAW8 mosaic before debayering (RAW16, dev mode and ML balance in RGB)
     },
     
     "auto_brightness": False,  # Automatically adjust brightness
@@ -111,7 +186,8 @@ DEFAULT_CONFIG = {
         "shadow_aggressiveness": 2.8,  # MAD multiplier for shadow clipping (1.5=aggressive, 2.8=standard, 4.0=gentle)
         "saturation_boost": 1.5,  # Post-stretch saturation boost (1.0=none, 1.5=moderate, 2.0=strong)
         "normalize_channels": True,  # Equalize R/G/B medians before stretch (fixes color cast in dark scenes)
-        "dark_scene_threshold": 0.05  # Median below this triggers dark scene mode (0.0-0.2)
+        "dark_scene_threshold": 0.05,  # Median below this triggers dark scene mode (0.0-0.2)
+        "lut_stretch": True  # Apply stretch as a uint16->uint8 lookup table (no float32 frame copy)
     },
     
     # ML Models (Beta) - Observatory condition classification
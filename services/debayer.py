@@ -0,0 +1,222 @@
+"""
+Pure-numpy debayer engine
+
+Used when OpenCV is not installed, and for the superpixel mode OpenCV does
+not have. Two modes:
+
+- bilinear: full resolution, every missing colour averaged from its nearest
+  same-colour neighbours, with OpenCV's rounding, so all but the outermost
+  pixels match cv2.cvtColor(COLOR_Bayer..2RGB) exactly (at the frame edge the
+  missing neighbours are copied from the edge row/column instead)
+- superpixel: each 2x2 Bayer cell becomes one RGB pixel (greens averaged),
+  half resolution at about a quarter of the work - enough for previews,
+  brightness metering and the ML classifiers
+
+Everything runs on the four quarter-size colour planes with whole-array
+operations; the other three patterns are handled as mirror images of the
+canonical one (red at the top-left) through flipped views, so no pixel is
+copied to re-align them.
+
+Pattern names follow the OpenCV codes debayer_raw_image has always used
+(e.g. 'BGGR' -> COLOR_BayerBG2RGB, which has red at the top-left pixel).
+"""
+import numpy as np
+
+
+# Position of the red pixel in each 2x2 cell, as (row, col), for each pattern name
+RED_SITES = {
+    'BGGR': (0, 0),
+    'GBRG': (0, 1),
+    'GRBG': (1, 0),
+    'RGGB': (1, 1),
+}
+
+DEFAULT_PATTERN = 'BGGR'
+MODES = ('bilinear', 'superpixel')
+
+
+def debayer(bayer, bayer_pattern=DEFAULT_PATTERN, mode='bilinear', out=None):
+    """
+    Demosaic a Bayer frame.
+
+    Args:
+        bayer: 2D uint8 or uint16 mosaic with even width and height
+        bayer_pattern: RGGB, BGGR, GRBG or GBRG (OpenCV naming, see module docstring)
+        mode: 'bilinear' (full resolution) or 'superpixel' (half resolution)
+        out: Optional preallocated RGB array of the input dtype; (H, W, 3) for
+             bilinear, (H/2, W/2, 3) for superpixel
+
+    Returns:
+        RGB array with the input dtype
+    """
+    if mode == 'superpixel':
+        return debayer_superpixel(bayer, bayer_pattern, out)
+    if mode != 'bilinear':
+        raise ValueError(f"Unknown debayer mode: {mode} (use one of {', '.join(MODES)})")
+    return debayer_bilinear(bayer, bayer_pattern, out)
+
+
+def debayer_bilinear(bayer, bayer_pattern=DEFAULT_PATTERN, out=None):
+    """Full-resolution bilinear demosaic (see debayer)"""
+    height, width = _check_shape(bayer)
+    if out is None:
+        out = np.empty((height, width, 3), dtype=bayer.dtype)
+    src, dst = _canonical(bayer, out, bayer_pattern)
+
+    acc = _accumulator(bayer.dtype)
+    red, green_r, green_b, blue = (_padded(plane, acc) for plane in _planes(src))
+    h, w = height // 2, width // 2
+
+    def at(plane, dy, dx):
+        return plane[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+
+    tmp = np.empty((h, w), dtype=acc)
+
+    def mean2(a, b, target):
+        np.add(a, b, out=tmp)
+        np.add(tmp, 1, out=tmp)
+        np.right_shift(tmp, 1, out=tmp)
+        target[...] = tmp
+
+    def mean4(a, b, c, d, target):
+        np.add(a, b, out=tmp)
+        np.add(tmp, c, out=tmp)
+        np.add(tmp, d, out=tmp)
+        np.add(tmp, 2, out=tmp)
+        np.right_shift(tmp, 2, out=tmp)
+        target[...] = tmp
+
+    out_r, out_gr, out_gb, out_b = dst[0::2, 0::2], dst[0::2, 1::2], dst[1::2, 0::2], dst[1::2, 1::2]
+
+    # Red sites
+    out_r[..., 0] = at(red, 0, 0)
+    mean4(at(green_b, -1, 0), at(green_b, 0, 0), at(green_r, 0, -1), at(green_r, 0, 0), out_r[..., 1])
+    mean4(at(blue, -1, -1), at(blue, -1, 0), at(blue, 0, -1), at(blue, 0, 0), out_r[..., 2])
+
+    # Green sites on red rows
+    mean2(at(red, 0, 0), at(red, 0, 1), out_gr[..., 0])
+    out_gr[..., 1] = at(green_r, 0, 0)
+    mean2(at(blue, -1, 0), at(blue, 0, 0), out_gr[..., 2])
+
+    # Green sites on blue rows
+    mean2(at(red, 0, 0), at(red, 1, 0), out_gb[..., 0])
+    out_gb[..., 1] = at(green_b, 0, 0)
+    mean2(at(blue, 0, -1), at(blue, 0, 0), out_gb[..., 2])
+
+    # Blue sites
+    mean4(at(red, 0, 0), at(red, 0, 1), at(red, 1, 0), at(red, 1, 1), out_b[..., 0])
+    mean4(at(green_r, 0, 0), at(green_r, 1, 0), at(green_b, 0, 0), at(green_b, 0, 1), out_b[..., 1])
+    out_b[..., 2] = at(blue, 0, 0)
+    return out
+
+
+def debayer_superpixel(bayer, bayer_pattern=DEFAULT_PATTERN, out=None):
+    """Half-resolution demosaic, one RGB pixel per 2x2 cell (see debayer)"""
+    height, width = _check_shape(bayer)
+    if out is None:
+        out = np.empty((height // 2, width // 2, 3), dtype=bayer.dtype)
+    src, dst = _canonical(bayer, out, bayer_pattern)
+
+    red, green_r, green_b, blue = _planes(src)
+    green = np.add(green_r, green_b, dtype=_accumulator(bayer.dtype))
+    green += 1
+    green >>= 1
+    dst[..., 0] = red
+    dst[..., 1] = green
+    dst[..., 2] = blue
+    return out
+
+
+def to_uint8(src, out=None):
+    """
+    Scale 16-bit data to 8 bits (x // 257, 0-65535 -> 0-255) with integer
+    arithmetic only, writing straight into out (no float64 copy of the frame).
+
+    Args:
+        src: uint16 array
+        out: Optional preallocated uint8 array of the same shape
+
+    Returns:
+        uint8 array
+    """
+    if out is None:
+        out = np.empty(src.shape, dtype=np.uint8)
+    np.floor_divide(src, 257, out=out, casting='unsafe')
+    return out
+
+
+def cfa_planes(bayer, bayer_pattern=DEFAULT_PATTERN):
+    """
+    Quarter-size views of the colour sites of a mosaic.
+
+    Args:
+        bayer: 2D mosaic with even width and height
+        bayer_pattern: RGGB, BGGR, GRBG or GBRG
+
+    Returns:
+        Tuple of (red, green on red rows, green on blue rows, blue) views;
+        writing to them writes the mosaic
+    """
+    red_y, red_x = RED_SITES.get(bayer_pattern, RED_SITES[DEFAULT_PATTERN])
+    blue_y, blue_x = 1 - red_y, 1 - red_x
+    return (bayer[red_y::2, red_x::2], bayer[red_y::2, blue_x::2],
+            bayer[blue_y::2, red_x::2], bayer[blue_y::2, blue_x::2])
+
+
+def bayer_sample(bayer, stride=4):
+    """
+    Every stride-th 2x2 cell of a mosaic in both directions, as a compact copy.
+
+    The sample is itself a mosaic with the same pattern (whole cells are kept),
+    about 1/stride^2 of the frame - enough for metering and white balance
+    statistics.
+
+    Args:
+        bayer: 2D mosaic with even width and height
+        stride: Cell step (1 = a copy of the whole mosaic)
+
+    Returns:
+        2D array of the input dtype
+    """
+    height, width = _check_shape(bayer)
+    cells = bayer.reshape(height // 2, 2, width // 2, 2)[::stride, :, ::stride, :]
+    return cells.copy().reshape(cells.shape[0] * 2, cells.shape[2] * 2)
+
+
+def _check_shape(bayer):
+    if bayer.ndim != 2:
+        raise ValueError("Bayer data must be a 2D array")
+    height, width = bayer.shape
+    if height % 2 or width % 2:
+        raise ValueError(f"Bayer frame must have even dimensions, got {width}x{height}")
+    return height, width
+
+
+def _canonical(bayer, out, bayer_pattern):
+    """Input and output views mirrored so red sits at the top-left of every cell"""
+    flip_y, flip_x = RED_SITES.get(bayer_pattern, RED_SITES[DEFAULT_PATTERN])
+    rows = slice(None, None, -1) if flip_y else slice(None)
+    cols = slice(None, None, -1) if flip_x else slice(None)
+    return bayer[rows, cols], out[rows, cols]
+
+
+def _planes(bayer):
+    """Red, green (red rows), green (blue rows) and blue planes of a canonical mosaic"""
+    return bayer[0::2, 0::2], bayer[0::2, 1::2], bayer[1::2, 0::2], bayer[1::2, 1::2]
+
+
+def _accumulator(dtype):
+    """Integer type wide enough for the sum of four samples plus rounding"""
+    return np.uint16 if dtype == np.uint8 else np.uint32
+
+
+def _padded(plane, dtype):
+    """Plane with a one-pixel border copied from its outermost rows and columns"""
+    h, w = plane.shape
+    padded = np.empty((h + 2, w + 2), dtype=dtype)
+    padded[1:-1, 1:-1] = plane
+    padded[0, 1:-1] = plane[0]
+    padded[-1, 1:-1] = plane[-1]
+    padded[:, 0] = padded[:, 1]
+    padded[:, -1] = padded[:, -2]
+    return padded
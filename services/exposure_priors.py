@@ -0,0 +1,184 @@
+"""
+Exposure prior table keyed by sun altitude, moon illumination and roof state
+
+Sky brightness at a site is mostly a function of where the sun is, how much
+moon there is and whether the roof is open, so the exposure that converged
+last time under the same conditions is a far better starting point than the
+exposure that happens to be set. Every converged calibration is recorded in
+a small table (persisted as JSON); calibration starts from the value
+interpolated along sun altitude, which usually needs zero or one correction
+frame.
+
+Entries store the signal (exposure x gain factor) that gives brightness 100,
+so a prior carries over across gain and target brightness changes.
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+
+from utils_paths import get_app_data_dir
+from .exposure_solver import gain_factor
+from .logger import app_logger
+
+
+ALTITUDE_BIN = 2.0  # Degrees of sun altitude per table row
+NIGHT_ALTITUDE = -18.0  # Below astronomical twilight the sun no longer matters
+MOON_ALTITUDE = -6.0  # Above civil twilight the moon no longer matters
+MOON_BIN = 25.0  # Percent illumination per moon column
+MAX_ALTITUDE_GAP = 8.0  # Furthest a prior may be taken from along sun altitude
+SMOOTHING = 0.5  # Weight of a new calibration against the stored value
+REFERENCE_BRIGHTNESS = 100.0
+
+
+def prior_table_path(camera_name=None):
+    """Per-camera prior table file in the app data directory"""
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', camera_name or '').strip('_') or 'default'
+    return os.path.join(get_app_data_dir(), 'exposure_priors', f'{safe_name}.json')
+
+
+def _roof_key(roof_open):
+    if roof_open is None:
+        return 'unknown'
+    return 'open' if roof_open else 'closed'
+
+
+class ExposurePriorTable:
+    """Converged exposures by observing conditions, with interpolated lookups"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: JSON file the table is loaded from and saved to (None = in memory only)
+        """
+        self.path = path
+        self.entries = {}  # (roof, altitude_bin, moon_bin) -> {'log_signal', 'samples', 'updated'}
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    def record(self, context, exposure, gain, brightness):
+        """
+        Store a converged calibration.
+
+        Args:
+            context: Dict with sun_altitude, moon_illumination and roof_open
+                (see ui.controllers.context_fetchers.compute_exposure_context)
+            exposure: Converged exposure in seconds
+            gain: Gain it converged at
+            brightness: Brightness it produced
+        """
+        key = self._key(context)
+        if key is None or brightness <= 0:
+            return
+        log_signal = math.log(exposure * gain_factor(gain) * REFERENCE_BRIGHTNESS / brightness)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {'log_signal': log_signal, 'samples': 0}
+            else:
+                entry['log_signal'] += SMOOTHING * (log_signal - entry['log_signal'])
+            entry['samples'] += 1
+            entry['updated'] = time.time()
+        self.save()
+
+    def lookup(self, context, gain, target_brightness):
+        """
+        Starting exposure for the current conditions.
+
+        Args:
+            context: Dict with sun_altitude, moon_illumination and roof_open
+            gain: Gain the calibration runs at
+            target_brightness: Brightness calibration aims for
+
+        Returns:
+            Exposure in seconds, or None when nothing was recorded under similar conditions
+        """
+        key = self._key(context)
+        if key is None:
+            return None
+        roof, _, moon_bin = key
+        with self._lock:
+            candidates = {}  # altitude_bin -> roof -> (moon distance, log_signal)
+            for (entry_roof, entry_altitude, entry_moon), entry in self.entries.items():
+                if roof != 'unknown' and entry_roof != roof:
+                    continue
+                # Per altitude row and roof state keep the entry with the closest moon (twilight rows have none)
+                distance = 0 if moon_bin is None or entry_moon is None else abs(entry_moon - moon_bin)
+                by_roof = candidates.setdefault(entry_altitude, {})
+                best = by_roof.get(entry_roof)
+                if best is None or distance < best[0]:
+                    by_roof[entry_roof] = (distance, entry['log_signal'])
+
+        # An unknown roof state prefers priors recorded while it was unknown. Open
+        # and closed priors differ by orders of magnitude at night, so a row that
+        # has both (and no unknown entry) gives no usable seed
+        rows = {}
+        for altitude_bin, by_roof in candidates.items():
+            if roof in by_roof:
+                rows[altitude_bin] = by_roof[roof]
+            elif len(by_roof) == 1:
+                rows[altitude_bin] = next(iter(by_roof.values()))
+
+        # Interpolate between the nearest recorded rows on either side
+        altitude = self._altitude(context['sun_altitude'])
+        points = sorted(((row + 0.5) * ALTITUDE_BIN, value[1]) for row, value in rows.items())
+        below = [point for point in points if point[0] <= altitude and altitude - point[0] <= MAX_ALTITUDE_GAP]
+        above = [point for point in points if point[0] > altitude and point[0] - altitude <= MAX_ALTITUDE_GAP]
+        if not below and not above:
+            return None
+
+        if below and above:
+            (low, low_signal), (high, high_signal) = below[-1], above[0]
+            log_signal = low_signal + (altitude - low) / (high - low) * (high_signal - low_signal)
+        else:
+            log_signal = (below[-1] if below else above[0])[1]
+        return math.exp(log_signal) * target_brightness / REFERENCE_BRIGHTNESS / gain_factor(gain)
+
+    def load(self):
+        """Load the table from path (a missing or unreadable file leaves it empty)"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            entries = {}
+            for item in data.get('entries', []):
+                key = (item['roof'], item['altitude_bin'], item.get('moon_bin'))
+                entries[key] = {'log_signal': item['log_signal'], 'samples': item.get('samples', 1),
+                                'updated': item.get('updated', 0)}
+            with self._lock:
+                self.entries = entries
+        except Exception as e:
+            app_logger.warning(f"Could not load exposure priors from {self.path}: {e}")
+
+    def save(self):
+        """Write the table to path (atomically, so a crash never leaves half a file)"""
+        if not self.path:
+            return
+        with self._lock:
+            items = [dict(roof=roof, altitude_bin=altitude_bin, moon_bin=moon_bin, **entry)
+                     for (roof, altitude_bin, moon_bin), entry in sorted(self.entries.items(), key=str)]
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': 1, 'entries': items}, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            app_logger.warning(f"Could not save exposure priors to {self.path}: {e}")
+
+    @staticmethod
+    def _altitude(sun_altitude):
+        return max(sun_altitude, NIGHT_ALTITUDE)
+
+    def _key(self, context):
+        if not context or context.get('sun_altitude') is None:
+            return None
+        altitude = self._altitude(context['sun_altitude'])
+        moon_bin = None
+        if altitude < MOON_ALTITUDE:
+            moon_bin = int(round((context.get('moon_illumination') or 0.0) / MOON_BIN))
+        return (_roof_key(context.get('roof_open')), int(math.floor(altitude / ALTITUDE_BIN)), moon_bin)
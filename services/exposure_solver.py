@@ -0,0 +1,191 @@
+"""
+Model-based exposure solver for rapid calibration
+
+Sensor response is close to a power law in the collected signal on top of a
+black level (sensor offset, sky glow, hot pixels):
+
+    B = black + k * (exposure * gain_factor) ** slope
+
+which is a straight line in log space once the black level is removed. One
+well-exposed sample plus the slope and black level is enough to predict the
+exposure that hits the target; each further sample refines them (two samples
+give the black level, three the slope as well). Saturated and black frames
+carry no level information, only a bound (the target exposure is below /
+above theirs), so they are kept as bounds and the solver steps by a fixed
+factor until a usable frame arrives.
+
+The slope, black level and last converged exposure survive between
+calibrations, so a recalibration after a scene change starts from the last
+good exposure with an already learned response.
+"""
+import math
+
+
+# ZWO gain is in 0.1 dB steps: linear factor 10 ** (gain / 200)
+GAIN_DB_PER_UNIT = 0.1
+
+MIN_SIGNAL = 2.0  # Brightness above black needed to trust a sample
+SATURATED_STEP = 1 / 8.0  # Exposure factor after a saturated frame with nothing better known
+DARK_STEP = 64.0  # Exposure factor after a black frame with nothing better known
+SLOPE_RANGE = (0.3, 2.0)
+SLOPE_GRID = [SLOPE_RANGE[0] + step * 0.05 for step in range(int((SLOPE_RANGE[1] - SLOPE_RANGE[0]) / 0.05) + 1)]
+
+
+def gain_factor(gain):
+    """Linear signal multiplier for a ZWO gain value"""
+    return 10 ** (gain * GAIN_DB_PER_UNIT / 20.0)
+
+
+class ExposureSolver:
+    """Predicts the exposure that reaches a target brightness from measured frames"""
+
+    def __init__(self, target_brightness=100, min_exposure=0.000032, max_exposure=30.0,
+                 saturation=245, black_level=0.0, max_step=64.0, slope=1.0):
+        """
+        Args:
+            target_brightness: Brightness to reach (0-255)
+            min_exposure: Shortest exposure in seconds
+            max_exposure: Longest exposure in seconds
+            saturation: Brightness at or above which a frame counts as clipped
+            black_level: Initial brightness of a zero-signal frame (learned from frames)
+            max_step: Largest exposure change per frame (factor)
+            slope: Initial response slope in log space (1.0 = linear sensor)
+        """
+        self.target_brightness = target_brightness
+        self.min_exposure = min_exposure
+        self.max_exposure = max_exposure
+        self.saturation = saturation
+        self.black_level = black_level
+        self.max_step = max_step
+        self.slope = slope
+        self.samples = []  # (exposure, gain, brightness) of the current calibration
+        self.converged_exposure = None
+        self.converged_gain = None
+
+    def reset(self):
+        """Start a new calibration (keeps the learned response and last converged exposure)"""
+        self.samples = []
+
+    def seed_exposure(self, gain, default):
+        """
+        Starting exposure for a calibration.
+
+        Args:
+            gain: Gain the calibration runs at
+            default: Exposure to use when nothing has converged yet
+
+        Returns:
+            Last converged exposure, adjusted for a gain change
+        """
+        if self.converged_exposure is None:
+            return default
+        exposure = self.converged_exposure * gain_factor(self.converged_gain) / gain_factor(gain)
+        return self._clamp(exposure)
+
+    def add(self, exposure, gain, brightness):
+        """Record a measured frame"""
+        self.samples.append((exposure, gain, brightness))
+
+    def converged(self, exposure, gain):
+        """Remember a converged exposure to seed the next calibration"""
+        self.converged_exposure = exposure
+        self.converged_gain = gain
+
+    def predict(self, gain):
+        """
+        Exposure for the next frame.
+
+        Args:
+            gain: Gain of the next frame
+
+        Returns:
+            Exposure in seconds, or None when the target cannot be approached
+            further (pinned at the exposure limit on the wrong side of target)
+        """
+        if not self.samples:
+            return None
+
+        unclipped = [(exposure * gain_factor(sample_gain), brightness)
+                     for exposure, sample_gain, brightness in self.samples
+                     if brightness < self.saturation]
+        self._fit(unclipped[-4:])
+
+        usable, bright_bound, dark_bound = [], None, None
+        for exposure, sample_gain, brightness in self.samples:
+            log_signal = math.log(exposure * gain_factor(sample_gain))
+            if brightness >= self.saturation:
+                bright_bound = log_signal if bright_bound is None else min(bright_bound, log_signal)
+            elif brightness - self.black_level < MIN_SIGNAL:
+                dark_bound = log_signal if dark_bound is None else max(dark_bound, log_signal)
+            else:
+                usable.append((log_signal, math.log(brightness - self.black_level)))
+
+        target = math.log(max(self.target_brightness - self.black_level, MIN_SIGNAL))
+        last_exposure, last_gain, _ = self.samples[-1]
+        last_signal = math.log(last_exposure * gain_factor(last_gain))
+
+        if usable:
+            # Extrapolate from the sample nearest the target, where the model errs least
+            anchor_signal, anchor_brightness = min(usable, key=lambda point: abs(point[1] - target))
+            log_signal = anchor_signal + (target - anchor_brightness) / self.slope
+        elif bright_bound is not None:
+            log_signal = bright_bound + math.log(SATURATED_STEP)
+        else:
+            log_signal = dark_bound + math.log(DARK_STEP)
+
+        # Stay strictly between the clipped and black frames seen so far
+        if bright_bound is not None and dark_bound is not None and dark_bound < bright_bound:
+            if not dark_bound < log_signal < bright_bound:
+                log_signal = (dark_bound + bright_bound) / 2
+        elif bright_bound is not None and log_signal >= bright_bound:
+            log_signal = bright_bound + math.log(SATURATED_STEP)
+        elif dark_bound is not None and log_signal <= dark_bound:
+            log_signal = dark_bound + math.log(DARK_STEP)
+
+        max_step = math.log(self.max_step)
+        log_signal = min(max(log_signal, last_signal - max_step), last_signal + max_step)
+
+        exposure = self._clamp(math.exp(log_signal) / gain_factor(gain))
+        if exposure == last_exposure and gain == last_gain and exposure in (self.min_exposure, self.max_exposure):
+            return None  # Pinned at a limit
+        return exposure
+
+    def _fit(self, points):
+        """
+        Least-squares black level (and slope, given three or more points) from
+        unclipped (signal, brightness) samples.
+        """
+        if len(points) < 2:
+            return
+        signals = [signal for signal, _ in points]
+        if max(signals) / min(signals) < 1.1:
+            return  # Exposures too close together to tell the response apart
+
+        lowest = min(brightness for _, brightness in points)
+        if max(brightness for _, brightness in points) - lowest < MIN_SIGNAL:
+            # No response across the exposures: everything so far is black level
+            self.black_level = lowest
+            return
+
+        best = None
+        for slope in (SLOPE_GRID if len(points) >= 3 else [self.slope]):
+            xs = [signal ** slope for signal in signals]
+            ys = [brightness for _, brightness in points]
+            n = len(points)
+            mean_x = sum(xs) / n
+            mean_y = sum(ys) / n
+            sxx = sum((x - mean_x) ** 2 for x in xs)
+            scale = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sxx
+            if scale <= 0:
+                continue
+            # Black level can't exceed the darkest frame
+            black = min(max(mean_y - scale * mean_x, 0.0), lowest)
+            error = sum((black + scale * x - y) ** 2 for x, y in zip(xs, ys))
+            if best is None or error < best[0]:
+                best = (error, slope, black)
+
+        if best is not None:
+            _, self.slope, self.black_level = best
+
+    def _clamp(self, exposure):
+        return max(self.min_exposure, min(self.max_exposure, exposure))
@@ -0,0 +1,228 @@
+"""
+Typed capture frame
+
+Frames used to travel as a PIL image plus a free-form metadata dict that
+mixed display strings ('EXPOSURE': '1.0s') with full-resolution arrays, and
+every stage copied it. Frame keeps the capture facts as numbers in
+__slots__ (no per-instance __dict__), holds the raw/RGB arrays as views into
+the frame pool, and formats overlay token strings only when a token is
+first read.
+
+Frame is also a MutableMapping of token name -> value, the adapter for code
+written against the metadata dict (overlay and filename templates, dev-mode
+saves, the live panel, the web /status):
+
+    frame['EXPOSURE']              # "1.0s", formatted on first read and cached
+    frame['RAW_RGB_16BIT']         # the pooled uint16 view (or None)
+    frame['ROOF_STATUS'] = 'Open'  # anything else is kept in an extras dict
+
+The buffers are plain references to FramePool views, so the pool's
+reference counting decides when a slot can be reused: it goes back into
+rotation once every Frame holding its views has let go (release(), pop(),
+or the Frame being dropped). copy() is shallow and shares the buffers, so
+handing a frame to another stage never copies pixels.
+"""
+from collections.abc import MutableMapping
+
+
+_MISSING = object()
+_DELETED = object()  # Extras marker for a computed token or buffer that was popped
+
+
+def _temperature(frame, template, fahrenheit=False):
+    if frame.temperature_c is None:
+        return "N/A"
+    value = frame.temperature_c * 9 / 5 + 32 if fahrenheit else frame.temperature_c
+    return template.format(value)
+
+
+def _stat(frame, key, template):
+    value = frame.stats.get(key)
+    if value is None:
+        return "N/A"
+    return template.format(value)
+
+
+# Tokens computed from the frame's fields, formatted as the metadata dict did
+_TOKENS = {
+    'CAMERA': lambda frame: frame.camera,
+    'EXPOSURE': lambda frame: f"{frame.exposure_seconds}s",
+    'GAIN': lambda frame: str(frame.gain),
+    'TEMP': lambda frame: _temperature(frame, "{:.1f} C"),
+    'TEMPERATURE': lambda frame: _temperature(frame, "{:.1f} C"),
+    'TEMP_C': lambda frame: _temperature(frame, "{:.1f}°C"),
+    'TEMP_F': lambda frame: _temperature(frame, "{:.1f}°F", fahrenheit=True),
+    'RES': lambda frame: f"{frame.width}x{frame.height}",
+    'CAPTURE AREA SIZE': lambda frame: f"{frame.width} * {frame.height}",
+    'FILENAME': lambda frame: f"capture_{frame.captured_at.strftime('%Y%m%d_%H%M%S')}.png",
+    'SESSION': lambda frame: frame.captured_at.strftime('%Y-%m-%d'),
+    'DATETIME': lambda frame: frame.captured_at.strftime('%Y-%m-%d %H:%M:%S'),
+    'BRIGHTNESS': lambda frame: _stat(frame, 'mean', "{:.1f}"),
+    'MEAN': lambda frame: _stat(frame, 'mean', "{:.1f}"),
+    'MEDIAN': lambda frame: _stat(frame, 'median', "{:.1f}"),
+    'MIN': lambda frame: _stat(frame, 'min', "{}"),
+    'MAX': lambda frame: _stat(frame, 'max', "{}"),
+    'STD_DEV': lambda frame: _stat(frame, 'std_dev', "{:.2f}"),
+    'P25': lambda frame: _stat(frame, 'p25', "{:.1f}"),
+    'P75': lambda frame: _stat(frame, 'p75', "{:.1f}"),
+    'P95': lambda frame: _stat(frame, 'p95', "{:.1f}"),
+    'CAMERA_BIT_DEPTH': lambda frame: frame.camera_bit_depth,
+    'IMAGE_BIT_DEPTH': lambda frame: frame.bit_depth,
+    'BAYER_PATTERN': lambda frame: frame.bayer_pattern,
+    'PIXEL_SIZE': lambda frame: frame.pixel_size,
+    'BINNING': lambda frame: frame.binning,
+    'CAPTURE_PROFILE': lambda frame: frame.profile,
+    'ELEC_PER_ADU': lambda frame: frame.elec_per_adu,
+    'CAPTURE_INTERVAL': lambda frame: f"{frame.interval:.1f}",
+}
+
+# Token name -> slot of a pooled array
+_BUFFERS = {
+    'RAW_RGB_NO_WB': 'rgb_no_wb',  # Pre-white-balance RGB (uint8), None if balanced as Bayer
+    'RAW_RGB_16BIT': 'rgb16',  # Full uint16 RGB, None if RAW8
+    'METER_SAMPLE': 'meter_sample',  # Balanced 8-bit Bayer sample for auto exposure
+    'RAW_SAMPLE_NO_WB': 'sample_no_wb',  # Bayer sample before white balance, None unless balanced as Bayer
+}
+
+
+class Frame(MutableMapping):
+    """One developed capture: numeric fields, pooled buffers and lazily formatted tokens"""
+
+    __slots__ = ('captured_at', 'camera', 'exposure_seconds', 'gain', 'temperature_c',
+                 'width', 'height', 'bit_depth', 'camera_bit_depth', 'bayer_pattern',
+                 'pixel_size', 'binning', 'profile', 'elec_per_adu', 'stats', 'interval',
+                 'rgb_no_wb', 'rgb16', 'meter_sample', 'sample_no_wb', 'extra', '_tokens')
+
+    def __init__(self, captured_at, camera, exposure_seconds, gain, temperature_c, width, height,
+                 bit_depth=8, camera_bit_depth=8, bayer_pattern='RGGB', pixel_size=0, binning=1,
+                 profile='full', elec_per_adu=1.0, stats=None, interval=0.0,
+                 rgb_no_wb=None, rgb16=None, meter_sample=None, sample_no_wb=None, extra=None):
+        """
+        Args:
+            captured_at: Capture time (local datetime)
+            camera: Camera name
+            exposure_seconds: Exposure used
+            gain: Gain used
+            temperature_c: Sensor temperature in Celsius, None if unavailable
+            width: Image width
+            height: Image height
+            bit_depth: Capture mode bit depth (8 or 16)
+            camera_bit_depth: ADC bit depth
+            bayer_pattern: CFA pattern
+            pixel_size: Pixel size in microns
+            binning: Hardware binning factor
+            profile: Capture profile name
+            elec_per_adu: Sensor gain in electrons per ADU
+            stats: Image statistics dict (calculate_image_stats)
+            interval: Seconds until the next capture
+            rgb_no_wb: Pre-white-balance RGB view (uint8) or None
+            rgb16: Full-depth RGB view (uint16) or None
+            meter_sample: Metering sample view or None
+            sample_no_wb: Metering sample before Bayer white balance or None
+            extra: Initial extra tokens (e.g. STAGE_TIMINGS, CADENCE)
+        """
+        self.captured_at = captured_at
+        self.camera = camera
+        self.exposure_seconds = exposure_seconds
+        self.gain = gain
+        self.temperature_c = temperature_c
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.camera_bit_depth = camera_bit_depth
+        self.bayer_pattern = bayer_pattern
+        self.pixel_size = pixel_size
+        self.binning = binning
+        self.profile = profile
+        self.elec_per_adu = elec_per_adu
+        self.stats = stats or {}
+        self.interval = interval
+        self.rgb_no_wb = rgb_no_wb
+        self.rgb16 = rgb16
+        self.meter_sample = meter_sample
+        self.sample_no_wb = sample_no_wb
+        self.extra = dict(extra) if extra else {}
+        self._tokens = None  # Formatted token cache, created on first read
+
+    def __getitem__(self, key):
+        value = self.extra.get(key, _MISSING)
+        if value is _DELETED:
+            raise KeyError(key)
+        if value is not _MISSING:
+            return value
+        slot = _BUFFERS.get(key)
+        if slot is not None:
+            return getattr(self, slot)
+        compute = _TOKENS.get(key)
+        if compute is None:
+            raise KeyError(key)
+        if self._tokens is None:
+            self._tokens = {}
+        value = self._tokens.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._tokens[key] = compute(self)
+        return value
+
+    def __setitem__(self, key, value):
+        slot = _BUFFERS.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+            self.extra.pop(key, None)
+        else:
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        slot = _BUFFERS.get(key)
+        if slot is not None:
+            setattr(self, slot, None)  # Drops the pool reference
+        if slot is not None or key in _TOKENS:
+            self.extra[key] = _DELETED
+        else:
+            del self.extra[key]
+
+    def __contains__(self, key):
+        value = self.extra.get(key, _MISSING)
+        if value is not _MISSING:
+            return value is not _DELETED
+        return key in _BUFFERS or key in _TOKENS
+
+    def __iter__(self):
+        for key in list(_TOKENS) + list(_BUFFERS):
+            if self.extra.get(key) is not _DELETED:
+                yield key
+        for key, value in self.extra.items():
+            if value is not _DELETED and key not in _TOKENS and key not in _BUFFERS:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return (f"Frame({self.camera!r}, {self.captured_at:%Y-%m-%d %H:%M:%S}, "
+                f"{self.exposure_seconds}s, gain {self.gain}, {self.width}x{self.height})")
+
+    def copy(self):
+        """Shallow copy: own extras, shared buffers (no pixels copied)"""
+        clone = Frame.__new__(Frame)
+        for slot in Frame.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        clone.extra = dict(self.extra)
+        clone._tokens = dict(self._tokens) if self._tokens else None
+        return clone
+
+    @property
+    def nbytes(self):
+        """Bytes of the buffers still held"""
+        return sum(getattr(self, slot).nbytes for slot in _BUFFERS.values() if getattr(self, slot) is not None)
+
+    def release(self):
+        """Drop the pooled buffers so their frame pool slot can be reused"""
+        for key in _BUFFERS:
+            if key in self:
+                del self[key]
+
+    def tokens(self):
+        """Plain dict of every token (for consumers that need a real dict)"""
+        return dict(self.items())
@@ -0,0 +1,116 @@
+"""
+Preallocated frame buffers for camera capture
+
+A FramePool holds a small ring of FrameSlots sized for one capture geometry
+(width, height, bit depth). Each slot owns the raw SDK buffer and every
+intermediate RGB array, so a capture reads, debayers and white-balances
+into memory that already exists instead of allocating ~4 full-frame arrays
+per frame.
+
+Arrays handed out from a slot (e.g. in frame metadata, or a raw frame waiting
+in the processing queue) are views into the pool, not copies. A slot is only
+reused once nothing outside the pool still references its buffers, so a
+consumer that keeps a frame simply keeps its slot out of rotation; the pool
+grows (up to max_slots) or falls back to a one-off allocation rather than
+overwriting data someone is still reading.
+"""
+import sys
+import numpy as np
+
+from .logger import app_logger
+
+
+class FrameSlot:
+    """Buffers for one captured frame"""
+
+    # Buffers that leave the pool via queued raw frames, metadata or return values
+    _SHARED = ('raw', 'rgb', 'rgb_no_wb', 'rgb16')
+
+    def __init__(self, width, height, bit_depth=8):
+        """
+        Args:
+            width: Frame width in pixels
+            height: Frame height in pixels
+            bit_depth: 8 for RAW8, 16 for RAW16
+        """
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+
+        raw_dtype = np.uint16 if bit_depth == 16 else np.uint8
+        self.raw = bytearray(width * height * np.dtype(raw_dtype).itemsize)  # SDK writes here
+        self.bayer = np.frombuffer(self.raw, dtype=raw_dtype).reshape((height, width))
+        self.rgb16 = np.empty((height, width, 3), dtype=np.uint16) if bit_depth == 16 else None
+        self.rgb_no_wb = np.empty((height, width, 3), dtype=np.uint8)
+        self.rgb = np.empty((height, width, 3), dtype=np.uint8)
+
+        # Reference counts while only the slot itself holds each array
+        self._free_refcounts = {name: sys.getrefcount(getattr(self, name))
+                                for name in self._SHARED if getattr(self, name) is not None}
+
+    @property
+    def nbytes(self):
+        """Total bytes held by this slot"""
+        return sum(memoryview(getattr(self, name)).nbytes for name in self._free_refcounts)
+
+    def in_use(self):
+        """True while any array from this slot is still referenced outside the pool"""
+        return any(sys.getrefcount(getattr(self, name)) > count
+                   for name, count in self._free_refcounts.items())
+
+
+class FramePool:
+    """Ring of FrameSlots for one capture geometry"""
+
+    def __init__(self, width, height, bit_depth=8, slots=3, max_slots=6):
+        """
+        Args:
+            width: Frame width in pixels
+            height: Frame height in pixels
+            bit_depth: 8 for RAW8, 16 for RAW16
+            slots: Slots allocated up front
+            max_slots: Upper bound when consumers hold on to frames
+        """
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.max_slots = max(slots, max_slots)
+        self._slots = [FrameSlot(width, height, bit_depth) for _ in range(slots)]
+        self._next = 0
+
+    def matches(self, width, height, bit_depth):
+        """Whether this pool can serve frames of the given geometry"""
+        return (self.width, self.height, self.bit_depth) == (width, height, bit_depth)
+
+    @property
+    def nbytes(self):
+        """Total bytes held by pooled slots"""
+        return sum(slot.nbytes for slot in self._slots)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def acquire(self):
+        """
+        Next free slot in ring order.
+
+        Returns:
+            FrameSlot whose buffers may be overwritten
+        """
+        count = len(self._slots)
+        for i in range(count):
+            index = (self._next + i) % count
+            slot = self._slots[index]
+            if not slot.in_use():
+                self._next = (index + 1) % count
+                return slot
+
+        slot = FrameSlot(self.width, self.height, self.bit_depth)
+        if count < self.max_slots:
+            self._slots.append(slot)
+            self._next = 0
+            app_logger.debug(f"Frame pool grown to {len(self._slots)} slots (all in use)")
+        else:
+            app_logger.warning(f"Frame pool exhausted ({count} slots held by consumers), "
+                               f"allocating unpooled frame")
+        return slot
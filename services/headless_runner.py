@@ -5,6 +5,7 @@ Runs camera capture without GUI for server/scheduled task deployments
 Usage:
     python main.py --auto-start --headless                   # Run until Ctrl+C
     python main.py --auto-start --headless --auto-stop 3600  # Run for 1 hour
+    python main.py --headless --virtual-camera raw_debug     # Replay frames, no hardware
 """
 import os
 import io
@@ -16,9 +17,17 @@ from datetime import datetime
 from .logger import app_logger
 from .config import Config
 from .zwo_camera import ZWOCamera
-from .web_output import WebOutputServer
+from .web_output import WebOutputServer, json_metadata
+from .rtsp_output import RTSPStreamServer
+from .hls_output import HLSSegmentRing
 from .processor import add_overlays
+from .token_template import compile_template
 from .cleanup import run_cleanup
+from .capture_pipeline import CapturePipeline
+from .capture_schedule import CaptureSchedule
+from .cadence_governor import CadenceGovernor
+from .qos_governor import QoSGovernor
+from .exposure_priors import ExposurePriorTable, prior_table_path
 
 
 class HeadlessRunner:
@@ -28,17 +37,22 @@ class HeadlessRunner:
     Designed for background/server operation.
     """
     
-    def __init__(self, auto_stop: int = None):
+    def __init__(self, auto_stop: int = None, virtual_camera: str = None):
         """
         Args:
             auto_stop: Stop after this many seconds (None = run forever)
+            virtual_camera: Use the simulated camera (services/virtual_zwoasi.py) instead
+                of the SDK; a frame directory to replay, or '' for a synthetic sky
         """
         self.auto_stop = auto_stop
+        self.virtual_camera = virtual_camera
         self.running = False
         self.config = Config()
         self.zwo_camera = None
         self.web_server = None
+        self.rtsp_server = None
         self.image_count = 0
+        self.capture_pipeline = None
         self._shutdown_event = threading.Event()
         
         # Register signal handlers for graceful shutdown
@@ -55,6 +69,11 @@ class HeadlessRunner:
         app_logger.info(message)
         print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
     
+    def _exposure_context(self):
+        """Observing conditions for exposure priors (shared with the GUI's context fetchers)"""
+        from ui.controllers.context_fetchers import compute_exposure_context
+        return compute_exposure_context()
+    
     def start(self):
         """Start headless capture"""
         self._log("=" * 60)
@@ -70,6 +89,12 @@ class HeadlessRunner:
             if self.config.get('output', {}).get('mode') == 'webserver':
                 self._start_webserver()
             
+            # Start RTSP stream if configured (also the HLS encoder)
+            output_config = self.config.get('output', {})
+            if (output_config.get('mode') == 'rtsp' or output_config.get('rtsp_enabled', False)
+                    or output_config.get('hls_enabled', False)):
+                self._start_rtsp()
+            
             # Initialize camera
             self._log("Initializing camera...")
             if not self._init_camera():
@@ -129,7 +154,8 @@ class HeadlessRunner:
         
         self._log(f"Starting web server on {host}:{port}...")
         
-        self.web_server = WebOutputServer(host, port, image_path, status_path)
+        self.web_server = WebOutputServer(host, port, image_path, status_path,
+                                          jpeg_quality=self.config.get('jpg_quality', 85))
         if self.web_server.start():
             self._log(f"✓ Web server running: {self.web_server.get_url()}")
             self._log(f"  Status endpoint: {self.web_server.get_status_url()}")
@@ -137,43 +163,121 @@ class HeadlessRunner:
             self._log("⚠ Failed to start web server")
             self.web_server = None
     
+    def _start_rtsp(self):
+        """Start RTSP stream output (and HLS from the same encoder)"""
+        output_config = self.config.get('output', {})
+        
+        # HLS segments are served by the web server, so it needs to be running
+        hls = None
+        if output_config.get('hls_enabled', False):
+            if self.web_server and self.web_server.running:
+                hls = HLSSegmentRing(output_config.get('hls_segments', 6))
+            else:
+                self._log("⚠ HLS output requires the web server (output mode 'webserver'); HLS disabled")
+        rtsp_enabled = output_config.get('mode') == 'rtsp' or output_config.get('rtsp_enabled', False)
+        if not rtsp_enabled and hls is None:
+            return
+        
+        self.rtsp_server = RTSPStreamServer(
+            host=output_config.get('rtsp_host', '127.0.0.1'),
+            port=output_config.get('rtsp_port', 8554),
+            stream_name=output_config.get('rtsp_stream_name', 'asiwatchdog'),
+            fps=output_config.get('rtsp_fps', 1.0),
+            width=output_config.get('rtsp_width', 1280),
+            height=output_config.get('rtsp_height', 720),
+            keyframe_interval=output_config.get('rtsp_keyframe_interval', 2.0),
+            rtsp=rtsp_enabled,
+            hls=hls
+        )
+        if self.rtsp_server.start():
+            if rtsp_enabled:
+                self._log(f"✓ RTSP stream running: {self.rtsp_server.get_url()}")
+            if hls is not None:
+                self.web_server.attach_hls(hls)
+                self._log(f"✓ HLS stream running: {self.web_server.get_hls_url()}")
+        else:
+            self._log("⚠ Failed to start RTSP stream")
+            self.rtsp_server = None
+    
+    def _check_sdk(self) -> bool:
+        """Install the virtual camera if requested, else check the SDK library exists"""
+        sdk_path = self.config.get('zwo_sdk_path')
+        if self.virtual_camera is not None:
+            from . import virtual_zwoasi
+            virtual_zwoasi.install(virtual_zwoasi.VirtualCameraSpec.from_config(
+                self.config.get('virtual_camera', {}), source=self.virtual_camera))
+            self._log(f"Using virtual camera ({self.virtual_camera or 'synthetic sky'})")
+        elif not sdk_path or not os.path.exists(sdk_path):
+            self._log(f"ERROR: SDK not found at: {sdk_path}")
+            return False
+        return True
+    
+    def _build_camera(self, camera_name=None, profile=None):
+        """
+        ZWOCamera configured from the global camera settings.
+        
+        Args:
+            camera_name: Camera to build for (default: the configured camera)
+            profile: Optional per-camera profile (Config.get_camera_profile) overriding
+                     the global exposure, gain, white balance, offset, flip and Bayer pattern
+        """
+        config = self.config
+        profile = profile or {}
+        camera_name = camera_name or config.get('zwo_camera_name')
+        
+        zwo_camera = ZWOCamera(
+            sdk_path=config.get('zwo_sdk_path'),
+            camera_index=config.get('zwo_selected_camera', 0),
+            camera_name=camera_name,
+            exposure_sec=profile.get('exposure_ms', config.get('zwo_exposure_ms', 100.0)) / 1000.0,
+            gain=profile.get('gain', config.get('zwo_gain', 100)),
+            white_balance_r=profile.get('wb_r', config.get('zwo_wb_r', 75)),
+            white_balance_b=profile.get('wb_b', config.get('zwo_wb_b', 99)),
+            offset=profile.get('offset', config.get('zwo_offset', 20)),
+            flip=profile.get('flip', config.get('zwo_flip', 0)),
+            auto_exposure=config.get('zwo_auto_exposure', False),
+            max_exposure_sec=profile.get('max_exposure_ms', config.get('zwo_max_exposure_ms', 30000)) / 1000.0,
+            bayer_pattern=profile.get('bayer_pattern', config.get('zwo_bayer_pattern', 'BGGR')),
+            wb_mode=config.get('white_balance', {}).get('mode', 'asi_auto'),
+            wb_config=config.get('white_balance', {}),
+            scheduled_capture_enabled=config.get('scheduled_capture_enabled', False),
+            scheduled_start_time=config.get('scheduled_start_time', '17:00'),
+            scheduled_end_time=config.get('scheduled_end_time', '09:00')
+        )
+        
+        # Set capture interval and window
+        zwo_camera.capture_interval = config.get('zwo_interval', 5.0)
+        zwo_camera.set_capture_schedule(CaptureSchedule.from_config(config))
+        cadence = config.get('cadence', {})
+        if cadence.get('enabled', False):
+            zwo_camera.cadence_governor = CadenceGovernor.from_config(
+                cadence, zwo_camera.capture_interval, log=app_logger.info)
+        qos = config.get('qos', {})
+        if qos.get('enabled', False):
+            # Headless processing has no ML, stretch or dev-mode stage to shed
+            zwo_camera.qos_governor = QoSGovernor.from_config(qos, timings=zwo_camera.stage_timings,
+                                                              log=app_logger.info, supported=('encode',))
+        zwo_camera.pipelined = config.get('zwo_pipelined_capture', False)
+        zwo_camera.pipeline_queue_size = config.get('zwo_pipeline_queue_size', 2)
+        zwo_camera.capture_mode = config.get('zwo_capture_mode', 'snapshot')
+        zwo_camera.video_max_exposure = config.get('zwo_video_max_exposure_ms', 1000.0) / 1000.0
+        zwo_camera.capture_profile = config.get('zwo_capture_profile', 'full')
+        zwo_camera.calibration_solver = config.get('zwo_calibration_solver', 'model')
+        if config.get('zwo_exposure_priors', True):
+            zwo_camera.exposure_priors = ExposurePriorTable(prior_table_path(camera_name))
+            zwo_camera.exposure_context = self._exposure_context
+        
+        # Set logging callback
+        zwo_camera.on_log_callback = lambda msg: app_logger.info(msg)
+        return zwo_camera
+    
     def _init_camera(self) -> bool:
         """Initialize ZWO camera"""
         try:
-            sdk_path = self.config.get('zwo_sdk_path')
-            if not sdk_path or not os.path.exists(sdk_path):
-                self._log(f"ERROR: SDK not found at: {sdk_path}")
+            if not self._check_sdk():
                 return False
             
-            # Get camera settings from config
-            exposure_ms = self.config.get('zwo_exposure_ms', 100.0)
-            exposure_sec = exposure_ms / 1000.0
-            
-            self.zwo_camera = ZWOCamera(
-                sdk_path=sdk_path,
-                camera_index=self.config.get('zwo_selected_camera', 0),
-                camera_name=self.config.get('zwo_camera_name'),
-                exposure_sec=exposure_sec,
-                gain=self.config.get('zwo_gain', 100),
-                white_balance_r=self.config.get('zwo_wb_r', 75),
-                white_balance_b=self.config.get('zwo_wb_b', 99),
-                offset=self.config.get('zwo_offset', 20),
-                flip=self.config.get('zwo_flip', 0),
-                auto_exposure=self.config.get('zwo_auto_exposure', False),
-                max_exposure_sec=self.config.get('zwo_max_exposure_ms', 30000) / 1000.0,
-                bayer_pattern=self.config.get('zwo_bayer_pattern', 'BGGR'),
-                wb_mode=self.config.get('white_balance', {}).get('mode', 'asi_auto'),
-                wb_config=self.config.get('white_balance', {}),
-                scheduled_capture_enabled=self.config.get('scheduled_capture_enabled', False),
-                scheduled_start_time=self.config.get('scheduled_start_time', '17:00'),
-                scheduled_end_time=self.config.get('scheduled_end_time', '09:00')
-            )
-            
-            # Set capture interval
-            self.zwo_camera.capture_interval = self.config.get('zwo_interval', 5.0)
-            
-            # Set logging callback
-            self.zwo_camera.on_log_callback = lambda msg: app_logger.info(msg)
+            self.zwo_camera = self._build_camera()
             
             # Initialize SDK and connect
             if not self.zwo_camera.initialize_sdk():
@@ -207,14 +311,15 @@ class HeadlessRunner:
     
     def _capture_loop(self):
         """Main capture loop"""
-        interval = self.config.get('zwo_interval', 5.0)
+        if self.zwo_camera.pipelined:
+            self._pipelined_capture_loop()
+            return
         
         while self.running and not self._shutdown_event.is_set():
             try:
                 # Check scheduled capture window
                 if not self.zwo_camera.is_within_scheduled_window():
-                    self._log("Outside scheduled capture window, waiting...")
-                    self._shutdown_event.wait(60)  # Check every minute
+                    self._wait_for_window(self.zwo_camera)
                     continue
                 
                 # Capture frame
@@ -235,7 +340,7 @@ class HeadlessRunner:
                 
                 # Wait for next interval
                 elapsed = time.time() - start_time
-                wait_time = max(0, interval - elapsed)
+                wait_time = max(0, self.zwo_camera.next_capture_interval() - elapsed)
                 if wait_time > 0:
                     self._shutdown_event.wait(wait_time)
                     
@@ -246,57 +351,185 @@ class HeadlessRunner:
                 # Wait before retrying
                 self._shutdown_event.wait(5)
     
-    def _process_and_save(self, img, metadata):
-        """Process image with overlays and save/publish"""
+    def _pipelined_capture_loop(self):
+        """Capture loop that only exposes; frames are developed and saved on a processing thread"""
+        pipeline = CapturePipeline(self._develop_and_save,
+                                   maxsize=self.zwo_camera.pipeline_queue_size,
+                                   timings=self.zwo_camera.stage_timings,
+                                   name="headless-processing")
+        self.capture_pipeline = pipeline
+        pipeline.start()
+        self._log(f"Pipelined capture: processing overlaps the next exposure "
+                  f"(queue size {pipeline.queue.maxsize}, drop-oldest)")
+        
+        try:
+            while self.running and not self._shutdown_event.is_set():
+                try:
+                    # Check scheduled capture window
+                    if not self.zwo_camera.is_within_scheduled_window():
+                        self._wait_for_window(self.zwo_camera)
+                        continue
+                    
+                    # Expose and read out, then hand off without waiting for processing
+                    start_time = time.time()
+                    pipeline.submit(self.zwo_camera.expose_frame())
+                    
+                    # Start-to-start cadence
+                    wait_time = max(0, self.zwo_camera.next_capture_interval() - (time.time() - start_time))
+                    if wait_time > 0:
+                        self._shutdown_event.wait(wait_time)
+                
+                except Exception as e:
+                    self._log(f"ERROR in capture loop: {e}")
+                    import traceback
+                    self._log(traceback.format_exc())
+                    # Wait before retrying
+                    self._shutdown_event.wait(5)
+        finally:
+            pipeline.stop()
+            self.capture_pipeline = None
+            self._log(f"Processing stage stopped ({pipeline.processed} processed, "
+                      f"{pipeline.dropped} dropped while behind)")
+    
+    def _wait_for_window(self, zwo_camera):
+        """Sleep until the camera's capture window opens or shutdown (no polling)"""
+        schedule = zwo_camera.capture_schedule
+        self._log(f"Outside scheduled capture window ({schedule.describe()}), "
+                  f"waiting until {schedule.format_next_change()}")
+        schedule.wait(self._shutdown_event)
+    
+    def _develop_and_save(self, raw):
+        """Processing stage for pipelined capture"""
+        started = time.perf_counter()
+        img, metadata = self.zwo_camera.develop_frame(raw)
+        self._process_and_save(img, metadata, started=started)
+        
+        self.image_count += 1
+        stage, avg = self.zwo_camera.stage_timings.bottleneck()
+        self._log(f"Frame {self.image_count}: {metadata.get('FILENAME', 'unknown')} "
+                  f"(bottleneck: {stage} {avg:.2f}s)")
+        
+        # Run cleanup if enabled
+        self._run_cleanup()
+    
+    def _status_metadata(self, metadata, pipeline=None):
+        """JSON-safe metadata for the web /status endpoint (drops image arrays)"""
+        status = json_metadata(metadata)
+        pipeline = pipeline or self.capture_pipeline
+        if pipeline is not None:
+            status['PIPELINE'] = pipeline.stats()
+        return status
+    
+    def _process_and_save(self, img, metadata, unit=None, started=None):
+        """
+        Process image with overlays and save/publish
+        
+        Args:
+            img: Developed PIL image
+            metadata: Frame metadata
+            unit: CameraUnit in multi-camera mode (its own timings, output
+                  directory and /cam/<id>/ web namespace); None for the single camera
+            started: time.perf_counter() when processing of the frame began
+                     (before develop in pipelined mode); default now
+        """
+        started = started or time.perf_counter()
+        zwo_camera = unit.zwo_camera if unit else self.zwo_camera
+        qos = zwo_camera.qos_governor
+        self._publish_frame(img, metadata, unit, qos)
+        
+        # Frame time against the processing budget; sheds or restores optional work
+        if qos is not None:
+            pipeline = unit.source if unit else self.capture_pipeline
+            backlog = len(pipeline.queue) if pipeline is not None else 0
+            qos.frame_done(time.perf_counter() - started, zwo_camera.next_capture_interval(), backlog)
+    
+    def _publish_frame(self, img, metadata, unit=None, qos=None):
+        """
+        Resize, overlay, save and publish one frame (see _process_and_save)
+        
+        Args:
+            qos: QoSGovernor choosing the encode options, or None for full quality
+        """
         from PIL import Image
         
+        timings = (unit.zwo_camera if unit else self.zwo_camera).stage_timings
+        if qos is not None:
+            metadata['QOS'] = qos.stats()
+        
         try:
-            # Apply resize if configured
-            resize_percent = self.config.get('resize_percent', 100)
-            if resize_percent < 100:
-                new_size = (
-                    int(img.width * resize_percent / 100),
-                    int(img.height * resize_percent / 100)
-                )
-                img = img.resize(new_size, Image.LANCZOS)
-            
-            # Add overlays
-            overlays = self.config.get('overlays', [])
-            if overlays:
-                img = add_overlays(img, overlays, metadata)
+            with timings.measure('overlay'):
+                # Apply resize if configured
+                resize_percent = self.config.get('resize_percent', 100)
+                if resize_percent < 100:
+                    new_size = (
+                        int(img.width * resize_percent / 100),
+                        int(img.height * resize_percent / 100)
+                    )
+                    img = img.resize(new_size, Image.LANCZOS)
+                
+                # Add overlays
+                overlays = self.config.get('overlays', [])
+                if overlays:
+                    img = add_overlays(img, overlays, metadata, in_place=True)
             
             # Generate filename
-            output_dir = self.config.get('output_directory')
+            output_dir = unit.output_dir if unit else self.config.get('output_directory')
             os.makedirs(output_dir, exist_ok=True)
             
             filename_pattern = self.config.get('filename_pattern', 'latestImage')
             output_format = self.config.get('output_format', 'jpg').lower()
             
             # Replace tokens in filename
-            filename = filename_pattern
-            filename = filename.replace('{timestamp}', datetime.now().strftime('%Y%m%d_%H%M%S'))
-            filename = filename.replace('{session}', datetime.now().strftime('%Y-%m-%d'))
+            template = compile_template(filename_pattern, case_sensitive=True)
+            now = datetime.now()
+            tokens = {}
+            if 'timestamp' in template.tokens:
+                tokens['timestamp'] = now.strftime('%Y%m%d_%H%M%S')
+            if 'session' in template.tokens:
+                tokens['session'] = now.strftime('%Y-%m-%d')
+            filename = template.render(tokens, default=None)
             
             output_path = os.path.join(output_dir, f"{filename}.{output_format}")
             
             # Save image
-            if output_format in ('jpg', 'jpeg'):
-                quality = self.config.get('jpg_quality', 85)
-                img.save(output_path, 'JPEG', quality=quality, optimize=True)
-            else:
-                img.save(output_path, 'PNG', optimize=True)
+            pil_format = 'JPEG' if output_format in ('jpg', 'jpeg') else 'PNG'
+            options = {'optimize': True}
+            if pil_format == 'JPEG':
+                options['quality'] = self.config.get('jpg_quality', 85)
+            if qos is not None:
+                options = qos.save_options(pil_format, **options)
+            with timings.measure('save'):
+                img.save(output_path, pil_format, **options)
+            governor = (unit.zwo_camera if unit else self.zwo_camera).cadence_governor
+            if governor is not None:
+                governor.record_output(os.path.getsize(output_path))
+            
+            # Push to RTSP stream if running (scaled and encoded on its own thread)
+            if self.rtsp_server and self.rtsp_server.running and (unit is None or unit.streams):
+                self.rtsp_server.update_image(img)
             
-            # Push to web server if running
+            # Push to web server if running (serves the saved file; other
+            # sizes/formats are encoded from img in the background)
             if self.web_server and self.web_server.running:
-                img_bytes = io.BytesIO()
-                if output_format in ('jpg', 'jpeg'):
-                    img.save(img_bytes, format='JPEG', quality=self.config.get('jpg_quality', 85))
-                    content_type = 'image/jpeg'
-                else:
-                    img.save(img_bytes, format='PNG')
-                    content_type = 'image/png'
+                camera_id = unit.id if unit else None
+                status = self._status_metadata(metadata, unit.source if unit else None)
+                with timings.measure('publish'):
+                    published = self.web_server.update_image_from_file(
+                        output_path, metadata=status, image=img, camera=camera_id)
                 
-                self.web_server.update_image(output_path, img_bytes.getvalue(), content_type=content_type)
+                if not published:
+                    with timings.measure('encode'):
+                        img_bytes = io.BytesIO()
+                        if output_format in ('jpg', 'jpeg'):
+                            img.save(img_bytes, format='JPEG', quality=self.config.get('jpg_quality', 85))
+                            content_type = 'image/jpeg'
+                        else:
+                            img.save(img_bytes, format='PNG')
+                            content_type = 'image/png'
+                    
+                    with timings.measure('publish'):
+                        self.web_server.update_image(output_path, img_bytes.getvalue(), metadata=status,
+                                                     content_type=content_type, image=img, camera=camera_id)
             
         except Exception as e:
             self._log(f"ERROR processing image: {e}")
@@ -329,19 +562,31 @@ class HeadlessRunner:
         except Exception as e:
             self._log(f"Error stopping web server: {e}")
         
+        try:
+            if self.rtsp_server:
+                self.rtsp_server.stop()
+                self._log("RTSP stream stopped")
+        except Exception as e:
+            self._log(f"Error stopping RTSP stream: {e}")
+        
         self._log(f"Headless session complete. Captured {self.image_count} images.")
         self._log("=" * 60)
 
 
-def run_headless(auto_stop: int = None) -> bool:
+def run_headless(auto_stop: int = None, virtual_camera: str = None) -> bool:
     """
     Run PFR Sentinel in headless mode
     
     Args:
         auto_stop: Stop after this many seconds (None = run forever)
+        virtual_camera: Frame directory for the simulated camera ('' = synthetic, None = real camera)
     
     Returns:
         True if completed successfully, False on error
     """
-    runner = HeadlessRunner(auto_stop=auto_stop)
+    runner_class = HeadlessRunner
+    if Config().get('multi_camera', {}).get('enabled', False):
+        from .multi_camera import MultiCameraRunner
+        runner_class = MultiCameraRunner
+    runner = runner_class(auto_stop=auto_stop, virtual_camera=virtual_camera)
     return runner.start()
@@ -0,0 +1,217 @@
+"""
+HLS output fed from the RTSP encoder
+
+The ffmpeg process that encodes the RTSP stream also writes the same H.264
+stream as MPEG-TS to its stdout (tee muxer), so HLS costs no second encode.
+TSSegmenter cuts that byte stream into segments at keyframes (the encoder
+forces one every keyframe interval) and HLSSegmentRing keeps the most recent
+segments and a pre-rendered playlist in memory for WebOutputServer to serve.
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from .logger import app_logger
+
+
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+PAT_PID = 0x0000
+H264_STREAM_TYPE = 0x1B
+PTS_CLOCK_HZ = 90000
+
+PLAYLIST_NAME = 'stream.m3u8'
+SEGMENT_SUFFIX = '.ts'
+
+
+def _parse_pts(payload):
+    """PTS (90 kHz ticks) from the start of a PES packet, or None"""
+    if len(payload) < 14 or payload[:3] != b'\x00\x00\x01' or not payload[7] & 0x80:
+        return None
+    p = payload[9:14]
+    return (((p[0] >> 1) & 0x07) << 30) | (p[1] << 22) | ((p[2] >> 1) << 15) | (p[3] << 7) | (p[4] >> 1)
+
+
+def _section(payload):
+    """PSI section bytes (after the pointer field) of a payload_unit_start packet"""
+    pointer = payload[0]
+    section = payload[1 + pointer:]
+    if len(section) < 3:
+        return None
+    length = ((section[1] & 0x0F) << 8) | section[2]
+    return section[:3 + length]
+
+
+class TSSegmenter:
+    """Cuts an MPEG-TS byte stream into keyframe-aligned segments"""
+
+    def __init__(self, on_segment, default_duration=2.0):
+        """
+        Args:
+            on_segment: Called as on_segment(data, duration_seconds) for each completed segment
+            default_duration: Duration used when a segment's timestamps are missing
+        """
+        self.on_segment = on_segment
+        self.default_duration = default_duration
+        self._buffer = bytearray()
+        self._pat = None
+        self._pmt = None
+        self._pmt_pid = None
+        self._video_pid = None
+        self._segment = None  # bytearray of the segment being built
+        self._segment_pts = None
+
+    def feed(self, data):
+        """Process encoder output (any chunk size)"""
+        self._buffer += data
+        offset = 0
+        end = len(self._buffer) - TS_PACKET_SIZE
+        while offset <= end:
+            if self._buffer[offset] != TS_SYNC_BYTE:
+                offset += 1  # Resynchronise
+                continue
+            self._packet(bytes(self._buffer[offset:offset + TS_PACKET_SIZE]))
+            offset += TS_PACKET_SIZE
+        del self._buffer[:offset]
+
+    def _packet(self, packet):
+        pid = ((packet[1] & 0x1F) << 8) | packet[2]
+        unit_start = bool(packet[1] & 0x40)
+        adaptation = (packet[3] >> 4) & 0x03
+        payload_offset = 4
+        random_access = False
+        if adaptation & 0x02:
+            adaptation_length = packet[4]
+            random_access = adaptation_length > 0 and bool(packet[5] & 0x40)
+            payload_offset = 5 + adaptation_length
+        payload = packet[payload_offset:] if adaptation & 0x01 else b''
+
+        if pid == PAT_PID:
+            if unit_start:
+                self._pat = packet
+                self._read_pat(payload)
+            return
+        if pid == self._pmt_pid:
+            if unit_start:
+                self._pmt = packet
+                self._read_pmt(payload)
+            return
+
+        if pid == self._video_pid and unit_start and random_access:
+            self._start_segment(_parse_pts(payload))
+        if self._segment is not None:
+            self._segment += packet
+
+    def _read_pat(self, payload):
+        section = _section(payload)
+        if not section:
+            return
+        # Program loop: 4 bytes per program, between the 8-byte header and the CRC
+        for i in range(8, len(section) - 4, 4):
+            program_number = (section[i] << 8) | section[i + 1]
+            if program_number != 0:
+                self._pmt_pid = ((section[i + 2] & 0x1F) << 8) | section[i + 3]
+                return
+
+    def _read_pmt(self, payload):
+        section = _section(payload)
+        if not section or len(section) < 12:
+            return
+        i = 12 + (((section[10] & 0x0F) << 8) | section[11])
+        while i + 5 <= len(section) - 4:
+            stream_type = section[i]
+            pid = ((section[i + 1] & 0x1F) << 8) | section[i + 2]
+            if stream_type == H264_STREAM_TYPE:
+                self._video_pid = pid
+                return
+            i += 5 + (((section[i + 3] & 0x0F) << 8) | section[i + 4])
+
+    def _start_segment(self, pts):
+        if self._segment is not None:
+            duration = self.default_duration
+            if pts is not None and self._segment_pts is not None and pts > self._segment_pts:
+                duration = (pts - self._segment_pts) / PTS_CLOCK_HZ
+            try:
+                self.on_segment(bytes(self._segment), duration)
+            except Exception as e:
+                app_logger.error(f"Error publishing HLS segment: {e}")
+
+        # Every segment starts with PAT/PMT so it decodes on its own
+        self._segment = bytearray((self._pat or b'') + (self._pmt or b''))
+        self._segment_pts = pts
+
+
+class HLSSegmentRing:
+    """Most recent HLS segments and their playlist, held in memory"""
+
+    def __init__(self, max_segments=6):
+        """
+        Args:
+            max_segments: Segments listed in the playlist (older ones are dropped)
+        """
+        self.max_segments = max(2, int(max_segments))
+        self._segments = OrderedDict()  # sequence -> (data, duration)
+        self._next_sequence = 0
+        self._playlist = None
+        self._lock = threading.Lock()
+        # Prefix for segment names, so a restarted stream never reuses a cached URL
+        self.session = os.urandom(4).hex()
+
+    def add_segment(self, data, duration):
+        """Publish a completed segment (called by TSSegmenter)"""
+        with self._lock:
+            self._segments[self._next_sequence] = (data, duration)
+            self._next_sequence += 1
+            # Keep one extra so a client that just read the playlist can still fetch it
+            while len(self._segments) > self.max_segments + 1:
+                self._segments.popitem(last=False)
+            self._playlist = self._render_playlist()
+
+    @property
+    def playlist(self):
+        """Playlist bytes (None until the first segment is complete)"""
+        return self._playlist
+
+    def segment_name(self, sequence):
+        """File name of a segment in the playlist"""
+        return f'{self.session}_{sequence}{SEGMENT_SUFFIX}'
+
+    def segment(self, name):
+        """Segment bytes for a file name from the playlist, or None if unknown or already dropped"""
+        prefix = f'{self.session}_'
+        if not (name.startswith(prefix) and name.endswith(SEGMENT_SUFFIX)):
+            return None
+        try:
+            sequence = int(name[len(prefix):-len(SEGMENT_SUFFIX)])
+        except ValueError:
+            return None
+        with self._lock:
+            entry = self._segments.get(sequence)
+        return entry[0] if entry else None
+
+    @property
+    def segment_lifetime(self):
+        """Approximate seconds a segment stays available (for cache headers)"""
+        with self._lock:
+            durations = [duration for _, duration in self._segments.values()]
+        return int(sum(durations)) if durations else 0
+
+    def clear(self):
+        with self._lock:
+            self._segments.clear()
+            self._playlist = None
+
+    def _render_playlist(self):
+        listed = list(self._segments.items())[-self.max_segments:]
+        target = max(1, math.ceil(max(duration for _, (_, duration) in listed)))
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:3',
+            f'#EXT-X-TARGETDURATION:{target}',
+            f'#EXT-X-MEDIA-SEQUENCE:{listed[0][0]}',
+        ]
+        for sequence, (_, duration) in listed:
+            lines.append(f'#EXTINF:{duration:.3f},')
+            lines.append(self.segment_name(sequence))
+        return ('\n'.join(lines) + '\n').encode('ascii')
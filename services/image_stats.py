@@ -0,0 +1,290 @@
+"""
+Histogram-based image statistics engine
+
+Builds one integer histogram per plane (256 bins for 8-bit, 65536 bins for
+16-bit, 4096 bins for left-aligned 12-bit data, etc.) in a single O(N) pass and
+answers median, MAD, percentiles, mean and standard deviation from the
+histogram in O(bins) instead of sorting/partitioning the full frame each time.
+
+For integer input the results are identical to numpy's np.median /
+np.percentile (default linear interpolation) / np.mean. Float input in the
+0-1 range is quantized to 16 bits, so results are within 1/65535 of numpy.
+"""
+import numpy as np
+
+
+# Rows processed per bincount call. np.bincount casts its input to intp, so
+# working in row blocks bounds the temporary allocation to a few MB instead of
+# 8 bytes per pixel for the whole frame.
+_BLOCK_PIXELS = 1 << 20
+
+# Integer Rec.601 luminance weights (match 0.299 / 0.587 / 0.114 float weights)
+_LUM_WEIGHTS = (299, 587, 114)
+
+FLOAT_BINS = 65536
+
+
+def _row_blocks(height, width):
+    """Yield (start, stop) row ranges holding roughly _BLOCK_PIXELS pixels"""
+    rows = max(1, _BLOCK_PIXELS // max(width, 1))
+    for start in range(0, height, rows):
+        yield start, min(start + rows, height)
+
+
+def _as_plane(data):
+    """View 1D/2D data as a 2D plane for row-block iteration"""
+    if data.ndim == 1:
+        return data.reshape(1, -1)
+    if data.ndim == 2:
+        return data
+    raise ValueError(f"Expected a 1D or 2D plane, got shape {data.shape}")
+
+
+def _percentile_index(cdf, total, percentile):
+    """
+    Percentile in bin-index units using numpy's linear interpolation rule.
+
+    numpy places percentile p at sorted position (N - 1) * p / 100 and
+    interpolates between the two neighbouring sorted values. The k-th sorted
+    value is the first bin whose cumulative count exceeds k.
+    """
+    position = (total - 1) * (percentile / 100.0)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, total - 1)
+    fraction = position - lower
+
+    lower_value = int(np.searchsorted(cdf, lower, side='right'))
+    if fraction == 0 or upper == lower:
+        return float(lower_value)
+    upper_value = int(np.searchsorted(cdf, upper, side='right'))
+    return lower_value + fraction * (upper_value - lower_value)
+
+
+class HistogramStats:
+    """
+    Statistics for one image plane answered from its integer histogram.
+
+    All returned values are in the units of the source data (0-255 for
+    uint8, 0-65535 for uint16, 0-1 for float input). Use ``full_scale`` to
+    normalize to 0-1.
+    """
+
+    def __init__(self, counts, value_scale=1.0, full_scale=None):
+        """
+        Args:
+            counts: 1D histogram counts (index = bin)
+            value_scale: Source units per bin (e.g. 16 for 12-bit data stored in uint16)
+            full_scale: Maximum representable source value (default: last bin)
+        """
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.bins = len(self.counts)
+        self.value_scale = float(value_scale)
+        self.full_scale = float(full_scale) if full_scale is not None else (self.bins - 1) * self.value_scale
+        self.total = int(self.counts.sum())
+        self._cdf = np.cumsum(self.counts)
+        self._median_index = None
+
+    # =========================================================================
+    # Construction
+    # =========================================================================
+
+    @classmethod
+    def from_array(cls, data, bit_depth=None):
+        """
+        Build statistics from an integer plane (any shape, all pixels pooled).
+
+        Args:
+            data: uint8 or uint16 numpy array
+            bit_depth: Optional effective bit depth of left-aligned uint16 data
+                       (e.g. 12 for a 12-bit sensor in RAW16 mode -> 4096 bins)
+        """
+        data = np.asarray(data)
+        if data.dtype == np.uint8:
+            bins, shift = 256, 0
+        elif data.dtype == np.uint16:
+            shift = 16 - bit_depth if bit_depth and 8 <= bit_depth < 16 else 0
+            bins = 1 << (16 - shift)
+        else:
+            raise TypeError(f"from_array expects uint8 or uint16 data, got {data.dtype}")
+
+        plane = _as_plane(data.reshape(data.shape[0], -1) if data.ndim > 2 else data)
+        counts = np.zeros(bins, dtype=np.int64)
+        for start, stop in _row_blocks(*plane.shape):
+            block = plane[start:stop].ravel()
+            if shift:
+                block = block >> shift
+            counts += np.bincount(block, minlength=bins)[:bins]
+
+        full_scale = 255 if bins == 256 else 65535
+        return cls(counts, value_scale=1 << shift, full_scale=full_scale)
+
+    @classmethod
+    def from_float(cls, data, bins=FLOAT_BINS):
+        """
+        Build statistics from a float plane in the 0-1 range.
+
+        Values are quantized to ``bins`` levels (16-bit by default) and clipped.
+        """
+        data = np.asarray(data)
+        plane = _as_plane(data.reshape(data.shape[0], -1) if data.ndim > 2 else data)
+        top = bins - 1
+        counts = np.zeros(bins, dtype=np.int64)
+        for start, stop in _row_blocks(*plane.shape):
+            block = plane[start:stop] * np.float32(top)
+            np.clip(block, 0, top, out=block)
+            np.rint(block, out=block)
+            counts += np.bincount(block.astype(np.intp).ravel(), minlength=bins)
+        return cls(counts, value_scale=1.0 / top, full_scale=1.0)
+
+    # =========================================================================
+    # Queries
+    # =========================================================================
+
+    def _to_value(self, index):
+        return index * self.value_scale
+
+    def percentile(self, percentile):
+        """Percentile (0-100), same interpolation as np.percentile"""
+        if self.total == 0:
+            return 0.0
+        return self._to_value(_percentile_index(self._cdf, self.total, percentile))
+
+    def median(self):
+        """Median value (same as np.median for integer data)"""
+        if self.total == 0:
+            return 0.0
+        if self._median_index is None:
+            self._median_index = _percentile_index(self._cdf, self.total, 50)
+        return self._to_value(self._median_index)
+
+    def mad(self):
+        """
+        Median absolute deviation from the median.
+
+        The median is always a whole or half bin index, so the deviations of
+        every bin are whole or half bins as well; they are re-histogrammed by
+        distance from the median and the median of that is taken.
+        """
+        if self.total == 0:
+            return 0.0
+        self.median()
+        twice_median = int(round(2 * self._median_index))
+        indices = np.arange(self.bins)
+        if twice_median % 2 == 0:
+            distance = np.abs(indices - twice_median // 2)
+            offset = 0.0
+        else:
+            # Median lies between bins m and m+1: deviations are k + 0.5
+            lower = twice_median // 2
+            distance = np.where(indices <= lower, lower - indices, indices - lower - 1)
+            offset = 0.5
+        deviation_counts = np.bincount(distance, weights=self.counts, minlength=self.bins)
+        deviation_cdf = np.cumsum(deviation_counts)
+        index = _percentile_index(deviation_cdf, self.total, 50) + offset
+        return self._to_value(index)
+
+    def mean(self):
+        """Mean value"""
+        if self.total == 0:
+            return 0.0
+        return self._to_value(float(np.dot(self.counts, np.arange(self.bins, dtype=np.float64))) / self.total)
+
+    def std(self):
+        """Population standard deviation (same as np.std)"""
+        if self.total == 0:
+            return 0.0
+        indices = np.arange(self.bins, dtype=np.float64)
+        mean_index = float(np.dot(self.counts, indices)) / self.total
+        variance = float(np.dot(self.counts, (indices - mean_index) ** 2)) / self.total
+        return self._to_value(np.sqrt(variance))
+
+    def min(self):
+        """Smallest value present"""
+        nonzero = np.flatnonzero(self.counts)
+        return self._to_value(int(nonzero[0])) if len(nonzero) else 0.0
+
+    def max(self):
+        """Largest value present"""
+        nonzero = np.flatnonzero(self.counts)
+        return self._to_value(int(nonzero[-1])) if len(nonzero) else 0.0
+
+    def fraction_above(self, threshold):
+        """Fraction of pixels strictly above ``threshold`` (source units)"""
+        if self.total == 0:
+            return 0.0
+        index = int(np.floor(threshold / self.value_scale))
+        if index < 0:
+            return 1.0
+        if index >= self.bins - 1:
+            return 0.0
+        return (self.total - int(self._cdf[index])) / self.total
+
+    def normalized(self, value):
+        """Convert a source-unit value to the 0-1 range"""
+        return value / self.full_scale if self.full_scale else 0.0
+
+
+def channel_stats(rgb, bit_depth=None):
+    """
+    Per-channel statistics for an (H, W, C) array.
+
+    Args:
+        rgb: uint8/uint16 or float (0-1) array with channels last
+        bit_depth: Optional effective bit depth for left-aligned uint16 data
+
+    Returns:
+        List of HistogramStats, one per channel
+    """
+    if np.issubdtype(rgb.dtype, np.floating):
+        return [HistogramStats.from_float(rgb[:, :, c]) for c in range(rgb.shape[2])]
+    return [HistogramStats.from_array(rgb[:, :, c], bit_depth) for c in range(rgb.shape[2])]
+
+
+def luminance_stats(rgb):
+    """
+    Statistics of Rec.601 luminance (0.299 R + 0.587 G + 0.114 B).
+
+    Integer input uses integer weights on row blocks, so no full-frame
+    luminance plane is ever allocated. Results are in source units.
+
+    Args:
+        rgb: (H, W, 3+) uint8/uint16 or float (0-1) array
+
+    Returns:
+        HistogramStats for the luminance plane
+    """
+    height, width = rgb.shape[:2]
+
+    if np.issubdtype(rgb.dtype, np.floating):
+        counts = np.zeros(FLOAT_BINS, dtype=np.int64)
+        top = np.float32(FLOAT_BINS - 1)
+        for start, stop in _row_blocks(height, width):
+            block = rgb[start:stop]
+            lum = 0.299 * block[:, :, 0] + 0.587 * block[:, :, 1] + 0.114 * block[:, :, 2]
+            lum *= top
+            np.clip(lum, 0, top, out=lum)
+            np.rint(lum, out=lum)
+            counts += np.bincount(lum.astype(np.intp).ravel(), minlength=FLOAT_BINS)
+        return HistogramStats(counts, value_scale=1.0 / (FLOAT_BINS - 1), full_scale=1.0)
+
+    if rgb.dtype not in (np.uint8, np.uint16):
+        raise TypeError(f"luminance_stats expects uint8, uint16 or float data, got {rgb.dtype}")
+
+    # 8-bit luminance is kept in 8.8-ish fixed point (x257 -> 0-65535) so the
+    # fractional part of the weighted sum is not lost to rounding
+    if rgb.dtype == np.uint8:
+        multiplier, value_scale, full_scale = 257, 1.0 / 257, 255
+    else:
+        multiplier, value_scale, full_scale = 1, 1.0, 65535
+
+    counts = np.zeros(FLOAT_BINS, dtype=np.int64)
+    wr, wg, wb = (w * multiplier for w in _LUM_WEIGHTS)
+    for start, stop in _row_blocks(height, width):
+        block = rgb[start:stop]
+        lum = block[:, :, 0].astype(np.uint32) * wr
+        lum += block[:, :, 1].astype(np.uint32) * wg
+        lum += block[:, :, 2].astype(np.uint32) * wb
+        lum += 500
+        lum //= 1000
+        counts += np.bincount(lum.ravel(), minlength=FLOAT_BINS)[:FLOAT_BINS]
+    return HistogramStats(counts, value_scale=value_scale, full_scale=full_scale)
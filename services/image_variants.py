@@ -0,0 +1,250 @@
+"""
+Pre-encoded image variants for the HTTP /latest endpoint
+
+The web server receives each processed frame once (the bytes already written
+to disk, plus the PIL image when the caller has it). A background encoder then
+produces the standard variants - full-size JPEG, reduced-size JPEG, WebP and a
+thumbnail - once per frame, so a request only picks bytes out of the cache.
+Variants that are not pre-encoded are encoded on first request and kept for
+the rest of the frame.
+
+Each variant carries a strong ETag from its own bytes. Publishing a frame
+whose bytes are unchanged keeps the existing variants.
+"""
+import io
+import hashlib
+import threading
+from collections import namedtuple
+
+from PIL import Image, features
+
+from .logger import app_logger
+
+
+REDUCED_WIDTH = 1280
+THUMBNAIL_WIDTH = 320
+
+# (width or None for full size, format) encoded in the background for every frame
+DEFAULT_PRESETS = (
+    (None, 'jpeg'),
+    (REDUCED_WIDTH, 'jpeg'),
+    (None, 'webp'),
+    (THUMBNAIL_WIDTH, 'jpeg'),
+)
+
+# ?fmt= value -> (PIL format, content type)
+FORMATS = {
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'webp': ('WEBP', 'image/webp'),
+    'png': ('PNG', 'image/png'),
+}
+FORMAT_ALIASES = {'jpg': 'jpeg'}
+
+EncodedVariant = namedtuple('EncodedVariant', 'data content_type etag')
+
+
+def make_etag(data):
+    """Strong ETag (quoted content hash) for response bytes"""
+    return f'"{hashlib.md5(data).hexdigest()}"'
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value matches etag"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    bare = etag.strip('"')
+    return any(candidate.strip() in (etag, bare) for candidate in if_none_match.split(','))
+
+
+def normalize_format(fmt):
+    """
+    Canonical format name for a ?fmt= value.
+
+    Returns:
+        'jpeg', 'webp', 'png', or None when unknown / not supported by this PIL build
+    """
+    fmt = FORMAT_ALIASES.get(fmt.lower(), fmt.lower())
+    if fmt not in FORMATS:
+        return None
+    if fmt == 'webp' and not features.check('webp'):
+        return None
+    return fmt
+
+
+class _Frame:
+    """One published frame and the variants encoded from it"""
+
+    def __init__(self, data, content_type, image=None):
+        self.primary = EncodedVariant(data, content_type, make_etag(data))
+        self.format = next((name for name, (_, ctype) in FORMATS.items() if ctype == content_type), None)
+        self._image = image
+        self.variants = {}
+        self.key_locks = {}
+        self.lock = threading.Lock()
+
+    @property
+    def image(self):
+        """Source image (decoded from the primary bytes if no PIL image was given; call with lock held)"""
+        if self._image is None:
+            with Image.open(io.BytesIO(self.primary.data)) as decoded:
+                self._image = decoded.copy()
+        return self._image
+
+
+class VariantCache:
+    """Latest frame plus its pre-encoded variants"""
+
+    def __init__(self, presets=DEFAULT_PRESETS, jpeg_quality=85, webp_quality=80, background=True):
+        """
+        Args:
+            presets: (width, format) variants encoded for every frame
+            jpeg_quality: JPEG quality for encoded variants
+            webp_quality: WebP quality for encoded variants
+            background: Encode presets on a background thread (False: only on request)
+        """
+        self.presets = tuple(preset for preset in presets if normalize_format(preset[1]))
+        self.widths = sorted({width for width, _ in self.presets if width})
+        self.jpeg_quality = jpeg_quality
+        self.webp_quality = webp_quality
+        self.encode_count = 0
+
+        self._frame = None
+        self._condition = threading.Condition()
+        self._pending = None
+        self._closed = False
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._encoder_loop, name="VariantEncoder", daemon=True)
+            self._thread.start()
+
+    def update(self, data, content_type, image=None):
+        """
+        Publish a new frame.
+
+        Args:
+            data: Encoded bytes of the frame (served as-is without query parameters)
+            content_type: MIME type of data
+            image: Optional PIL image of the same frame (saves decoding data again)
+
+        Returns:
+            True if the frame changed, False if the bytes were identical to the current frame
+        """
+        current = self._frame
+        if current is not None and current.primary.data == data:
+            return False
+
+        frame = _Frame(data, content_type, image)
+        with self._condition:
+            self._frame = frame
+            self._pending = frame
+            self._condition.notify()
+        return True
+
+    @property
+    def primary(self):
+        """EncodedVariant of the published bytes, or None"""
+        frame = self._frame
+        return frame.primary if frame else None
+
+    def resolve_width(self, width):
+        """
+        Preset width for a requested width (smallest preset that is at least as wide).
+
+        Returns:
+            Preset width, or None for full size
+        """
+        if not width:
+            return None
+        return next((preset for preset in self.widths if preset >= width), None)
+
+    def get(self, width=None, fmt=None):
+        """
+        Encoded variant of the current frame.
+
+        Args:
+            width: Requested width in pixels (rounded up to a preset width), or None
+            fmt: 'jpeg', 'webp' or 'png'; defaults to the published format
+                 (JPEG when only a width is given)
+
+        Returns:
+            EncodedVariant, or None if no frame has been published
+        """
+        frame = self._frame
+        if frame is None:
+            return None
+        if fmt is None:
+            fmt = 'jpeg' if width else (frame.format or 'jpeg')
+        return self._variant(frame, self.resolve_width(width), fmt)
+
+    def close(self):
+        """Stop the background encoder"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _variant(self, frame, width, fmt):
+        if width is None and fmt == frame.format:
+            return frame.primary
+
+        with frame.lock:
+            img = frame.image
+            if width is not None and width >= img.width:
+                width = None  # Never upscale
+                if fmt == frame.format:
+                    return frame.primary
+            key = (width, fmt)
+            variant = frame.variants.get(key)
+            if variant is not None:
+                return variant
+            key_lock = frame.key_locks.setdefault(key, threading.Lock())
+
+        # Per-variant lock: each variant is encoded once, without blocking the others
+        with key_lock:
+            variant = frame.variants.get(key)
+            if variant is None:
+                variant = self._encode(img, width, fmt)
+                frame.variants[key] = variant
+        return variant
+
+    def _encode(self, img, width, fmt):
+        if width is not None:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        pil_format, content_type = FORMATS[fmt]
+        if pil_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        options = {}
+        if pil_format == 'JPEG':
+            options['quality'] = self.jpeg_quality
+        elif pil_format == 'WEBP':
+            options['quality'] = self.webp_quality
+
+        buffer = io.BytesIO()
+        img.save(buffer, format=pil_format, **options)
+        data = buffer.getvalue()
+        self.encode_count += 1
+        return EncodedVariant(data, content_type, make_etag(data))
+
+    def _encoder_loop(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                frame, self._pending = self._pending, None
+
+            for width, fmt in self.presets:
+                if frame is not self._frame or self._closed:
+                    break  # Superseded by a newer frame
+                try:
+                    self._variant(frame, width, normalize_format(fmt))
+                except Exception as e:
+                    app_logger.error(f"Error encoding {fmt} variant (width={width}): {e}")
+                    break
@@ -0,0 +1,117 @@
+"""
+Fan-out of published frames to live stream clients (MJPEG and Server-Sent Events)
+
+Each connected client holds a Subscription with a single pending slot. The
+publisher only drops the newest item into every slot, so it never waits on a
+client; a client that is still writing the previous frame simply finds the
+newest one when it gets back, and the frames in between are skipped for it.
+"""
+import threading
+from collections import namedtuple
+
+
+# Published to subscribers on every image update. image is the LatestImage
+# snapshot; sse is the encoded Server-Sent Events message, built once and
+# written as-is to every /events client.
+LiveEvent = namedtuple('LiveEvent', 'seq image sse')
+
+
+class Subscription:
+    """One client's view of the broadcast: the newest item it has not consumed yet"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self.closed = False
+        self.delivered = 0
+        self.skipped = 0
+
+    def offer(self, item):
+        """Replace the pending item (never blocks)"""
+        with self._condition:
+            if self._item is not None:
+                self.skipped += 1
+            self._item = item
+            self._condition.notify()
+
+    def next(self, timeout=None):
+        """
+        Take the pending item, waiting up to timeout seconds for one.
+
+        Returns:
+            The newest item, or None on timeout / when closed
+        """
+        with self._condition:
+            if self._item is None and not self.closed:
+                self._condition.wait(timeout)
+            item, self._item = self._item, None
+            if item is not None:
+                self.delivered += 1
+            return item
+
+    def close(self):
+        """Wake the waiting client and make it stop"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class Broadcaster:
+    """Hands each published item to every subscriber without waiting for any of them"""
+
+    def __init__(self, max_subscribers=32):
+        """
+        Args:
+            max_subscribers: Concurrent subscribers allowed (each holds a server thread)
+        """
+        self.max_subscribers = max_subscribers
+        self.latest = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self, replay_latest=True):
+        """
+        Register a new subscriber.
+
+        Args:
+            replay_latest: Queue the most recent item so the client starts with it
+
+        Returns:
+            Subscription, or None when closed or at max_subscribers
+        """
+        subscription = Subscription()
+        with self._lock:
+            if self._closed or len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscription)
+            if replay_latest and self.latest is not None:
+                subscription.offer(self.latest)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+        subscription.close()
+
+    def publish(self, item):
+        """Offer item to every subscriber"""
+        with self._lock:
+            self.latest = item
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.offer(item)
+
+    def close(self):
+        """Disconnect all subscribers and refuse new ones"""
+        with self._lock:
+            self._closed = True
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscribers:
+            subscription.close()
@@ -0,0 +1,233 @@
+"""
+Concurrent multi-camera capture in one process (headless)
+
+Several cameras (e.g. an all-sky and a pier camera) share one process: one
+SDK initialization and camera enumeration, one capture thread per camera and
+a shared ProcessingPool that develops, overlays and saves frames round-robin
+across cameras. Fonts, overlay images and the ML service are process-wide, so
+they are loaded once for all cameras.
+
+Each camera gets its own namespace: settings from its camera profile
+(Config.get_camera_profile), images under <output_directory>/<id> and web
+endpoints under /cam/<id>/ (latest, status, stream, events).
+
+Config:
+    "multi_camera": {
+        "enabled": true,
+        "cameras": [{"name": "ZWO ASI676MC", "id": "allsky"},
+                    {"name": "ZWO ASI224MC", "id": "pier", "interval": 10}],
+        "processing_workers": 2
+    }
+"""
+import os
+import re
+import threading
+import time
+
+from .capture_pipeline import ProcessingPool
+from .headless_runner import HeadlessRunner
+from .processor import warm_overlay_caches
+
+
+def camera_slug(name):
+    """URL- and path-safe camera id from a camera name ('ZWO ASI676MC' -> 'zwo-asi676mc')"""
+    return re.sub(r'[^a-z0-9]+', '-', (name or '').lower()).strip('-') or 'camera'
+
+
+class CameraUnit:
+    """One camera of a multi-camera session and its output namespace"""
+
+    def __init__(self, camera_id, name, zwo_camera, output_dir, interval, streams=False):
+        """
+        Args:
+            camera_id: Namespace for output directory and web endpoints
+            name: Camera name as reported by the SDK
+            zwo_camera: Connected ZWOCamera
+            output_dir: Directory its images are saved to
+            interval: Seconds between exposure starts (the base interval when cadence is governed)
+            streams: Whether its frames feed the RTSP/HLS stream (one camera only)
+        """
+        self.id = camera_id
+        self.name = name
+        self.zwo_camera = zwo_camera
+        self.output_dir = output_dir
+        self.interval = interval
+        self.streams = streams
+        self.image_count = 0
+        self.source = None  # PoolSource (set when capture starts)
+        self.thread = None
+
+
+class MultiCameraRunner(HeadlessRunner):
+    """Headless runner capturing from every configured camera concurrently"""
+
+    def __init__(self, auto_stop: int = None, virtual_camera: str = None):
+        """
+        Args:
+            auto_stop: Stop after this many seconds (None = run forever)
+            virtual_camera: Frame directory for the simulated camera ('' = synthetic, None = real cameras)
+        """
+        super().__init__(auto_stop=auto_stop, virtual_camera=virtual_camera)
+        self.units = []
+        self.pool = None
+        self._count_lock = threading.Lock()
+
+    def _init_camera(self) -> bool:
+        """Initialize the SDK once and connect every configured camera"""
+        settings = self.config.get('multi_camera', {})
+        entries = settings.get('cameras', [])
+        if not entries:
+            self._log("ERROR: multi_camera.cameras is empty")
+            return False
+
+        try:
+            if not self._check_sdk():
+                return False
+
+            # One SDK initialization and enumeration for all cameras
+            first = self._build_camera(entries[0].get('name'), self.config.get_camera_profile(entries[0].get('name')))
+            if not first.initialize_sdk():
+                self._log("ERROR: Failed to initialize ZWO SDK")
+                return False
+            detected = first.detect_cameras()
+            if not detected:
+                self._log("ERROR: No cameras detected")
+                return False
+            self._log(f"Found {len(detected)} camera(s): {detected}")
+
+            used = set()
+            for position, entry in enumerate(entries):
+                index = self._resolve_index(entry, detected, used)
+                if index is None:
+                    self._log(f"⚠ Camera '{entry.get('name') or entry.get('id')}' not found, skipping")
+                    continue
+                name = entry.get('name') or detected[index]['name']
+                zwo_camera = first if position == 0 else self._build_camera(
+                    name, self.config.get_camera_profile(name))
+                zwo_camera.asi = first.asi  # Shared SDK
+                zwo_camera._connection.cameras = detected
+                if not zwo_camera.connect_camera(index):
+                    self._log(f"⚠ Failed to connect to camera {index} ({name}), skipping")
+                    continue
+                used.add(index)
+
+                camera_id = entry.get('id') or camera_slug(name)
+                interval = entry.get('interval', self.config.get('zwo_interval', 5.0))
+                zwo_camera.capture_interval = interval
+                if zwo_camera.cadence_governor is not None:
+                    zwo_camera.cadence_governor.set_base_interval(interval)
+                unit = CameraUnit(camera_id, zwo_camera.camera_name or name, zwo_camera,
+                                  os.path.join(self.config.get('output_directory'), camera_id),
+                                  interval, streams=not self.units)
+                self.units.append(unit)
+                if self.web_server:
+                    self.web_server.add_camera(camera_id)
+                self._log(f"✓ Connected camera '{camera_id}': {detected[index]['name']}")
+
+            if not self.units:
+                self._log("ERROR: No configured camera could be connected")
+                return False
+            self.zwo_camera = self.units[0].zwo_camera
+
+            # Fonts and overlay images are process-wide caches: load them once up front
+            warm_overlay_caches(self.config.get('overlays', []), {})
+            return True
+
+        except Exception as e:
+            self._log(f"ERROR initializing cameras: {e}")
+            import traceback
+            self._log(traceback.format_exc())
+            return False
+
+    @staticmethod
+    def _resolve_index(entry, detected, used):
+        """SDK index for a configured camera: explicit index, else first unused name match"""
+        if entry.get('index') is not None:
+            index = entry['index']
+            return index if index < len(detected) and index not in used else None
+        name = entry.get('name')
+        for camera in detected:
+            if camera['index'] not in used and (not name or name in camera['name']):
+                return camera['index']
+        return None
+
+    def _capture_loop(self):
+        """One capture thread per camera feeding the shared processing pool"""
+        workers = self.config.get('multi_camera', {}).get('processing_workers', 2)
+        self.pool = ProcessingPool(workers=workers, name="multi-camera-processing")
+        for unit in self.units:
+            unit.source = self.pool.add_source(
+                lambda raw, unit=unit: self._develop_and_save_unit(unit, raw),
+                maxsize=unit.zwo_camera.pipeline_queue_size,
+                timings=unit.zwo_camera.stage_timings,
+                name=unit.id)
+        self.pool.start()
+        self._log(f"Multi-camera capture: {len(self.units)} camera(s), "
+                  f"{self.pool.workers} shared processing worker(s)")
+
+        try:
+            for unit in self.units:
+                unit.thread = threading.Thread(target=self._camera_loop, args=(unit,),
+                                               name=f"capture-{unit.id}", daemon=True)
+                unit.thread.start()
+            while self.running and not self._shutdown_event.is_set():
+                self._shutdown_event.wait(1.0)
+        finally:
+            for unit in self.units:
+                if unit.thread is not None:
+                    unit.thread.join(timeout=unit.zwo_camera.exposure_seconds + 10)
+            self.pool.stop()
+            for unit in self.units:
+                self._log(f"Camera '{unit.id}': {unit.image_count} images "
+                          f"({unit.source.processed} processed, {unit.source.dropped} dropped while behind)")
+
+    def _camera_loop(self, unit):
+        """Expose and hand off frames for one camera at its own interval"""
+        zwo_camera = unit.zwo_camera
+        while self.running and not self._shutdown_event.is_set():
+            try:
+                if not zwo_camera.is_within_scheduled_window():
+                    self._wait_for_window(zwo_camera)
+                    continue
+
+                start_time = time.time()
+                unit.source.submit(zwo_camera.expose_frame())
+
+                # Start-to-start cadence (governed per camera when cadence is enabled)
+                wait_time = max(0, zwo_camera.next_capture_interval() - (time.time() - start_time))
+                if wait_time > 0:
+                    self._shutdown_event.wait(wait_time)
+
+            except Exception as e:
+                self._log(f"ERROR in capture loop for '{unit.id}': {e}")
+                import traceback
+                self._log(traceback.format_exc())
+                # Wait before retrying
+                self._shutdown_event.wait(5)
+
+    def _develop_and_save_unit(self, unit, raw):
+        """Processing stage for one camera's frame (runs on a pool worker)"""
+        started = time.perf_counter()
+        img, metadata = unit.zwo_camera.develop_frame(raw)
+        metadata['CAMERA_ID'] = unit.id
+        self._process_and_save(img, metadata, unit=unit, started=started)
+
+        with self._count_lock:
+            unit.image_count += 1
+            self.image_count += 1
+        self._log(f"[{unit.id}] Frame {unit.image_count}: {metadata.get('FILENAME', 'unknown')}")
+
+        # Run cleanup if enabled
+        self._run_cleanup()
+
+    def _cleanup(self):
+        """Disconnect every camera, then stop the shared outputs"""
+        for unit in self.units:
+            if unit.zwo_camera is self.zwo_camera:
+                continue  # Disconnected by the base class
+            try:
+                unit.zwo_camera.disconnect_camera()
+                self._log(f"Camera '{unit.id}' disconnected")
+            except Exception as e:
+                self._log(f"Error disconnecting camera '{unit.id}': {e}")
+        super()._cleanup()
@@ -0,0 +1,295 @@
+"""
+Overlay compositor
+
+Each text overlay is rendered into a small transparent RGBA tile covering just
+its text box (plus background box), and image overlays are resized/faded once
+into a prepared RGBA layer. Tiles are then alpha-composited into the region
+they cover on the RGB frame, so the full frame is never converted to RGBA and
+back.
+
+Overlays whose text contains no {TOKENS} are rendered once and kept; token
+text is re-rendered only when its substituted value changes (small LRU keyed
+by the final text). Fonts come from an LRU cache keyed by (family, size).
+"""
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from .processor import replace_tokens, calculate_position, parse_color, is_safe_path
+from .token_template import compile_template
+from .logger import app_logger
+
+
+DEFAULT_FONT_FAMILY = "arial.ttf"
+TEXT_BACKGROUND_PADDING = 5
+
+# Rendered text tile; (offset_x, offset_y) is the tile origin relative to the
+# draw position, (width, height) the text size used for anchoring
+TextLayer = namedtuple('TextLayer', 'tile offset_x offset_y width height')
+
+# Scratch surface for measuring text
+_MEASURE = ImageDraw.Draw(Image.new('L', (1, 1)))
+
+
+@lru_cache(maxsize=64)
+def load_font(family, size):
+    """
+    Font for (family, size), loaded once.
+
+    Falls back to the capitalized file name (case-sensitive file systems),
+    then to PIL's default font.
+    """
+    for name in dict.fromkeys((family, family[:1].upper() + family[1:])):
+        try:
+            return ImageFont.truetype(name, size)
+        except Exception:
+            continue
+    return ImageFont.load_default()
+
+
+def render_text_layer(text, font, color, background_color=None):
+    """
+    Render text (and optional background box) into a transparent tile.
+
+    Compositing the tile gives the same pixels as drawing the text directly
+    onto the frame: the tile's RGB is the text colour everywhere and its
+    alpha carries the glyph coverage.
+
+    Args:
+        text: Final text (tokens already substituted)
+        font: PIL font
+        color: RGB tuple for the text
+        background_color: RGB tuple for the background box, or None
+
+    Returns:
+        TextLayer
+    """
+    left, top, right, bottom = _MEASURE.textbbox((0, 0), text, font=font)
+    padding = TEXT_BACKGROUND_PADDING if background_color is not None else 0
+    size = (right - left + 2 * padding + 1, bottom - top + 2 * padding + 1)
+
+    tile = Image.new('RGBA', size, tuple(color) + (0,))
+    draw = ImageDraw.Draw(tile)
+    if background_color is not None:
+        draw.rectangle([0, 0, size[0] - 1, size[1] - 1], fill=background_color)
+    draw.text((padding - left, padding - top), text, fill=color, font=font)
+
+    return TextLayer(tile, left - padding, top - padding, right - left, bottom - top)
+
+
+def _base_image(img, in_place):
+    """RGB frame to composite onto (RGBA input is flattened onto white, as before)"""
+    if img.mode == 'RGB':
+        return img if in_place else img.copy()
+    if img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info):
+        rgba = img.convert('RGBA')
+        flattened = Image.new('RGB', img.size, (255, 255, 255))
+        flattened.paste(rgba, mask=rgba.getchannel('A'))
+        return flattened
+    return img.convert('RGB')
+
+
+class OverlayCompositor:
+    """Composites text and image overlays using cached layers"""
+
+    def __init__(self, max_dynamic_layers=64, max_static_layers=256):
+        """
+        Args:
+            max_dynamic_layers: Rendered token-text tiles kept (LRU)
+            max_static_layers: Static text / prepared image layers kept
+        """
+        self.max_dynamic_layers = max_dynamic_layers
+        self.max_static_layers = max_static_layers
+        self._static_layers = {}
+        self._dynamic_layers = OrderedDict()
+        self._image_layers = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Drop all cached layers (fonts stay cached)"""
+        with self._lock:
+            self._static_layers.clear()
+            self._dynamic_layers.clear()
+            self._image_layers.clear()
+
+    def composite(self, img, overlays, metadata, image_cache=None, weather_service=None, in_place=False):
+        """
+        Apply overlays in order.
+
+        Args:
+            img: PIL Image
+            overlays: List of overlay configurations
+            metadata: Metadata dictionary for token substitution
+            image_cache: Optional dict to cache loaded overlay images
+            weather_service: Optional WeatherService for dynamic weather icons
+            in_place: Draw onto img itself when it is already RGB (caller owns it)
+
+        Returns:
+            RGB PIL Image
+        """
+        img = _base_image(img, in_place)
+        for overlay in overlays:
+            if overlay.get('type', 'text') == 'image':
+                self._composite_image(img, overlay, image_cache, weather_service)
+            else:
+                self._composite_text(img, overlay, metadata)
+        return img
+
+    def _composite_text(self, img, overlay, metadata):
+        try:
+            raw_text = overlay.get('text', '')
+            font_size = overlay.get('font_size', 28)
+            color = parse_color(overlay.get('color', 'white'))
+            background_color = None
+            background = overlay.get('background_color', 'black')
+            if overlay.get('background_enabled', False) and background.lower() != 'transparent':
+                background_color = parse_color(background)
+            style = (font_size, color, background_color)
+
+            template = compile_template(raw_text)
+            if template.is_static:
+                layer = self._static_text_layer(raw_text, style)
+            else:
+                overrides = None
+                if 'DATETIME' in template.tokens:
+                    # Overlay-specific datetime format
+                    datetime_format = overlay.get('datetime_format', '%Y-%m-%d %H:%M:%S')
+                    overrides = {'DATETIME': datetime.now().strftime(datetime_format)}
+                layer = self._dynamic_text_layer(replace_tokens(raw_text, metadata, overrides), style)
+
+            x, y = calculate_position(img.size, (layer.width, layer.height),
+                                      overlay.get('anchor', 'Bottom-Left'),
+                                      overlay.get('offset_x', 10), overlay.get('offset_y', 10))
+            img.paste(layer.tile, (x + layer.offset_x, y + layer.offset_y), layer.tile)
+
+        except Exception as e:
+            app_logger.error(f"Error adding text overlay: {e}")
+
+    def _static_text_layer(self, text, style):
+        key = (text,) + style
+        with self._lock:
+            layer = self._static_layers.get(key)
+        if layer is None:
+            layer = self._render(text, style)
+            with self._lock:
+                if len(self._static_layers) >= self.max_static_layers:
+                    self._static_layers.clear()
+                self._static_layers[key] = layer
+        return layer
+
+    def _dynamic_text_layer(self, text, style):
+        key = (text,) + style
+        with self._lock:
+            layer = self._dynamic_layers.get(key)
+            if layer is not None:
+                self._dynamic_layers.move_to_end(key)
+                return layer
+        layer = self._render(text, style)
+        with self._lock:
+            self._dynamic_layers[key] = layer
+            while len(self._dynamic_layers) > self.max_dynamic_layers:
+                self._dynamic_layers.popitem(last=False)
+        return layer
+
+    @staticmethod
+    def _render(text, style):
+        font_size, color, background_color = style
+        return render_text_layer(text, load_font(DEFAULT_FONT_FAMILY, font_size), color, background_color)
+
+    def _composite_image(self, img, overlay, image_cache, weather_service):
+        try:
+            image_path = self._resolve_image_path(overlay, weather_service)
+            if image_path is None:
+                return
+
+            key = (image_path, os.path.getmtime(image_path), overlay.get('width'), overlay.get('height'),
+                   overlay.get('maintain_aspect', True), overlay.get('opacity', 100))
+            with self._lock:
+                layer = self._image_layers.get(key)
+            if layer is None:
+                layer = self._prepare_image_layer(image_path, overlay, image_cache)
+                with self._lock:
+                    if len(self._image_layers) >= self.max_static_layers:
+                        self._image_layers.clear()
+                    self._image_layers[key] = layer
+
+            x, y = calculate_position(img.size, layer.size, overlay.get('anchor', 'Bottom-Right'),
+                                      overlay.get('offset_x', 10), overlay.get('offset_y', 10))
+            img.paste(layer, (x, y), layer)
+
+        except Exception as e:
+            app_logger.error(f"Error adding image overlay: {e}")
+
+    @staticmethod
+    def _resolve_image_path(overlay, weather_service):
+        """Validated file path for an image overlay, or None to skip it"""
+        image_path = overlay.get('image_path', '')
+        if not image_path:
+            app_logger.warning(f"Image overlay has no image_path: {overlay}")
+            return None
+
+        # SEC-003: Validate path before loading (prevent directory traversal)
+        if not is_safe_path(image_path):
+            app_logger.warning(f"Blocked potentially unsafe image overlay path: {image_path}")
+            return None
+
+        # Handle dynamic weather icon
+        if image_path == 'WEATHER_ICON':
+            if not (weather_service and weather_service.is_configured()):
+                app_logger.debug("Weather service not configured for WEATHER_ICON")
+                return None
+            image_path = weather_service.get_weather_icon_path()
+            if not image_path or not os.path.exists(image_path):
+                app_logger.warning("Weather icon not available - path not returned or doesn't exist")
+                return None
+
+        if not os.path.exists(image_path):
+            app_logger.warning(f"Image overlay path does not exist: {image_path}")
+            return None
+        return image_path
+
+    @staticmethod
+    def _prepare_image_layer(image_path, overlay, image_cache):
+        """Load, resize and fade an overlay image into an RGBA layer"""
+        if image_cache is not None and image_path in image_cache:
+            overlay_img = image_cache[image_path].copy()
+        else:
+            app_logger.info(f"Loading image overlay from: {image_path}")
+            with Image.open(image_path) as source:
+                overlay_img = source.copy()
+            if image_cache is not None:
+                image_cache[image_path] = overlay_img.copy()
+
+        # Get size settings
+        target_width = overlay.get('width', overlay_img.width)
+        target_height = overlay.get('height', overlay_img.height)
+        maintain_aspect = overlay.get('maintain_aspect', True)
+
+        if maintain_aspect and (target_width != overlay_img.width or target_height != overlay_img.height):
+            # Calculate aspect-preserving size
+            aspect_ratio = overlay_img.width / overlay_img.height
+            if target_width / target_height > aspect_ratio:
+                target_width = int(target_height * aspect_ratio)  # Height is limiting factor
+            else:
+                target_height = int(target_width / aspect_ratio)  # Width is limiting factor
+
+        if target_width != overlay_img.width or target_height != overlay_img.height:
+            overlay_img = overlay_img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+
+        overlay_img = overlay_img.convert('RGBA')
+
+        # Apply opacity
+        opacity = overlay.get('opacity', 100)
+        if opacity < 100:
+            alpha = overlay_img.getchannel('A').point(lambda p: int(p * opacity / 100))
+            overlay_img.putalpha(alpha)
+
+        return overlay_img
+
+
+# Shared by add_overlays callers
+default_compositor = OverlayCompositor()
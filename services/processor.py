@@ -2,12 +2,13 @@
 Image processing and metadata parsing
 """
 import os
-import re
 import tempfile
 from datetime import datetime
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 from services.logger import app_logger
+from services.image_stats import HistogramStats, channel_stats, luminance_stats
+from services.token_template import compile_template
 
 
 def is_safe_path(path: str) -> bool:
@@ -151,34 +152,29 @@ def derive_metadata(metadata, image_filename, session_name):
     return derived
 
 
-def replace_tokens(text, metadata):
-    """
-    Replace tokens like {EXPOSURE}, {GAIN} with actual values.
-    """
-    # Create a copy of metadata with formatted values
-    formatted_metadata = metadata.copy()
-    
-    # Format exposure to 2 decimal places if it exists
-    if 'EXPOSURE' in formatted_metadata:
-        exp_str = str(formatted_metadata['EXPOSURE'])
+def format_token_value(token, value):
+    """Display formatting for an overlay token value (EXPOSURE to 2 decimal places)"""
+    if token == 'EXPOSURE':
+        exp_str = str(value)
         if exp_str.endswith('s'):
             try:
-                exp_value = float(exp_str[:-1])
-                formatted_metadata['EXPOSURE'] = f"{exp_value:.2f}s"
+                return f"{float(exp_str[:-1]):.2f}s"
             except ValueError:
                 pass
+        return exp_str
+    return str(value)
+
+
+def replace_tokens(text, metadata, overrides=None):
+    """
+    Replace tokens like {EXPOSURE}, {GAIN} with actual values.
     
-    result = text
-    
-    # Find all tokens in the format {TOKEN}
-    tokens = re.findall(r'\{([^}]+)\}', text)
-    
-    for token in tokens:
-        token_upper = token.upper()
-        value = formatted_metadata.get(token_upper, '?')
-        result = result.replace(f'{{{token}}}', str(value))
-    
-    return result
+    Args:
+        text: Overlay text (compiled once and cached)
+        metadata: Metadata dictionary
+        overrides: Optional values that take precedence over metadata
+    """
+    return compile_template(text).render(metadata, overrides=overrides, formatter=format_token_value)
 
 
 def get_text_bbox(draw, text, font):
@@ -243,7 +239,8 @@ def parse_color(color_str):
     return (255, 255, 255)
 
 
-def add_overlays(image_input, overlays, metadata, image_cache=None, weather_service=None):
+def add_overlays(image_input, overlays, metadata, image_cache=None, weather_service=None,
+                 in_place=False):
     """
     Add text and image overlays to an image.
     
@@ -253,9 +250,12 @@ def add_overlays(image_input, overlays, metadata, image_cache=None, weather_serv
         metadata: Metadata dictionary
         image_cache: Optional dict to cache loaded overlay images
         weather_service: Optional WeatherService instance for weather tokens
+        in_place: Draw directly onto an RGB image_input instead of a copy
     
-    Returns the modified PIL Image object.
+    Returns the modified PIL Image object (RGB).
     """
+    from services.overlay_compositor import default_compositor
+    
     try:
         # Merge weather data into metadata if weather service is available
         if weather_service and weather_service.is_configured():
@@ -269,37 +269,12 @@ def add_overlays(image_input, overlays, metadata, image_cache=None, weather_serv
         # Load image if it's a path, otherwise use the Image object directly
         if isinstance(image_input, str):
             img = Image.open(image_input)
+            in_place = True
         else:
             img = image_input
         
-        # Only convert palette mode - preserve RGB/RGBA
-        if img.mode in ('P',):  # Only convert palette mode
-            img = img.convert('RGB')
-        
-        # Ensure RGBA mode for drawing (to support image overlays with transparency)
-        if img.mode != 'RGBA':
-            img = img.convert('RGBA')
-        
-        draw = ImageDraw.Draw(img)
-        
-        for overlay in overlays:
-            overlay_type = overlay.get('type', 'text')
-            
-            if overlay_type == 'image':
-                # Handle image overlay with cache and weather service
-                img = add_image_overlay(img, overlay, image_cache, weather_service)
-            else:
-                # Handle text overlay
-                img = add_text_overlay(img, draw, overlay, metadata)
-        
-        # Convert back to RGB for final output
-        if img.mode == 'RGBA':
-            # Create RGB image with white background
-            rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-            rgb_img.paste(img, mask=img.split()[3] if img.mode == 'RGBA' else None)
-            img = rgb_img
-        
-        return img
+        return default_compositor.composite(img, overlays, metadata, image_cache=image_cache,
+                                            weather_service=weather_service, in_place=in_place)
     
     except Exception as e:
         error_msg = f"Error adding overlays: {e}"
@@ -307,194 +282,30 @@ def add_overlays(image_input, overlays, metadata, image_cache=None, weather_serv
         raise Exception(error_msg)
 
 
-def add_image_overlay(base_img, overlay, image_cache=None, weather_service=None):
+def warm_overlay_caches(overlays, image_cache):
     """
-    Add an image overlay to the base image
+    Preload the fonts and overlay images used by a set of overlays.
     
     Args:
-        base_img: Base PIL Image
-        overlay: Overlay configuration dict
-        image_cache: Optional dict to cache loaded images
-        weather_service: Optional WeatherService for dynamic weather icons
-        
-    Returns:
-        Modified PIL Image
-    """
-    try:
-        import os
-        
-        image_path = overlay.get('image_path', '')
-        if not image_path:
-            print(f"Image overlay has no image_path: {overlay}")
-            return base_img
-        
-        # SEC-003: Validate path before loading (prevent directory traversal)
-        if not is_safe_path(image_path):
-            app_logger.warning(f"Blocked potentially unsafe image overlay path: {image_path}")
-            return base_img
-        
-        # Handle dynamic weather icon
-        if image_path == 'WEATHER_ICON':
-            if weather_service and weather_service.is_configured():
-                actual_path = weather_service.get_weather_icon_path()
-                if actual_path and os.path.exists(actual_path):
-                    app_logger.debug(f"Resolved WEATHER_ICON to: {actual_path}")
-                    image_path = actual_path
-                else:
-                    app_logger.warning("Weather icon not available - path not returned or doesn't exist")
-                    return base_img
-            else:
-                app_logger.debug("Weather service not configured for WEATHER_ICON")
-                return base_img
-        
-        if not os.path.exists(image_path):
-            print(f"Image overlay path does not exist: {image_path}")
-            return base_img
-        
-        # Use cache if available
-        if image_cache is not None and image_path in image_cache:
-            overlay_img = image_cache[image_path].copy()
-        else:
-            print(f"Loading image overlay from: {image_path}")
-            # Load overlay image
-            overlay_img = Image.open(image_path)
-            print(f"Loaded image: {overlay_img.size}, mode: {overlay_img.mode}")
-            
-            # Cache the loaded image if cache is provided
-            if image_cache is not None:
-                image_cache[image_path] = overlay_img.copy()
-        
-        # Get size settings
-        target_width = overlay.get('width', overlay_img.width)
-        target_height = overlay.get('height', overlay_img.height)
-        maintain_aspect = overlay.get('maintain_aspect', True)
-        
-        # Resize if needed
-        if maintain_aspect and (target_width != overlay_img.width or target_height != overlay_img.height):
-            # Calculate aspect-preserving size
-            aspect_ratio = overlay_img.width / overlay_img.height
-            if target_width / target_height > aspect_ratio:
-                # Height is limiting factor
-                target_width = int(target_height * aspect_ratio)
-            else:
-                # Width is limiting factor
-                target_height = int(target_width / aspect_ratio)
-        
-        # Resize overlay image
-        if target_width != overlay_img.width or target_height != overlay_img.height:
-            overlay_img = overlay_img.resize((target_width, target_height), Image.Resampling.LANCZOS)
-        
-        # Apply opacity
-        opacity = overlay.get('opacity', 100)
-        if opacity < 100 and overlay_img.mode in ('RGBA', 'LA'):
-            # Adjust alpha channel
-            alpha = overlay_img.split()[3 if overlay_img.mode == 'RGBA' else 1]
-            alpha = alpha.point(lambda p: int(p * opacity / 100))
-            overlay_img.putalpha(alpha)
-        elif opacity < 100:
-            # Convert to RGBA and set opacity
-            overlay_img = overlay_img.convert('RGBA')
-            alpha = Image.new('L', overlay_img.size, int(255 * opacity / 100))
-            overlay_img.putalpha(alpha)
-        
-        # Ensure overlay has alpha channel
-        if overlay_img.mode != 'RGBA':
-            overlay_img = overlay_img.convert('RGBA')
-        
-        # Calculate position
-        anchor = overlay.get('anchor', 'Bottom-Right')
-        x_offset = overlay.get('offset_x', 10)
-        y_offset = overlay.get('offset_y', 10)
-        
-        x, y = calculate_position(base_img.size, (target_width, target_height), 
-                                 anchor, x_offset, y_offset)
-        
-        # Paste overlay onto base image
-        base_img.paste(overlay_img, (x, y), overlay_img)
-        
-        return base_img
-        
-    except Exception as e:
-        print(f"Error adding image overlay: {e}")
-        return base_img
-
-
-def add_text_overlay(img, draw, overlay, metadata):
+        overlays: List of overlay configurations
+        image_cache: Dict to fill with loaded overlay images (keyed by image path)
     """
-    Add a text overlay to the image
+    from services.overlay_compositor import load_font, DEFAULT_FONT_FAMILY
     
-    Args:
-        img: PIL Image
-        draw: ImageDraw object
-        overlay: Overlay configuration dict
-        metadata: Metadata dictionary
-        
-    Returns:
-        Modified PIL Image
-    """
-    try:
-        # Get datetime format from overlay config
-        datetime_format = overlay.get('datetime_format', '%Y-%m-%d %H:%M:%S')
-        
-        # Create overlay-specific metadata with custom datetime format
-        overlay_metadata = metadata.copy()
-        if '{DATETIME}' in overlay.get('text', '').upper():
-            overlay_metadata['DATETIME'] = datetime.now().strftime(datetime_format)
+    for overlay in overlays:
+        if overlay.get('type', 'text') != 'image':
+            load_font(DEFAULT_FONT_FAMILY, overlay.get('font_size', 28))
+            continue
         
-        # Replace tokens in overlay text
-        text = replace_tokens(overlay.get('text', ''), overlay_metadata)
-        
-        # Get overlay properties
-        font_size = overlay.get('font_size', 28)
-        color = parse_color(overlay.get('color', 'white'))
-        anchor = overlay.get('anchor', 'Bottom-Left')
-        x_offset = overlay.get('offset_x', 10)  # Match config key
-        y_offset = overlay.get('offset_y', 10)  # Match config key
-        background_enabled = overlay.get('background_enabled', False)
-        background_color = overlay.get('background_color', 'black')
-        
-        # Load font (use default if custom font loading fails)
+        image_path = overlay.get('image_path', '')
+        if (not image_path or image_path == 'WEATHER_ICON' or image_path in image_cache
+                or not is_safe_path(image_path) or not os.path.exists(image_path)):
+            continue
         try:
-            font = ImageFont.truetype("arial.ttf", font_size)
-        except:
-            try:
-                font = ImageFont.truetype("Arial.ttf", font_size)
-            except:
-                # Fall back to default font
-                font = ImageFont.load_default()
-        
-        # Calculate text bounding box for proper padding
-        # Get bbox relative to (0, 0) to find actual text dimensions including descenders
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        # Calculate position
-        x, y = calculate_position(img.size, (text_width, text_height), anchor, x_offset, y_offset)
-        
-        # Draw background box if enabled and not transparent
-        if background_enabled and background_color.lower() != 'transparent':
-            padding = 5
-            # Get bbox at actual drawing position for accurate background box
-            text_bbox = draw.textbbox((x, y), text, font=font)
-            box_coords = [
-                text_bbox[0] - padding,  # left
-                text_bbox[1] - padding,  # top
-                text_bbox[2] + padding,  # right
-                text_bbox[3] + padding   # bottom (includes descenders)
-            ]
-            # Parse background color (supports color names and hex)
-            bg_color = parse_color(background_color)
-            draw.rectangle(box_coords, fill=bg_color)
-        
-        # Draw text
-        draw.text((x, y), text, fill=color, font=font)
-        
-        return img
-        
-    except Exception as e:
-        print(f"Error adding text overlay: {e}")
-        return img
+            with Image.open(image_path) as overlay_img:
+                image_cache[image_path] = overlay_img.copy()
+        except Exception as e:
+            app_logger.warning(f"Could not preload image overlay {image_path}: {e}")
 
 
 def mtf_stretch(value, midtone):
@@ -563,6 +374,8 @@ def auto_stretch_image(img, config, raw_16bit=None):
                - saturation_boost: Post-stretch saturation multiplier
                - normalize_channels: Equalize channel medians before stretch (for dark scenes with color cast)
                - dark_scene_threshold: Median below this triggers dark scene mode (default 0.05)
+               - lut_stretch: Apply the curve as a lookup table on the integer source
+                 instead of float32 passes (default True)
         raw_16bit: Optional numpy array with 16-bit RGB data (H, W, 3) dtype=uint16.
                    When provided, stretching uses full 16-bit precision for better results.
     
@@ -573,13 +386,30 @@ def auto_stretch_image(img, config, raw_16bit=None):
         # Use 16-bit data if available for higher precision processing
         if raw_16bit is not None and raw_16bit.dtype == np.uint16:
             # 16-bit input: normalize to 0-1 range using full 16-bit range
-            img_array = raw_16bit.astype(np.float32) / 65535.0
+            source_array = raw_16bit
             bit_depth_str = "16-bit"
         else:
             # 8-bit input: convert from PIL Image
-            img_array = np.array(img).astype(np.float32) / 255.0
+            source_array = np.asarray(img)
             bit_depth_str = "8-bit"
         
+        # LUT mode works on the integer source directly; the float path needs a 0-1 copy
+        is_integer = source_array.dtype in (np.uint8, np.uint16)
+        use_lut = config.get('lut_stretch', True) and is_integer
+        img_array = None
+        if not is_integer:
+            img_array = source_array.astype(np.float32) / 255.0
+        
+        # Luminance statistics come from one histogram of the source data
+        # (integer when possible) instead of repeated full-frame sorts
+        stats_source = source_array if is_integer else img_array
+        if stats_source.ndim == 3 and stats_source.shape[2] >= 3:
+            lum_stats = luminance_stats(stats_source)
+        elif not is_integer:
+            lum_stats = HistogramStats.from_float(img_array)
+        else:
+            lum_stats = HistogramStats.from_array(stats_source)
+        
         # Get stretch parameters
         target_median = config.get('target_median', 0.25)
         linked_stretch = config.get('linked_stretch', True)
@@ -597,16 +427,7 @@ def auto_stretch_image(img, config, raw_16bit=None):
         
         # Check current image brightness - skip stretch if image is already bright
         # MTF stretch is designed for dark astro images, not daylight scenes
-        if len(img_array.shape) == 2:
-            current_brightness = np.median(img_array)
-        else:
-            # Use luminance for color images
-            if img_array.shape[2] >= 3:
-                current_brightness = np.median(
-                    0.299 * img_array[:,:,0] + 0.587 * img_array[:,:,1] + 0.114 * img_array[:,:,2]
-                )
-            else:
-                current_brightness = np.median(img_array)
+        current_brightness = lum_stats.normalized(lum_stats.median())
         
         # Skip stretch if image is already brighter than target (e.g., daylight capture)
         if current_brightness > target_median + 0.1:
@@ -619,8 +440,24 @@ def auto_stretch_image(img, config, raw_16bit=None):
         # For very dark images, color channel imbalance gets amplified by stretch.
         # This equalizes channel medians before stretching to prevent color casts.
         is_dark_scene = current_brightness < dark_scene_threshold
-        if normalize_channels and is_dark_scene and len(img_array.shape) == 3 and img_array.shape[2] >= 3:
+        normalize = normalize_channels and is_dark_scene and source_array.ndim == 3 and source_array.shape[2] >= 3
+        
+        if use_lut:
+            # LUT MODE: compile the curve into per-channel tables and apply them
+            # to the uint8/uint16 source (no float copy of the frame)
+            stretched_uint8 = _auto_stretch_lut(source_array, lum_stats, normalize, target_median,
+                                                linked_stretch, preserve_blacks, black_point,
+                                                shadow_aggressiveness)
+            if stretched_uint8 is None:
+                return img
+            return _finish_stretch(stretched_uint8, img.mode, saturation_boost)
+        
+        if img_array is None:
+            img_array = source_array.astype(np.float32) / (65535.0 if source_array.dtype == np.uint16 else 255.0)
+        
+        if normalize:
             img_array = _normalize_channel_medians(img_array)
+            lum_stats = None  # Channel gains changed the luminance distribution
         
         # Determine if image is grayscale or color
         if len(img_array.shape) == 2:
@@ -631,7 +468,8 @@ def auto_stretch_image(img, config, raw_16bit=None):
             # RGB image
             if linked_stretch:
                 stretched = _stretch_linked_rgb(img_array, target_median, 
-                                               preserve_blacks, black_point, shadow_aggressiveness)
+                                               preserve_blacks, black_point, shadow_aggressiveness,
+                                               lum_stats=lum_stats)
             else:
                 # Independent stretch per channel (WARNING: can cause color shifts)
                 stretched = np.zeros_like(img_array)
@@ -648,7 +486,8 @@ def auto_stretch_image(img, config, raw_16bit=None):
             
             if linked_stretch:
                 stretched_rgb = _stretch_linked_rgb(rgb, target_median,
-                                                   preserve_blacks, black_point, shadow_aggressiveness)
+                                                   preserve_blacks, black_point, shadow_aggressiveness,
+                                                   lum_stats=lum_stats)
             else:
                 stretched_rgb = np.zeros_like(rgb)
                 channel_names = ['R', 'G', 'B']
@@ -665,22 +504,68 @@ def auto_stretch_image(img, config, raw_16bit=None):
         
         # Convert back to uint8 and PIL Image
         stretched_uint8 = (stretched * 255.0).astype(np.uint8)
-        result_img = Image.fromarray(stretched_uint8, mode=img.mode)
-        
-        # Apply saturation boost to compensate for stretch color desaturation
-        if saturation_boost != 1.0 and result_img.mode in ('RGB', 'RGBA'):
-            from PIL import ImageEnhance
-            enhancer = ImageEnhance.Color(result_img)
-            result_img = enhancer.enhance(saturation_boost)
-            app_logger.debug(f"Auto-stretch saturation boost: {saturation_boost:.2f}")
-        
-        return result_img
+        return _finish_stretch(stretched_uint8, img.mode, saturation_boost)
         
     except Exception as e:
         app_logger.error(f"Auto-stretch error: {e}")
         return img
 
 
+def _finish_stretch(stretched_uint8, mode, saturation_boost):
+    """Wrap stretched uint8 data as a PIL Image and apply the saturation boost"""
+    result_img = Image.fromarray(stretched_uint8, mode=mode)
+    
+    # Apply saturation boost to compensate for stretch color desaturation
+    if saturation_boost != 1.0 and result_img.mode in ('RGB', 'RGBA'):
+        from PIL import ImageEnhance
+        enhancer = ImageEnhance.Color(result_img)
+        result_img = enhancer.enhance(saturation_boost)
+        app_logger.debug(f"Auto-stretch saturation boost: {saturation_boost:.2f}")
+    
+    return result_img
+
+
+def _auto_stretch_lut(source_array, lum_stats, normalize, target_median, linked_stretch,
+                      preserve_blacks, black_point, shadow_aggressiveness):
+    """
+    Stretch an integer source array through precomputed lookup tables.
+    
+    Args:
+        source_array: uint8/uint16 array (H, W) or (H, W, 3|4)
+        lum_stats: Luminance HistogramStats of source_array
+        normalize: Apply dark scene channel normalization gains first
+        (remaining args as in auto_stretch_image)
+    
+    Returns:
+        uint8 array, or None for unsupported layouts
+    """
+    from services.stretch_lut import lut_stretch_linked, lut_stretch_channel
+    
+    if source_array.ndim == 2:
+        return lut_stretch_channel(source_array, target_median, 'L',
+                                   preserve_blacks, black_point, shadow_aggressiveness)
+    if source_array.shape[2] not in (3, 4):
+        return None
+    
+    gains = (1.0, 1.0, 1.0)
+    if normalize:
+        gains = _channel_normalization_gains(channel_stats(source_array[:,:,:3]))
+    
+    if linked_stretch:
+        return lut_stretch_linked(source_array, target_median, preserve_blacks, black_point,
+                                  shadow_aggressiveness, lum_stats=lum_stats, gains=gains)
+    
+    # Independent stretch per channel (WARNING: can cause color shifts)
+    stretched = np.empty(source_array.shape, dtype=np.uint8)
+    for c, channel_name in enumerate(['R', 'G', 'B']):
+        stretched[:,:,c] = lut_stretch_channel(source_array[:,:,c], target_median, channel_name,
+                                               preserve_blacks, black_point, shadow_aggressiveness,
+                                               gain=gains[c])
+    if source_array.shape[2] == 4:
+        stretched[:,:,3] = source_array[:,:,3]
+    return stretched
+
+
 def _normalize_channel_medians(img_array):
     """
     Normalize RGB channel medians to remove color casts in dark scenes.
@@ -698,9 +583,27 @@ def _normalize_channel_medians(img_array):
     Returns:
         Normalized RGB array with balanced channel medians
     """
-    r_median = np.median(img_array[:,:,0])
-    g_median = np.median(img_array[:,:,1])
-    b_median = np.median(img_array[:,:,2])
+    gains = _channel_normalization_gains(channel_stats(img_array[:,:,:3]))
+    
+    result = img_array.copy()
+    for c, gain in enumerate(gains):
+        if gain != 1.0:
+            result[:,:,c] = np.clip(img_array[:,:,c] * gain, 0, 1)
+    
+    return result
+
+
+def _channel_normalization_gains(stats):
+    """
+    Per-channel gains that pull R/G/B medians toward their luminance-weighted median.
+    
+    Args:
+        stats: List of three HistogramStats (R, G, B) in any source units
+    
+    Returns:
+        Tuple of (r_gain, g_gain, b_gain); 1.0 for channels too dark to scale
+    """
+    r_median, g_median, b_median = (st.normalized(st.median()) for st in stats[:3])
     
     # Calculate luminance-weighted target (prevents over-correction)
     # This maintains natural color balance better than equalizing to single channel
@@ -712,34 +615,22 @@ def _normalize_channel_medians(img_array):
     app_logger.debug(f"Dark scene normalization: R={r_median:.4f}, G={g_median:.4f}, B={b_median:.4f}")
     app_logger.debug(f"  Luminance target: {target_median:.4f}")
     
-    result = img_array.copy()
-    
     # Apply gentle scaling (50% correction to avoid over-correction)
     # This removes most color cast while preserving some natural color
-    if r_median > min_median:
-        r_scale = target_median / r_median
-        # Blend 50% toward target (full correction can over-correct)
-        r_scale = 1.0 + 0.5 * (r_scale - 1.0)
-        result[:,:,0] = np.clip(img_array[:,:,0] * r_scale, 0, 1)
-        app_logger.debug(f"  R scaled by {r_scale:.3f}")
-    
-    if g_median > min_median:
-        g_scale = target_median / g_median
-        g_scale = 1.0 + 0.5 * (g_scale - 1.0)
-        result[:,:,1] = np.clip(img_array[:,:,1] * g_scale, 0, 1)
-        app_logger.debug(f"  G scaled by {g_scale:.3f}")
-    
-    if b_median > min_median:
-        b_scale = target_median / b_median
-        b_scale = 1.0 + 0.5 * (b_scale - 1.0)
-        result[:,:,2] = np.clip(img_array[:,:,2] * b_scale, 0, 1)
-        app_logger.debug(f"  B scaled by {b_scale:.3f}")
-    
-    return result
+    gains = []
+    for name, median in zip('RGB', (r_median, g_median, b_median)):
+        gain = 1.0
+        if median > min_median:
+            # Blend 50% toward target (full correction can over-correct)
+            gain = 1.0 + 0.5 * (target_median / median - 1.0)
+            app_logger.debug(f"  {name} scaled by {gain:.3f}")
+        gains.append(gain)
+    
+    return tuple(gains)
 
 
 def _stretch_linked_rgb(img_array, target_median, preserve_blacks=True, 
-                        black_point=0.0, shadow_aggressiveness=2.8):
+                        black_point=0.0, shadow_aggressiveness=2.8, lum_stats=None):
     """
     Stretch RGB image using linked luminance-based approach.
     
@@ -752,28 +643,22 @@ def _stretch_linked_rgb(img_array, target_median, preserve_blacks=True,
         preserve_blacks: If True, keep true blacks dark
         black_point: Manual black point - pixels below this stay black
         shadow_aggressiveness: MAD multiplier for shadow clipping
+        lum_stats: Optional precomputed luminance HistogramStats of img_array
+                   (any source units); built from img_array when omitted
     
     Returns:
         Stretched RGB array
     """
-    # Calculate luminance for linked processing
-    luminance = 0.299 * img_array[:,:,0] + 0.587 * img_array[:,:,1] + 0.114 * img_array[:,:,2]
+    if lum_stats is None:
+        lum_stats = luminance_stats(img_array)
     
     # Calculate shadow clip from luminance using MAD
-    median_lum = np.median(luminance)
-    mad_lum = np.median(np.abs(luminance - median_lum))
+    median_lum = lum_stats.normalized(lum_stats.median())
+    mad_lum = lum_stats.normalized(lum_stats.mad())
     mad_lum = max(mad_lum, 0.001)
     
-    # Calculate shadow clip point using aggressiveness parameter
-    # Higher aggressiveness = more clipping = lighter blacks
-    # Lower aggressiveness = less clipping = darker blacks preserved
-    shadow_clip = max(0.0, median_lum - shadow_aggressiveness * mad_lum)
-    
-    # Safety: don't clip more than 80% of the median value
-    shadow_clip = min(shadow_clip, median_lum * 0.8)
-    
-    # Apply manual black point if set (overrides calculated if higher)
-    effective_black_point = max(shadow_clip, black_point)
+    shadow_clip, effective_black_point = _shadow_clip_point(median_lum, mad_lum, black_point,
+                                                            shadow_aggressiveness)
     
     app_logger.debug(f"Auto-stretch (linked): lum_median={median_lum:.4f}, MAD={mad_lum:.4f}, "
                     f"shadow_clip={shadow_clip:.4f}, black_point={black_point:.4f}")
@@ -786,7 +671,10 @@ def _stretch_linked_rgb(img_array, target_median, preserve_blacks=True,
         # This keeps true blacks dark while still stretching midtones
         
         # Find the 1st percentile as true black reference
-        true_black = np.percentile(luminance, 1)
+        true_black = lum_stats.normalized(lum_stats.percentile(1))
+        
+        # Per-pixel luminance is only needed for the zone masks
+        luminance = 0.299 * img_array[:,:,0] + 0.587 * img_array[:,:,1] + 0.114 * img_array[:,:,2]
         
         # Calculate transition zone (pixels between true black and clip point)
         transition_start = true_black
@@ -840,8 +728,7 @@ def _stretch_linked_rgb(img_array, target_median, preserve_blacks=True,
             stretched[:,:,c] = channel
     
     # Calculate MTF from luminance after clipping
-    lum_clipped = 0.299 * stretched[:,:,0] + 0.587 * stretched[:,:,1] + 0.114 * stretched[:,:,2]
-    current_median = np.median(lum_clipped)
+    current_median = luminance_stats(stretched).median()
     
     # Skip MTF if already at target
     if abs(current_median - target_median) < 0.01:
@@ -881,20 +768,15 @@ def _stretch_channel(channel, target_median, channel_name='',
     channel = channel.copy()
     
     # Step 1: Calculate shadow clip using MAD (Median Absolute Deviation)
-    median = np.median(channel)
-    mad = np.median(np.abs(channel - median))
+    stats = HistogramStats.from_float(channel)
+    median = stats.median()
+    mad = stats.mad()
     
     # Ensure minimum MAD to prevent over-clipping uniform images
     mad = max(mad, 0.001)
     
-    # Calculate shadow clip point using aggressiveness parameter
-    shadow_clip = max(0.0, median - shadow_aggressiveness * mad)
-    
-    # Safety: don't clip more than 80% of the median value
-    shadow_clip = min(shadow_clip, median * 0.8)
-    
-    # Apply manual black point if set (overrides calculated if higher)
-    effective_black_point = max(shadow_clip, black_point)
+    shadow_clip, effective_black_point = _shadow_clip_point(median, mad, black_point,
+                                                            shadow_aggressiveness)
     
     if channel_name:
         app_logger.debug(f"Auto-stretch {channel_name}: median={median:.4f}, MAD={mad:.4f}, "
@@ -903,7 +785,7 @@ def _stretch_channel(channel, target_median, channel_name='',
     # Step 2: Apply shadow clipping with optional black preservation
     if preserve_blacks and effective_black_point > 0:
         # Find true black reference (1st percentile)
-        true_black = np.percentile(channel, 1)
+        true_black = stats.percentile(1)
         
         # Create smooth transition from true blacks to normal stretch
         is_black = channel <= true_black
@@ -932,7 +814,7 @@ def _stretch_channel(channel, target_median, channel_name='',
         channel = (channel - effective_black_point) / (1.0 - effective_black_point)
     
     # Step 3: Calculate current median after clipping
-    current_median = np.median(channel)
+    current_median = HistogramStats.from_float(channel).median()
     
     # Skip MTF if already at target or very dark
     if abs(current_median - target_median) < 0.01 or current_median < 0.0001:
@@ -947,6 +829,25 @@ def _stretch_channel(channel, target_median, channel_name='',
     return mtf_stretch(channel, midtone)
 
 
+def _shadow_clip_point(median, mad, black_point, shadow_aggressiveness):
+    """
+    Shadow clip from median and MAD, combined with the manual black point.
+    
+    Higher aggressiveness = more clipping = lighter blacks.
+    Lower aggressiveness = less clipping = darker blacks preserved.
+    
+    Returns:
+        Tuple of (shadow_clip, effective_black_point)
+    """
+    shadow_clip = max(0.0, median - shadow_aggressiveness * mad)
+    
+    # Safety: don't clip more than 80% of the median value
+    shadow_clip = min(shadow_clip, median * 0.8)
+    
+    # Apply manual black point if set (overrides calculated if higher)
+    return shadow_clip, max(shadow_clip, black_point)
+
+
 def _calculate_mtf_midtone(current_median, target_median):
     """
     Calculate the MTF midtone parameter to map current_median to target_median.
@@ -988,21 +889,21 @@ def build_output_filename(pattern, metadata, output_format='PNG'):
     Build output filename from pattern and metadata.
     Supports tokens: {filename}, {session}, {timestamp}
     """
-    result = pattern
+    template = compile_template(pattern, case_sensitive=True)
+    values = {}
     
-    # Replace filename token (without extension)
-    if '{filename}' in result:
-        filename_no_ext = os.path.splitext(metadata.get('FILENAME', 'image'))[0]
-        result = result.replace('{filename}', filename_no_ext)
+    # Filename token (without extension)
+    if 'filename' in template.tokens:
+        values['filename'] = os.path.splitext(metadata.get('FILENAME', 'image'))[0]
     
-    # Replace session token
-    if '{session}' in result:
-        result = result.replace('{session}', metadata.get('SESSION', 'unknown'))
+    if 'session' in template.tokens:
+        values['session'] = metadata.get('SESSION', 'unknown')
     
-    # Replace timestamp token
-    if '{timestamp}' in result:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        result = result.replace('{timestamp}', timestamp)
+    if 'timestamp' in template.tokens:
+        values['timestamp'] = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    # Unknown tokens are left as written
+    result = template.render(values, default=None)
     
     # Determine extension from format
     ext_map = {
@@ -1021,7 +922,7 @@ def build_output_filename(pattern, metadata, output_format='PNG'):
     return result
 
 
-def process_image(image_path, config, metadata_dict=None):
+def process_image(image_path, config, metadata_dict=None, image_cache=None):
     """
     Main processing function:
     1. Parse sidecar file OR use provided metadata
@@ -1032,6 +933,7 @@ def process_image(image_path, config, metadata_dict=None):
         image_path: Path to image file OR PIL Image object
         config: Config object
         metadata_dict: Optional pre-built metadata dictionary (for camera capture)
+        image_cache: Optional dict to cache loaded overlay images
     
     Returns: (success: bool, output_path: str, error: str)
     """
@@ -1101,10 +1003,10 @@ def process_image(image_path, config, metadata_dict=None):
             raw_img = auto_stretch_image(raw_img, auto_stretch_config)
             
             # Add overlays to stretched image
-            processed_img = add_overlays(raw_img, overlays_to_apply, metadata)
+            processed_img = add_overlays(raw_img, overlays_to_apply, metadata, image_cache, in_place=True)
         else:
             # Add overlays to image (no stretch)
-            processed_img = add_overlays(image_path, overlays_to_apply, metadata)
+            processed_img = add_overlays(image_path, overlays_to_apply, metadata, image_cache)
         
         # Apply auto brightness if enabled (for saved images)
         if config.get('auto_brightness', False):
@@ -0,0 +1,225 @@
+"""
+Processing-budget governor: shed optional work when frames can't keep up
+
+When processing a frame takes longer than the capture interval, frames pile
+up in the processing queue. QoSGovernor compares the time each frame spends
+in processing (a moving average) with a budget, a fraction of the capture
+interval. While over budget it sheds optional work one step at a time in a
+configured order. Once there is clear headroom it restores the steps in
+reverse order:
+
+- ml: run the ML models on alternate frames (the last predictions are reused)
+- stretch: 8-bit LUT stretch instead of the 16-bit source
+- dev_mode: skip dev-mode raw/statistics saves
+- encode: fast encode (no optimize pass, PNG compress level 1)
+
+Per-stage latencies go to a StageTimings (the camera's, so processing
+stages show next to expose/readout) and name the bottleneck. Every
+shed/restore is logged with the frame time, budget and bottleneck stage, and
+counted in stats() (metadata 'QOS', web /status).
+
+Config:
+    "qos": {
+        "enabled": false,
+        "budget": 0.8,           # Processing budget as a fraction of the capture interval
+        "restore_below": 0.5,    # Restore a step when under this fraction of the budget
+        "degrade_frames": 2,     # Consecutive frames over budget before shedding a step
+        "restore_frames": 5,     # Consecutive frames with headroom before restoring one
+        "shed_order": ["ml", "stretch", "dev_mode", "encode"]
+    }
+"""
+import threading
+import time
+from collections import deque
+
+from .capture_pipeline import StageTimings
+from .logger import app_logger
+
+
+ACTIONS = {
+    'ml': "ML on alternate frames",
+    'stretch': "8-bit LUT stretch",
+    'dev_mode': "dev-mode saves skipped",
+    'encode': "fast encode",
+}
+SHED_ORDER = ('ml', 'stretch', 'dev_mode', 'encode')
+
+# Decisions kept for stats()
+DECISION_HISTORY = 10
+# Stages that are not frame processing, left out of the bottleneck
+NON_PROCESSING_STAGES = ('processing', 'expose', 'readout', 'queue_wait')
+
+
+class QoSGovernor:
+    """Sheds optional processing steps while frames take longer than the budget"""
+
+    def __init__(self, budget=0.8, restore_below=0.5, degrade_frames=2, restore_frames=5,
+                 shed_order=SHED_ORDER, smoothing=0.3, timings=None, log=None):
+        """
+        Args:
+            budget: Processing budget as a fraction of the capture interval
+            restore_below: Restore a step when the average is under this fraction of the budget
+            degrade_frames: Consecutive frames over budget before shedding a step
+            restore_frames: Consecutive frames with headroom before restoring a step
+            shed_order: Actions (keys of ACTIONS) in the order they are shed
+            smoothing: Weight of the newest frame in the moving average (0-1)
+            timings: StageTimings for per-stage latency (default: a new one)
+            log: Optional callable(message) for decisions
+        """
+        unknown = [action for action in shed_order if action not in ACTIONS]
+        if unknown:
+            app_logger.warning(f"QoS: ignoring unknown shed_order entries {unknown}")
+        self.shed_order = [action for action in shed_order if action in ACTIONS]
+        self.budget = budget
+        self.restore_below = restore_below
+        self.degrade_frames = max(1, int(degrade_frames))
+        self.restore_frames = max(1, int(restore_frames))
+        self.smoothing = smoothing
+        self.log = log or (lambda message: None)
+        self.timings = timings if timings is not None else StageTimings()
+
+        self.level = 0  # Number of shed steps (prefix of shed_order)
+        self.frames = 0
+        self.average = None  # Moving average of frame processing time (seconds)
+        self.sheds = 0
+        self.restores = 0
+        self.skipped = {action: 0 for action in ACTIONS}
+        self.decisions = deque(maxlen=DECISION_HISTORY)
+        self._over = 0
+        self._headroom = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, settings, timings=None, log=None, supported=None):
+        """
+        Governor from the 'qos' config section
+        
+        Args:
+            settings: 'qos' config section
+            timings: Optional StageTimings
+            log: Optional callable(message) for decisions
+            supported: Actions the caller implements (default: all); the
+                       others are left out of the shed order
+        """
+        shed_order = settings.get('shed_order', SHED_ORDER)
+        if supported is not None:
+            shed_order = [action for action in shed_order if action in supported]
+        return cls(budget=settings.get('budget', 0.8),
+                   restore_below=settings.get('restore_below', 0.5),
+                   degrade_frames=settings.get('degrade_frames', 2),
+                   restore_frames=settings.get('restore_frames', 5),
+                   shed_order=shed_order,
+                   timings=timings,
+                   log=log)
+
+    def degraded(self, action):
+        """True while an action is shed"""
+        return action in self.shed_order[:self.level]
+
+    def skip(self, action):
+        """
+        True if this frame should leave out an optional step.
+
+        ml is skipped on alternate frames while shed; other steps are skipped
+        for as long as they are shed. Skips are counted in stats().
+        """
+        if not self.degraded(action):
+            return False
+        if action == 'ml' and self.frames % 2 == 0:
+            return False
+        self.skipped[action] += 1
+        return True
+
+    def save_options(self, output_format, **options):
+        """
+        PIL save() keyword arguments, overridden for a fast encode while shed.
+
+        Args:
+            output_format: 'PNG' or 'JPEG' (case-insensitive)
+            **options: Full-quality options (e.g. quality, optimize)
+        """
+        if self.degraded('encode'):
+            options['optimize'] = False
+            if output_format.upper() == 'PNG':
+                options['compress_level'] = 1
+        return options
+
+    def measure(self, stage):
+        """Context manager recording a stage's latency"""
+        return self.timings.measure(stage)
+
+    def frame_done(self, seconds, interval, backlog=0):
+        """
+        Account one processed frame and shed or restore a step if needed.
+
+        Args:
+            seconds: Processing time of the frame
+            interval: Current capture interval (seconds)
+            backlog: Frames still waiting in the processing queue
+
+        Returns:
+            The decision dict when a step was shed or restored, else None
+        """
+        with self._lock:
+            self.frames += 1
+            self.timings.record('processing', seconds)
+            if self.average is None:
+                self.average = seconds
+            else:
+                self.average += self.smoothing * (seconds - self.average)
+            budget = self.budget * interval
+
+            # A growing queue means over budget even if the average has not caught up yet
+            if self.average > budget or backlog > 1:
+                self._over += 1
+                self._headroom = 0
+                if self._over >= self.degrade_frames and self.level < len(self.shed_order):
+                    return self._decide('shed', self.shed_order[self.level], budget, backlog, +1)
+            elif self.average < budget * self.restore_below and backlog == 0:
+                self._headroom += 1
+                self._over = 0
+                if self._headroom >= self.restore_frames and self.level > 0:
+                    return self._decide('restore', self.shed_order[self.level - 1], budget, backlog, -1)
+            else:
+                self._over = self._headroom = 0
+            return None
+
+    def _decide(self, direction, action, budget, backlog, step):
+        self.level += step
+        self._over = self._headroom = 0
+        if direction == 'shed':
+            self.sheds += 1
+        else:
+            self.restores += 1
+        stages = [name for name in self.timings.snapshot() if name not in NON_PROCESSING_STAGES]
+        stage, stage_seconds = self.timings.bottleneck(stages)
+        decision = {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'decision': direction,
+            'action': action,
+            'level': self.level,
+            'frame_ms': round(self.average * 1000.0, 1),
+            'budget_ms': round(budget * 1000.0, 1),
+            'backlog': backlog,
+            'bottleneck': stage,
+            'bottleneck_ms': round(stage_seconds * 1000.0, 1),
+        }
+        self.decisions.append(decision)
+        verb = "shedding" if direction == 'shed' else "restoring"
+        self.log(f"QoS: {verb} {action} ({ACTIONS[action]}) - frame {self.average:.2f}s vs budget "
+                 f"{budget:.2f}s, backlog {backlog}, bottleneck {stage} {stage_seconds:.2f}s, level {self.level}")
+        return decision
+
+    def stats(self):
+        """JSON-safe state, counters and recent decisions (metadata 'QOS', web /status)"""
+        with self._lock:
+            return {
+                'level': self.level,
+                'shed': self.shed_order[:self.level],
+                'frames': self.frames,
+                'frame_ms': round((self.average or 0.0) * 1000.0, 1),
+                'sheds': self.sheds,
+                'restores': self.restores,
+                'skipped': dict(self.skipped),
+                'decisions': list(self.decisions),
+            }
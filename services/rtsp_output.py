@@ -1,21 +1,64 @@
 """
 RTSP streaming server using ffmpeg as a bridge.
 Receives frames via stdin pipe and streams via RTSP for viewers like VLC or NINA.
+
+Frames are letterboxed to a fixed stream resolution, so the encoder never has
+to restart when the camera resolution, binning or ROI changes. A frame is
+scaled and written to the encoder once when it arrives; between frames only
+the last frame is repeated every keyframe interval (so new viewers can start
+decoding), instead of re-sending the full-resolution buffer at the stream fps.
+
+The same encoder can also feed HLS: ffmpeg tees the encoded stream to its
+stdout as MPEG-TS, which is segmented into an in-memory HLSSegmentRing.
 """
 
-import os
 import subprocess
 import threading
 import time
-import numpy as np
 from PIL import Image
 from .logger import app_logger
+from .hls_output import TSSegmenter
+
+
+DEFAULT_STREAM_SIZE = (1280, 720)
+KEYFRAME_INTERVAL_SEC = 2.0
+
+
+def fit_to_stream(img, size):
+    """
+    Scale an image into the fixed stream size, preserving aspect ratio (black bars).
+    
+    Args:
+        img: PIL Image or path to an image file
+        size: (width, height) of the stream
+    
+    Returns:
+        RGB PIL Image of exactly size
+    """
+    if isinstance(img, str):
+        with Image.open(img) as source:
+            img = source.convert('RGB')
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    if img.size == size:
+        return img
+    
+    scale = min(size[0] / img.width, size[1] / img.height)
+    scaled = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    resized = img.resize(scaled, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    if scaled == size:
+        return resized
+    canvas = Image.new('RGB', size)
+    canvas.paste(resized, ((size[0] - scaled[0]) // 2, (size[1] - scaled[1]) // 2))
+    return canvas
 
 
 class RTSPStreamServer:
     """Manages RTSP streaming via ffmpeg subprocess."""
     
-    def __init__(self, host='0.0.0.0', port=8554, stream_name='asiwatchdog', fps=1.0):
+    def __init__(self, host='0.0.0.0', port=8554, stream_name='asiwatchdog', fps=1.0,
+                 width=DEFAULT_STREAM_SIZE[0], height=DEFAULT_STREAM_SIZE[1],
+                 keyframe_interval=KEYFRAME_INTERVAL_SEC, rtsp=True, hls=None):
         """
         Initialize RTSP server.
         
@@ -23,18 +66,35 @@ class RTSPStreamServer:
             host: Interface to bind to (0.0.0.0 for all interfaces)
             port: RTSP port to listen on
             stream_name: Stream name in URL (rtsp://host:port/stream_name)
-            fps: Frames per second for the stream
+            fps: Maximum rate at which new frames are forwarded to the encoder
+            width: Stream width (frames are letterboxed to width x height)
+            height: Stream height
+            keyframe_interval: Seconds between repeats of the last frame when no new frame arrives
+            rtsp: Publish the RTSP stream (False for HLS only)
+            hls: Optional HLSSegmentRing to fill with segments of the same encode
         """
         self.host = host
         self.port = port
         self.stream_name = stream_name
         self.fps = fps
+        self.frame_size = (max(2, int(width) & ~1), max(2, int(height) & ~1))  # yuv420p needs even sizes
+        self.keyframe_interval = keyframe_interval
+        self.rtsp = rtsp
+        self.hls = hls
+        self.hls_thread = None
         self.process = None
         self.running = False
-        self.last_frame = None
-        self.frame_size = None  # (width, height)
+        self.last_frame = None  # Last frame written, as RGB bytes at frame_size
         self.frame_thread = None
-        self.frame_lock = threading.Lock()
+        self.frame_lock = threading.Condition()
+        self._pending = None  # Newest image not yet written
+        
+        # Pipe/CPU accounting (see stats())
+        self.frames_received = 0
+        self.frames_encoded = 0
+        self.frames_repeated = 0
+        self.bytes_written = 0
+        self.prepare_seconds = 0.0
     
     def start(self):
         """Start the RTSP server via ffmpeg."""
@@ -50,20 +110,8 @@ class RTSPStreamServer:
                 app_logger.info("After installing, add ffmpeg.exe to your system PATH and restart the app.")
                 return False
             
-            # Start with a placeholder frame size (will be updated on first frame)
-            self.frame_size = (1920, 1080)
-            
-            # Build ffmpeg command
-            cmd = self._build_ffmpeg_command()
-            
-            # Start ffmpeg process
-            self.process = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                bufsize=10**8
-            )
+            # Start ffmpeg process (fixed stream size: never restarted for new frame sizes)
+            self.process = self._spawn_encoder()
             
             self.running = True
             
@@ -71,12 +119,19 @@ class RTSPStreamServer:
             self.frame_thread = threading.Thread(target=self._frame_sender_loop, daemon=True)
             self.frame_thread.start()
             
-            rtsp_url = self.get_url()
-            app_logger.info(f"RTSP server started: {rtsp_url}")
-            app_logger.info(f"  - Stream at {self.fps} FPS")
-            app_logger.info(f"  - Connect with VLC, NINA, or other RTSP client")
-            return True
+            # Start HLS segment reader
+            if self.hls is not None:
+                self.hls_thread = threading.Thread(target=self._hls_reader_loop, daemon=True)
+                self.hls_thread.start()
             
+            if self.rtsp:
+                app_logger.info(f"RTSP server started: {self.get_url()}")
+                app_logger.info(f"  - Connect with VLC, NINA, or other RTSP client")
+            if self.hls is not None:
+                app_logger.info("HLS segments fed from the stream encoder")
+            app_logger.info(f"  - Stream at {self.frame_size[0]}x{self.frame_size[1]}, up to {self.fps} FPS")
+            return True
+        
         except FileNotFoundError:
             app_logger.error("ffmpeg executable not found in PATH")
             return False
@@ -96,58 +151,116 @@ class RTSPStreamServer:
         except:
             return False
     
+    def _spawn_encoder(self):
+        """Start the ffmpeg encoder process."""
+        # stderr is discarded (an unread pipe would eventually block ffmpeg);
+        # stdout carries MPEG-TS for HLS when enabled
+        return subprocess.Popen(
+            self._build_ffmpeg_command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE if self.hls is not None else subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    
     def _build_ffmpeg_command(self):
         """Build the ffmpeg command for RTSP streaming."""
         width, height = self.frame_size
         
         # ffmpeg command:
-        # - Read raw BGR24 frames from stdin
-        # - Encode to H.264
-        # - Stream via RTSP
+        # - Read raw RGB24 frames from stdin, timestamped on arrival (frames
+        #   are only written when they change, so the input rate is variable)
+        # - Encode to H.264, with a keyframe at least every keyframe_interval
+        #   (also where HLS segments are cut)
+        # - Stream via RTSP and/or MPEG-TS on stdout for HLS (one encode for both)
         cmd = [
             'ffmpeg',
+            '-loglevel', 'error',
             '-f', 'rawvideo',
-            '-pixel_format', 'bgr24',
+            '-pixel_format', 'rgb24',
             '-video_size', f'{width}x{height}',
-            '-framerate', str(self.fps),
+            '-use_wallclock_as_timestamps', '1',
             '-i', 'pipe:0',  # Read from stdin
             '-c:v', 'libx264',
             '-preset', 'ultrafast',
             '-tune', 'zerolatency',
             '-pix_fmt', 'yuv420p',
-            '-g', '30',  # GOP size
-            '-f', 'rtsp',
-            f'rtsp://{self.host}:{self.port}/{self.stream_name}'
+            '-fps_mode', 'vfr',
+            '-force_key_frames', f'expr:gte(t,n_forced*{self.keyframe_interval})',
         ]
         
+        rtsp_url = f'rtsp://{self.host}:{self.port}/{self.stream_name}'
+        if self.rtsp and self.hls is not None:
+            cmd += ['-map', '0:v', '-f', 'tee',
+                    f'[f=rtsp:onfail=ignore]{rtsp_url}|[f=mpegts:onfail=ignore]pipe:1']
+        elif self.hls is not None:
+            cmd += ['-f', 'mpegts', 'pipe:1']
+        else:
+            cmd += ['-f', 'rtsp', rtsp_url]
+        
         return cmd
     
     def _frame_sender_loop(self):
-        """Background thread that sends frames to ffmpeg at regular intervals."""
-        frame_interval = 1.0 / self.fps
+        """Background thread that scales new frames once and writes them to ffmpeg."""
+        min_interval = 1.0 / self.fps if self.fps and self.fps > 0 else 0.0
+        last_write = 0.0
         
         try:
             while self.running and self.process and self.process.poll() is None:
-                if self.last_frame is not None:
-                    try:
-                        with self.frame_lock:
-                            frame_bytes = self.last_frame
-                        
-                        self.process.stdin.write(frame_bytes)
-                        self.process.stdin.flush()
-                        app_logger.debug(f"Sent frame to RTSP ({len(frame_bytes)} bytes)")
-                    except BrokenPipeError:
-                        app_logger.error("RTSP ffmpeg pipe broken")
-                        break
-                    except Exception as e:
-                        app_logger.error(f"Error sending frame to RTSP: {e}")
+                with self.frame_lock:
+                    now = time.monotonic()
+                    repeat_due = last_write + self.keyframe_interval
+                    if self._pending is not None:
+                        wait = last_write + min_interval - now  # Forward new frames at most at fps
+                    else:
+                        wait = repeat_due - now if self.last_frame is not None else None
+                    if wait is None or wait > 0:
+                        self.frame_lock.wait(wait)
+                        continue
+                    image, self._pending = self._pending, None
                 
-                time.sleep(frame_interval)
+                if image is not None:
+                    start = time.perf_counter()
+                    frame_bytes = fit_to_stream(image, self.frame_size).tobytes()
+                    self.prepare_seconds += time.perf_counter() - start
+                    self.last_frame = frame_bytes
+                    self.frames_encoded += 1
+                else:
+                    # No new frame: repeat the last one so new viewers get a keyframe
+                    frame_bytes = self.last_frame
+                    self.frames_repeated += 1
+                
+                try:
+                    self.process.stdin.write(frame_bytes)
+                    self.process.stdin.flush()
+                    self.bytes_written += len(frame_bytes)
+                    last_write = time.monotonic()
+                    app_logger.debug(f"Sent frame to RTSP ({len(frame_bytes)} bytes)")
+                except (BrokenPipeError, ValueError):
+                    app_logger.error("RTSP ffmpeg pipe broken")
+                    break
+                except Exception as e:
+                    app_logger.error(f"Error sending frame to RTSP: {e}")
         except Exception as e:
             app_logger.error(f"RTSP frame sender error: {e}")
         finally:
             app_logger.debug("RTSP frame sender thread stopped")
     
+    def _hls_reader_loop(self):
+        """Background thread that cuts the encoder's MPEG-TS output into HLS segments."""
+        segmenter = TSSegmenter(self.hls.add_segment, default_duration=self.keyframe_interval)
+        stdout = self.process.stdout
+        try:
+            while self.running:
+                chunk = stdout.read1(65536) if hasattr(stdout, 'read1') else stdout.read(65536)
+                if not chunk:
+                    break
+                segmenter.feed(chunk)
+        except Exception as e:
+            if self.running:
+                app_logger.error(f"HLS segment reader error: {e}")
+        finally:
+            app_logger.debug("HLS segment reader thread stopped")
+    
     def stop(self):
         """Stop the RTSP server."""
         if not self.running:
@@ -155,7 +268,9 @@ class RTSPStreamServer:
         
         try:
             app_logger.info("Stopping RTSP server...")
-            self.running = False
+            with self.frame_lock:
+                self.running = False
+                self.frame_lock.notify_all()
             
             # Wait for frame thread
             if self.frame_thread:
@@ -174,6 +289,9 @@ class RTSPStreamServer:
                     self.process.kill()
                     self.process.wait()
             
+            if self.hls_thread:
+                self.hls_thread.join(timeout=2.0)
+            
             app_logger.info("RTSP server stopped")
         except Exception as e:
             app_logger.error(f"Error stopping RTSP server: {e}")
@@ -182,6 +300,9 @@ class RTSPStreamServer:
         """
         Update the stream with a new frame.
         
+        Returns immediately: scaling and writing happen on the sender thread,
+        and a frame replaced before it was sent is skipped.
+        
         Args:
             image_input: PIL Image object or path to image file
             metadata: Optional dict with image metadata (unused for RTSP)
@@ -189,62 +310,30 @@ class RTSPStreamServer:
         if not self.running:
             return
         
-        try:
-            # Load image if path provided
-            if isinstance(image_input, str):
-                img = Image.open(image_input)
-            else:
-                img = image_input
-            
-            # Convert to RGB if needed
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Check if frame size changed (restart ffmpeg if needed)
-            new_size = (img.width, img.height)
-            if new_size != self.frame_size:
-                app_logger.info(f"RTSP frame size changed: {self.frame_size} -> {new_size}")
-                self.frame_size = new_size
-                self._restart_ffmpeg()
-            
-            # Convert PIL Image to numpy array (RGB -> BGR for ffmpeg)
-            img_np = np.array(img)
-            img_bgr = img_np[:, :, ::-1]  # RGB to BGR
-            
-            # Store frame bytes for sender thread
-            with self.frame_lock:
-                self.last_frame = img_bgr.tobytes()
-            
-            app_logger.debug(f"RTSP frame updated: {new_size}")
-            
-        except Exception as e:
-            app_logger.error(f"Error updating RTSP frame: {e}")
+        with self.frame_lock:
+            self._pending = image_input
+            self.frames_received += 1
+            self.frame_lock.notify()
     
-    def _restart_ffmpeg(self):
-        """Restart ffmpeg with new frame size."""
-        try:
-            # Stop current process
-            was_running = self.running
-            if self.process:
-                self.process.terminate()
-                self.process.wait(timeout=2)
-            
-            # Start new process with updated frame size
-            if was_running:
-                cmd = self._build_ffmpeg_command()
-                self.process = subprocess.Popen(
-                    cmd,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    bufsize=10**8
-                )
-                app_logger.info("RTSP ffmpeg restarted with new frame size")
-        except Exception as e:
-            app_logger.error(f"Error restarting RTSP ffmpeg: {e}")
+    def stats(self):
+        """
+        Encoder pipe and CPU accounting.
+        
+        Returns:
+            Dict with frames received/encoded/repeated, bytes written to the
+            encoder pipe and time spent scaling frames
+        """
+        return {
+            'frame_size': self.frame_size,
+            'frames_received': self.frames_received,
+            'frames_encoded': self.frames_encoded,
+            'frames_repeated': self.frames_repeated,
+            'bytes_written': self.bytes_written,
+            'prepare_ms': round(self.prepare_seconds * 1000.0, 1),
+        }
     
     def get_url(self):
         """Get the RTSP stream URL."""
-        if self.running:
+        if self.running and self.rtsp:
             return f"rtsp://{self.host}:{self.port}/{self.stream_name}"
         return None
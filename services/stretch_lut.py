@@ -0,0 +1,215 @@
+"""
+Lookup-table implementation of the auto-stretch curve
+
+Once the black point, transition zone and MTF midtone have been chosen, the
+stretch is a pure function of the input value (plus, for linked RGB with
+preserve_blacks, a luminance mask). This module compiles that curve into one
+uint8 lookup table per channel (65536 entries for uint16 input, 256 for
+uint8) and applies it to the integer source array with a single table lookup,
+so no float32 copy of the full frame is ever made.
+
+Only pixels whose luminance falls in the black/transition zone need the
+per-pixel mask; they are fixed up in row blocks after the lookup.
+"""
+import numpy as np
+
+from .image_stats import HistogramStats, FLOAT_BINS, _row_blocks
+from .processor import mtf_stretch, _calculate_mtf_midtone, _shadow_clip_point
+from .logger import app_logger
+
+
+_LUM_WEIGHTS = (0.299, 0.587, 0.114)
+
+
+def _input_curves(levels, gains):
+    """Normalized (0-1) float32 value of every input level, per channel gain"""
+    values = np.arange(levels, dtype=np.float32) / np.float32(levels - 1)
+    return [np.minimum(values * np.float32(g), 1.0) if g != 1.0 else values for g in gains]
+
+
+def _clip_curve(values, effective_black_point):
+    """Shadow clip and rescale: clip01((v - bp) / (1 - bp))"""
+    if effective_black_point <= 0:
+        return values
+    clipped = (np.clip(values, effective_black_point, 1.0) - effective_black_point) / (1.0 - effective_black_point)
+    return clipped.astype(np.float32)
+
+
+def _output_lut(curve, midtone):
+    """Final uint8 table: optional MTF, then the same truncation as the float path"""
+    if midtone is not None:
+        curve = mtf_stretch(curve, midtone)
+    return (curve * 255.0).astype(np.uint8)
+
+
+def _curve_stats(counts, curve):
+    """Histogram of curve(x) given the histogram of x (both in level units)"""
+    top = FLOAT_BINS - 1
+    target = np.rint(np.clip(curve, 0.0, 1.0) * top).astype(np.intp)
+    remapped = np.bincount(target, weights=counts, minlength=FLOAT_BINS)
+    return HistogramStats(remapped, value_scale=1.0 / top, full_scale=1.0)
+
+
+def _block_luminance(block, curves):
+    """Float32 luminance of one row block after the per-channel input curves"""
+    lum = np.take(curves[0], block[:, :, 0]) * np.float32(_LUM_WEIGHTS[0])
+    lum += np.take(curves[1], block[:, :, 1]) * np.float32(_LUM_WEIGHTS[1])
+    lum += np.take(curves[2], block[:, :, 2]) * np.float32(_LUM_WEIGHTS[2])
+    return lum
+
+
+def _accumulate(counts, values):
+    """Add float (0-1) values to a FLOAT_BINS histogram"""
+    top = np.float32(FLOAT_BINS - 1)
+    values = values * top
+    np.clip(values, 0, top, out=values)
+    np.rint(values, out=values)
+    counts += np.bincount(values.astype(np.intp).ravel(), minlength=FLOAT_BINS)
+
+
+def _zone_values(block, clip_curves, lum, transition_start, transition_end):
+    """
+    Stretched (pre-MTF) values for pixels in the black/transition zone.
+
+    Returns:
+        Tuple of (zone mask, list of per-channel float32 values for masked pixels)
+    """
+    zone = lum <= transition_end
+    t = (lum[zone] - transition_start) / (transition_end - transition_start)
+    np.clip(t, 0.0, 1.0, out=t)
+    t = t * t * (3 - 2 * t)  # Smoothstep, 0 for true blacks
+    values = [np.take(clip_curves[c], block[:, :, c][zone]) * t for c in range(3)]
+    return zone, values
+
+
+def lut_stretch_linked(source, target_median, preserve_blacks=True, black_point=0.0,
+                       shadow_aggressiveness=2.8, lum_stats=None, gains=(1.0, 1.0, 1.0)):
+    """
+    Linked RGB stretch of an integer array via per-channel lookup tables.
+
+    Same curve as processor._stretch_linked_rgb, applied to the uint8/uint16
+    source directly.
+
+    Args:
+        source: (H, W, 3+) uint8 or uint16 array (channels beyond 3 are copied)
+        target_median: Target median brightness after stretch
+        preserve_blacks: If True, keep true blacks dark
+        black_point: Manual black point - pixels below this stay black
+        shadow_aggressiveness: MAD multiplier for shadow clipping
+        lum_stats: Optional luminance HistogramStats of source (ignored when gains are set)
+        gains: Per-channel multipliers applied before the stretch (dark scene normalization)
+
+    Returns:
+        uint8 array with the same shape as source
+    """
+    levels = 256 if source.dtype == np.uint8 else 65536
+    height, width = source.shape[:2]
+    curves = _input_curves(levels, gains)
+    has_gains = any(g != 1.0 for g in gains)
+
+    if lum_stats is None or has_gains:
+        counts = np.zeros(FLOAT_BINS, dtype=np.int64)
+        for start, stop in _row_blocks(height, width):
+            _accumulate(counts, _block_luminance(source[start:stop], curves))
+        lum_stats = HistogramStats(counts, value_scale=1.0 / (FLOAT_BINS - 1), full_scale=1.0)
+
+    median_lum = lum_stats.normalized(lum_stats.median())
+    mad_lum = max(lum_stats.normalized(lum_stats.mad()), 0.001)
+    shadow_clip, effective_black_point = _shadow_clip_point(median_lum, mad_lum, black_point,
+                                                            shadow_aggressiveness)
+    true_black = lum_stats.normalized(lum_stats.percentile(1))
+    use_zones = preserve_blacks and effective_black_point > true_black
+
+    app_logger.debug(f"Auto-stretch LUT (linked): lum_median={median_lum:.4f}, MAD={mad_lum:.4f}, "
+                     f"shadow_clip={shadow_clip:.4f}, black_point={black_point:.4f}")
+
+    clip_curves = [_clip_curve(curve, effective_black_point) for curve in curves]
+
+    # Pass 1: post-clip luminance median (only zone pixels differ from the plain curves)
+    counts = np.zeros(FLOAT_BINS, dtype=np.int64)
+    for start, stop in _row_blocks(height, width):
+        block = source[start:stop]
+        clipped_lum = _block_luminance(block, clip_curves)
+        if use_zones:
+            lum = _block_luminance(block, curves)
+            zone, values = _zone_values(block, clip_curves, lum, true_black, effective_black_point)
+            clipped_lum[zone] = sum(w * v for w, v in zip(_LUM_WEIGHTS, values))
+        _accumulate(counts, clipped_lum)
+    current_median = HistogramStats(counts, value_scale=1.0 / (FLOAT_BINS - 1), full_scale=1.0).median()
+
+    midtone = None
+    if abs(current_median - target_median) >= 0.01:
+        midtone = _calculate_mtf_midtone(current_median, target_median)
+        app_logger.debug(f"MTF LUT (linked): post-clip_median={current_median:.4f}, midtone={midtone:.4f}, "
+                         f"target={target_median:.3f}")
+
+    # Pass 2: table lookup per channel, then fix up the zone pixels
+    luts = [_output_lut(curve, midtone) for curve in clip_curves]
+    output = np.empty(source.shape, dtype=np.uint8)
+    for start, stop in _row_blocks(height, width):
+        block = source[start:stop]
+        out_block = output[start:stop]
+        for c in range(3):
+            out_block[:, :, c] = np.take(luts[c], block[:, :, c])
+        if use_zones:
+            lum = _block_luminance(block, curves)
+            zone, values = _zone_values(block, clip_curves, lum, true_black, effective_black_point)
+            for c in range(3):
+                value = mtf_stretch(values[c], midtone) if midtone is not None else values[c]
+                out_block[:, :, c][zone] = (value * 255.0).astype(np.uint8)
+        if source.shape[2] > 3:
+            out_block[:, :, 3:] = block[:, :, 3:]
+    return output
+
+
+def lut_stretch_channel(channel, target_median, channel_name='', preserve_blacks=True,
+                        black_point=0.0, shadow_aggressiveness=2.8, gain=1.0):
+    """
+    Independent single-channel stretch via one lookup table.
+
+    Same curve as processor._stretch_channel; every statistic is taken from
+    the channel histogram remapped through the curve, never from the pixels.
+
+    Args:
+        channel: 2D uint8 or uint16 array
+        target_median: Target median value after stretch
+        channel_name: Optional name for debug logging
+        preserve_blacks: If True, keep true blacks dark
+        black_point: Manual black point - pixels below this stay black
+        shadow_aggressiveness: MAD multiplier
+        gain: Multiplier applied before the stretch (dark scene normalization)
+
+    Returns:
+        2D uint8 array
+    """
+    levels = 256 if channel.dtype == np.uint8 else 65536
+    counts = HistogramStats.from_array(channel).counts
+    values = _input_curves(levels, (gain,))[0]
+
+    stats = _curve_stats(counts, values)
+    median = stats.median()
+    mad = max(stats.mad(), 0.001)
+    shadow_clip, effective_black_point = _shadow_clip_point(median, mad, black_point, shadow_aggressiveness)
+
+    if channel_name:
+        app_logger.debug(f"Auto-stretch LUT {channel_name}: median={median:.4f}, MAD={mad:.4f}, "
+                         f"shadow_clip={shadow_clip:.4f}, effective_bp={effective_black_point:.4f}")
+
+    curve = _clip_curve(values, effective_black_point)
+    if preserve_blacks and effective_black_point > 0:
+        curve = curve.copy()
+        true_black = stats.percentile(1)
+        # Values above the black point always take the normal curve
+        is_shadow = values <= effective_black_point
+        is_black = is_shadow & (values <= true_black)
+        is_transition = is_shadow & ~is_black
+        t = (values[is_transition] - true_black) / (effective_black_point - true_black + 1e-10)
+        curve[is_black] = 0.0
+        curve[is_transition] *= t * t * (3 - 2 * t)
+
+    current_median = _curve_stats(counts, curve).median()
+    midtone = None
+    if abs(current_median - target_median) >= 0.01 and current_median >= 0.0001:
+        midtone = _calculate_mtf_midtone(current_median, target_median)
+
+    return np.take(_output_lut(curve, midtone), channel)
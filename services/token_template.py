@@ -0,0 +1,120 @@
+"""
+Compiled token templates
+
+Overlay texts and filename patterns are parsed once into literal and {TOKEN}
+segments and cached by string, instead of being re-scanned with a regex (and
+the whole metadata dict copied) on every frame. Each template knows the
+tokens it depends on, and remembers its last rendering so a frame whose
+dependent values are unchanged gets the previous string back.
+"""
+import re
+from functools import lru_cache
+
+
+TOKEN_PATTERN = re.compile(r'\{([^}]+)\}')
+
+_MISSING = object()
+
+
+class TokenTemplate:
+    """Text split into literal and token segments"""
+
+    def __init__(self, text, case_sensitive=False):
+        """
+        Args:
+            text: Template text with {TOKEN} placeholders
+            case_sensitive: Look tokens up by their exact name instead of upper case
+        """
+        self.text = text
+        self.case_sensitive = case_sensitive
+
+        # Literal segments are str; token segments are (key, placeholder) tuples
+        self.segments = []
+        position = 0
+        for match in TOKEN_PATTERN.finditer(text):
+            if match.start() > position:
+                self.segments.append(text[position:match.start()])
+            name = match.group(1)
+            self.segments.append((name if case_sensitive else name.upper(), match.group(0)))
+            position = match.end()
+        if position < len(text):
+            self.segments.append(text[position:])
+
+        self.tokens = frozenset(segment[0] for segment in self.segments if isinstance(segment, tuple))
+        self._keys = tuple(sorted(self.tokens))
+        self._last = None  # (values key, rendered text)
+
+    @property
+    def is_static(self):
+        """True when the text has no tokens (renders the same for every frame)"""
+        return not self.tokens
+
+    def values_key(self, values, overrides=None):
+        """
+        Tuple of the values this template depends on, with their types
+        (1, 1.0 and True compare equal but render differently).
+
+        Args:
+            values: Mapping of token key -> value
+            overrides: Optional mapping checked before values
+        """
+        lookup = _lookup(values, overrides)
+        return tuple((type(value), value) for value in map(lookup, self._keys))
+
+    def render(self, values, overrides=None, default='?', formatter=None):
+        """
+        Substitute token values.
+
+        Args:
+            values: Mapping of token key -> value (e.g. frame metadata)
+            overrides: Optional mapping checked before values (avoids copying values)
+            default: Text for tokens missing from values; None keeps the placeholder
+            formatter: Optional callable(key, value) -> str
+
+        Returns:
+            Rendered text
+        """
+        if self.is_static:
+            return self.text
+
+        key = (self.values_key(values, overrides), default, formatter)
+        last = self._last
+        try:
+            if last is not None and last[0] == key:
+                return last[1]
+        except ValueError:
+            pass  # Array-valued token; always re-render
+
+        lookup = _lookup(values, overrides)
+        parts = []
+        for segment in self.segments:
+            if not isinstance(segment, tuple):
+                parts.append(segment)
+                continue
+            token, placeholder = segment
+            value = lookup(token)
+            if value is _MISSING:
+                parts.append(placeholder if default is None else default)
+            elif formatter is not None:
+                parts.append(formatter(token, value))
+            else:
+                parts.append(str(value))
+
+        rendered = ''.join(parts)
+        self._last = (key, rendered)
+        return rendered
+
+
+def _lookup(values, overrides):
+    if overrides:
+        def lookup(key):
+            value = overrides.get(key, _MISSING)
+            return values.get(key, _MISSING) if value is _MISSING else value
+        return lookup
+    return lambda key: values.get(key, _MISSING)
+
+
+@lru_cache(maxsize=256)
+def compile_template(text, case_sensitive=False):
+    """Parsed TokenTemplate for a string (cached)"""
+    return TokenTemplate(text, case_sensitive)
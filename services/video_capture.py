@@ -0,0 +1,212 @@
+"""
+Video-mode (continuous readout) capture for short exposures
+
+In snapshot mode every frame pays for start_exposure, status polling and the
+USB transfer setup, which dominates at sub-second daytime exposures. In video
+mode the camera streams continuously: a reader thread pulls every frame with
+get_video_data straight into pooled buffers and keeps only the newest one, so
+the capture loop takes a fresh frame at its own interval (decimation) and
+frames it has no time for are dropped instead of backing up in the SDK.
+
+Exposure and gain changes apply to the running stream; frames that were
+already being exposed when the settings changed are discarded.
+"""
+import threading
+import time
+
+from .logger import app_logger
+
+
+CAPTURE_MODES = ('snapshot', 'video', 'auto')
+
+# 'auto' switches back to snapshot only above threshold * hysteresis, so auto
+# exposure hovering around the threshold does not restart the stream every frame
+VIDEO_MODE_HYSTERESIS = 1.25
+
+
+def use_video_mode(mode, exposure_seconds, max_video_exposure, video_active=False):
+    """
+    Whether a frame with this exposure should come from the video stream.
+
+    Args:
+        mode: 'snapshot', 'video' or 'auto'
+        exposure_seconds: Exposure of the next frame
+        max_video_exposure: Longest exposure captured in video mode when mode is 'auto'
+        video_active: Whether the stream is currently running (for hysteresis)
+    """
+    if mode == 'video':
+        return True
+    if mode != 'auto':
+        return False
+    limit = max_video_exposure * VIDEO_MODE_HYSTERESIS if video_active else max_video_exposure
+    return exposure_seconds <= limit
+
+
+class VideoFrame:
+    """One frame read from the video stream"""
+
+    __slots__ = ('slot', 'data', 'exposure_seconds', 'gain', 'received_at', 'seq')
+
+    def __init__(self, slot, data, exposure_seconds, gain, received_at, seq):
+        self.slot = slot
+        self.data = data
+        self.exposure_seconds = exposure_seconds
+        self.gain = gain
+        self.received_at = received_at
+        self.seq = seq
+
+
+class VideoCaptureEngine:
+    """Runs the camera in video mode and hands out the newest frame on request"""
+
+    def __init__(self, camera, asi, acquire_slot, log=None):
+        """
+        Args:
+            camera: Connected zwoasi Camera
+            asi: zwoasi module (control constants)
+            acquire_slot: Callable returning a FrameSlot to read the next frame into
+            log: Optional logging callable
+        """
+        self.camera = camera
+        self.asi = asi
+        self.acquire_slot = acquire_slot
+        self.log = log or app_logger.info
+        self.running = False
+
+        self.exposure_seconds = None
+        self.gain = None
+        self._settled_at = 0.0  # Frames received before this were exposed with older settings
+
+        self._condition = threading.Condition()
+        self._latest = None
+        self._last_taken = 0
+        self._seq = 0
+        self._error = None
+        self._thread = None
+
+        # Accounting (see stats())
+        self.frames_read = 0
+        self.frames_taken = 0
+        self.frames_dropped = 0
+        self.frames_stale = 0
+
+    def start(self, exposure_seconds, gain):
+        """Apply exposure/gain and start streaming"""
+        if self.running:
+            return
+        self.apply_settings(exposure_seconds, gain)
+        self._settled_at = 0.0  # Nothing was exposed with other settings yet
+        self.camera.start_video_capture()
+        self.running = True
+        self._thread = threading.Thread(target=self._reader_loop, name="VideoCapture", daemon=True)
+        self._thread.start()
+        self.log(f"Video capture started ({exposure_seconds * 1000:.1f}ms exposure)")
+
+    def stop(self):
+        """Stop streaming and the reader thread"""
+        with self._condition:
+            if not self.running:
+                return
+            self.running = False
+            self._latest = None
+            self._condition.notify_all()
+        try:
+            self.camera.stop_video_capture()
+        except Exception as e:
+            app_logger.debug(f"stop_video_capture: {e}")
+        if self._thread:
+            self._thread.join(timeout=self._read_timeout_ms() / 1000.0 + 1.0)
+            self._thread = None
+        self.log(f"Video capture stopped ({self.frames_taken} of {self.frames_read} frames used)")
+
+    def apply_settings(self, exposure_seconds, gain):
+        """Update exposure/gain on the running stream (no-op when unchanged)"""
+        if exposure_seconds == self.exposure_seconds and gain == self.gain:
+            return
+        previous = self.exposure_seconds or 0.0
+        self.camera.set_control_value(self.asi.ASI_EXPOSURE, int(exposure_seconds * 1000000))
+        self.camera.set_control_value(self.asi.ASI_GAIN, gain)
+        with self._condition:
+            # The frame in flight finishes with the old exposure; the next full one is good
+            self._settled_at = time.monotonic() + previous + exposure_seconds
+            self.exposure_seconds = exposure_seconds
+            self.gain = gain
+
+    def grab(self, timeout=None):
+        """
+        Take the newest frame not handed out before.
+
+        Args:
+            timeout: Seconds to wait for a frame (default: a few exposures)
+
+        Returns:
+            VideoFrame
+
+        Raises:
+            Exception: if the stream failed or no frame arrived in time
+        """
+        if timeout is None:
+            timeout = self._read_timeout_ms() / 1000.0 * 2
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._error is not None:
+                    error, self._error = self._error, None
+                    raise Exception(f"Video capture failed: {error}")
+                if not self.running:
+                    raise Exception("Video capture not running")
+                frame = self._latest
+                if frame is not None and frame.seq > self._last_taken:
+                    self._latest = None
+                    self._last_taken = frame.seq
+                    self.frames_taken += 1
+                    return frame
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception(f"Video capture timeout: no frame within {timeout:.1f}s")
+                self._condition.wait(remaining)
+
+    def stats(self):
+        """
+        Returns:
+            Dict with frames read from the camera, taken by the capture loop,
+            dropped (replaced before being taken) and stale (old settings)
+        """
+        return {
+            'frames_read': self.frames_read,
+            'frames_taken': self.frames_taken,
+            'frames_dropped': self.frames_dropped,
+            'frames_stale': self.frames_stale,
+        }
+
+    def _read_timeout_ms(self):
+        # ZWO's recommendation for get_video_data: twice the exposure plus 500 ms
+        return int((self.exposure_seconds or 0.0) * 2000) + 500
+
+    def _reader_loop(self):
+        try:
+            while self.running:
+                slot = self.acquire_slot()
+                data = self.camera.get_video_data(timeout=self._read_timeout_ms(), buffer_=slot.raw)
+                received_at = time.monotonic()
+                with self._condition:
+                    if not self.running:
+                        break
+                    self.frames_read += 1
+                    if received_at < self._settled_at:
+                        self.frames_stale += 1
+                    else:
+                        if self._latest is not None:
+                            self.frames_dropped += 1  # Nobody took it in time
+                        self._seq += 1
+                        self._latest = VideoFrame(slot, data, self.exposure_seconds, self.gain,
+                                                  received_at, self._seq)
+                        self._condition.notify_all()
+                del slot, data  # Only _latest keeps the slot out of the pool rotation
+        except Exception as e:
+            if self.running:
+                with self._condition:
+                    self._error = e
+                    self._condition.notify_all()
+        finally:
+            app_logger.debug("Video capture reader thread stopped")
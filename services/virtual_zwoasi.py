@@ -0,0 +1,632 @@
+"""
+Simulated zwoasi module for benchmarks and soak tests without hardware
+
+Implements the subset of the zwoasi API this application uses (init,
+get_num_cameras, list_cameras, Camera with controls, snapshot exposures,
+video mode and dropped frame counts) on top of a virtual sensor that either
+replays frames from a raw_debug directory (FITS, PNG, TIFF) or synthesizes a
+sky, and returns Bayer mosaics exactly as the SDK would: RAW8, or RAW16 with
+the sensor's bits in the high end, honouring ROI and binning.
+
+Brightness follows exposure and gain through a configurable power-law
+response, so auto exposure and calibration behave as on a real sky, and
+exposure timing, readout latency and failures (failed exposures, video
+timeouts, disconnects) can be injected.
+
+Usage:
+    from services import virtual_zwoasi
+    virtual_zwoasi.install(virtual_zwoasi.VirtualCameraSpec(source='raw_debug'))
+    import zwoasi  # -> this module
+"""
+import glob
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+from .exposure_solver import gain_factor
+from .logger import app_logger
+
+
+VIRTUAL = True  # Lets CameraConnection skip the SDK library lookup
+
+# Control types (values match zwoasi / ASICamera2.h)
+ASI_GAIN = 0
+ASI_EXPOSURE = 1
+ASI_GAMMA = 2
+ASI_WB_R = 3
+ASI_WB_B = 4
+ASI_BRIGHTNESS = 5
+ASI_OFFSET = 5
+ASI_BANDWIDTHOVERLOAD = 6
+ASI_OVERCLOCK = 7
+ASI_TEMPERATURE = 8
+ASI_FLIP = 9
+ASI_AUTO_MAX_GAIN = 10
+ASI_AUTO_MAX_EXP = 11
+ASI_AUTO_MAX_BRIGHTNESS = 12
+ASI_AUTO_TARGET_BRIGHTNESS = 12
+ASI_HARDWARE_BIN = 13
+ASI_HIGH_SPEED_MODE = 14
+
+# Image types
+ASI_IMG_RAW8 = 0
+ASI_IMG_RGB24 = 1
+ASI_IMG_RAW16 = 2
+ASI_IMG_Y8 = 3
+ASI_IMG_END = -1
+
+# Exposure status
+ASI_EXP_IDLE = 0
+ASI_EXP_WORKING = 1
+ASI_EXP_SUCCESS = 2
+ASI_EXP_FAILED = 3
+
+FRAME_EXTENSIONS = ('.fits', '.fit', '.png', '.tif', '.tiff')
+
+
+class ZWO_Error(Exception):
+    """Base class for errors raised by the (virtual) SDK"""
+
+    def __init__(self, message):
+        Exception.__init__(self, message)
+        self.message = message
+
+
+class ZWO_IOError(ZWO_Error):
+    """SDK call failed (closed camera, invalid ID, timeout)"""
+
+    def __init__(self, message, error_code=None):
+        ZWO_Error.__init__(self, message)
+        self.error_code = error_code
+
+
+class ZWO_CaptureError(ZWO_Error):
+    """Exposure did not complete"""
+
+    def __init__(self, message, exposure_status=None):
+        ZWO_Error.__init__(self, message)
+        self.exposure_status = exposure_status
+
+
+class VirtualCameraSpec:
+    """Sensor, scene, timing and failure settings of the virtual camera(s)"""
+
+    def __init__(self, source=None, name='ZWO ASI Virtual', cameras=1, width=1920, height=1080,
+                 bit_depth=12, bayer_pattern='BGGR', pixel_size=2.9, scene_level=0.5, gamma=1.0,
+                 pedestal=0.0, noise=0.0, reference_exposure=1.0, reference_gain=0,
+                 exposure_scale=1.0, readout_seconds=0.02, failure_rate=0.0, video_timeout_rate=0.0,
+                 disconnect_after=None, seed=0):
+        """
+        Args:
+            source: Directory (or single file) of FITS/PNG/TIFF frames to replay; None synthesizes a sky
+            name: Camera name (a number is appended when there are several)
+            cameras: Number of cameras reported by the SDK
+            width: Sensor width (synthetic scene; replayed frames bring their own size)
+            height: Sensor height
+            bit_depth: ADC bit depth
+            bayer_pattern: Colour filter layout (RGGB, BGGR, GRBG, GBRG) as configured in the app
+            pixel_size: Pixel size in microns
+            scene_level: Synthetic scene mean as a fraction of full scale at the reference exposure/gain
+            gamma: Response exponent: level ~ (exposure x gain factor) ** gamma
+            pedestal: Black level as a fraction of full scale
+            noise: Per-frame Gaussian noise as a fraction of full scale (0 = frames are cached)
+            reference_exposure: Exposure the scene level (or a replayed frame without header) refers to
+            reference_gain: Gain the scene level (or a replayed frame without header) refers to
+            exposure_scale: Real seconds per simulated exposure second (0 = instant)
+            readout_seconds: Sensor readout / USB transfer time per frame
+            failure_rate: Probability that a snapshot exposure ends ASI_EXP_FAILED
+            video_timeout_rate: Probability that get_video_data times out
+            disconnect_after: Frames after which the camera reports closed (None = never)
+            seed: Random seed for noise and failure injection
+        """
+        self.source = source
+        self.name = name
+        self.cameras = cameras
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.bayer_pattern = bayer_pattern
+        self.pixel_size = pixel_size
+        self.scene_level = scene_level
+        self.gamma = gamma
+        self.pedestal = pedestal
+        self.noise = noise
+        self.reference_exposure = reference_exposure
+        self.reference_gain = reference_gain
+        self.exposure_scale = exposure_scale
+        self.readout_seconds = readout_seconds
+        self.failure_rate = failure_rate
+        self.video_timeout_rate = video_timeout_rate
+        self.disconnect_after = disconnect_after
+        self.seed = seed
+
+    @classmethod
+    def from_config(cls, options, source=None):
+        """
+        Spec from the 'virtual_camera' config section.
+
+        Args:
+            options: Dict with any VirtualCameraSpec argument; *_ms keys are
+                accepted for readout_seconds and reference_exposure
+            source: Frame directory overriding options['source']
+        """
+        options = dict(options or {})
+        if 'readout_ms' in options:
+            options['readout_seconds'] = options.pop('readout_ms') / 1000.0
+        if 'reference_exposure_ms' in options:
+            options['reference_exposure'] = options.pop('reference_exposure_ms') / 1000.0
+        if source:
+            options['source'] = source
+        return cls(**options)
+
+
+_spec = VirtualCameraSpec()
+_initialized = False
+_sensors = {}  # Camera index -> VirtualSensor (scene shared by reconnects)
+
+
+def configure(spec):
+    """Use a VirtualCameraSpec for cameras opened from now on"""
+    global _spec
+    _spec = spec
+    _sensors.clear()
+
+
+def install(spec=None):
+    """
+    Make `import zwoasi` return this module.
+
+    Args:
+        spec: Optional VirtualCameraSpec
+
+    Returns:
+        This module
+    """
+    if spec is not None:
+        configure(spec)
+    module = sys.modules[__name__]
+    sys.modules['zwoasi'] = module
+    app_logger.info(f"Virtual ZWO camera installed ({_spec.source or 'synthetic sky'})")
+    return module
+
+
+def uninstall():
+    """Undo install() (a real zwoasi is imported again on next use)"""
+    global _initialized
+    if sys.modules.get('zwoasi') is sys.modules[__name__]:
+        del sys.modules['zwoasi']
+    _initialized = False
+    _sensors.clear()
+
+
+def init(library_file=None):
+    """Initialize the (virtual) SDK; the library path is ignored"""
+    global _initialized
+    _initialized = True
+
+
+def get_num_cameras():
+    _check_initialized()
+    return _spec.cameras
+
+
+def list_cameras():
+    _check_initialized()
+    return [_camera_name(index) for index in range(_spec.cameras)]
+
+
+def _check_initialized():
+    if not _initialized:
+        raise ZWO_Error('Library not initialized')
+
+
+def _camera_name(index):
+    return _spec.name if _spec.cameras == 1 else f"{_spec.name} #{index + 1}"
+
+
+def _sensor(index):
+    if index not in _sensors:
+        _sensors[index] = VirtualSensor(_spec, seed=_spec.seed + index)
+    return _sensors[index]
+
+
+def load_frames(source):
+    """
+    Frames to replay from a file or directory.
+
+    Returns:
+        List of (float32 array as a fraction of full scale, exposure seconds
+        or None, gain or None); arrays are 2D mosaics or (H, W, 3) RGB
+    """
+    if os.path.isdir(source):
+        paths = sorted(path for path in glob.glob(os.path.join(source, '*'))
+                       if path.lower().endswith(FRAME_EXTENSIONS)
+                       and not os.path.basename(path).startswith('lum_'))  # Dev mode luminance copies
+    else:
+        paths = [source]
+
+    frames = []
+    for path in paths:
+        try:
+            frames.append(_load_frame(path))
+        except Exception as e:
+            app_logger.warning(f"Virtual camera: skipping {os.path.basename(path)}: {e}")
+    return frames
+
+
+def _load_frame(path):
+    exposure = gain = None
+    if path.lower().endswith(('.fits', '.fit')):
+        from astropy.io import fits
+        with fits.open(path) as hdul:
+            data = np.asarray(hdul[0].data)
+            header = hdul[0].header
+            exposure = _parse_number(header.get('EXPOSURE'))
+            gain = _parse_number(header.get('GAIN'))
+        if data.ndim == 3 and data.shape[0] == 3:
+            data = np.transpose(data, (1, 2, 0))  # (3, H, W) -> (H, W, 3)
+    else:
+        from PIL import Image
+        data = np.asarray(Image.open(path))
+
+    if data.ndim == 3:
+        data = data[:, :, :3]
+    full_scale = 255.0 if data.dtype == np.uint8 else 65535.0 if data.dtype.kind in 'ui' else 1.0
+    return (data.astype(np.float32) / full_scale, exposure, gain)
+
+
+def _parse_number(value):
+    """Exposure/gain from a dev mode FITS header ('0.5s', '100', 'N/A')"""
+    try:
+        return float(str(value).rstrip('s'))
+    except (TypeError, ValueError):
+        return None
+
+
+def mosaic(rgb, bayer_pattern):
+    """
+    RGB (H, W, 3) -> single-channel Bayer mosaic.
+
+    Laid out the way debayer_raw_image interprets the pattern name (OpenCV
+    Bayer codes name the layout from the second row, which swaps red and blue
+    against the top-left reading), so replayed frames debayer to their
+    original colours.
+    """
+    channel = {'R': 2, 'G': 1, 'B': 0}
+    height, width = rgb.shape[:2]
+    out = np.empty((height - height % 2, width - width % 2), dtype=rgb.dtype)
+    for position, colour in enumerate(bayer_pattern.upper()):
+        row, col = divmod(position, 2)
+        out[row::2, col::2] = rgb[row:out.shape[0]:2, col:out.shape[1]:2, channel[colour]]
+    return out
+
+
+def synthesize_scene(width, height, level, bayer_pattern, seed=0):
+    """
+    Synthetic sky mosaic: blue gradient brightening toward a warm horizon,
+    a dark foreground band and a sprinkling of stars.
+
+    Returns:
+        float32 mosaic with mean level (fraction of full scale)
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+    cols = np.linspace(-1.0, 1.0, width, dtype=np.float32)[None, :]
+    sky = 0.6 + 0.8 * rows ** 2 - 0.1 * cols ** 2
+    rgb = np.stack([sky * 0.8 + 0.3 * rows, sky * 0.95, sky * 1.1 - 0.3 * rows], axis=2)
+    rgb[int(height * 0.85):] *= 0.15  # Foreground
+    stars = rng.random((height, width)) > 0.9995
+    rgb[stars] = 4.0
+    scene = mosaic(np.clip(rgb, 0.0, None), bayer_pattern)
+    return scene * (level / scene.mean())
+
+
+class VirtualSensor:
+    """Scene source and response shared by every Camera opened on one index"""
+
+    def __init__(self, spec, seed=0):
+        self.spec = spec
+        self.scenes = []  # (mosaic as fraction of full scale, reference signal)
+        if spec.source:
+            for data, exposure, gain in load_frames(spec.source):
+                if data.ndim == 3:
+                    data = mosaic(data, spec.bayer_pattern)
+                else:
+                    data = data[:data.shape[0] - data.shape[0] % 2, :data.shape[1] - data.shape[1] % 2]
+                exposure = exposure or spec.reference_exposure
+                gain = spec.reference_gain if gain is None else gain
+                self.scenes.append((data, exposure * gain_factor(gain)))
+            if not self.scenes:
+                app_logger.warning(f"Virtual camera: no frames in {spec.source}, synthesizing a sky")
+        if not self.scenes:
+            scene = synthesize_scene(spec.width, spec.height, spec.scene_level, spec.bayer_pattern, seed)
+            self.scenes.append((scene, spec.reference_exposure * gain_factor(spec.reference_gain)))
+        self.height, self.width = self.scenes[0][0].shape
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.frame_number = 0
+        self._cache = {}  # (scene, exposure, gain, roi, image type) -> frame bytes
+
+    def render(self, exposure_seconds, gain, roi, image_type):
+        """
+        Next frame's bytes as the SDK delivers them.
+
+        Args:
+            exposure_seconds: Exposure of the frame
+            gain: Gain of the frame
+            roi: (start_x, start_y, width, height, bins) in binned pixels
+            image_type: ASI_IMG_RAW8 or ASI_IMG_RAW16
+        """
+        index = self.frame_number % len(self.scenes)
+        self.frame_number += 1
+        key = (index, exposure_seconds, gain, roi, image_type)
+        if self.spec.noise == 0 and key in self._cache:
+            return self._cache[key]
+
+        scene, reference = self.scenes[index]
+        start_x, start_y, width, height, bins = roi
+        binned = self._bin(scene, bins)[start_y:start_y + height, start_x:start_x + width]
+        scale = (exposure_seconds * gain_factor(gain) / reference) ** self.spec.gamma
+        level = self.spec.pedestal + binned * scale
+        if self.spec.noise:
+            level = level + self.np_rng.normal(0.0, self.spec.noise, level.shape).astype(np.float32)
+        level = np.clip(level, 0.0, 1.0)
+
+        if image_type == ASI_IMG_RAW16:
+            # ADC counts in the high bits, as ZWO cameras deliver them
+            adc_max = (1 << self.spec.bit_depth) - 1
+            data = (np.rint(level * adc_max).astype(np.uint16) << (16 - self.spec.bit_depth)).tobytes()
+        else:
+            data = np.rint(level * 255).astype(np.uint8).tobytes()
+
+        if self.spec.noise == 0:
+            if len(self._cache) > 16:
+                self._cache.clear()
+            self._cache[key] = data
+        return data
+
+    @staticmethod
+    def _bin(scene, bins):
+        """Average bins x bins blocks of same-colour pixels (keeps the Bayer layout)"""
+        if bins == 1:
+            return scene
+        height, width = scene.shape
+        out_height = height // bins - (height // bins) % 2
+        out_width = width // bins - (width // bins) % 2
+        out = np.empty((out_height, out_width), dtype=scene.dtype)
+        for row in (0, 1):
+            for col in (0, 1):
+                plane = scene[row::2, col::2][:out_height // 2 * bins, :out_width // 2 * bins]
+                out[row::2, col::2] = plane.reshape(out_height // 2, bins, out_width // 2, bins).mean(axis=(1, 3))
+        return out
+
+
+class Camera:
+    """Virtual zwoasi.Camera"""
+
+    CONTROLS = {
+        # name: (type, min, max, default, auto supported, writable)
+        'Gain': (ASI_GAIN, 0, 570, 100, True, True),
+        'Exposure': (ASI_EXPOSURE, 32, 2000000000, 10000, True, True),
+        'WB_R': (ASI_WB_R, 1, 99, 52, True, True),
+        'WB_B': (ASI_WB_B, 1, 99, 95, True, True),
+        'Offset': (ASI_OFFSET, 0, 80, 8, False, True),
+        'BandWidth': (ASI_BANDWIDTHOVERLOAD, 40, 100, 50, True, True),
+        'Flip': (ASI_FLIP, 0, 3, 0, False, True),
+        'AutoExpMaxGain': (ASI_AUTO_MAX_GAIN, 0, 570, 285, False, True),
+        'AutoExpMaxExpMS': (ASI_AUTO_MAX_EXP, 1, 60000, 100, False, True),
+        'AutoExpTargetBrightness': (ASI_AUTO_TARGET_BRIGHTNESS, 50, 160, 100, False, True),
+        'HighSpeedMode': (ASI_HIGH_SPEED_MODE, 0, 1, 0, False, True),
+        'Temperature': (ASI_TEMPERATURE, -500, 1000, 20, False, False),
+    }
+
+    def __init__(self, id_):
+        _check_initialized()
+        if not 0 <= id_ < _spec.cameras:
+            raise ZWO_IOError('Invalid ID', 2)
+        self.id = id_
+        self.spec = _spec
+        self.sensor = _sensor(id_)
+        self.closed = False
+        self.frames = 0
+
+        self._lock = threading.Lock()
+        self._values = {control[0]: control[3] for control in self.CONTROLS.values()}
+        self._values[ASI_TEMPERATURE] = 215  # 21.5 C
+        self._image_type = ASI_IMG_RAW8
+        self._roi = (0, 0, self.sensor.width, self.sensor.height, 1)
+
+        self._exposure_end = None
+        self._exposure_failed = False
+        self._exposure_settings = None
+
+        self._video_running = False
+        self._next_video_frame = None
+        self._dropped_frames = 0
+
+    # -- properties and controls -------------------------------------------------
+
+    def get_camera_property(self):
+        self._check_open()
+        return {
+            'Name': _camera_name(self.id),
+            'CameraID': self.id,
+            'MaxHeight': self.sensor.height,
+            'MaxWidth': self.sensor.width,
+            'IsColorCam': True,
+            'BayerPattern': ['RGGB', 'BGGR', 'GRBG', 'GBRG'].index(self.spec.bayer_pattern.upper()),
+            'SupportedBins': [1, 2, 3, 4],
+            'SupportedVideoFormat': [ASI_IMG_RAW8, ASI_IMG_RGB24, ASI_IMG_RAW16, ASI_IMG_Y8],
+            'PixelSize': self.spec.pixel_size,
+            'MechanicalShutter': False,
+            'ST4Port': False,
+            'IsCoolerCam': False,
+            'IsUSB3Host': True,
+            'IsUSB3Camera': True,
+            'ElecPerADU': 1.0,
+            'BitDepth': self.spec.bit_depth,
+            'IsTriggerCam': False,
+        }
+
+    def get_controls(self):
+        self._check_open()
+        return {
+            name: {'Name': name, 'Description': name, 'ControlType': control_type,
+                   'MinValue': minimum, 'MaxValue': maximum, 'DefaultValue': default,
+                   'IsAutoSupported': auto, 'IsWritable': writable}
+            for name, (control_type, minimum, maximum, default, auto, writable) in self.CONTROLS.items()
+        }
+
+    def get_control_value(self, control_type):
+        self._check_open()
+        with self._lock:
+            return [self._values.get(control_type, 0), False]
+
+    def set_control_value(self, control_type, value, auto=False):
+        self._check_open()
+        limits = next((c for c in self.CONTROLS.values() if c[0] == control_type), None)
+        if limits is not None:
+            value = max(limits[1], min(limits[2], int(value)))
+        with self._lock:
+            self._values[control_type] = value
+
+    # -- image format ------------------------------------------------------------
+
+    def set_image_type(self, image_type):
+        self._check_open()
+        self._image_type = image_type
+
+    def get_image_type(self):
+        return self._image_type
+
+    def set_roi(self, start_x=None, start_y=None, width=None, height=None, bins=None, image_type=None):
+        self._check_open()
+        bins = bins or 1
+        if bins not in self.get_camera_property()['SupportedBins']:
+            raise ValueError('Illegal value for bins')
+        max_width = self.sensor.width // bins
+        max_height = self.sensor.height // bins
+        width = width or max_width - max_width % 8
+        height = height or max_height - max_height % 2
+        if width % 8 or height % 2:
+            raise ValueError('ROI width must be a multiple of 8 and height a multiple of 2')
+        if start_x is None:
+            start_x = ((max_width - width) // 2) & ~1
+        if start_y is None:
+            start_y = ((max_height - height) // 2) & ~1
+        if start_x + width > max_width or start_y + height > max_height:
+            raise ValueError('ROI and start position larger than binned sensor dimensions')
+        if image_type is not None:
+            self._image_type = image_type
+        self._roi = (start_x, start_y, width, height, bins)
+
+    def get_roi(self):
+        start_x, start_y, width, height, _ = self._roi
+        return start_x, start_y, width, height
+
+    def get_bin(self):
+        return self._roi[4]
+
+    # -- snapshot exposures ------------------------------------------------------
+
+    def start_exposure(self, is_dark=False):
+        self._check_open()
+        with self._lock:
+            exposure = self._values[ASI_EXPOSURE] / 1000000.0
+            self._exposure_settings = (exposure, self._values[ASI_GAIN])
+            self._exposure_end = time.monotonic() + exposure * self.spec.exposure_scale
+            self._exposure_failed = self.sensor.rng.random() < self.spec.failure_rate
+
+    def stop_exposure(self):
+        self._exposure_end = None
+
+    def get_exposure_status(self):
+        self._check_open()
+        if self._exposure_end is None:
+            return ASI_EXP_IDLE
+        if time.monotonic() < self._exposure_end:
+            return ASI_EXP_WORKING
+        return ASI_EXP_FAILED if self._exposure_failed else ASI_EXP_SUCCESS
+
+    def get_data_after_exposure(self, buffer_=None):
+        status = self.get_exposure_status()
+        if status != ASI_EXP_SUCCESS:
+            raise ZWO_CaptureError('Could not download image', status)
+        self._exposure_end = None
+        exposure, gain = self._exposure_settings
+        return self._read_frame(exposure, gain, buffer_)
+
+    # -- video mode --------------------------------------------------------------
+
+    def start_video_capture(self):
+        self._check_open()
+        self._video_running = True
+        self._next_video_frame = time.monotonic() + self._frame_interval()
+
+    def stop_video_capture(self):
+        self._video_running = False
+
+    def get_video_data(self, timeout=None, buffer_=None):
+        self._check_open()
+        if not self._video_running:
+            raise ZWO_IOError('Video capture not started', 13)
+        with self._lock:
+            exposure = self._values[ASI_EXPOSURE] / 1000000.0
+            gain = self._values[ASI_GAIN]
+        if timeout is None:
+            timeout = int(exposure * 2000) + 500
+
+        now = time.monotonic()
+        interval = self._frame_interval()
+        if self.sensor.rng.random() < self.spec.video_timeout_rate:
+            time.sleep(timeout / 1000.0)
+            raise ZWO_IOError('Timeout', 11)
+        if now > self._next_video_frame + interval:
+            # Frames the camera delivered while nobody was reading are lost
+            missed = int((now - self._next_video_frame) / interval)
+            self._dropped_frames += missed
+            self._next_video_frame += missed * interval
+        wait = self._next_video_frame - now
+        if wait > timeout / 1000.0:
+            time.sleep(timeout / 1000.0)
+            raise ZWO_IOError('Timeout', 11)
+        if wait > 0:
+            time.sleep(wait)
+        self._next_video_frame += interval
+        return self._read_frame(exposure, gain, buffer_, readout=False)
+
+    def get_dropped_frames(self):
+        return self._dropped_frames
+
+    # -- lifecycle ---------------------------------------------------------------
+
+    def close(self):
+        self._video_running = False
+        self.closed = True
+
+    def _frame_interval(self):
+        exposure = self._values[ASI_EXPOSURE] / 1000000.0
+        return max(exposure * self.spec.exposure_scale, self.spec.readout_seconds, 0.0001)
+
+    def _check_open(self):
+        if self.closed:
+            raise ZWO_IOError('Camera closed', 4)
+        if self.spec.disconnect_after is not None and self.frames >= self.spec.disconnect_after:
+            raise ZWO_IOError('Camera closed', 4)
+
+    def _read_frame(self, exposure, gain, buffer_, readout=True):
+        self._check_open()
+        if readout and self.spec.readout_seconds:
+            time.sleep(self.spec.readout_seconds)
+        data = self.sensor.render(exposure, gain, self._roi, self._image_type)
+        self.frames += 1
+        if buffer_ is None:
+            return bytearray(data)
+        if len(buffer_) != len(data):
+            raise ValueError(f'Buffer must be {len(data)} bytes')
+        buffer_[:] = data
+        return buffer_
@@ -0,0 +1,224 @@
+"""
+Process pool for directory-watch image processing
+
+Stretching, overlays and encoding are numpy/PIL heavy and largely hold the
+GIL, so a burst of files from NINA is processed in worker processes instead
+of threads. Each worker loads the overlay config, fonts and overlay images
+once (in its initializer) and opens the source file itself, so no pixels are
+sent to it. The processed frame comes back through a shared memory block
+rather than being pickled through the result pipe.
+
+Results are delivered in the order the files arrived, whatever order the
+workers finish in.
+"""
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from PIL import Image
+
+from .processor import process_image, warm_overlay_caches
+from .logger import app_logger
+
+
+# Shared memory blocks a worker keeps open until the parent has attached
+# (on Windows a block disappears once every handle to it is closed)
+_SHARED_BLOCKS_KEPT = 4
+
+# Per-worker state, set by _init_worker in each process
+_worker_config = None
+_worker_image_cache = None
+_worker_blocks = deque()
+
+
+class ConfigSnapshot:
+    """Read-only stand-in for Config inside worker processes"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def get_overlays(self):
+        return self.data.get("overlays", [])
+
+
+def export_image(img):
+    """
+    Copy a PIL image into a new shared memory block.
+
+    The block is left for the receiving process to unlink (import_image).
+
+    Returns:
+        Descriptor dict (name, shape, dtype, mode)
+    """
+    array = np.asarray(img)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    if os.name == 'posix':
+        # The receiver unlinks the block; stop this process's tracker doing it too
+        resource_tracker.unregister(block._name, 'shared_memory')
+
+    _worker_blocks.append(block)
+    while len(_worker_blocks) > _SHARED_BLOCKS_KEPT:
+        _worker_blocks.popleft().close()
+
+    return {'name': block.name, 'shape': array.shape, 'dtype': array.dtype.str, 'mode': img.mode}
+
+
+def import_image(descriptor):
+    """
+    Rebuild a PIL image from an export_image descriptor and free the block.
+
+    Returns:
+        PIL Image owning its own copy of the pixels
+    """
+    block = shared_memory.SharedMemory(name=descriptor['name'])
+    try:
+        array = np.ndarray(descriptor['shape'], dtype=np.dtype(descriptor['dtype']),
+                           buffer=block.buf).copy()
+    finally:
+        block.close()
+        block.unlink()
+    return Image.fromarray(array, mode=descriptor['mode'])
+
+
+def _init_worker(config_data):
+    """Worker initializer: load config, fonts and overlay images once per process"""
+    global _worker_config, _worker_image_cache
+    _worker_config = ConfigSnapshot(config_data)
+    _worker_image_cache = {}
+    warm_overlay_caches(_worker_config.get_overlays(), _worker_image_cache)
+
+
+def _process_in_worker(filepath):
+    """
+    Process one file in a worker process.
+
+    Returns:
+        Tuple of (success, output_path, error, shared image descriptor or None)
+    """
+    success, output_path, error, processed_img = process_image(
+        filepath, _worker_config, image_cache=_worker_image_cache)
+    frame = export_image(processed_img) if success and processed_img is not None else None
+    return success, output_path, error, frame
+
+
+class OrderedDelivery:
+    """Hands results to a callback in ticket (arrival) order"""
+
+    def __init__(self, deliver):
+        """
+        Args:
+            deliver: Called with each result tuple, in ticket order
+        """
+        self._deliver = deliver
+        self._next_ticket = 0
+        self._next_delivery = 0
+        self._ready = {}
+        self._lock = threading.Lock()
+        self._delivery_lock = threading.Lock()
+
+    def reserve(self):
+        """Take the next ticket (call when the file arrives)"""
+        with self._lock:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            return ticket
+
+    def complete(self, ticket, result):
+        """Store a ticket's result and deliver everything that is now in order"""
+        with self._lock:
+            self._ready[ticket] = result
+        self._drain()
+
+    def skip(self, ticket):
+        """Release a ticket that will never produce a result"""
+        self.complete(ticket, None)
+
+    @property
+    def pending(self):
+        """Tickets reserved but not yet delivered"""
+        with self._lock:
+            return self._next_ticket - self._next_delivery
+
+    def _drain(self):
+        with self._delivery_lock:
+            while True:
+                with self._lock:
+                    if self._next_delivery not in self._ready:
+                        return
+                    result = self._ready.pop(self._next_delivery)
+                    self._next_delivery += 1
+                if result is None:
+                    continue
+                try:
+                    self._deliver(*result)
+                except Exception as e:
+                    app_logger.error(f"Error delivering processed image: {e}")
+
+
+class WatchProcessPool:
+    """Process pool that processes watched files and returns results in arrival order"""
+
+    def __init__(self, config, workers=2, on_result=None):
+        """
+        Args:
+            config: Config object (or dict); snapshotted when the pool starts
+            workers: Number of worker processes
+            on_result: Called as on_result(filepath, success, output_path, error, processed_img)
+        """
+        self.config = config
+        self.workers = max(1, int(workers))
+        self.on_result = on_result
+        self.executor = None
+        self._ordered = OrderedDelivery(self._deliver)
+
+    def start(self):
+        """Start the worker processes"""
+        config_data = dict(getattr(self.config, 'data', self.config))
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(config_data,))
+        app_logger.info(f"Watch processing pool started ({self.workers} worker processes)")
+
+    def reserve(self):
+        """Reserve the delivery slot for a newly arrived file"""
+        return self._ordered.reserve()
+
+    def skip(self, ticket):
+        """Give up a reserved slot (file skipped or timed out)"""
+        self._ordered.skip(ticket)
+
+    @property
+    def pending(self):
+        """Files reserved or in flight but not yet delivered"""
+        return self._ordered.pending
+
+    def submit(self, ticket, filepath):
+        """Queue a file for processing in a worker"""
+        future = self.executor.submit(_process_in_worker, filepath)
+        future.add_done_callback(lambda f: self._on_done(ticket, filepath, f))
+
+    def shutdown(self, wait=True):
+        """Stop the workers (waiting for queued files by default)"""
+        if self.executor:
+            self.executor.shutdown(wait=wait)
+            self.executor = None
+            app_logger.debug("Watch processing pool shut down")
+
+    def _on_done(self, ticket, filepath, future):
+        # Attach to the shared block right away, before the worker recycles its handle
+        try:
+            success, output_path, error, frame = future.result()
+            processed_img = import_image(frame) if frame is not None else None
+        except Exception as e:
+            success, output_path, error, processed_img = False, None, str(e), None
+        self._ordered.complete(ticket, (filepath, success, output_path, error, processed_img))
+
+    def _deliver(self, filepath, success, output_path, error, processed_img):
+        if self.on_result:
+            self.on_result(filepath, success, output_path, error, processed_img)
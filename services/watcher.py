@@ -8,6 +8,7 @@ from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from .processor import process_image
+from .watch_pool import WatchProcessPool
 from .cleanup import run_cleanup
 from .logger import app_logger
 
@@ -21,8 +22,19 @@ class ImageFileHandler(FileSystemEventHandler):
         self.on_image_processed = on_image_processed
         self.processing = set()  # Track files being processed
         self.lock = threading.Lock()
+        
+        # Process mode: stretch/overlay/encode run in worker processes (GIL-bound work),
+        # threads only wait for files to finish writing
+        self.process_pool = None
+        max_threads = 2
+        if config.get('watch_processing_mode', 'thread') == 'process':
+            workers = config.get('watch_workers', 2)
+            self.process_pool = WatchProcessPool(config, workers, on_result=self._on_pool_result)
+            self.process_pool.start()
+            max_threads = max(2, self.process_pool.workers * 2)
+        
         # Thread pool for concurrent file processing (REL-002 fix)
-        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="file_processor")
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="file_processor")
     
     def update_status(self, message):
         """Update status via callback"""
@@ -61,13 +73,22 @@ class ImageFileHandler(FileSystemEventHandler):
         
         return False
     
-    def process_file(self, filepath):
-        """Process a single image file"""
+    def process_file(self, filepath, ticket=None):
+        """
+        Process a single image file
+        
+        Args:
+            filepath: Image file path
+            ticket: Delivery slot from the process pool (process mode only)
+        """
         with self.lock:
             if filepath in self.processing:
+                if ticket is not None:
+                    self.process_pool.skip(ticket)
                 return  # Already processing
             self.processing.add(filepath)
         
+        handed_off = False
         try:
             filename = os.path.basename(filepath)
             self.update_status(f"Detected: {filename}")
@@ -80,32 +101,59 @@ class ImageFileHandler(FileSystemEventHandler):
             
             # Process the image
             self.update_status(f"Processing: {filename}")
-            success, output_path, error, processed_img = process_image(filepath, self.config)
+            if ticket is not None:
+                # Result comes back through _on_pool_result, in arrival order
+                self.process_pool.submit(ticket, filepath)
+                handed_off = True
+                return
             
-            if success:
-                self.update_status(f"✓ Saved: {os.path.basename(output_path)}")
-                
-                # Notify callback with both path and image
-                if self.on_image_processed:
-                    self.on_image_processed(output_path, processed_img)
-                
-                # Run cleanup if enabled
-                if self.config.get('cleanup_enabled', False):
-                    cleanup_success, cleanup_msg = run_cleanup(self.config)
-                    if cleanup_success:
-                        self.update_status(f"Cleanup: {cleanup_msg}")
-                    else:
-                        self.update_status(f"Cleanup error: {cleanup_msg}")
-            else:
-                self.update_status(f"✗ Error processing {filename}: {error}")
+            success, output_path, error, processed_img = process_image(filepath, self.config)
+            self._handle_result(filepath, success, output_path, error, processed_img)
         
         except Exception as e:
             self.update_status(f"✗ Exception processing {filepath}: {e}")
         
+        finally:
+            if not handed_off:
+                if ticket is not None:
+                    self.process_pool.skip(ticket)
+                with self.lock:
+                    self.processing.discard(filepath)
+    
+    def _on_pool_result(self, filepath, success, output_path, error, processed_img):
+        """Result from the process pool (delivered in arrival order)"""
+        try:
+            self._handle_result(filepath, success, output_path, error, processed_img)
+        except Exception as e:
+            self.update_status(f"✗ Exception processing {filepath}: {e}")
         finally:
             with self.lock:
                 self.processing.discard(filepath)
     
+    def _handle_result(self, filepath, success, output_path, error, processed_img):
+        """Report a processed file, notify the callback and run cleanup"""
+        if success:
+            self.update_status(f"✓ Saved: {os.path.basename(output_path)}")
+            
+            # Notify callback with both path and image
+            if self.on_image_processed:
+                self.on_image_processed(output_path, processed_img)
+            
+            # Run cleanup if enabled
+            if self.config.get('cleanup_enabled', False):
+                cleanup_success, cleanup_msg = run_cleanup(self.config)
+                if cleanup_success:
+                    self.update_status(f"Cleanup: {cleanup_msg}")
+                else:
+                    self.update_status(f"Cleanup error: {cleanup_msg}")
+        else:
+            self.update_status(f"✗ Error processing {os.path.basename(filepath)}: {error}")
+    
+    def _submit(self, filepath):
+        """Queue a file; in process mode its delivery order is fixed now, on arrival"""
+        ticket = self.process_pool.reserve() if self.process_pool else None
+        self.executor.submit(self.process_file, filepath, ticket)
+    
     def on_created(self, event):
         """Called when a file is created"""
         if event.is_directory:
@@ -116,7 +164,7 @@ class ImageFileHandler(FileSystemEventHandler):
         # Check if it's an image file (PNG for now)
         if filepath.lower().endswith('.png'):
             # Submit to thread pool instead of spawning new thread (limits concurrent processing)
-            self.executor.submit(self.process_file, filepath)
+            self._submit(filepath)
     
     def on_modified(self, event):
         """Called when a file is modified - we'll also catch files here"""
@@ -131,7 +179,7 @@ class ImageFileHandler(FileSystemEventHandler):
             with self.lock:
                 if filepath not in self.processing:
                     # Submit to thread pool instead of spawning new thread
-                    self.executor.submit(self.process_file, filepath)
+                    self._submit(filepath)
 
 
     def shutdown(self):
@@ -143,6 +191,12 @@ class ImageFileHandler(FileSystemEventHandler):
                 app_logger.debug("File processing thread pool shut down")
         except Exception as e:
             app_logger.debug(f"Error shutting down thread pool: {e}")
+        
+        try:
+            if self.process_pool:
+                self.process_pool.shutdown(wait=True)
+        except Exception as e:
+            app_logger.debug(f"Error shutting down process pool: {e}")
 
 
 class FileWatcher:
@@ -181,6 +235,10 @@ class FileWatcher:
             self.observer.join()
             self.observer = None
         
+        if self.handler:
+            self.handler.shutdown()
+            self.handler = None
+        
         app_logger.info("Stopped watching")
     
     def is_running(self):
@@ -6,29 +6,79 @@ Provides endpoints for NINA and other remote applications to fetch latest frame.
 import os
 import io
 import json
-import hashlib
 import threading
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from collections import namedtuple
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime
 from .logger import app_logger
+from .image_variants import VariantCache, make_etag, etag_matches, normalize_format
+from .live_stream import Broadcaster, LiveEvent
+from .hls_output import PLAYLIST_NAME
 
 
-class ImageHTTPHandler(BaseHTTPRequestHandler):
-    """HTTP request handler for serving images and status."""
+# Saved file extension -> content type served as-is
+FILE_CONTENT_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+}
+
+
+# Seconds between keep-alive comments on an idle /events stream
+SSE_KEEPALIVE_SEC = 15
+MJPEG_BOUNDARY = 'frame'
+
+
+# URL prefix of the per-camera endpoints: /cam/<name>/latest, /cam/<name>/status, ...
+CAMERA_PREFIX = '/cam/'
+
+
+# Snapshot of the frame being served; replaced as a whole so a request never
+# mixes the bytes of one frame with the ETag of another
+LatestImage = namedtuple('LatestImage', 'data content_type etag path')
+
+
+# Metadata values published in /status and /events as they are
+JSON_VALUE_TYPES = (str, int, float, bool, dict, list, tuple)
+
+
+def json_metadata(metadata):
+    """Plain dict of the JSON-safe metadata values (a Frame or dict; image arrays are dropped)"""
+    return {key: value for key, value in metadata.items()
+            if value is None or isinstance(value, JSON_VALUE_TYPES)}
+
+
+class ImageChannel:
+    """
+    Latest image, encoded variants and live streams of one camera.
     
-    # Class-level variables shared between all handler instances
-    latest_image_path = None
-    latest_image_data = None
-    latest_image_content_type = 'image/jpeg'  # Default to JPEG
-    latest_image_etag = None  # PERF-002: ETag for caching support
-    latest_metadata = {}
-    server_start_time = None
-    image_count = 0
+    The server's own endpoints are served from the default channel; in
+    multi-camera mode each camera publishes to its own channel, served under
+    /cam/<name>/ with the same endpoint paths.
+    """
     
-    @classmethod
-    def update_image(cls, image_data: bytes, content_type: str, path: str = None, metadata: dict = None):
+    def __init__(self, name=None, jpeg_quality=85, max_stream_clients=32):
+        """
+        Args:
+            name: Camera name in the URL (None for the default channel)
+            jpeg_quality: JPEG quality for the pre-encoded image variants
+            max_stream_clients: Concurrent MJPEG + SSE clients allowed on this channel
+        """
+        self.name = name
+        self.latest_image = None  # LatestImage
+        self.latest_metadata = {}
+        self.image_count = 0
+        self.variants = VariantCache(jpeg_quality=jpeg_quality)  # Pre-encoded sizes/formats
+        self.broadcaster = Broadcaster(max_stream_clients)  # Feeds the MJPEG and /events streams
+        self._status_prefix = None  # Pre-serialized /status JSON (without uptime/timestamp)
+        self._update_lock = threading.Lock()
+        self._refresh_status()
+    
+    def update_image(self, image_data: bytes, content_type: str, path: str = None, metadata: dict = None,
+                     image=None):
         """
         Update the latest image with ETag generation.
         PERF-002: Centralized image update with caching support.
@@ -37,20 +87,112 @@ class ImageHTTPHandler(BaseHTTPRequestHandler):
             image_data: Raw image bytes
             content_type: MIME type (e.g., 'image/jpeg')
             path: Optional file path for logging
-            metadata: Optional metadata dict
+            metadata: Optional metadata dict or Frame (published without its image arrays)
+            image: Optional PIL Image of the same frame (source for the encoded variants)
         """
-        cls.latest_image_data = image_data
-        cls.latest_image_content_type = content_type
-        cls.latest_image_path = path
+        # Built before the swap: a bad metadata value must not drop the image
+        status_metadata = None
         if metadata:
-            cls.latest_metadata = metadata
-        # Generate ETag from content hash for cache validation
-        cls.latest_image_etag = hashlib.md5(image_data).hexdigest()
-        cls.image_count += 1
+            try:
+                status_metadata = json_metadata(metadata)
+            except Exception as e:
+                app_logger.warning(f"Image metadata not published: {e}")
+        with self._update_lock:
+            # Generate ETag from content hash for cache validation
+            if self.variants is not None:
+                self.variants.update(image_data, content_type, image)
+                etag = self.variants.primary.etag
+            else:
+                etag = make_etag(image_data)
+            if status_metadata is not None:
+                self.latest_metadata = status_metadata
+            self.image_count += 1
+            self.latest_image = LatestImage(image_data, content_type, etag, path)
+            self._refresh_status()
+            if self.broadcaster is not None:
+                self.broadcaster.publish(self._live_event())
+    
+    def clear_image(self):
+        """Forget the latest image (requests get 404 until the next update)"""
+        with self._update_lock:
+            self.latest_image = None
+            self._refresh_status()
+    
+    def close(self):
+        """End open streams and stop background encoding"""
+        if self.broadcaster is not None:
+            # Ends the MJPEG / SSE streams so their threads exit
+            self.broadcaster.close()
+            self.broadcaster = None
+        if self.variants is not None:
+            self.variants.close()
+            self.variants = None
+    
+    def _refresh_status(self):
+        """Serialize the /status fields that only change with a new image"""
+        latest = self.latest_image
+        status = {
+            "server": "PFR Sentinel HTTP Server",
+            "status": "running",
+            "images_served": self.image_count,
+            "latest_image": (latest.path if latest else None) or "None",
+            "metadata": self.latest_metadata,
+        }
+        if self.name is not None:
+            status["camera"] = self.name
+        self._status_prefix = json.dumps(status, default=str)[:-1]  # Drop closing brace
+    
+    def _live_event(self):
+        """LiveEvent for the current image, with its SSE message encoded once for all clients"""
+        latest = self.latest_image
+        data = json.dumps({
+            "seq": self.image_count,
+            "etag": latest.etag,
+            "content_type": latest.content_type,
+            "latest_image": latest.path or "None",
+            "metadata": self.latest_metadata,
+        }, default=str)
+        sse = f"id: {self.image_count}\nevent: frame\ndata: {data}\n\n".encode('utf-8')
+        return LiveEvent(self.image_count, latest, sse)
+
+
+class ImageHTTPHandler(BaseHTTPRequestHandler):
+    """HTTP request handler for serving images and status."""
+    
+    # HTTP/1.1 keep-alive: pollers reuse their connection between requests
+    protocol_version = 'HTTP/1.1'
+    # Idle keep-alive connections are closed after this many seconds
+    timeout = 30
+    # Small responses (304, status) go out immediately
+    disable_nagle_algorithm = True
+    
+    # Class-level variables shared between all handler instances
+    channel = None  # Default ImageChannel (set by WebOutputServer)
+    cameras = {}  # Camera name -> ImageChannel served under CAMERA_PREFIX (WebOutputServer.add_camera)
+    hls = None  # HLSSegmentRing filled by the stream encoder (WebOutputServer.attach_hls)
+    server_start_time = None
+    
+    @classmethod
+    def update_image(cls, image_data: bytes, content_type: str, path: str = None, metadata: dict = None,
+                     image=None):
+        """Update the default channel's image (see ImageChannel.update_image)"""
+        if cls.channel is not None:
+            cls.channel.update_image(image_data, content_type, path, metadata, image)
+    
+    @classmethod
+    def clear_image(cls):
+        """Forget the latest image (requests get 404 until the next update)"""
+        for channel in [cls.channel] + list(cls.cameras.values()):
+            if channel is not None:
+                channel.clear_image()
     
     def log_message(self, format, *args):
-        """Override to use our logger instead of stderr."""
-        app_logger.info(f"HTTP {self.address_string()} - {format % args}")
+        """Override to use our logger instead of stderr (debug level: one line per request)."""
+        app_logger.debug(f"HTTP {self.address_string()} - {format % args}")
+    
+    def log_error(self, format, *args):
+        """Log request errors (bad requests, timeouts) at warning level."""
+        app_logger.warning(f"HTTP {self.address_string()} - {format % args}")
     
     def do_GET(self):
         """Handle GET requests."""
@@ -67,12 +209,31 @@ class ImageHTTPHandler(BaseHTTPRequestHandler):
         if query_params:
             app_logger.debug(f"Query params: {query_params}")
         
+        # Per-camera namespace: the same endpoints under /cam/<name>/
+        self.image_channel = self.channel
+        camera = None
+        if clean_path.startswith(CAMERA_PREFIX):
+            camera, _, rest = clean_path[len(CAMERA_PREFIX):].partition('/')
+            self.image_channel = self.cameras.get(camera)
+            if self.image_channel is None:
+                self.send_error(404, f"Unknown camera. Available: {', '.join(sorted(self.cameras)) or 'none'}")
+                return
+            clean_path = '/' + rest
+        
         if clean_path == config_path:
-            self._serve_image()
+            self._serve_image(query_params)
         elif clean_path == status_path:
             self._serve_status()
+        elif clean_path == self.server.stream_path:
+            self._serve_mjpeg(query_params)
+        elif clean_path == self.server.events_path:
+            self._serve_events()
+        elif camera is None and clean_path.startswith(self.server.hls_path + '/'):
+            self._serve_hls(clean_path[len(self.server.hls_path) + 1:])
         else:
-            self.send_error(404, f"Path not found. Available: {config_path}, {status_path}")
+            self.send_error(404, f"Path not found. Available: {config_path}, {status_path}, "
+                                 f"{self.server.stream_path}, {self.server.events_path}, "
+                                 f"{self.server.hls_path}/{PLAYLIST_NAME}")
     
     def do_OPTIONS(self):
         """Handle OPTIONS requests for CORS preflight."""
@@ -83,9 +244,16 @@ class ImageHTTPHandler(BaseHTTPRequestHandler):
         self.send_header("Content-Length", "0")
         self.end_headers()
     
-    def _serve_image(self):
-        """Serve the latest processed image with ETag caching support."""
-        if not self.latest_image_data:
+    def _serve_image(self, query_params=None):
+        """
+        Serve the latest processed image with ETag caching support.
+        
+        Query parameters select a pre-encoded variant: ?w=<width> (rounded up
+        to the nearest cached width) and ?fmt=jpeg|webp|png.
+        """
+        channel = self.image_channel
+        latest = channel.latest_image
+        if latest is None:
             try:
                 self.send_error(404, "No image available yet")
             except (ConnectionAbortedError, BrokenPipeError):
@@ -93,24 +261,190 @@ class ImageHTTPHandler(BaseHTTPRequestHandler):
                 pass
             return
         
+        query_params = query_params or {}
+        if channel.variants is None or not ('w' in query_params or 'fmt' in query_params):
+            self._send_image(latest.data, latest.content_type, latest.etag)
+            return
+        
+        width = self._requested_width(query_params)
+        if width is False:
+            return
+        fmt = None
+        if 'fmt' in query_params:
+            fmt = normalize_format(query_params['fmt'][0])
+            if fmt is None:
+                self.send_error(406, "Unsupported fmt (use jpeg, webp or png)")
+                return
+        
+        try:
+            variant = channel.variants.get(width, fmt)
+        except Exception as e:
+            app_logger.error(f"Error encoding image variant: {e}")
+            self.send_error(500, "Could not encode image variant")
+            return
+        if variant is None:
+            self.send_error(404, "No image available yet")
+            return
+        self._send_image(variant.data, variant.content_type, variant.etag)
+    
+    def _requested_width(self, query_params):
+        """?w= as an int (None if absent); sends 400 and returns False if invalid"""
+        if 'w' not in query_params:
+            return None
+        try:
+            width = int(query_params['w'][0])
+            if width > 0:
+                return width
+        except ValueError:
+            pass
+        self.send_error(400, "w must be a positive integer")
+        return False
+    
+    def _subscribe(self, broadcaster):
+        """Subscription to the live broadcast; sends 503 and returns None when unavailable"""
+        subscription = broadcaster.subscribe() if broadcaster is not None else None
+        if subscription is None:
+            self.send_error(503, "Too many live stream clients")
+        return subscription
+    
+    def _start_stream(self, content_type):
+        """Headers for an open-ended streaming response (connection closes when it ends)"""
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", "no-cache, no-store")
+        self.send_header("Connection", "close")
+        self.send_header("X-Accel-Buffering", "no")  # Don't let reverse proxies buffer the stream
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+    
+    def _serve_mjpeg(self, query_params):
+        """
+        Stream frames as multipart/x-mixed-replace JPEG (MJPEG).
+        
+        Every client gets the same cached JPEG bytes (?w= selects a reduced
+        size); a client that falls behind skips to the newest frame.
+        """
+        width = self._requested_width(query_params)
+        if width is False:
+            return
+        channel = self.image_channel
+        broadcaster = channel.broadcaster
+        subscription = self._subscribe(broadcaster)
+        if subscription is None:
+            return
+        
+        try:
+            self._start_stream(f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}")
+            while True:
+                event = subscription.next(timeout=SSE_KEEPALIVE_SEC)
+                if subscription.closed:
+                    break
+                if event is None:
+                    continue
+                if channel.variants is not None:
+                    frame = channel.variants.get(width, 'jpeg')
+                elif event.image.content_type == 'image/jpeg':
+                    frame = event.image
+                else:
+                    continue
+                header = (f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                          f"Content-Length: {len(frame.data)}\r\n\r\n").encode('ascii')
+                self.wfile.write(header)
+                self.wfile.write(memoryview(frame.data))
+                self.wfile.write(b"\r\n")
+        except OSError as e:
+            # Client disconnected or stalled past the socket timeout
+            app_logger.debug(f"MJPEG client disconnected: {e.__class__.__name__}")
+        except Exception as e:
+            app_logger.error(f"Error streaming MJPEG: {e}")
+        finally:
+            broadcaster.unsubscribe(subscription)
+    
+    def _serve_events(self):
+        """
+        Stream a Server-Sent Event for every published frame.
+        
+        Each event carries the frame's sequence number, ETag and metadata;
+        clients fetch the image itself from the image endpoint.
+        """
+        broadcaster = self.image_channel.broadcaster
+        subscription = self._subscribe(broadcaster)
+        if subscription is None:
+            return
+        
+        try:
+            self._start_stream("text/event-stream")
+            self.wfile.write(b"retry: 2000\n\n")
+            while True:
+                event = subscription.next(timeout=SSE_KEEPALIVE_SEC)
+                if subscription.closed:
+                    break
+                # Keep-alive comment on idle streams (also detects gone clients)
+                self.wfile.write(event.sse if event is not None else b": keepalive\n\n")
+        except OSError as e:
+            app_logger.debug(f"SSE client disconnected: {e.__class__.__name__}")
+        except Exception as e:
+            app_logger.error(f"Error streaming events: {e}")
+        finally:
+            broadcaster.unsubscribe(subscription)
+    
+    def _serve_hls(self, name):
+        """
+        Serve the HLS playlist or one of its segments from memory.
+        
+        The playlist changes with every segment and must be revalidated;
+        segment names are never reused, so segments can be cached.
+        """
+        hls = self.hls
+        if hls is None:
+            self.send_error(404, "HLS output not enabled")
+            return
+        
+        if name == PLAYLIST_NAME:
+            data = hls.playlist
+            content_type = "application/vnd.apple.mpegurl"
+            cache_control = "no-cache"
+        else:
+            data = hls.segment(name)
+            content_type = "video/mp2t"
+            cache_control = f"public, max-age={max(hls.segment_lifetime, 1)}, immutable"
+        if data is None:
+            self.send_error(404, "HLS segment not available")
+            return
+        
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", len(data))
+            self.send_header("Cache-Control", cache_control)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(memoryview(data))
+        except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError) as e:
+            app_logger.debug(f"Client disconnected during HLS transfer: {e.__class__.__name__}")
+        except Exception as e:
+            app_logger.error(f"Error serving HLS: {e}")
+    
+    def _send_image(self, data, content_type, etag):
+        """Send image bytes, or 304 when the client's If-None-Match matches etag."""
         try:
             # PERF-002: Check If-None-Match header for ETag-based caching
-            client_etag = self.headers.get('If-None-Match')
-            if client_etag and client_etag == self.latest_image_etag:
+            if etag_matches(self.headers.get('If-None-Match'), etag):
                 # Client has current version - return 304 Not Modified
                 self.send_response(304)
-                self.send_header("ETag", self.latest_image_etag)
+                self.send_header("ETag", etag)
                 self.send_header("Access-Control-Allow-Origin", "*")
                 self.end_headers()
                 app_logger.debug(f"Served 304 Not Modified (ETag match)")
                 return
             
             self.send_response(200)
-            self.send_header("Content-Type", self.latest_image_content_type)
-            self.send_header("Content-Length", len(self.latest_image_data))
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", len(data))
             # Include ETag for cache validation
-            if self.latest_image_etag:
-                self.send_header("ETag", self.latest_image_etag)
+            if etag:
+                self.send_header("ETag", etag)
             self.send_header("Cache-Control", "no-cache, must-revalidate")  # Allow conditional requests
             self.send_header("Pragma", "no-cache")
             self.send_header("Expires", "0")
@@ -119,8 +453,8 @@ class ImageHTTPHandler(BaseHTTPRequestHandler):
             self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
             self.send_header("Access-Control-Allow-Headers", "Content-Type, If-None-Match")
             self.end_headers()
-            self.wfile.write(self.latest_image_data)
-            app_logger.debug(f"Served image: {len(self.latest_image_data)} bytes ({self.latest_image_content_type})")
+            self.wfile.write(memoryview(data))  # Cached bytes go to the socket without copying
+            app_logger.debug(f"Served image: {len(data)} bytes ({content_type})")
         except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError) as e:
             # Client disconnected - this is normal, don't log as error
             app_logger.debug(f"Client disconnected during image transfer: {e.__class__.__name__}")
@@ -128,31 +462,26 @@ class ImageHTTPHandler(BaseHTTPRequestHandler):
             app_logger.error(f"Error serving image: {e}")
     
     def _serve_status(self):
-        """Serve server status as JSON."""
+        """Serve server status as JSON (pre-serialized; only uptime and timestamp added per request)."""
         uptime = 0
         if self.server_start_time:
             uptime = int(time.time() - self.server_start_time)
         
-        status = {
-            "server": "PFR Sentinel HTTP Server",
-            "status": "running",
-            "uptime_seconds": uptime,
-            "images_served": self.image_count,
-            "latest_image": self.latest_image_path or "None",
-            "metadata": self.latest_metadata,
-            "timestamp": datetime.now().isoformat()
-        }
+        body = f'{self.image_channel._status_prefix}, "uptime_seconds": {uptime}, "timestamp": "{datetime.now().isoformat()}"}}'.encode('utf-8')
         
         try:
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", len(body))
             self.send_header("Cache-Control", "no-cache")
             # CORS headers for cross-origin requests
             self.send_header("Access-Control-Allow-Origin", "*")
             self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
             self.send_header("Access-Control-Allow-Headers", "Content-Type")
             self.end_headers()
-            self.wfile.write(json.dumps(status, indent=2).encode('utf-8'))
+            self.wfile.write(body)
+        except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError) as e:
+            app_logger.debug(f"Client disconnected during status transfer: {e.__class__.__name__}")
         except Exception as e:
             app_logger.error(f"Error serving status: {e}")
 
@@ -160,7 +489,8 @@ class ImageHTTPHandler(BaseHTTPRequestHandler):
 class WebOutputServer:
     """Manages HTTP server for serving latest processed images."""
     
-    def __init__(self, host='0.0.0.0', port=8080, image_path='/latest', status_path='/status'):
+    def __init__(self, host='0.0.0.0', port=8080, image_path='/latest', status_path='/status', jpeg_quality=85,
+                 stream_path='/stream', events_path='/events', max_stream_clients=32, hls_path='/hls'):
         """
         Initialize web server.
         
@@ -169,11 +499,21 @@ class WebOutputServer:
             port: Port to listen on
             image_path: URL path for image endpoint
             status_path: URL path for status endpoint
+            jpeg_quality: JPEG quality for the pre-encoded image variants
+            stream_path: URL path for the MJPEG live stream
+            events_path: URL path for the Server-Sent Events stream
+            max_stream_clients: Concurrent MJPEG + SSE clients allowed
+            hls_path: URL prefix for the HLS playlist and segments (see attach_hls)
         """
         self.host = host
         self.port = port
         self.image_path = image_path
         self.status_path = status_path
+        self.stream_path = stream_path
+        self.events_path = events_path
+        self.hls_path = hls_path.rstrip('/')
+        self.max_stream_clients = max_stream_clients
+        self.jpeg_quality = jpeg_quality
         self.server = None
         self.server_thread = None
         self.running = False
@@ -185,14 +525,20 @@ class WebOutputServer:
             return False
         
         try:
-            # Create server
-            self.server = HTTPServer((self.host, self.port), ImageHTTPHandler)
+            # Create server (one thread per connection, so a slow or idle
+            # keep-alive client doesn't hold up the others)
+            self.server = ThreadingHTTPServer((self.host, self.port), ImageHTTPHandler)
+            self.server.daemon_threads = True
             self.server.config_path = self.image_path
             self.server.status_path = self.status_path
+            self.server.stream_path = self.stream_path
+            self.server.events_path = self.events_path
+            self.server.hls_path = self.hls_path
             
             # Set class variables
             ImageHTTPHandler.server_start_time = time.time()
-            ImageHTTPHandler.image_count = 0
+            ImageHTTPHandler.channel = ImageChannel(None, self.jpeg_quality, self.max_stream_clients)
+            ImageHTTPHandler.cameras = {}
             
             # Start in daemon thread
             self.server_thread = threading.Thread(target=self._run_server, daemon=True)
@@ -204,6 +550,8 @@ class WebOutputServer:
             app_logger.info(f"Web server started on http://{self.host}:{actual_port}")
             app_logger.info(f"  - Image endpoint: http://{self.host}:{actual_port}{self.image_path}")
             app_logger.info(f"  - Status endpoint: http://{self.host}:{actual_port}{self.status_path}")
+            app_logger.info(f"  - MJPEG stream: http://{self.host}:{actual_port}{self.stream_path}")
+            app_logger.info(f"  - Event stream: http://{self.host}:{actual_port}{self.events_path}")
             return True
             
         except OSError as e:
@@ -234,45 +582,106 @@ class WebOutputServer:
         try:
             app_logger.info("Stopping web server...")
             self.running = False
+            channels = [ImageHTTPHandler.channel] + list(ImageHTTPHandler.cameras.values())
+            for channel in channels:
+                if channel is not None:
+                    channel.close()  # Ends the MJPEG / SSE streams so their threads exit
             if self.server:
                 self.server.shutdown()
                 self.server.server_close()
             if self.server_thread:
                 self.server_thread.join(timeout=2.0)
+            ImageHTTPHandler.hls = None
             app_logger.info("Web server stopped")
         except Exception as e:
             app_logger.error(f"Error stopping web server: {e}")
     
-    def update_image(self, image_path, image_data_bytes, metadata=None, content_type='image/jpeg'):
+    def add_camera(self, name):
+        """
+        Serve a camera's images under /cam/<name>/ (multi-camera mode).
+        
+        Args:
+            name: URL-safe camera name
+            
+        Returns:
+            The camera's ImageChannel
+        """
+        channel = ImageHTTPHandler.cameras.get(name)
+        if channel is None:
+            channel = ImageChannel(name, self.jpeg_quality, self.max_stream_clients)
+            # Replaced as a whole so request threads never see a dict being resized
+            ImageHTTPHandler.cameras = dict(ImageHTTPHandler.cameras, **{name: channel})
+            if self.running and self.server:
+                app_logger.info(f"  - Camera '{name}': {self.get_url(camera=name)}")
+        return channel
+    
+    def update_image(self, image_path, image_data_bytes, metadata=None, content_type='image/jpeg', image=None,
+                     camera=None):
         """
         Update the latest image to serve.
         
         Args:
             image_path: Path to the saved image file (for reference)
-            image_data_bytes: Image data as bytes (JPEG or PNG)
-            metadata: Optional dict with image metadata
+            image_data_bytes: Image data as bytes (JPEG or PNG), e.g. the file already written to disk
+            metadata: Optional dict or Frame with image metadata
             content_type: MIME type (default: 'image/jpeg')
+            image: Optional PIL Image of the same frame; the other sizes/formats are encoded
+                   from it in the background (otherwise decoded from image_data_bytes)
+            camera: Camera name to publish under /cam/<name>/ (None = default endpoints)
         """
         if not self.running:
             return
         
         try:
+            channel = self.add_camera(camera) if camera else ImageHTTPHandler.channel
             # PERF-002: Use centralized update method with ETag generation
-            ImageHTTPHandler.update_image(
+            channel.update_image(
                 image_data=image_data_bytes,
                 content_type=content_type,
                 path=image_path,
-                metadata=metadata
+                metadata=metadata,
+                image=image
             )
             app_logger.debug(f"Web server updated with new image: {os.path.basename(image_path)} ({len(image_data_bytes)} bytes, {content_type})")
         except Exception as e:
             app_logger.error(f"Error updating web server image: {e}")
     
-    def get_url(self):
-        """Get the full URL for the image endpoint."""
+    def update_image_from_file(self, image_path, metadata=None, image=None, camera=None):
+        """
+        Serve an image file that was already encoded to disk, without re-encoding it.
+        
+        Args:
+            image_path: Path to the saved JPEG/PNG/WebP file
+            metadata: Optional dict or Frame with image metadata
+            image: Optional PIL Image of the same frame (source for the other variants)
+            camera: Camera name to publish under /cam/<name>/ (None = default endpoints)
+            
+        Returns:
+            True if the file was read and published, False otherwise (caller should encode)
+        """
+        if not self.running:
+            return False
+        
+        content_type = FILE_CONTENT_TYPES.get(os.path.splitext(image_path)[1].lower())
+        if content_type is None:
+            return False
+        try:
+            with open(image_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            app_logger.debug(f"Could not read saved image for web server: {e}")
+            return False
+        
+        self.update_image(image_path, data, metadata=metadata, content_type=content_type, image=image,
+                          camera=camera)
+        return True
+    
+    def get_url(self, camera=None):
+        """Get the full URL for the image endpoint (of a camera, in multi-camera mode)."""
         if self.running and self.server:
             actual_port = self.server.server_port
-            return f"http://{self.host}:{actual_port}{self.image_path}"
+            prefix = f"{CAMERA_PREFIX}{camera}" if camera else ""
+            return f"http://{self.host}:{actual_port}{prefix}{self.image_path}"
         return None
     
     def get_status_url(self):
@@ -281,3 +690,33 @@ class WebOutputServer:
             actual_port = self.server.server_port
             return f"http://{self.host}:{actual_port}{self.status_path}"
         return None
+    
+    def get_stream_url(self):
+        """Get the full URL for the MJPEG stream endpoint."""
+        if self.running and self.server:
+            actual_port = self.server.server_port
+            return f"http://{self.host}:{actual_port}{self.stream_path}"
+        return None
+    
+    def get_events_url(self):
+        """Get the full URL for the Server-Sent Events endpoint."""
+        if self.running and self.server:
+            actual_port = self.server.server_port
+            return f"http://{self.host}:{actual_port}{self.events_path}"
+        return None
+    
+    def attach_hls(self, ring):
+        """
+        Serve an HLSSegmentRing under hls_path (playlist at <hls_path>/stream.m3u8).
+        
+        Args:
+            ring: HLSSegmentRing filled by the stream encoder, or None to detach
+        """
+        ImageHTTPHandler.hls = ring
+    
+    def get_hls_url(self):
+        """Get the full URL for the HLS playlist (when HLS is attached)."""
+        if self.running and self.server and ImageHTTPHandler.hls is not None:
+            actual_port = self.server.server_port
+            return f"http://{self.host}:{actual_port}{self.hls_path}/{PLAYLIST_NAME}"
+        return None
@@ -11,19 +11,35 @@ import numpy as np
 from datetime import datetime
 from PIL import Image
 from .camera_utils import (
-    simple_debayer_rggb, 
-    is_within_scheduled_window as check_scheduled_window,
     debayer_raw_image,
     apply_white_balance,
     calculate_image_stats
 )
+from .color_balance import BayerWhiteBalance
+from .debayer import bayer_sample, to_uint8
 from .camera_calibration import CameraCalibration
 from .camera_connection import CameraConnection
+from .frame import Frame
+from .frame_pool import FramePool
+from .capture_pipeline import CapturePipeline, StageTimings
+from .video_capture import VideoCaptureEngine, use_video_mode
+from .capture_profiles import DEFAULT_PROFILE
+from .capture_schedule import CaptureSchedule
 
 
 class ZWOCamera:
     """Interface to ZWO ASI camera using zwoasi library"""
     
+    # Recalibration rate limits (e.g., someone turning lights on/off repeatedly)
+    RECALIBRATION_COOLDOWN_SEC = 60  # Minimum 60 seconds between recalibrations
+    MAX_RECALIBRATIONS_PER_WINDOW = 3  # Max 3 recalibrations per 10-minute window
+    RECALIBRATION_WINDOW_SEC = 600  # 10-minute window
+    
+    STAGE_TIMING_LOG_INTERVAL_SEC = 300
+    
+    # Bayer cells skipped between samples used for auto exposure and white balance (1/16 of the frame)
+    METER_STRIDE = 4
+    
     def __init__(self, sdk_path=None, camera_index=0, exposure_sec=1.0, gain=100,
                  white_balance_r=75, white_balance_b=99, offset=20, flip=0,
                  auto_exposure=False, max_exposure_sec=30.0, auto_wb=False,
@@ -54,6 +70,8 @@ class ZWOCamera:
         self.exposure_seconds = exposure_sec
         self.gain = gain
         self.capture_interval = 5.0  # Seconds between captures
+        self.cadence_governor = None  # CadenceGovernor stretching the interval while the scene is stable
+        self.qos_governor = None  # QoSGovernor shedding optional processing when frames fall behind
         self.auto_exposure = auto_exposure
         self.max_exposure = max_exposure_sec  # Max exposure for auto mode
         self.target_brightness = 100  # Target brightness for auto exposure
@@ -61,20 +79,50 @@ class ZWOCamera:
         self.exposure_percentile = 75  # Use 75th percentile (focuses on brighter areas)
         self.clipping_threshold = 245  # Consider pixels > this value as clipped
         self.clipping_prevention = True  # Prevent further exposure increase if clipping detected
+        self.calibration_solver = 'model'  # 'model' (fits the sensor response) or 'legacy'
+        self.exposure_priors = None  # ExposurePriorTable (kept across reconnects; None = off)
+        self.exposure_context = None  # Callable() -> sun_altitude/moon_illumination/roof_open dict
         self.white_balance_r = white_balance_r
         self.white_balance_b = white_balance_b
         self.auto_wb = auto_wb
         self.wb_mode = wb_mode  # 'asi_auto', 'manual', or 'gray_world'
         self.wb_config = wb_config if wb_config else {'mode': wb_mode}  # Full WB config
+        self.bayer_white_balance = BayerWhiteBalance()  # Cached gains for WB on the raw mosaic
         self.flip = flip  # 0=none, 1=horizontal, 2=vertical, 3=both
         self.offset = offset
         self.bayer_pattern = bayer_pattern  # RGGB, BGGR, GRBG, GBRG
         self.use_raw16 = False  # Use RAW16 mode for full bit depth (set by dev mode)
+        self.preserve_raw = False  # Keep the mosaic pre-white-balance (dev-mode raw saves, ML input)
+        
+        # Preallocated capture buffers (created on first capture, sized from the ROI)
+        self.frame_pool_slots = 3
+        self._frame_pool = None
+        
+        # Pipelined capture: overlap the next exposure with processing of the previous frame
+        self.pipelined = False
+        self.pipeline_queue_size = 2  # Raw frames waiting for processing before the oldest is dropped
+        self.capture_pipeline = None
+        self.stage_timings = StageTimings()
+        self._last_timing_log = 0.0
+        self._recalibration_requested = threading.Event()
+        self._recalibration_state = {'last_time': 0, 'count': 0, 'window_start': time.time()}
+        
+        # Binning/ROI profile for captured frames ('full' to publish, 'ml' for ML-only use);
+        # calibration switches to its own binned profiles
+        self.capture_profile = DEFAULT_PROFILE
+        
+        # Video-mode (continuous readout) capture for short exposures
+        self.capture_mode = 'snapshot'  # 'snapshot', 'video', or 'auto' (video up to video_max_exposure)
+        self.video_max_exposure = 1.0  # Seconds
+        self._video = None
         
         # Scheduled capture settings
         self.scheduled_capture_enabled = scheduled_capture_enabled
         self.scheduled_start_time = scheduled_start_time  # Format: "HH:MM"
         self.scheduled_end_time = scheduled_end_time      # Format: "HH:MM"
+        self.capture_schedule = CaptureSchedule(scheduled_capture_enabled, scheduled_start_time,
+                                                scheduled_end_time)  # Replaced for sun-altitude windows
+        self._schedule_wake = threading.Event()  # Wakes a sleeping capture loop (stop/new schedule)
         
         # Exposure tracking for UI
         self.exposure_start_time = None
@@ -166,14 +214,10 @@ class ZWOCamera:
     def is_within_scheduled_window(self):
         """
         Check if current time is within the scheduled capture window.
-        Handles overnight captures (e.g., 17:00 - 09:00).
+        Handles overnight captures (e.g., 17:00 - 09:00) and sun-altitude windows.
         Returns True if scheduled capture is disabled or if within window.
         """
-        return check_scheduled_window(
-            self.scheduled_capture_enabled,
-            self.scheduled_start_time,
-            self.scheduled_end_time
-        )
+        return self.capture_schedule.is_active()
     
     def initialize_sdk(self):
         """Initialize the ZWO ASI SDK (delegates to connection manager)"""
@@ -257,8 +301,8 @@ class ZWOCamera:
             self._init_calibration_manager()
             
             self.log(f"✓ Camera connection successful")
-            if self.scheduled_capture_enabled:
-                self.log(f"Scheduled capture enabled: {self.scheduled_start_time} - {self.scheduled_end_time}")
+            if self.capture_schedule.enabled:
+                self.log(f"Scheduled capture enabled: {self.capture_schedule.describe()}")
         
         return success
     
@@ -280,8 +324,32 @@ class ZWOCamera:
             algorithm=self.exposure_algorithm,
             percentile=self.exposure_percentile,
             clipping_threshold=self.clipping_threshold,
-            clipping_prevention=self.clipping_prevention
+            clipping_prevention=self.clipping_prevention,
+            solver=self.calibration_solver
         )
+        self.calibration_manager.select_profile = self._select_calibration_profile
+        self.calibration_manager.exposure_priors = self.exposure_priors
+        self.calibration_manager.context_provider = self.exposure_context
+    
+    def _select_calibration_profile(self, profile):
+        """Apply a binned calibration profile; returns the frame (width, height)"""
+        geometry = self._use_capture_profile(profile)
+        return geometry.width, geometry.height
+    
+    def _use_capture_profile(self, profile):
+        """
+        Apply a capture profile's binning and ROI before the next exposure.
+        
+        Returns:
+            CaptureGeometry in effect
+        """
+        current = self._connection.capture_geometry
+        if current is not None and current.profile == profile:
+            return current
+        self._stop_video_capture()  # The stream cannot change ROI while running
+        geometry = self._connection.apply_capture_profile(profile)
+        self.log(f"Capture profile '{geometry.profile}': {geometry.width}x{geometry.height} bin {geometry.bins}")
+        return geometry
     
     def _configure_camera(self):
         """Configure camera settings (delegates to connection manager)"""
@@ -319,23 +387,18 @@ class ZWOCamera:
             return False
         
         try:
+            # The video stream cannot change image type while running
+            self._stop_video_capture()
+            
             # Update our setting
             self.use_raw16 = enabled
             
-            # Get camera info for ROI
-            camera_info = self.camera.get_camera_property()
-            width = camera_info['MaxWidth']
-            height = camera_info['MaxHeight']
-            
-            # Set new image type
+            # Set new image type (ROI re-applied for the current capture profile)
             image_type = self.asi.ASI_IMG_RAW16 if enabled else self.asi.ASI_IMG_RAW8
-            self.camera.set_roi(start_x=0, start_y=0, width=width, height=height, 
-                               bins=1, image_type=image_type)
-            self.camera.set_image_type(image_type)
-            
-            # Update connection manager state
             self._connection.current_image_type = image_type
             self._connection.current_bit_depth = 16 if enabled else 8
+            self._connection.apply_capture_profile(self.capture_profile, force=True)
+            self.camera.set_image_type(image_type)
             
             # Update calibration manager bit depth
             if self.calibration_manager:
@@ -356,6 +419,9 @@ class ZWOCamera:
             self.log("Stopping active capture before disconnect...")
             self.stop_capture()
         
+        # Leave video mode before the camera goes away
+        self._stop_video_capture()
+        
         # Create callback to stop exposure before disconnect
         def stop_exposure_callback():
             if self.exposure_start_time is not None:
@@ -374,22 +440,56 @@ class ZWOCamera:
         # Clear exposure tracking
         self.exposure_start_time = None
         self.exposure_remaining = 0.0
+        
+        # Release pooled capture buffers
+        self._frame_pool = None
+    
+    @property
+    def video_active(self):
+        """True while frames are read from the camera's video stream"""
+        return self._video is not None and self._video.running
+    
+    def _stop_video_capture(self):
+        """Leave video mode (before snapshots, calibration, ROI changes or disconnect)"""
+        video, self._video = self._video, None
+        if video is not None:
+            video.stop()
     
     def capture_single_frame(self):
         """Capture a single frame and return image + metadata"""
+        return self.develop_frame(self.expose_frame())
+    
+    def expose_frame(self):
+        """
+        Expose and read out one frame (the camera-bound half of a capture).
+        
+        Returns:
+            dict with the pooled 'frame' slot, raw 'data', 'camera_info',
+            'temp_info' and the exposure settings used, for develop_frame()
+        """
         if not self.camera:
             raise Exception("Camera not connected")
         
+        if use_video_mode(self.capture_mode, self.exposure_seconds, self.video_max_exposure,
+                          self.video_active):
+            return self._grab_video_frame()
+        self._stop_video_capture()
+        
         try:
+            # Binning/ROI for this frame's use
+            geometry = self._use_capture_profile(self.capture_profile)
+            
             # Update exposure and gain
-            self.camera.set_control_value(self.asi.ASI_EXPOSURE, int(self.exposure_seconds * 1000000))
-            self.camera.set_control_value(self.asi.ASI_GAIN, self.gain)
+            exposure_seconds = self.exposure_seconds
+            gain = self.gain
+            self.camera.set_control_value(self.asi.ASI_EXPOSURE, int(exposure_seconds * 1000000))
+            self.camera.set_control_value(self.asi.ASI_GAIN, gain)
             
             # Capture frame
             self.camera.start_exposure()
             
             # Wait for exposure to complete
-            timeout = self.exposure_seconds + 5.0
+            timeout = exposure_seconds + 5.0
             start_time = time.time()
             self.exposure_start_time = start_time
             
@@ -408,83 +508,216 @@ class ZWOCamera:
                 
                 # Update remaining time for UI
                 elapsed = time.time() - start_time
-                self.exposure_remaining = max(0, self.exposure_seconds - elapsed)
+                self.exposure_remaining = max(0, exposure_seconds - elapsed)
                 time.sleep(0.05)
             
             # Check if we timed out
             if time.time() - start_time >= timeout:
                 self.exposure_remaining = 0.0
                 self.exposure_start_time = None
-                raise Exception(f"Exposure timeout: camera did not complete {self.exposure_seconds}s exposure within {timeout}s")
+                raise Exception(f"Exposure timeout: camera did not complete {exposure_seconds}s exposure within {timeout}s")
             
             # Reset exposure tracking
             self.exposure_remaining = 0.0
             self.exposure_start_time = None
+            self.stage_timings.record('expose', time.time() - start_time)
             
-            # Get the image data
-            img_data = self.camera.get_data_after_exposure()
+            with self.stage_timings.measure('readout'):
+                # Get camera info
+                camera_info = self.camera.get_camera_property()
+                
+                # Read the image data straight into a pooled buffer
+                frame = self._acquire_frame_buffers(geometry.width, geometry.height)
+                img_data = self.camera.get_data_after_exposure(frame.raw)
+                
+                # Get temperature
+                temp_info = self._get_temperature()
             
-            # Get camera info
+            return {
+                'frame': frame,
+                'data': img_data,
+                'camera_info': camera_info,
+                'temp_info': temp_info,
+                'exposure_seconds': exposure_seconds,
+                'gain': gain,
+                'bit_depth': self.current_bit_depth,
+                'geometry': geometry,
+                'captured_at': datetime.now(),
+            }
+        
+        except Exception as e:
+            self.log(f"ERROR capturing frame: {e}")
+            raise
+    
+    def _grab_video_frame(self):
+        """
+        Take the newest frame from the video stream (started on first use).
+        
+        Returns:
+            Same dict as expose_frame()
+        """
+        try:
+            geometry = self._use_capture_profile(self.capture_profile)
+            exposure_seconds = self.exposure_seconds
+            gain = self.gain
             camera_info = self.camera.get_camera_property()
-            width = camera_info['MaxWidth']
-            height = camera_info['MaxHeight']
             
-            # Get temperature
-            temp_info = self._get_temperature()
+            if self._video is None:
+                self._video = VideoCaptureEngine(
+                    self.camera, self.asi,
+                    lambda: self._acquire_frame_buffers(geometry.width, geometry.height),
+                    log=self.log)
+                self._video.start(exposure_seconds, gain)
+            else:
+                self._video.apply_settings(exposure_seconds, gain)
+            
+            with self.stage_timings.measure('expose'):
+                video_frame = self._video.grab()
+            
+            with self.stage_timings.measure('readout'):
+                temp_info = self._get_temperature()
+            
+            return {
+                'frame': video_frame.slot,
+                'data': video_frame.data,
+                'camera_info': camera_info,
+                'temp_info': temp_info,
+                'exposure_seconds': video_frame.exposure_seconds,
+                'gain': video_frame.gain,
+                'bit_depth': self.current_bit_depth,
+                'geometry': geometry,
+                'captured_at': datetime.now(),
+            }
+        
+        except Exception as e:
+            self.log(f"ERROR capturing video frame: {e}")
+            self._stop_video_capture()
+            raise
+    
+    def develop_frame(self, raw):
+        """
+        Turn an exposed frame into an RGB image and metadata (no camera access,
+        safe to run on a processing thread while the next exposure runs).
+        
+        Args:
+            raw: dict returned by expose_frame()
+        
+        Returns:
+            Tuple of (PIL Image, Frame metadata)
+        """
+        try:
+            frame = raw['frame']
+            camera_info = raw['camera_info']
+            temp_info = raw['temp_info']
+            bit_depth = raw['bit_depth']
+            geometry = raw['geometry']
+            width = geometry.width
+            height = geometry.height
+            captured_at = raw['captured_at']
+            
+            # White balance and metering on the raw mosaic: one strided sample
+            # feeds the gray world estimate and auto exposure, the gains touch
+            # each CFA site once instead of every RGB channel. RAW16 and
+            # preserve_raw (dev mode, ML) balance in RGB instead, so
+            # RAW_RGB_16BIT, the raw debug saves and the ML input keep the
+            # sensor's unbalanced values
+            bayer = np.frombuffer(raw['data'], dtype=np.uint16 if bit_depth == 16 else np.uint8)
+            bayer = bayer.reshape((height, width))
+            bayer_wb = (self.wb_config.get('bayer_domain', True) and bit_depth == 8
+                        and not self.preserve_raw)
+            sample_no_wb = None
+            with self.stage_timings.measure('white_balance'):
+                sample = bayer_sample(bayer, self.METER_STRIDE)
+                if bayer_wb and self.bayer_white_balance.update(sample, self.wb_config, self.bayer_pattern):
+                    sample_no_wb = sample.copy()  # Unbalanced source for the RAW histogram
+                    if not bayer.flags.writeable:
+                        bayer = bayer.copy()
+                    self.bayer_white_balance.apply(bayer, self.bayer_pattern)
+                    self.bayer_white_balance.apply(sample, self.bayer_pattern)
+                else:
+                    bayer_wb = False
+                meter_sample = to_uint8(sample) if bit_depth == 16 else sample
             
             # Convert raw Bayer to RGB using utility functions
             # Pass bit_depth for RAW16 mode support, request raw16 for dev mode
-            img_rgb, img_rgb_raw16 = debayer_raw_image(
-                img_data, width, height, self.bayer_pattern, 
-                bit_depth=self.current_bit_depth,
-                return_raw16=(self.current_bit_depth == 16)  # Get raw uint16 for RAW16 mode
-            )
-            img_rgb_no_wb = img_rgb.copy()  # 8-bit pre-WB version for display
-            img_rgb = apply_white_balance(img_rgb, self.wb_config)
+            with self.stage_timings.measure('debayer'):
+                img_rgb, img_rgb_raw16 = debayer_raw_image(
+                    bayer, width, height, self.bayer_pattern, 
+                    bit_depth=bit_depth,
+                    return_raw16=(bit_depth == 16),  # Get raw uint16 for RAW16 mode
+                    buffers=frame
+                )
+            if bayer_wb:
+                img_rgb_no_wb = None  # Balanced before debayering, no pre-WB RGB exists
+            else:
+                img_rgb_no_wb = img_rgb  # 8-bit pre-WB version for display (pooled, not copied)
+                with self.stage_timings.measure('white_balance'):
+                    img_rgb = apply_white_balance(img_rgb, self.wb_config, out=frame.rgb)
             img = Image.fromarray(img_rgb, mode='RGB')
             
             # Calculate image statistics using utility function
-            stats = calculate_image_stats(np.array(img))
+            with self.stage_timings.measure('stats'):
+                stats = calculate_image_stats(img_rgb)
             
-            # Build metadata dictionary
-            metadata = {
-                'CAMERA': camera_info['Name'],
-                'EXPOSURE': f"{self.exposure_seconds}s",
-                'GAIN': str(self.gain),
-                'TEMP': temp_info['display'],
-                'TEMPERATURE': temp_info['display'],
-                'TEMP_C': temp_info['celsius_str'],
-                'TEMP_F': temp_info['fahrenheit_str'],
-                'RES': f"{width}x{height}",
-                'CAPTURE AREA SIZE': f"{width} * {height}",
-                'FILENAME': f"capture_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
-                'SESSION': datetime.now().strftime('%Y-%m-%d'),
-                'DATETIME': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'BRIGHTNESS': f"{stats['mean']:.1f}",
-                'MEAN': f"{stats['mean']:.1f}",
-                'MEDIAN': f"{stats['median']:.1f}",
-                'MIN': f"{stats['min']}",
-                'MAX': f"{stats['max']}",
-                'STD_DEV': f"{stats['std_dev']:.2f}",
-                'P25': f"{stats['p25']:.1f}",
-                'P75': f"{stats['p75']:.1f}",
-                'P95': f"{stats['p95']:.1f}",
-                'RAW_RGB_NO_WB': img_rgb_no_wb,  # Pre-white-balance RGB (uint8) for display
-                'RAW_RGB_16BIT': img_rgb_raw16,  # Full uint16 RGB for dev mode (None if RAW8)
-                # Camera sensor info for proper FITS saving
-                'CAMERA_BIT_DEPTH': camera_info.get('BitDepth', 8),  # ADC bit depth (e.g., 12)
-                'IMAGE_BIT_DEPTH': self.current_bit_depth,  # Current capture mode (RAW8=8, RAW16=16)
-                'BAYER_PATTERN': self.bayer_pattern,
-                'PIXEL_SIZE': camera_info.get('PixelSize', 0),
-                'ELEC_PER_ADU': camera_info.get('ElecPerADU', 1.0),
-            }
+            # Next interval from how much the scene changed
+            if self.cadence_governor is not None:
+                self.cadence_governor.observe(meter_sample, stats['mean'], raw['exposure_seconds'], raw['gain'])
+            
+            # Frame metadata: numeric fields and pooled views, token strings formatted on demand
+            metadata = Frame(
+                captured_at=captured_at,
+                camera=camera_info['Name'],
+                exposure_seconds=raw['exposure_seconds'],
+                gain=raw['gain'],
+                temperature_c=temp_info.get('celsius'),
+                width=width,
+                height=height,
+                bit_depth=bit_depth,  # Current capture mode (RAW8=8, RAW16=16)
+                camera_bit_depth=camera_info.get('BitDepth', 8),  # ADC bit depth (e.g., 12), for FITS saving
+                bayer_pattern=self.bayer_pattern,
+                pixel_size=camera_info.get('PixelSize', 0),
+                binning=geometry.bins,
+                profile=geometry.profile,
+                elec_per_adu=camera_info.get('ElecPerADU', 1.0),
+                stats=stats,
+                interval=self.next_capture_interval(),
+                rgb_no_wb=img_rgb_no_wb,  # Pre-white-balance RGB (uint8) for display (None if balanced as Bayer)
+                rgb16=img_rgb_raw16,  # Full uint16 RGB for dev mode (None if RAW8)
+                meter_sample=meter_sample,  # Balanced 8-bit Bayer sample for auto exposure
+                sample_no_wb=sample_no_wb,  # Pre-white-balance Bayer sample (None unless balanced as Bayer)
+                extra={'STAGE_TIMINGS': self.stage_timings.snapshot()}  # Per-stage ms (count/last/avg/max)
+            )
+            if self.cadence_governor is not None:
+                metadata['CADENCE'] = self.cadence_governor.stats()  # Interval and per-night savings
             
             return img, metadata
         
         except Exception as e:
-            self.log(f"ERROR capturing frame: {e}")
+            self.log(f"ERROR processing frame: {e}")
             raise
     
+    def _acquire_frame_buffers(self, width, height):
+        """
+        Get capture buffers for the next frame, (re)building the pool when the
+        frame geometry or bit depth changes.
+        
+        Returns:
+            FrameSlot from the pool
+        """
+        bit_depth = self.current_bit_depth
+        if self._frame_pool is None or not self._frame_pool.matches(width, height, bit_depth):
+            slots = self.frame_pool_slots
+            if self.pipelined:
+                # Queued raw frames + the one being developed + the one being exposed
+                slots = max(slots, self.pipeline_queue_size + 2)
+            if self._video is not None:
+                slots += 1  # Newest video frame waiting to be taken
+            self._frame_pool = FramePool(width, height, bit_depth, slots=slots,
+                                         max_slots=max(6, slots + 2))
+            self.log(f"Frame pool: {len(self._frame_pool)} x {width}x{height} {bit_depth}-bit "
+                     f"({self._frame_pool.nbytes / (1024 * 1024):.0f} MB)")
+        return self._frame_pool.acquire()
+    
     def _get_temperature(self):
         """Get camera temperature info as dict"""
         try:
@@ -492,18 +725,19 @@ class ZWOCamera:
             temp_celsius = temp_value / 10.0
             temp_fahrenheit = (temp_celsius * 9/5) + 32
             return {
+                'celsius': temp_celsius,
                 'display': f"{temp_celsius:.1f} C",
                 'celsius_str': f"{temp_celsius:.1f}°C",
                 'fahrenheit_str': f"{temp_fahrenheit:.1f}°F"
             }
         except:
-            return {'display': "N/A", 'celsius_str': "N/A", 'fahrenheit_str': "N/A"}
+            return {'celsius': None, 'display': "N/A", 'celsius_str': "N/A", 'fahrenheit_str': "N/A"}
     
     def capture_loop(self):
         """Background capture loop with automatic recovery and scheduled capture support"""
         self.log("=== Capture Loop Started ===")
-        if self.scheduled_capture_enabled:
-            self.log(f"Scheduled capture enabled: {self.scheduled_start_time} - {self.scheduled_end_time}")
+        if self.capture_schedule.enabled:
+            self.log(f"Scheduled capture enabled: {self.capture_schedule.describe()}")
         else:
             self.log("Scheduled capture disabled: will run continuously")
         
@@ -513,12 +747,22 @@ class ZWOCamera:
         
         # Recalibration rate limiting to prevent infinite loops
         # (e.g., someone turning lights on/off repeatedly)
-        last_recalibration_time = 0
-        recalibration_cooldown_sec = 60  # Minimum 60 seconds between recalibrations
-        recalibration_count = 0  # Count recalibrations in current window
-        recalibration_window_start = time.time()
-        max_recalibrations_per_window = 3  # Max 3 recalibrations per 10-minute window
-        recalibration_window_sec = 600  # 10-minute window
+        recalibration_state = {
+            'last_time': 0,
+            'count': 0,  # Count recalibrations in current window
+            'window_start': time.time(),
+        }
+        self._recalibration_state = recalibration_state
+        self._recalibration_requested.clear()
+        
+        # Pipelined mode: this thread only exposes, a processing thread develops and publishes
+        pipeline = None
+        if self.pipelined:
+            pipeline = CapturePipeline(self._process_pipelined_frame, maxsize=self.pipeline_queue_size,
+                                       timings=self.stage_timings, name="capture-processing")
+            pipeline.start()
+            self.capture_pipeline = pipeline
+            self.log(f"Pipelined capture enabled (queue size {pipeline.queue.maxsize}, drop-oldest)")
         
         try:
             # Run rapid calibration if auto exposure is enabled
@@ -541,7 +785,8 @@ class ZWOCamera:
                         # Outside scheduled window - disconnect camera to reduce load
                         current_status = "outside_window"
                         if last_schedule_log != current_status:
-                            self.log(f"⏸ Outside scheduled capture window ({self.scheduled_start_time} - {self.scheduled_end_time})")
+                            self.log(f"⏸ Outside scheduled capture window ({self.capture_schedule.describe()}), "
+                                     f"next start {self.capture_schedule.format_next_change()}")
                             self.log("Entering off-peak mode: disconnecting camera to reduce hardware load...")
                             last_schedule_log = current_status
                             
@@ -552,7 +797,8 @@ class ZWOCamera:
                                     was_capturing = self.is_capturing
                                     self.is_capturing = False
                                     
-                                    # Abort any in-progress exposure before disconnect
+                                    # Abort any in-progress exposure or video stream before disconnect
+                                    self._stop_video_capture()
                                     try:
                                         if self.exposure_start_time is not None:
                                             self.camera.stop_exposure()
@@ -570,15 +816,20 @@ class ZWOCamera:
                                     
                                     # Update UI status to reflect disconnection
                                     if self.status_callback:
-                                        self.status_callback(f"Idle (off-peak until {self.scheduled_start_time})")
+                                        self.status_callback(f"Idle (off-peak until {self.capture_schedule.format_next_change()})")
                                 except Exception as e:
                                     self.log(f"Error disconnecting camera: {e}")
                                     self.is_capturing = was_capturing  # Restore flag even on error
+                        
+                        # Sleep until the window opens, capture stops or the schedule changes (no clock polling)
+                        self._schedule_wake.clear()
+                        if self.is_capturing:
+                            self.capture_schedule.wait(self._schedule_wake)
                         continue
                     else:
                         # Within window - reconnect camera if needed
                         if last_schedule_log == "outside_window":
-                            self.log(f"▶ Entered scheduled capture window ({self.scheduled_start_time} - {self.scheduled_end_time})")
+                            self.log(f"▶ Entered scheduled capture window ({self.capture_schedule.describe()})")
                             self.log("Transitioning to active capture mode: reconnecting camera...")
                             last_schedule_log = "inside_window"
                             
@@ -595,11 +846,32 @@ class ZWOCamera:
                                     time.sleep(5)  # Wait before retrying
                                     continue
                                 self.log("✓ Camera reconnected successfully for scheduled captures")
+                            
+                            # Hours may have passed: start the window from a calibrated exposure
+                            if self.auto_exposure:
+                                self.run_calibration()
                     
                     # Check if camera is still connected
                     if not self.camera:
                         raise Exception("Camera disconnected")
                     
+                    # Recalibration requested by the processing thread (pipelined mode)
+                    if self._recalibration_requested.is_set():
+                        self._recalibration_requested.clear()
+                        self._run_recalibration(recalibration_state)
+                    
+                    if pipeline is not None:
+                        # Expose/read out only; develop + publish overlap the next exposure
+                        frame_start = time.time()
+                        pipeline.submit(self.expose_frame())
+                        consecutive_errors = 0
+                        self._check_dropped_frames()
+                        self._log_stage_timings()
+                        
+                        # Start-to-start cadence: processing time no longer adds to the interval
+                        self._pause(self.next_capture_interval() - (time.time() - frame_start))
+                        continue
+                    
                     # Capture frame
                     img, metadata = self.capture_single_frame()
                     
@@ -609,55 +881,15 @@ class ZWOCamera:
                     # Auto-adjust exposure based on image brightness
                     # Check if drastic brightness change requires recalibration
                     if self.auto_exposure:
-                        img_array = np.array(img)
-                        exposure_result = self.adjust_exposure_auto(img_array)
+                        exposure_result = self.adjust_exposure_auto(self._meter_array(img, metadata))
                         if exposure_result and exposure_result.get('needs_recalibration', False):
-                            current_time = time.time()
-                            
-                            # Reset recalibration window if expired
-                            if current_time - recalibration_window_start > recalibration_window_sec:
-                                recalibration_count = 0
-                                recalibration_window_start = current_time
-                            
-                            # Check rate limits before allowing recalibration
-                            time_since_last = current_time - last_recalibration_time
-                            can_recalibrate = (
-                                time_since_last >= recalibration_cooldown_sec and
-                                recalibration_count < max_recalibrations_per_window
-                            )
-                            
-                            if can_recalibrate:
-                                self.log(f"⚠ Drastic scene change detected - running rapid calibration")
-                                self.log(f"  (Recalibration {recalibration_count + 1}/{max_recalibrations_per_window} in current window)")
-                                
-                                # Notify calibration starting
-                                if self.on_calibration_callback:
-                                    self.on_calibration_callback(True)
-                                
-                                # Run rapid calibration to quickly find optimal exposure
-                                try:
-                                    self.run_calibration()
-                                    last_recalibration_time = time.time()
-                                    recalibration_count += 1
-                                except Exception as cal_error:
-                                    self.log(f"Recalibration error: {cal_error} - continuing with adjusted exposure")
-                                
-                                # Notify calibration complete
-                                if self.on_calibration_callback:
-                                    self.on_calibration_callback(False)
+                            if self._recalibration_allowed(recalibration_state):
+                                self._run_recalibration(recalibration_state)
                                 
                                 # Skip publishing this badly-exposed frame
                                 # Next iteration will capture with calibrated exposure
                                 continue
-                            else:
-                                # Rate limited - log why and continue with normal aggressive adjustment
-                                if time_since_last < recalibration_cooldown_sec:
-                                    wait_time = int(recalibration_cooldown_sec - time_since_last)
-                                    self.log(f"⚠ Scene change detected but recalibration on cooldown ({wait_time}s remaining)")
-                                else:
-                                    self.log(f"⚠ Scene change detected but max recalibrations reached ({max_recalibrations_per_window} per {recalibration_window_sec//60}min window)")
-                                self.log(f"  Using aggressive auto-exposure adjustment instead")
-                                # Don't skip frame - let normal aggressive adjustment handle it
+                            # Rate limited - don't skip frame, let normal aggressive adjustment handle it
                     
                     # Call callback with image and metadata
                     if self.on_frame_callback:
@@ -666,17 +898,10 @@ class ZWOCamera:
                     self.log(f"Captured frame: {metadata['FILENAME']}")
                     
                     # Check for dropped frames (helps diagnose USB bandwidth issues)
-                    try:
-                        dropped = self.camera.get_dropped_frames()
-                        if dropped > 0:
-                            self.log(f"⚠ USB performance warning: {dropped} dropped frames detected")
-                            self.log("  Consider: reducing bandwidth_overload, lowering frame rate, or checking USB connection")
-                    except Exception:
-                        pass  # Not all cameras/modes support dropped frame reporting
+                    self._check_dropped_frames()
                     
                     # Wait for next capture interval
-                    if self.is_capturing:  # Check again in case stopped during capture
-                        time.sleep(self.capture_interval)
+                    self._pause(self.next_capture_interval())
                 
                 except Exception as e:
                     consecutive_errors += 1
@@ -696,6 +921,7 @@ class ZWOCamera:
                         try:
                             # Clean up existing camera using connection manager
                             # This ensures proper cleanup via the thread-safe disconnect method
+                            self._stop_video_capture()
                             if self.camera:
                                 self.log("Cleaning up existing camera connection...")
                                 self._connection.disconnect()
@@ -735,12 +961,113 @@ class ZWOCamera:
         finally:
             # Ensure camera is properly stopped on all exit paths (normal, error, or thread interrupt)
             self.log("Capture loop exiting - cleaning up...")
-            # Note: We use snapshot mode (start_exposure/get_data_after_exposure)
-            # NOT video mode (start_video_capture/get_video_data)
+            if pipeline is not None:
+                pipeline.stop()
+                self.log(f"Processing stage stopped ({pipeline.processed} processed, "
+                         f"{pipeline.dropped} dropped while behind)")
+                self.capture_pipeline = None
+            # Video mode is only used while capturing; snapshot calibration and
+            # other camera users expect the camera idle
             # Camera cleanup is handled by disconnect_camera() which is called by stop_capture()
+            self._stop_video_capture()
         
         self.log("Capture loop stopped")
     
+    def _process_pipelined_frame(self, raw):
+        """Processing-thread half of pipelined capture: develop, auto-exposure, publish"""
+        img, metadata = self.develop_frame(raw)
+        
+        # Auto exposure lags one frame behind: the next exposure is already running
+        if self.auto_exposure:
+            exposure_result = self.adjust_exposure_auto(self._meter_array(img, metadata))
+            if exposure_result and exposure_result.get('needs_recalibration', False):
+                if self._recalibration_allowed(self._recalibration_state):
+                    # Calibration drives the camera, so it runs on the capture thread
+                    self._recalibration_requested.set()
+                    return
+        
+        if self.on_frame_callback:
+            with self.stage_timings.measure('publish'):
+                self.on_frame_callback(img, metadata)
+        
+        self.log(f"Captured frame: {metadata['FILENAME']}")
+    
+    @staticmethod
+    def _meter_array(img, metadata):
+        """Pixels auto exposure meters: the Bayer sample from develop_frame, else the image"""
+        sample = metadata.get('METER_SAMPLE')
+        return sample if sample is not None else np.asarray(img)
+    
+    def _recalibration_allowed(self, state):
+        """
+        Apply the recalibration rate limits, logging why a recalibration was refused.
+        
+        Args:
+            state: Rate limiting state dict owned by the capture loop
+        """
+        current_time = time.time()
+        
+        # Reset recalibration window if expired
+        if current_time - state['window_start'] > self.RECALIBRATION_WINDOW_SEC:
+            state['count'] = 0
+            state['window_start'] = current_time
+        
+        # Check rate limits before allowing recalibration
+        time_since_last = current_time - state['last_time']
+        if (time_since_last >= self.RECALIBRATION_COOLDOWN_SEC and
+                state['count'] < self.MAX_RECALIBRATIONS_PER_WINDOW):
+            return True
+        
+        # Rate limited - log why and continue with normal aggressive adjustment
+        if time_since_last < self.RECALIBRATION_COOLDOWN_SEC:
+            wait_time = int(self.RECALIBRATION_COOLDOWN_SEC - time_since_last)
+            self.log(f"⚠ Scene change detected but recalibration on cooldown ({wait_time}s remaining)")
+        else:
+            self.log(f"⚠ Scene change detected but max recalibrations reached ({self.MAX_RECALIBRATIONS_PER_WINDOW} per {self.RECALIBRATION_WINDOW_SEC//60}min window)")
+        self.log(f"  Using aggressive auto-exposure adjustment instead")
+        return False
+    
+    def _run_recalibration(self, state):
+        """Run a rapid recalibration after a drastic scene change (capture thread only)"""
+        self.log(f"⚠ Drastic scene change detected - running rapid calibration")
+        self.log(f"  (Recalibration {state['count'] + 1}/{self.MAX_RECALIBRATIONS_PER_WINDOW} in current window)")
+        
+        # Notify calibration starting
+        if self.on_calibration_callback:
+            self.on_calibration_callback(True)
+        
+        # Run rapid calibration to quickly find optimal exposure
+        try:
+            self.run_calibration()
+            state['last_time'] = time.time()
+            state['count'] += 1
+        except Exception as cal_error:
+            self.log(f"Recalibration error: {cal_error} - continuing with adjusted exposure")
+        
+        # Notify calibration complete
+        if self.on_calibration_callback:
+            self.on_calibration_callback(False)
+    
+    def _check_dropped_frames(self):
+        """Log USB dropped frames reported by the SDK"""
+        try:
+            dropped = self.camera.get_dropped_frames()
+            if dropped > 0:
+                self.log(f"⚠ USB performance warning: {dropped} dropped frames detected")
+                self.log("  Consider: reducing bandwidth_overload, lowering frame rate, or checking USB connection")
+        except Exception:
+            pass  # Not all cameras/modes support dropped frame reporting
+    
+    def _log_stage_timings(self):
+        """Periodically log per-stage timings and the current bottleneck"""
+        now = time.time()
+        if now - self._last_timing_log < self.STAGE_TIMING_LOG_INTERVAL_SEC:
+            return
+        self._last_timing_log = now
+        stage, avg = self.stage_timings.bottleneck()
+        if stage is not None:
+            self.log(f"Stage timings: {self.stage_timings.summary()} (bottleneck: {stage}, {avg * 1000:.0f}ms)")
+    
     def start_capture(self, on_frame_callback, on_log_callback=None):
         """Start continuous capture"""
         if self.is_capturing:
@@ -768,6 +1095,7 @@ class ZWOCamera:
         
         self.log("Stopping capture...")
         self.is_capturing = False
+        self._schedule_wake.set()  # Wake a capture loop sleeping outside the schedule window
         
         # Wait briefly for capture thread to finish
         if self.capture_thread and self.capture_thread.is_alive():
@@ -791,9 +1119,28 @@ class ZWOCamera:
         """Set gain value"""
         self.gain = max(0, min(600, int(gain)))
     
+    def set_capture_schedule(self, schedule):
+        """Replace the capture window (CaptureSchedule), waking a loop that sleeps outside the old one"""
+        self.capture_schedule = schedule
+        self._schedule_wake.set()
+    
     def set_capture_interval(self, seconds):
         """Set interval between captures"""
         self.capture_interval = max(1.0, seconds)
+        if self.cadence_governor is not None:
+            self.cadence_governor.set_base_interval(self.capture_interval)
+    
+    def next_capture_interval(self):
+        """Seconds until the next capture: the governed interval, or capture_interval when fixed"""
+        if self.cadence_governor is not None:
+            return self.cadence_governor.interval
+        return self.capture_interval
+    
+    def _pause(self, seconds):
+        """Sleep between captures; stop_capture cuts it short"""
+        self._schedule_wake.clear()
+        if self.is_capturing and seconds > 0:  # Check again in case stopped during capture
+            self._schedule_wake.wait(seconds)
     
     def update_exposure(self, exposure_seconds):
         """Update exposure setting and apply immediately to camera if connected"""
@@ -814,6 +1161,7 @@ class ZWOCamera:
         
         self.log("Starting rapid auto-exposure calibration...")
         self.calibration_mode = True
+        self._stop_video_capture()  # Calibration takes snapshot exposures
         
         # Notify UI that calibration is starting
         if self.on_calibration_callback:
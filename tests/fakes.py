@@ -0,0 +1,111 @@
+"""
+Camera fakes and synthetic frames shared by the capture tests
+"""
+import numpy as np
+
+from services.debayer import RED_SITES
+from services.exposure_solver import gain_factor
+from services.zwo_camera import ZWOCamera
+
+
+WB_MANUAL = {'mode': 'manual', 'apply_software_gains': True,
+             'manual_red_gain': 1.2, 'manual_blue_gain': 0.9}
+
+
+class FakeASI:
+    """Constants used by ZWOCamera.capture_single_frame"""
+    ASI_EXPOSURE = 1
+    ASI_GAIN = 0
+    ASI_TEMPERATURE = 8
+    ASI_EXP_IDLE = 0
+    ASI_EXP_WORKING = 1
+    ASI_EXP_SUCCESS = 2
+    ASI_EXP_FAILED = 3
+    ASI_IMG_RAW8 = 0
+    ASI_IMG_RAW16 = 2
+
+
+class FakeCamera:
+    """Minimal zwoasi.Camera stand-in that fills the caller's buffer"""
+
+    def __init__(self, width, height, bit_depth):
+        self.width, self.height, self.bit_depth = width, height, bit_depth
+        rng = np.random.default_rng(3)
+        dtype = np.uint16 if bit_depth == 16 else np.uint8
+        self.frame = rng.integers(0, np.iinfo(dtype).max, size=(height, width)).astype(dtype).tobytes()
+
+    def set_control_value(self, control, value):
+        pass
+
+    def get_control_value(self, control):
+        return [215, False]
+
+    def start_exposure(self):
+        pass
+
+    def get_exposure_status(self):
+        return FakeASI.ASI_EXP_SUCCESS
+
+    def get_data_after_exposure(self, buffer_=None):
+        if buffer_ is None:
+            return bytearray(self.frame)
+        buffer_[:] = self.frame
+        return buffer_
+
+    def get_camera_property(self):
+        return {'Name': 'Fake ASI', 'MaxWidth': self.width, 'MaxHeight': self.height, 'BitDepth': 12}
+
+    def set_roi(self, **kwargs):
+        pass
+
+    def stop_exposure(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_camera(width=160, height=120, bit_depth=8, wb_config=None):
+    """ZWOCamera wired to a FakeCamera"""
+    zwo = ZWOCamera(wb_config=wb_config or {'mode': 'asi_auto'})
+    zwo.camera = FakeCamera(width, height, bit_depth)
+    zwo.asi = FakeASI
+    zwo._connection.current_bit_depth = bit_depth
+    zwo.exposure_seconds = 0.001
+    return zwo
+
+
+class SceneCamera(FakeCamera):
+    """FakeCamera whose frame brightness follows a scene response to exposure"""
+
+    def __init__(self, scene, width=64, height=48):
+        super().__init__(width, height, 8)
+        self.scene = scene
+        self.exposure_us = 0
+        self.gain = 100
+        self.exposures = 0
+
+    def set_control_value(self, control, value):
+        if control == FakeASI.ASI_EXPOSURE:
+            self.exposure_us = value
+        elif control == FakeASI.ASI_GAIN:
+            self.gain = value
+
+    def get_data_after_exposure(self, buffer_=None):
+        self.exposures += 1
+        level = self.scene(self.exposure_us / 1000000, self.gain)
+        return np.full((self.height, self.width), round(level), dtype=np.uint8).tobytes()
+
+
+def response(exposure, gain=100, scale=2000.0, gamma=1.0, pedestal=0.0):
+    """Brightness of a scene: power law in collected signal, clipped at 255"""
+    return min(255.0, pedestal + scale * (exposure * gain_factor(gain) / gain_factor(100)) ** gamma)
+
+
+def uniform_mosaic(pattern, rgb, height=16, width=16, dtype=np.uint8):
+    """Mosaic of a flat colour laid out for the given pattern"""
+    red_y, red_x = RED_SITES[pattern]
+    mosaic = np.full((height, width), rgb[1], dtype=dtype)
+    mosaic[red_y::2, red_x::2] = rgb[0]
+    mosaic[1 - red_y::2, 1 - red_x::2] = rgb[2]
+    return mosaic
@@ -0,0 +1,157 @@
+"""
+Test white balance and auto-exposure metering on the raw Bayer mosaic
+"""
+import pytest
+import os
+import sys
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.color_balance import BayerWhiteBalance, bayer_gray_world_gains
+from services.debayer import bayer_sample, cfa_planes
+from tests.fakes import WB_MANUAL, make_camera, uniform_mosaic
+
+GRAY_WORLD = {'mode': 'gray_world', 'gray_world_low_pct': 5, 'gray_world_high_pct': 95,
+              'gray_world_refresh_frames': 3}
+
+
+def tinted_mosaic(level=100, pattern='RGGB', size=64, seed=0):
+    """Noisy grey scene seen through a warm (red-heavy, blue-weak) colour cast"""
+    rng = np.random.default_rng(seed)
+    mosaic = rng.integers(level - 20, level + 20, (size, size)).astype(np.float32)
+    red, _, _, blue = cfa_planes(mosaic, pattern)
+    red *= 1.5
+    blue *= 0.6
+    return np.clip(mosaic, 0, 255).astype(np.uint8)
+
+
+class TestBayerHelpers:
+    """Site views and strided samples"""
+
+    def test_cfa_planes_follow_pattern(self):
+        red, green_r, green_b, blue = cfa_planes(uniform_mosaic('GBRG', (200, 100, 20)), 'GBRG')
+
+        assert (red == 200).all() and (blue == 20).all()
+        assert (green_r == 100).all() and (green_b == 100).all()
+
+    def test_sample_keeps_whole_cells(self):
+        mosaic = uniform_mosaic('GRBG', (200, 100, 20), height=32, width=64)
+        sample = bayer_sample(mosaic, 4)
+
+        assert sample.shape == (8, 16)
+        np.testing.assert_array_equal(sample, uniform_mosaic('GRBG', (200, 100, 20), height=8, width=16))
+
+    def test_sample_is_a_copy(self):
+        mosaic = np.zeros((8, 8), np.uint8)
+        bayer_sample(mosaic, 1)[...] = 255
+
+        assert not mosaic.any()
+
+
+class TestBayerWhiteBalance:
+    """Gains estimated and applied per CFA site"""
+
+    def test_gray_world_neutralizes_cast(self):
+        red_gain, green_gain, blue_gain = bayer_gray_world_gains(tinted_mosaic(), 'RGGB')
+
+        assert red_gain * 1.5 == pytest.approx(green_gain, rel=0.03)
+        assert blue_gain * 0.6 == pytest.approx(green_gain, rel=0.03)
+
+    def test_manual_gains_touch_red_and_blue_only(self):
+        mosaic = uniform_mosaic('BGGR', (200, 100, 100))
+        balance = BayerWhiteBalance()
+        balance.update(mosaic, WB_MANUAL, 'BGGR')
+        balance.apply(mosaic, 'BGGR')
+        red, green_r, green_b, blue = cfa_planes(mosaic, 'BGGR')
+
+        assert (red == 240).all() and (blue == 90).all()
+        assert (green_r == 100).all() and (green_b == 100).all()
+
+    def test_gains_clip_at_full_scale(self):
+        mosaic = uniform_mosaic('RGGB', (60000, 30000, 30000), dtype=np.uint16)
+        balance = BayerWhiteBalance()
+        balance.update(mosaic, WB_MANUAL, 'RGGB')
+        balance.apply(mosaic, 'RGGB')
+
+        assert (cfa_planes(mosaic, 'RGGB')[0] == 65535).all()
+
+    def test_no_software_wb(self):
+        mosaic = tinted_mosaic()
+        balance = BayerWhiteBalance()
+
+        assert balance.update(mosaic, {'mode': 'asi_auto'}) is None
+        assert balance.apply(mosaic.copy()).tolist() == mosaic.tolist()
+
+    def test_gains_cached_between_refreshes(self):
+        balance = BayerWhiteBalance()
+        for seed in range(7):
+            balance.update(tinted_mosaic(seed=seed), GRAY_WORLD, 'RGGB')
+
+        assert balance.estimates == 3  # Frames 1, 4 and 7
+
+    def test_scene_change_refreshes_gains(self):
+        balance = BayerWhiteBalance()
+        balance.update(tinted_mosaic(level=100), GRAY_WORLD, 'RGGB')
+        balance.update(tinted_mosaic(level=105), GRAY_WORLD, 'RGGB')
+        assert balance.estimates == 1
+
+        balance.update(tinted_mosaic(level=60), GRAY_WORLD, 'RGGB')
+        assert balance.estimates == 2
+
+    def test_settings_change_refreshes_gains(self):
+        balance = BayerWhiteBalance()
+        balance.update(tinted_mosaic(), GRAY_WORLD, 'RGGB')
+        balance.update(tinted_mosaic(), WB_MANUAL, 'RGGB')
+        balance.update(tinted_mosaic(), GRAY_WORLD, 'RGGB')
+
+        assert balance.estimates == 2
+
+
+class TestDevelopFrame:
+    """Capture path balancing and metering the mosaic"""
+
+    def test_balanced_before_debayer(self):
+        rgb_domain = make_camera(wb_config=dict(WB_MANUAL, bayer_domain=False))
+        bayer_domain = make_camera(wb_config=WB_MANUAL)
+
+        expected, expected_metadata = rgb_domain.capture_single_frame()
+        img, metadata = bayer_domain.capture_single_frame()
+        difference = np.abs(np.asarray(img, np.int16) - np.asarray(expected, np.int16))
+
+        assert metadata['RAW_RGB_NO_WB'] is None
+        # Histogram source keeps the unbalanced sample
+        np.testing.assert_array_equal(metadata['RAW_SAMPLE_NO_WB'], expected_metadata['METER_SAMPLE'])
+        assert expected_metadata['RAW_SAMPLE_NO_WB'] is None
+        assert difference.mean() < 2.0  # Dither, rounding and clipping before interpolation
+
+    def test_raw16_stays_pre_white_balance(self):
+        rgb_domain = make_camera(bit_depth=16, wb_config=dict(WB_MANUAL, bayer_domain=False))
+        bayer_domain = make_camera(bit_depth=16, wb_config=WB_MANUAL)
+
+        _, expected = rgb_domain.capture_single_frame()
+        _, metadata = bayer_domain.capture_single_frame()
+
+        np.testing.assert_array_equal(metadata['RAW_RGB_16BIT'], expected['RAW_RGB_16BIT'])
+        assert metadata['RAW_RGB_NO_WB'] is not None  # Balanced in RGB
+
+    def test_dev_mode_keeps_pre_wb_rgb(self):
+        zwo = make_camera(wb_config=WB_MANUAL)
+        zwo.preserve_raw = True
+        img, metadata = zwo.capture_single_frame()
+
+        assert metadata['RAW_RGB_NO_WB'] is not None
+        assert not np.array_equal(metadata['RAW_RGB_NO_WB'], np.asarray(img))
+
+    @pytest.mark.parametrize("bit_depth", [8, 16])
+    def test_meter_sample(self, bit_depth):
+        zwo = make_camera(bit_depth=bit_depth)
+        img, metadata = zwo.capture_single_frame()
+        sample = metadata['METER_SAMPLE']
+
+        assert sample.dtype == np.uint8
+        assert sample.shape == (30, 40)  # Every 4th 2x2 cell of 160x120
+        assert sample.mean() == pytest.approx(np.asarray(img).mean(), rel=0.1)
+        assert zwo._meter_array(img, metadata) is sample
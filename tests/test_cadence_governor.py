@@ -0,0 +1,142 @@
+"""
+Test the adaptive capture cadence governor and its per-night report
+"""
+import pytest
+import os
+import sys
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.cadence_governor import CadenceGovernor, CadenceReport, thumbnail
+from tests.fakes import make_camera
+
+
+def scene(level=100.0, spot=None, size=64):
+    """Flat frame with an optional bright spot at (row, col)"""
+    frame = np.full((size, size), level, np.float32)
+    if spot is not None:
+        frame[spot[0]:spot[0] + 16, spot[1]:spot[1] + 16] = level * 2
+    return frame
+
+
+class FakeClock:
+    """Settable clock for the report"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def governor(**options):
+    options.setdefault('max_interval', 40.0)
+    options.setdefault('stretch', 2.0)
+    options.setdefault('stable_frames', 2)
+    options.setdefault('ml_state', None)
+    return CadenceGovernor(5.0, **options)
+
+
+class TestCadenceGovernor:
+    """Interval follows how fast the scene changes"""
+
+    def test_stable_scene_stretches_to_ceiling(self):
+        gov = governor()
+        intervals = [gov.observe(scene(), 100.0, 1.0, 0) for _ in range(10)]
+
+        assert intervals == [5.0, 5.0, 10.0, 10.0, 20.0, 20.0, 40.0, 40.0, 40.0, 40.0]
+
+    def test_brightness_change_tightens(self):
+        gov = governor()
+        for _ in range(5):
+            gov.observe(scene(), 100.0, 1.0, 0)
+        assert gov.interval == 20.0
+
+        assert gov.observe(scene(), 150.0, 1.0, 0) == 5.0
+        assert gov.last_change == "brightness +50%"
+
+    def test_exposure_correction_is_not_change(self):
+        gov = governor()
+        for _ in range(5):
+            gov.observe(scene(), 100.0, 1.0, 0)
+
+        assert gov.observe(scene(), 100.0, 2.0, -60) == 20.0  # +6 dB gain cut, double exposure
+
+    def test_structure_change_tightens(self):
+        gov = governor()
+        for _ in range(5):
+            gov.observe(scene(spot=(0, 0)), 100.0, 1.0, 0)
+
+        assert gov.observe(scene(spot=(40, 40)), 100.0, 1.0, 0) == 5.0
+        assert gov.last_change.startswith("difference")
+
+    def test_ml_state(self):
+        state = {'roof_status': 'Closed', 'sky_condition': 'N/A'}
+        gov = governor(ml_state=lambda: state)
+        intervals = [gov.observe(scene(), 100.0, 1.0, 0) for _ in range(4)]
+        assert intervals == [5.0, 5.0, 20.0, 20.0]  # Closed roof stretches twice as fast
+
+        state = {'roof_status': 'Open', 'sky_condition': 'Clear'}
+        assert gov.observe(scene(), 100.0, 1.0, 0) == 5.0
+        assert gov.last_change == "roof/sky Closed/N/A -> Open/Clear"
+
+    def test_base_interval_change(self):
+        gov = governor()
+        gov.set_base_interval(10.0)
+
+        assert gov.interval == 10.0
+        assert gov.observe(scene(), 100.0, 1.0, 0) == 10.0
+
+    def test_thumbnail_size(self):
+        assert thumbnail(np.zeros((480, 640), np.uint8)).shape == (32, 32)
+        assert thumbnail(np.zeros((20, 30, 3), np.uint8)).shape == (20, 30)
+
+
+class TestCadenceReport:
+    """Frames, fixed-cadence equivalent, CPU and bytes per night"""
+
+    def test_counts_savings(self):
+        clock = FakeClock(1768500000.0)  # Evening of 2026-01-15 UTC
+        report = CadenceReport(clock=clock, cpu_clock=lambda: 0.0)
+        report.record_frame(5.0, 5.0)
+        report.record_frame(20.0, 5.0)
+        report.record_output(1000)
+
+        summary = report.summary()
+        assert (summary['frames'], summary['fixed_frames'], summary['frames_saved']) == (2, 5, 3)
+        assert summary['saved_percent'] == 60.0
+        assert summary['bytes_written'] == 1000
+
+    def test_new_night_returns_previous(self):
+        clock = FakeClock(1768500000.0)
+        report = CadenceReport(clock=clock, cpu_clock=lambda: 0.0)
+        report.record_frame(5.0, 5.0)
+
+        clock.now += 24 * 3600
+        finished = report.record_frame(5.0, 5.0)
+        assert finished['frames'] == 1
+        assert report.summary()['night'] != finished['night']
+
+
+class TestCameraCadence:
+    """ZWOCamera takes its interval from the governor"""
+
+    def test_develop_frame_feeds_governor(self):
+        zwo = make_camera()
+        zwo.capture_interval = 5.0
+        zwo.cadence_governor = governor()
+        for _ in range(3):
+            img, metadata = zwo.capture_single_frame()
+
+        assert zwo.next_capture_interval() == 10.0
+        assert metadata['CAPTURE_INTERVAL'] == "10.0"
+        assert metadata['CADENCE']['frames'] == 3
+
+    def test_fixed_interval_without_governor(self):
+        zwo = make_camera()
+        zwo.set_capture_interval(7.0)
+
+        assert zwo.next_capture_interval() == 7.0
@@ -0,0 +1,348 @@
+"""
+Test pipelined capture: drop-oldest queue, stage timings and the split
+expose/develop camera path
+"""
+import pytest
+import os
+import sys
+import threading
+import time
+import weakref
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.capture_pipeline import (CapturePipeline, CoalescingFrameQueue, FrameQueue, StageTimings,
+                                      ProcessingPool)
+from tests.fakes import FakeASI, FakeCamera, make_camera
+
+
+class TimedCamera(FakeCamera):
+    """FakeCamera whose exposures take exposure_seconds of wall time"""
+
+    def __init__(self, *args, exposure_seconds=0.1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.exposure_seconds = exposure_seconds
+        self._started = None
+
+    def start_exposure(self):
+        self._started = time.time()
+
+    def get_exposure_status(self):
+        if time.time() - self._started < self.exposure_seconds:
+            return FakeASI.ASI_EXP_WORKING
+        return FakeASI.ASI_EXP_SUCCESS
+
+
+class TestFrameQueue:
+    """Bounded drop-oldest queue"""
+
+    def test_fifo_order(self):
+        queue = FrameQueue(maxsize=3)
+        for i in range(3):
+            assert queue.put(i) is None
+
+        assert [queue.get(timeout=0) for _ in range(3)] == [0, 1, 2]
+
+    def test_full_queue_drops_oldest(self):
+        queue = FrameQueue(maxsize=2)
+        queue.put('a')
+        queue.put('b')
+
+        assert queue.put('c') == 'a'
+        assert queue.dropped == 1
+        assert len(queue) == 2
+        assert queue.get(timeout=0) == 'b'
+
+    def test_get_times_out_empty(self):
+        assert FrameQueue().get(timeout=0.01) is None
+
+    def test_close_wakes_consumer(self):
+        queue = FrameQueue()
+        results = []
+        consumer = threading.Thread(target=lambda: results.append(queue.get(timeout=5)))
+        consumer.start()
+        queue.close()
+        consumer.join(1)
+
+        assert not consumer.is_alive()
+        assert results == [None]
+
+
+class TestCoalescingFrameQueue:
+    """Ordered backlog within a byte budget, newest preview wins"""
+
+    def test_ordered_backlog_drops_oldest(self):
+        queue = CoalescingFrameQueue(backlog=2)
+        queue.put('a')
+        queue.put('b')
+
+        assert queue.put('c') == ['a']
+        assert queue.dropped == 1
+        assert [queue.get(timeout=0) for _ in range(2)] == ['b', 'c']
+
+    def test_preview_coalesces(self):
+        queue = CoalescingFrameQueue(backlog=3)
+        queue.put('preview-1', coalesce=True)
+        queue.put('file-1')
+
+        assert queue.put('preview-2', coalesce=True) == ['preview-1']
+        assert queue.coalesced == 1 and queue.dropped == 0
+        assert [queue.get(timeout=0) for _ in range(2)] == ['file-1', 'preview-2']
+
+    def test_byte_budget(self):
+        queue = CoalescingFrameQueue(backlog=10, max_bytes=250)
+        queue.put('a', 100)
+        queue.put('b', 100)
+
+        assert queue.put('c', 100) == ['a']
+        assert queue.nbytes == 200
+        assert queue.put('huge', 1000) == ['b', 'c']  # Newest always accepted
+        assert queue.get(timeout=0) == 'huge' and queue.nbytes == 0
+
+    def test_evicted_frames_released(self):
+        class Task:
+            pass
+
+        queue = CoalescingFrameQueue(backlog=1)
+        task = Task()
+        released = weakref.ref(task)
+        queue.put(task, coalesce=True)
+        del task
+        queue.put(Task(), coalesce=True)
+
+        assert released() is None
+
+    def test_newest_is_peeked(self):
+        queue = CoalescingFrameQueue(backlog=3)
+        assert queue.newest() is None
+        queue.put('a')
+        queue.put('b')
+
+        assert queue.newest() == 'b' and len(queue) == 2
+        assert queue.get(timeout=0) == 'a'
+
+    def test_closed_empty_returns_none(self):
+        queue = CoalescingFrameQueue()
+        queue.put('a')
+        queue.close()
+
+        assert queue.get(timeout=5) == 'a'
+        assert queue.get(timeout=5) is None and queue.closed
+
+
+class TestStageTimings:
+    """Per-stage timing statistics"""
+
+    def test_snapshot_in_milliseconds(self):
+        timings = StageTimings()
+        timings.record('debayer', 0.010)
+        timings.record('debayer', 0.030)
+        stats = timings.snapshot()['debayer']
+
+        assert stats['count'] == 2
+        assert stats['last_ms'] == 30.0
+        assert stats['max_ms'] == 30.0
+        assert 10.0 < stats['avg_ms'] < 30.0
+
+    def test_bottleneck(self):
+        timings = StageTimings()
+        timings.record('expose', 1.0)
+        timings.record('stretch', 0.2)
+
+        assert timings.bottleneck() == ('expose', 1.0)
+        assert timings.bottleneck(stages=['stretch']) == ('stretch', 0.2)
+        assert StageTimings().bottleneck() == (None, 0.0)
+
+    def test_measure(self):
+        timings = StageTimings()
+        with timings.measure('encode'):
+            time.sleep(0.01)
+
+        assert timings.snapshot()['encode']['last_ms'] >= 5.0
+
+
+class TestCapturePipeline:
+    """Processing thread behaviour"""
+
+    def test_processes_in_order(self):
+        seen = []
+        pipeline = CapturePipeline(seen.append, maxsize=10)
+        pipeline.start()
+        for i in range(5):
+            assert pipeline.submit(i)
+        pipeline.stop()
+
+        assert seen == [0, 1, 2, 3, 4]
+        assert pipeline.processed == 5
+        assert 'queue_wait' in pipeline.timings.snapshot()
+
+    def test_slow_processing_drops_oldest(self):
+        release = threading.Event()
+        seen = []
+
+        def process(item):
+            release.wait(2)
+            seen.append(item)
+
+        pipeline = CapturePipeline(process, maxsize=2)
+        pipeline.start()
+        pipeline.submit(0)
+        time.sleep(0.05)  # Worker now blocked on item 0
+        results = [pipeline.submit(i) for i in range(1, 5)]
+        release.set()
+        pipeline.stop()
+
+        assert results == [True, True, False, False]
+        assert seen == [0, 3, 4]
+        assert pipeline.stats()['dropped'] == 2
+
+    def test_errors_do_not_stop_worker(self):
+        seen = []
+
+        def process(item):
+            if item == 1:
+                raise ValueError("bad frame")
+            seen.append(item)
+
+        pipeline = CapturePipeline(process, maxsize=5)
+        pipeline.start()
+        for i in range(3):
+            pipeline.submit(i)
+        pipeline.stop()
+
+        assert seen == [0, 2]
+
+
+class TestProcessingPool:
+    """Shared workers for several capture sources"""
+
+    def test_sources_served_round_robin(self):
+        seen = []
+        pool = ProcessingPool(workers=1)
+        fast = pool.add_source(lambda item: seen.append(('fast', item)), maxsize=10, name='fast')
+        slow = pool.add_source(lambda item: seen.append(('slow', item)), maxsize=10, name='slow')
+        for i in range(4):
+            fast.submit(i)
+        slow.submit(0)
+        pool.start()
+        pool.stop()
+
+        assert seen[:2] in ([('fast', 0), ('slow', 0)], [('slow', 0), ('fast', 0)])
+        assert [item for name, item in seen if name == 'fast'] == [0, 1, 2, 3]
+
+    def test_one_frame_per_source_at_a_time(self):
+        active = {'a': 0, 'b': 0}
+        overlap = []
+        lock = threading.Lock()
+
+        def process(name):
+            def run(item):
+                with lock:
+                    active[name] += 1
+                    overlap.append(active[name])
+                time.sleep(0.01)
+                with lock:
+                    active[name] -= 1
+            return run
+
+        pool = ProcessingPool(workers=4)
+        sources = [pool.add_source(process(name), maxsize=10, name=name) for name in active]
+        pool.start()
+        for i in range(5):
+            for source in sources:
+                source.submit(i)
+        pool.stop()
+
+        assert max(overlap) == 1
+        assert pool.stats()['a']['processed'] == 5
+
+    def test_flooding_source_does_not_starve_others(self):
+        seen = []
+        pool = ProcessingPool(workers=1)
+        busy = pool.add_source(lambda item: (time.sleep(0.005), seen.append('busy')), maxsize=2, name='busy')
+        quiet = pool.add_source(lambda item: seen.append('quiet'), maxsize=2, name='quiet')
+        pool.start()
+        for i in range(20):
+            busy.submit(i)
+            if i % 5 == 0:
+                quiet.submit(i)
+            time.sleep(0.002)
+        pool.stop()
+
+        assert seen.count('quiet') == 4
+        assert busy.dropped > 0
+
+
+class TestSplitCapture:
+    """expose_frame / develop_frame on ZWOCamera"""
+
+    def test_develop_matches_single_frame(self):
+        zwo = make_camera()
+        img, metadata = zwo.capture_single_frame()
+        expected = np.asarray(img).copy()
+        del img, metadata
+
+        img2, metadata2 = zwo.develop_frame(zwo.expose_frame())
+
+        np.testing.assert_array_equal(np.asarray(img2), expected)
+        assert set(metadata2['STAGE_TIMINGS']) >= {'expose', 'readout', 'debayer', 'white_balance', 'stats'}
+
+    def test_metadata_uses_settings_at_exposure(self):
+        zwo = make_camera()
+        raw = zwo.expose_frame()
+        zwo.exposure_seconds = 2.0  # Auto exposure adjusts while the frame is queued
+        zwo.gain = 300
+
+        _, metadata = zwo.develop_frame(raw)
+
+        assert metadata['EXPOSURE'] == "0.001s"
+        assert metadata['GAIN'] == "100"
+
+    def test_queued_raw_frame_keeps_its_slot(self):
+        zwo = make_camera()
+        zwo.pipelined = True
+        queued = zwo.expose_frame()
+        snapshot = bytes(queued['data'])
+
+        zwo.camera.frame = bytes(len(zwo.camera.frame))
+        for _ in range(len(zwo._frame_pool) + 1):
+            zwo.capture_single_frame()
+
+        assert bytes(queued['data']) == snapshot
+
+
+class TestPipelinedCaptureLoop:
+    """capture_loop with pipelined=True against a timed fake camera"""
+
+    def test_processing_overlaps_next_exposure(self):
+        zwo = make_camera()
+        zwo.camera = TimedCamera(160, 120, 8, exposure_seconds=0.1)
+        zwo.exposure_seconds = 0.1
+        zwo.capture_interval = 0.0
+        zwo.pipelined = True
+
+        published = []
+        overlapped = []
+        done = threading.Event()
+
+        def on_frame(img, metadata):
+            overlapped.append(zwo.exposure_start_time is not None)
+            time.sleep(0.08)  # Slow processing stage (stretch, overlays, encode...)
+            overlapped[-1] = overlapped[-1] or zwo.exposure_start_time is not None
+            published.append(metadata)
+            if len(published) >= 4:
+                done.set()
+
+        zwo.start_capture(on_frame)
+        try:
+            assert done.wait(5)
+        finally:
+            zwo.stop_capture()
+
+        assert any(overlapped)
+        stages = published[-1]['STAGE_TIMINGS']
+        assert 'expose' in stages and 'queue_wait' in stages
+        assert zwo.capture_pipeline is None or not zwo.capture_pipeline.running
@@ -0,0 +1,146 @@
+"""
+Test binning/ROI capture profiles for calibration, probe, ML and publishing
+"""
+import pytest
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.capture_profiles import PROFILES, CaptureGeometry, get_profile, resolve_geometry
+from services.camera_calibration import CameraCalibration
+from tests.fakes import FakeASI, FakeCamera, make_camera
+
+
+CAMERA_INFO = {'Name': 'Fake ASI', 'MaxWidth': 3096, 'MaxHeight': 2080, 'BitDepth': 12,
+               'SupportedBins': [1, 2, 3, 4]}
+
+
+class BinningCamera(FakeCamera):
+    """FakeCamera whose frames follow the ROI set with set_roi"""
+
+    def __init__(self, info=CAMERA_INFO, level=100):
+        super().__init__(info['MaxWidth'], info['MaxHeight'], 8)
+        self.info = info
+        self.level = level
+        self.roi_calls = []
+        self.roi = (info['MaxWidth'], info['MaxHeight'], 1)
+        self.exposure_us = 0
+
+    def set_roi(self, start_x=None, start_y=None, width=None, height=None, bins=None, image_type=None):
+        self.roi_calls.append(dict(start_x=start_x, start_y=start_y, width=width, height=height, bins=bins))
+        self.roi = (width, height, bins)
+
+    def set_image_type(self, image_type):
+        pass
+
+    def set_control_value(self, control, value):
+        if control == FakeASI.ASI_EXPOSURE:
+            self.exposure_us = value
+
+    def get_camera_property(self):
+        return dict(self.info)
+
+    def get_data_after_exposure(self, buffer_=None):
+        width, height, _ = self.roi
+        data = bytes([self.level]) * (width * height)
+        if buffer_ is None:
+            return bytearray(data)
+        buffer_[:] = data
+        return buffer_
+
+
+class TestResolveGeometry:
+    """Profile -> binning and ROI"""
+
+    def test_full_profile_is_whole_sensor(self):
+        assert resolve_geometry(CAMERA_INFO, 'full') == CaptureGeometry('full', 1, 0, 0, 3096, 2080)
+
+    def test_largest_bin_meeting_min_width(self):
+        calibration = resolve_geometry(CAMERA_INFO, 'calibration')
+        probe = resolve_geometry(CAMERA_INFO, 'probe')
+
+        assert calibration.bins == 4 and calibration.width >= PROFILES['calibration'].min_width
+        assert probe.bins == 4
+        assert resolve_geometry(dict(CAMERA_INFO, MaxWidth=1920), 'calibration').bins == 3
+
+    def test_sdk_alignment(self):
+        info = dict(CAMERA_INFO, MaxWidth=1938, MaxHeight=1098)
+        for name in PROFILES:
+            geometry = resolve_geometry(info, name)
+            if geometry.bins > 1:
+                assert geometry.width % 8 == 0 and geometry.height % 2 == 0
+                assert geometry.start_x % 2 == 0 and geometry.start_y % 2 == 0
+                assert geometry.start_x + geometry.width <= info['MaxWidth'] // geometry.bins
+
+    def test_camera_without_binning(self):
+        info = dict(CAMERA_INFO, SupportedBins=[1])
+        assert resolve_geometry(info, 'probe').bins == 1
+
+    def test_unknown_profile_is_full(self):
+        assert get_profile('nonsense').name == 'full'
+
+
+class TestProfileSwitching:
+    """ZWOCamera applies profiles between exposures"""
+
+    def make(self):
+        zwo = make_camera()
+        zwo.camera = BinningCamera()
+        return zwo
+
+    def test_ml_profile_reads_binned_frames(self):
+        zwo = self.make()
+        zwo.capture_profile = 'ml'
+        raw = zwo.expose_frame()
+        img, metadata = zwo.develop_frame(raw)
+
+        assert zwo.camera.roi_calls[-1]['bins'] == 4
+        assert len(raw['data']) * 16 <= 3096 * 2080
+        assert img.size == (raw['geometry'].width, raw['geometry'].height)
+        assert metadata['BINNING'] == 4 and metadata['CAPTURE_PROFILE'] == 'ml'
+        assert metadata['RES'] == f"{img.width}x{img.height}"
+
+    def test_profile_applied_once(self):
+        zwo = self.make()
+        zwo.expose_frame()
+        zwo.expose_frame()
+
+        assert len(zwo.camera.roi_calls) == 1
+
+    def test_calibration_uses_binned_profiles(self):
+        zwo = self.make()
+        zwo.auto_exposure = True
+        zwo._init_calibration_manager()
+        calibration = zwo.calibration_manager
+        calibration.target_brightness = 100
+        zwo.camera.level = 30  # Far from target: starts with a probe
+
+        profiles = []
+        select = calibration.select_profile
+
+        def record(name):
+            profiles.append(name)
+            # Exposure adjustments bring the scene within 2x, then to target
+            zwo.camera.level = 60 if name == 'probe' else 98
+            return select(name)
+
+        calibration.select_profile = record
+        assert calibration.run_calibration(max_attempts=4)
+
+        assert profiles[0] == 'probe' and 'calibration' in profiles
+        assert all(call['bins'] == 4 for call in zwo.camera.roi_calls)
+
+        # The next published frame goes back to full resolution
+        zwo.expose_frame()
+        assert zwo.camera.roi_calls[-1]['bins'] == 1
+
+    def test_calibration_without_profiles_reads_full_frames(self):
+        camera = BinningCamera(level=100)
+        calibration = CameraCalibration(camera, FakeASI, lambda message: None)
+        calibration.target_brightness = 100
+
+        assert calibration.run_calibration(max_attempts=1)
+        assert camera.roi_calls == []
@@ -0,0 +1,143 @@
+"""
+Test capture windows and sleeping until the next window boundary
+"""
+import pytest
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services import capture_schedule
+from services.capture_schedule import CaptureSchedule
+from tests.fakes import make_camera
+
+EVENING = datetime(2026, 1, 15, 18, 30)
+MORNING = datetime(2026, 1, 16, 8, 59, 30)
+NOON = datetime(2026, 1, 16, 12, 0)
+
+
+class RecordingEvent(threading.Event):
+    """Event that records wait timeouts and reports itself set after the first wait"""
+
+    def __init__(self):
+        super().__init__()
+        self.timeouts = []
+
+    def wait(self, timeout=None):
+        self.timeouts.append(timeout)
+        self.set()
+        return True
+
+
+class CountingSchedule(CaptureSchedule):
+    """Schedule counting how often the window is checked"""
+
+    checks = 0
+
+    def is_active(self, now=None):
+        self.checks += 1
+        return super().is_active(now)
+
+
+class TestTimeWindow:
+    """Daily HH:MM windows"""
+
+    def test_overnight_window(self):
+        schedule = CaptureSchedule(True, "17:00", "09:00")
+
+        assert schedule.is_active(EVENING) and schedule.is_active(MORNING)
+        assert not schedule.is_active(NOON)
+
+    def test_next_change(self):
+        schedule = CaptureSchedule(True, "17:00", "09:00")
+
+        assert schedule.next_change(NOON) == datetime(2026, 1, 16, 17, 0)
+        assert schedule.next_change(EVENING) == datetime(2026, 1, 16, 9, 0)
+        assert schedule.format_next_change(NOON) == "17:00"
+        assert schedule.format_next_change(EVENING) == "2026-01-16 09:00"
+
+    def test_disabled_and_invalid_always_on(self):
+        assert CaptureSchedule(False).next_change(NOON) is None
+        assert CaptureSchedule(True, "invalid", "25:00").is_active(NOON)
+
+
+class TestSunWindow:
+    """Windows from the sun altitude at the observer"""
+
+    @pytest.fixture
+    def schedule(self):
+        if not capture_schedule.ASTRAL_AVAILABLE:
+            pytest.skip("astral not installed")
+        return CaptureSchedule(True, mode='sun', sun_altitude=-6.0, latitude=51.5, longitude=-0.13)
+
+    def test_night_is_active(self, schedule):
+        noon = datetime(2026, 6, 21, 12, 0, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+        midnight = noon + timedelta(hours=12)
+
+        assert schedule.is_active(midnight)
+        assert not schedule.is_active(noon)
+
+    def test_next_change_is_the_boundary(self, schedule):
+        noon = datetime(2026, 6, 21, 12, 0, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+        dusk = schedule.next_change(noon)
+
+        assert noon < dusk < noon + timedelta(hours=12)
+        assert not schedule.is_active(dusk - timedelta(minutes=1))
+        assert schedule.is_active(dusk + timedelta(minutes=1))
+
+    def test_polar_day_checks_again_tomorrow(self):
+        if not capture_schedule.ASTRAL_AVAILABLE:
+            pytest.skip("astral not installed")
+        schedule = CaptureSchedule(True, mode='sun', sun_altitude=-6.0, latitude=78.2, longitude=15.6)
+        midsummer = datetime(2026, 6, 21, 0, 0)
+
+        assert not schedule.is_active(midsummer)
+        assert schedule.next_change(midsummer) == midsummer + timedelta(days=1)
+
+    def test_without_location_falls_back_to_times(self):
+        schedule = CaptureSchedule(True, "17:00", "09:00", mode='sun')
+
+        assert schedule.mode == 'time'
+        assert not schedule.is_active(NOON)
+
+
+class TestWait:
+    """Sleeping on an event until the window opens"""
+
+    def test_sleeps_until_boundary(self):
+        event = RecordingEvent()
+
+        assert CaptureSchedule(True, "17:00", "09:00").wait(event, now=NOON) is False
+        assert event.timeouts == [capture_schedule.MAX_WAIT_SECONDS]  # 5 h away, capped
+
+        event = RecordingEvent()
+        CaptureSchedule(True, "12:10", "13:00").wait(event, now=NOON)
+        assert event.timeouts == [600.0]
+
+    def test_returns_at_once_inside_window(self):
+        event = RecordingEvent()
+
+        assert CaptureSchedule(True, "17:00", "09:00").wait(event, now=EVENING) is True
+        assert event.timeouts == []
+
+    def test_capture_loop_sleeps_outside_window(self):
+        zwo = make_camera()
+        zwo.on_log_callback = lambda message: None
+        closed = CountingSchedule(True, "12:00", "12:00")  # Never open
+        zwo.set_capture_schedule(closed)
+        zwo.start_capture(lambda img, metadata: None)
+        time.sleep(0.3)
+        assert closed.checks == 2  # Loop check + wait, then asleep instead of spinning
+
+        schedule = CountingSchedule(True, "00:00", "00:00")
+        zwo.set_capture_schedule(schedule)  # Wakes the sleeping loop
+        time.sleep(0.1)
+        zwo.stop_capture()
+
+        assert zwo.capture_thread is None  # Stopped promptly
+        assert 1 <= schedule.checks <= 3
@@ -0,0 +1,162 @@
+"""
+Test the pure-numpy debayer engine against OpenCV
+"""
+import pytest
+import os
+import sys
+import time
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.debayer import debayer, to_uint8, RED_SITES
+from services.camera_utils import debayer_raw_image
+from services.frame_pool import FrameSlot
+from tests.fakes import uniform_mosaic
+
+PATTERNS = sorted(RED_SITES)
+
+
+def random_mosaic(height, width, dtype, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, np.iinfo(dtype).max + 1, (height, width), dtype=dtype)
+
+
+class TestBilinear:
+    """Full-resolution mode"""
+
+    @pytest.mark.parametrize('pattern', PATTERNS)
+    @pytest.mark.parametrize('dtype', [np.uint8, np.uint16])
+    def test_matches_opencv_inside_border(self, pattern, dtype):
+        cv2 = pytest.importorskip('cv2')
+        codes = {'RGGB': cv2.COLOR_BayerRG2RGB, 'BGGR': cv2.COLOR_BayerBG2RGB,
+                 'GRBG': cv2.COLOR_BayerGR2RGB, 'GBRG': cv2.COLOR_BayerGB2RGB}
+        mosaic = random_mosaic(48, 64, dtype)
+
+        ours = debayer(mosaic, pattern)
+        reference = cv2.cvtColor(mosaic, codes[pattern])
+        assert ours.dtype == dtype
+        np.testing.assert_array_equal(ours[2:-2, 2:-2], reference[2:-2, 2:-2])
+
+    @pytest.mark.parametrize('pattern', PATTERNS)
+    def test_flat_colour_round_trip(self, pattern):
+        img = debayer(uniform_mosaic(pattern, (200, 100, 20)), pattern)
+
+        assert (img == (200, 100, 20)).all()
+
+    def test_writes_into_out(self):
+        mosaic = random_mosaic(8, 8, np.uint16)
+        out = np.empty((8, 8, 3), np.uint16)
+
+        assert debayer(mosaic, 'RGGB', out=out) is out
+
+    def test_rejects_odd_dimensions(self):
+        with pytest.raises(ValueError):
+            debayer(np.zeros((7, 8), np.uint8))
+
+    def test_rejects_unknown_mode(self):
+        with pytest.raises(ValueError):
+            debayer(np.zeros((8, 8), np.uint8), mode='nearest')
+
+
+class TestSuperpixel:
+    """Half-resolution mode"""
+
+    @pytest.mark.parametrize('pattern', PATTERNS)
+    def test_one_pixel_per_cell(self, pattern):
+        mosaic = uniform_mosaic(pattern, (4000, 30001, 120), dtype=np.uint16)
+        mosaic[0::2, 0::2][mosaic[0::2, 0::2] == 30001] = 30000  # Greens differ within the cell
+
+        img = debayer(mosaic, pattern, mode='superpixel')
+        assert img.shape == (8, 8, 3) and img.dtype == np.uint16
+        assert (img == (4000, 30001, 120)).all()  # Rounded green mean
+
+    def test_debayer_raw_image_superpixel(self):
+        mosaic = uniform_mosaic('GRBG', (50000, 25000, 1000), dtype=np.uint16)
+
+        img, raw16 = debayer_raw_image(mosaic.tobytes(), 16, 16, 'GRBG', bit_depth=16,
+                                       return_raw16=True, mode='superpixel')
+        assert img.shape == (8, 8, 3)
+        assert tuple(img[0, 0]) == (194, 97, 3)
+        assert tuple(raw16[0, 0]) == (50000, 25000, 1000)
+
+
+class TestToUint8:
+    """Integer 16 -> 8 bit scaling"""
+
+    def test_exact_over_full_range(self):
+        src = np.arange(65536, dtype=np.uint16)
+
+        np.testing.assert_array_equal(to_uint8(src), (src // 257).astype(np.uint8))
+        assert to_uint8(src)[-1] == 255
+
+    def test_writes_into_out(self):
+        out = np.empty((4, 4, 3), np.uint8)
+
+        assert to_uint8(np.full((4, 4, 3), 514, np.uint16), out=out) is out
+        assert (out == 2).all()
+
+
+class TestFallback:
+    """debayer_raw_image without OpenCV"""
+
+    @pytest.fixture
+    def no_cv2(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, 'cv2', None)
+
+    @pytest.mark.parametrize('pattern', PATTERNS)
+    def test_honours_pattern(self, no_cv2, pattern):
+        mosaic = uniform_mosaic(pattern, (200, 100, 20))
+
+        img, _ = debayer_raw_image(mosaic.tobytes(), 16, 16, pattern)
+        assert (img == (200, 100, 20)).all()
+
+    def test_raw16_into_pooled_buffers(self, no_cv2):
+        mosaic = uniform_mosaic('BGGR', (51400, 25700, 2570), dtype=np.uint16)
+        frame = FrameSlot(16, 16, 16)
+
+        img, raw16 = debayer_raw_image(mosaic.tobytes(), 16, 16, 'BGGR', bit_depth=16,
+                                       return_raw16=True, buffers=frame)
+        assert img is frame.rgb_no_wb and raw16 is frame.rgb16
+        assert (img == (200, 100, 10)).all()
+
+
+@pytest.mark.slow
+class TestDebayerBenchmark:
+    """Time per 4K frame: numpy bilinear and superpixel vs OpenCV"""
+
+    REPEATS = 5
+
+    def timed(self, fn):
+        fn()
+        start = time.perf_counter()
+        for _ in range(self.REPEATS):
+            fn()
+        return (time.perf_counter() - start) / self.REPEATS * 1000
+
+    @pytest.mark.parametrize('dtype', [np.uint8, np.uint16])
+    def test_debayer_speed(self, dtype):
+        cv2 = pytest.importorskip('cv2')
+        mosaic = random_mosaic(2160, 3840, dtype)
+        out = np.empty((2160, 3840, 3), dtype)
+        half = np.empty((1080, 1920, 3), dtype)
+
+        opencv = self.timed(lambda: cv2.cvtColor(mosaic, cv2.COLOR_BayerBG2RGB, dst=out))
+        bilinear = self.timed(lambda: debayer(mosaic, 'BGGR', out=out))
+        superpixel = self.timed(lambda: debayer(mosaic, 'BGGR', mode='superpixel', out=half))
+        print(f"\n4K {np.dtype(dtype).name}: cv2 {opencv:.1f} ms, numpy bilinear {bilinear:.1f} ms, "
+              f"superpixel {superpixel:.1f} ms")
+
+        assert superpixel < bilinear / 3
+
+    def test_uint8_conversion_speed(self):
+        src = random_mosaic(2160, 3840 * 3, np.uint16)
+        out = np.empty(src.shape, np.uint8)
+
+        floating = self.timed(lambda: (src / 257).astype(np.uint8))
+        integer = self.timed(lambda: to_uint8(src, out=out))
+        print(f"\n4K RGB 16 -> 8 bit: float {floating:.1f} ms, integer {integer:.1f} ms")
+
+        assert integer < floating
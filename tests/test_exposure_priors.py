@@ -0,0 +1,137 @@
+"""
+Test the exposure prior table and calibration starting from it
+"""
+import pytest
+import os
+import sys
+import json
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.exposure_priors import ExposurePriorTable
+from services.camera_calibration import CameraCalibration
+from tests.fakes import FakeASI, SceneCamera, response
+
+
+def context(sun_altitude, moon_illumination=0.0, roof_open=True):
+    return {'sun_altitude': sun_altitude, 'moon_illumination': moon_illumination, 'roof_open': roof_open}
+
+
+class TestExposurePriorTable:
+    """Recording and interpolated lookups"""
+
+    def test_lookup_returns_recorded_exposure(self):
+        table = ExposurePriorTable()
+        table.record(context(10.0), 0.002, 100, 100.0)
+
+        assert table.lookup(context(10.5), 100, 100) == pytest.approx(0.002)
+
+    def test_normalized_for_gain_and_target(self):
+        table = ExposurePriorTable()
+        table.record(context(10.0), 0.002, 100, 80.0)
+
+        assert table.lookup(context(10.0), 100, 100) == pytest.approx(0.0025)
+        assert table.lookup(context(10.0), 300, 100) == pytest.approx(0.00025)  # +20 dB
+
+    def test_interpolates_along_sun_altitude(self):
+        table = ExposurePriorTable()
+        table.record(context(-1.0), 0.01, 100, 100.0)  # Row centred on -1 deg
+        table.record(context(-5.0), 1.0, 100, 100.0)  # Row centred on -5 deg
+
+        assert table.lookup(context(-3.0), 100, 100) == pytest.approx(0.1)  # Geometric midpoint
+
+    def test_no_prior_far_from_recorded_conditions(self):
+        table = ExposurePriorTable()
+        table.record(context(30.0), 0.001, 100, 100.0)
+
+        assert table.lookup(context(-10.0), 100, 100) is None
+        assert table.lookup({'sun_altitude': None}, 100, 100) is None
+
+    def test_roof_state_kept_apart(self):
+        table = ExposurePriorTable()
+        table.record(context(-20.0, roof_open=True), 10.0, 100, 100.0)
+        table.record(context(-20.0, roof_open=False), 0.5, 100, 100.0)
+
+        assert table.lookup(context(-25.0, roof_open=False), 100, 100) == pytest.approx(0.5)
+        assert table.lookup(context(-40.0, roof_open=True), 100, 100) == pytest.approx(10.0)
+
+    def test_unknown_roof_prefers_unknown_entries(self):
+        table = ExposurePriorTable()
+        table.record(context(-20.0, roof_open=True), 10.0, 100, 100.0)
+        table.record(context(-20.0, roof_open=False), 0.5, 100, 100.0)
+        assert table.lookup(context(-20.0, roof_open=None), 100, 100) is None  # Open and closed disagree
+
+        table.record(context(-20.0, roof_open=None), 4.0, 100, 100.0)
+        assert table.lookup(context(-20.0, roof_open=None), 100, 100) == pytest.approx(4.0)
+
+    def test_unknown_roof_uses_single_roof_state(self):
+        table = ExposurePriorTable()
+        table.record(context(-20.0, roof_open=False), 0.5, 100, 100.0)
+
+        assert table.lookup(context(-20.0, roof_open=None), 100, 100) == pytest.approx(0.5)
+
+    def test_nearest_moon_at_night(self):
+        table = ExposurePriorTable()
+        table.record(context(-30.0, moon_illumination=0.0), 20.0, 100, 100.0)
+        table.record(context(-30.0, moon_illumination=100.0), 2.0, 100, 100.0)
+
+        assert table.lookup(context(-30.0, moon_illumination=90.0), 100, 100) == pytest.approx(2.0)
+        assert table.lookup(context(-30.0, moon_illumination=40.0), 100, 100) == pytest.approx(20.0)
+
+    def test_recalibration_smooths_entry(self):
+        table = ExposurePriorTable()
+        table.record(context(10.0), 0.001, 100, 100.0)
+        table.record(context(10.0), 0.004, 100, 100.0)
+
+        assert table.lookup(context(10.0), 100, 100) == pytest.approx(0.002)
+
+    def test_persisted_between_runs(self, tmp_path):
+        path = str(tmp_path / 'priors' / 'camera.json')
+        ExposurePriorTable(path).record(context(-12.0, moon_illumination=60.0), 3.0, 200, 100.0)
+
+        assert ExposurePriorTable(path).lookup(context(-12.0, moon_illumination=60.0), 200, 100) == pytest.approx(3.0)
+        assert json.load(open(path))['entries'][0]['roof'] == 'open'
+
+    def test_corrupt_file_starts_empty(self, tmp_path):
+        path = tmp_path / 'camera.json'
+        path.write_text('{not json')
+
+        assert ExposurePriorTable(str(path)).entries == {}
+
+
+class TestCalibrationPriors:
+    """CameraCalibration starts from and records priors"""
+
+    SCENE = staticmethod(lambda exposure, gain: response(exposure, gain, scale=40.0, pedestal=3.0))
+
+    def make(self, table, conditions):
+        camera = SceneCamera(self.SCENE)
+        calibration = CameraCalibration(camera, FakeASI, lambda message: None)
+        calibration.update_settings(exposure_seconds=0.001, gain=100, target_brightness=100, algorithm='mean')
+        calibration.exposure_priors = table
+        calibration.context_provider = lambda: conditions
+        return camera, calibration
+
+    def test_starts_from_prior(self):
+        table = ExposurePriorTable()
+        table.record(context(-8.0), 2.4, 100, 100.0)
+        camera, calibration = self.make(table, context(-8.5))
+
+        assert calibration.run_calibration()
+        assert camera.exposures == 1  # No correction frame
+
+    def test_converged_exposure_recorded(self):
+        table = ExposurePriorTable()
+        _, calibration = self.make(table, context(-8.0))
+        calibration.run_calibration()
+
+        assert table.lookup(context(-8.0), 100, 100) == pytest.approx(calibration.exposure_seconds, rel=0.2)
+
+    def test_unavailable_context_falls_back(self):
+        camera, calibration = self.make(ExposurePriorTable(), {'sun_altitude': None})
+        calibration.context_provider = lambda: 1 / 0
+
+        assert calibration.run_calibration()
+        assert camera.exposures <= 3
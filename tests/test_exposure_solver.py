@@ -0,0 +1,187 @@
+"""
+Test the model-based exposure solver and its use in rapid calibration
+"""
+import pytest
+import os
+import sys
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.exposure_solver import ExposureSolver
+from services.camera_calibration import CameraCalibration
+from tests.fakes import FakeASI, SceneCamera, response
+
+
+def solve(solver, scene, exposure, gain=100, frames=10):
+    """Feed a scene response into the solver; returns the exposures it tried"""
+    tried = []
+    for _ in range(frames):
+        tried.append(exposure)
+        brightness = scene(exposure, gain)
+        solver.add(exposure, gain, brightness)
+        if abs(brightness - solver.target_brightness) < solver.target_brightness * 0.2:
+            break
+        exposure = solver.predict(gain)
+        if exposure is None:
+            break
+    return tried
+
+
+class TestExposureSolver:
+    """Predictions from measured frames"""
+
+    def test_linear_scene_in_one_step(self):
+        solver = ExposureSolver(target_brightness=100)
+        solver.add(0.01, 100, response(0.01))  # 20
+
+        assert solver.predict(100) == pytest.approx(0.05)
+
+    def test_learns_nonlinear_response(self):
+        scene = lambda exposure, gain: response(exposure, gain, scale=400.0, gamma=0.6)
+        solver = ExposureSolver(target_brightness=100)
+        tried = solve(solver, scene, 0.001)
+
+        assert len(tried) <= 4  # Third frame gives the slope
+        assert solver.slope == pytest.approx(0.6, abs=0.05)
+
+    def test_saturated_start_backs_off(self):
+        solver = ExposureSolver(target_brightness=100)
+        tried = solve(solver, response, 10.0)
+
+        assert tried[1] == pytest.approx(10.0 / 8)
+        assert abs(response(tried[-1]) - 100) < 20
+
+    def test_black_frame_steps_up(self):
+        solver = ExposureSolver(target_brightness=100)
+        solver.add(0.00001, 100, 0.0)
+
+        assert solver.predict(100) == pytest.approx(0.00064)
+
+    def test_stays_between_bounds(self):
+        solver = ExposureSolver(target_brightness=100)
+        solver.add(0.001, 100, 0.0)
+        solver.add(0.004, 100, 255.0)
+
+        assert 0.001 < solver.predict(100) < 0.004
+
+    def test_pinned_at_max_exposure(self):
+        solver = ExposureSolver(target_brightness=100, max_exposure=1.0)
+        solver.add(1.0, 100, 20.0)
+
+        assert solver.predict(100) is None
+
+    def test_black_level_is_subtracted(self):
+        solver = ExposureSolver(target_brightness=100, black_level=20.0)
+        solver.add(0.01, 100, 40.0)
+
+        assert solver.predict(100) == pytest.approx(0.04)
+
+    def test_seed_from_last_converged(self):
+        solver = ExposureSolver()
+        assert solver.seed_exposure(100, 0.5) == 0.5
+
+        solver.converged(0.02, 100)
+        solver.reset()
+
+        assert solver.seed_exposure(100, 0.5) == 0.02
+        assert solver.seed_exposure(300, 0.5) == pytest.approx(0.002)  # +20 dB gain
+
+
+class TestCalibrationSolver:
+    """CameraCalibration with the model and legacy solvers"""
+
+    def make(self, scene, exposure=0.001, solver='model'):
+        camera = SceneCamera(scene)
+        calibration = CameraCalibration(camera, FakeASI, lambda message: None)
+        calibration.update_settings(exposure_seconds=exposure, gain=100, target_brightness=100,
+                                    max_exposure_sec=30.0, algorithm='mean', solver=solver)
+        return camera, calibration
+
+    def test_model_converges(self):
+        camera, calibration = self.make(lambda exposure, gain: response(exposure, gain, scale=40.0))
+
+        assert calibration.run_calibration()
+        assert camera.exposures <= 3
+        assert calibration.exposure_solver.converged_exposure == calibration.exposure_seconds
+
+    def test_recalibration_starts_from_converged_exposure(self):
+        camera, calibration = self.make(lambda exposure, gain: response(exposure, gain, scale=40.0))
+        calibration.run_calibration()
+        converged = calibration.exposure_seconds
+        calibration.exposure_seconds = 0.001  # Auto exposure wandered off
+        camera.exposures = 0
+
+        assert calibration.run_calibration()
+        assert camera.exposures == 1
+        assert camera.exposure_us == int(converged * 1000000)
+
+    def test_legacy_solver_selectable(self):
+        _, calibration = self.make(response, solver='legacy')
+
+        assert calibration.exposure_solver is None
+        assert calibration.run_calibration()
+
+    def test_dark_scene_accepts_max_exposure(self):
+        camera, calibration = self.make(lambda exposure, gain: 0.0)
+        calibration.max_exposure_sec = 1.0
+
+        assert calibration.run_calibration()
+        assert calibration.exposure_seconds == 1.0
+        assert camera.exposures < 15
+
+
+# Recorded scene response curves over a day: (name, scale, gamma, pedestal)
+# at gain 100, brightness = pedestal + scale * exposure ** gamma
+REPLAY_DAY = [
+    ('noon', 60000.0, 1.0, 0.0),
+    ('overcast', 4000.0, 1.0, 2.0),
+    ('clearing', 20000.0, 1.0, 1.0),
+    ('dusk', 150.0, 1.0, 4.0),
+    ('twilight', 25.0, 1.0, 6.0),
+    ('night', 6.0, 1.0, 8.0),
+    ('hot-pixels', 5.0, 1.05, 14.0),
+    ('dawn', 400.0, 1.0, 5.0),
+    ('gamma-encoded', 900.0, 0.45, 0.0),
+]
+
+
+@pytest.mark.slow
+class TestCalibrationReplayBenchmark:
+    """Frames to converge, model vs legacy, replaying recorded scene responses"""
+
+    COLD_START_EXPOSURE = 0.1  # zwo_exposure_ms default
+
+    def calibrate(self, calibration, scene):
+        name, scale, gamma, pedestal = scene
+        calibration.camera.scene = lambda exposure, gain: response(exposure, gain, scale, gamma, pedestal)
+        calibration.camera.exposures = 0
+        converged = calibration.run_calibration(max_attempts=15)
+        return calibration.camera.exposures if converged else None
+
+    def replay(self, solver):
+        """Cold start per scene, then the day in order (each calibration starts where the last ended)"""
+        cold = [self.calibrate(TestCalibrationSolver().make(None, self.COLD_START_EXPOSURE, solver)[1], scene)
+                for scene in REPLAY_DAY]
+        _, calibration = TestCalibrationSolver().make(None, self.COLD_START_EXPOSURE, solver)
+        day = [self.calibrate(calibration, scene) for scene in REPLAY_DAY]
+        return cold, day
+
+    def test_model_converges_faster(self):
+        model = self.replay('model')
+        legacy = self.replay('legacy')
+
+        print()
+        for label, model_counts, legacy_counts in zip(('cold start', 'day replay'), model, legacy):
+            print(f"{label}: model {model_counts}, legacy {legacy_counts} (None = not converged)")
+        # Runs that did not converge count as the full 15 attempts
+        model_mean = [np.mean([n or 15 for n in counts]) for counts in model]
+        legacy_mean = [np.mean([n or 15 for n in counts]) for counts in legacy]
+        print(f"mean frames: model {model_mean[0]:.1f} / {model_mean[1]:.1f}, "
+              f"legacy {legacy_mean[0]:.1f} / {legacy_mean[1]:.1f}")
+
+        assert all(n is not None for counts in model for n in counts)
+        assert model_mean[1] <= 3.0
+        assert model_mean[0] < legacy_mean[0] and model_mean[1] < legacy_mean[1]
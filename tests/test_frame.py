@@ -0,0 +1,131 @@
+"""
+Test the typed Frame and its token-dict adapter
+"""
+import pytest
+import os
+import sys
+from datetime import datetime
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.frame import Frame
+from services.processor import replace_tokens
+from tests.fakes import WB_MANUAL, make_camera
+
+STATS = {'mean': 42.25, 'median': 40.0, 'min': 0, 'max': 255, 'std_dev': 12.345,
+         'p25': 30.0, 'p75': 50.0, 'p95': 80.0}
+
+
+def make_frame(**fields):
+    fields.setdefault('rgb16', np.zeros((4, 6, 3), np.uint16))
+    return Frame(datetime(2026, 1, 15, 21, 30, 5), 'ZWO ASI676MC', 1.5, 200, -4.25, 6, 4,
+                 bit_depth=16, stats=STATS, interval=5.0, **fields)
+
+
+class TestTokens:
+    """Token strings as the metadata dict formatted them"""
+
+    def test_formatting(self):
+        frame = make_frame()
+
+        assert frame['EXPOSURE'] == "1.5s" and frame['GAIN'] == "200"
+        assert frame['TEMP'] == "-4.2 C" and frame['TEMP_C'] == "-4.2°C" and frame['TEMP_F'] == "24.4°F"
+        assert frame['RES'] == "6x4" and frame['CAPTURE AREA SIZE'] == "6 * 4"
+        assert frame['FILENAME'] == "capture_20260115_213005.png"
+        assert frame['DATETIME'] == "2026-01-15 21:30:05"
+        assert frame['MEAN'] == "42.2" and frame['STD_DEV'] == "12.35" and frame['MAX'] == "255"
+        assert frame['IMAGE_BIT_DEPTH'] == 16 and frame['CAPTURE_INTERVAL'] == "5.0"
+
+    def test_missing_stats(self):
+        frame = Frame(datetime(2026, 1, 15, 21, 30, 5), 'ZWO ASI676MC', 1.5, 200, -4.25, 6, 4)
+
+        assert frame['MEAN'] == "N/A" and frame['P95'] == "N/A"
+        assert frame.tokens()['EXPOSURE'] == "1.5s"
+
+    def test_formatted_lazily(self):
+        frame = make_frame()
+        assert frame._tokens is None
+
+        replace_tokens("{EXPOSURE} at {GAIN}", frame)
+        assert sorted(frame._tokens) == ['EXPOSURE', 'GAIN']
+
+    def test_no_temperature(self):
+        frame = Frame(datetime(2026, 1, 15), 'cam', 1.0, 0, None, 6, 4)
+
+        assert frame['TEMP'] == "N/A" and frame['TEMP_F'] == "N/A"
+
+    def test_slots(self):
+        assert not hasattr(make_frame(), '__dict__')
+
+
+class TestMapping:
+    """Dict adapter: extras, buffers, pop and copy"""
+
+    def test_extras(self):
+        frame = make_frame()
+        frame.update({'ROOF_STATUS': 'Open (97%)', 'FILENAME': 'override.png'})
+
+        assert frame['ROOF_STATUS'] == 'Open (97%)'
+        assert frame['FILENAME'] == 'override.png'
+        assert frame.get('MISSING', '-') == '-'
+        assert 'ROOF_STATUS' in dict(frame) and 'RAW_RGB_16BIT' in frame
+
+    def test_pop_buffer_releases(self):
+        frame = make_frame()
+        buffer = frame.pop('RAW_RGB_16BIT')
+
+        assert buffer.shape == (4, 6, 3)
+        assert 'RAW_RGB_16BIT' not in frame and frame.rgb16 is None
+        assert frame.get('RAW_RGB_16BIT') is None
+        assert frame.pop('RAW_RGB_16BIT', None) is None
+
+    def test_pop_token(self):
+        frame = make_frame()
+        assert frame.pop('GAIN') == "200"
+
+        assert 'GAIN' not in frame and 'GAIN' not in list(frame)
+        with pytest.raises(KeyError):
+            frame['GAIN']
+
+    def test_copy_shares_buffers(self):
+        frame = make_frame()
+        clone = frame.copy()
+        clone['CAMERA_ID'] = 'pier'
+        del clone['RAW_RGB_16BIT']
+
+        assert 'CAMERA_ID' not in frame
+        assert frame['RAW_RGB_16BIT'] is not None
+        assert clone.copy()['EXPOSURE'] == "1.5s"
+
+    def test_nbytes(self):
+        frame = make_frame()
+        assert frame.nbytes == 4 * 6 * 3 * 2
+
+        frame.release()
+        assert frame.nbytes == 0 and 'RAW_RGB_16BIT' not in frame
+
+
+class TestCameraFrame:
+    """develop_frame builds a Frame over pooled buffers"""
+
+    def test_capture_returns_frame(self):
+        zwo = make_camera(bit_depth=16, wb_config=dict(WB_MANUAL, bayer_domain=False))
+        img, frame = zwo.capture_single_frame()
+
+        assert isinstance(frame, Frame)
+        assert frame.exposure_seconds == zwo.exposure_seconds and frame.gain == zwo.gain
+        assert frame['EXPOSURE'] == f"{zwo.exposure_seconds}s"
+        assert frame['MEAN'] == f"{np.mean(np.asarray(img)):.1f}"
+        assert 'STAGE_TIMINGS' in frame
+
+    def test_release_returns_slot_to_pool(self):
+        zwo = make_camera(bit_depth=16, wb_config=dict(WB_MANUAL, bayer_domain=False))
+        _, frame = zwo.capture_single_frame()
+        held = [slot for slot in zwo._frame_pool._slots if slot.in_use()]
+        assert len(held) == 1
+
+        frame.release()
+        assert not held[0].in_use()
@@ -0,0 +1,193 @@
+"""
+Test preallocated capture frame buffers and their memory benefit
+"""
+import pytest
+import os
+import sys
+import tracemalloc
+import numpy as np
+from PIL import Image
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.frame_pool import FramePool, FrameSlot
+from services.camera_utils import debayer_raw_image, apply_white_balance, calculate_image_stats
+from tests.fakes import WB_MANUAL, FakeCamera, make_camera
+
+
+class TestFramePool:
+    """Test ring reuse and in-use tracking"""
+
+    def test_slot_buffers_match_geometry(self):
+        slot = FrameSlot(64, 48, 16)
+
+        assert len(slot.raw) == 64 * 48 * 2
+        assert slot.bayer.shape == (48, 64)
+        assert slot.rgb16.shape == (48, 64, 3)
+        assert slot.rgb.dtype == np.uint8
+        assert FrameSlot(64, 48, 8).rgb16 is None
+
+    def test_free_slots_are_reused_in_ring_order(self):
+        pool = FramePool(32, 32, slots=3)
+        first = [pool.acquire() for _ in range(3)]
+        second = [pool.acquire() for _ in range(3)]
+
+        assert first == second
+        assert len({id(slot) for slot in first}) == 3
+
+    def test_referenced_slot_is_not_reused(self):
+        pool = FramePool(32, 32, slots=2)
+        slot = pool.acquire()
+        held = {'RAW_RGB_NO_WB': slot.rgb_no_wb}
+
+        assert slot.in_use()
+        assert pool.acquire() is not slot
+        assert pool.acquire() is not slot
+
+        held.clear()
+        assert not slot.in_use()
+
+    def test_views_keep_slot_in_use(self):
+        slot = FrameSlot(32, 32)
+        view = slot.rgb[:, :, 0]
+
+        assert slot.in_use()
+        del view
+        assert not slot.in_use()
+
+    def test_pool_grows_then_falls_back(self):
+        pool = FramePool(16, 16, slots=1, max_slots=2)
+        held = [pool.acquire().rgb for _ in range(3)]
+
+        assert len(pool) == 2
+        assert len(held) == 3
+
+    def test_matches(self):
+        pool = FramePool(16, 8, bit_depth=16, slots=1)
+
+        assert pool.matches(16, 8, 16)
+        assert not pool.matches(16, 8, 8)
+
+
+class TestPooledDebayer:
+    """Pooled debayer/white balance must match the allocating path"""
+
+    @pytest.mark.parametrize("bit_depth", [8, 16])
+    def test_debayer_into_buffers(self, bit_depth):
+        camera = FakeCamera(64, 48, bit_depth)
+        slot = FrameSlot(64, 48, bit_depth)
+        slot.raw[:] = camera.frame
+
+        expected_rgb, expected_raw16 = debayer_raw_image(camera.frame, 64, 48, 'BGGR', bit_depth, True)
+        rgb, raw16 = debayer_raw_image(slot.raw, 64, 48, 'BGGR', bit_depth, True, buffers=slot)
+
+        assert rgb is slot.rgb_no_wb
+        np.testing.assert_array_equal(rgb, expected_rgb)
+        if bit_depth == 16:
+            assert raw16 is slot.rgb16
+            np.testing.assert_array_equal(raw16, expected_raw16)
+
+    def test_white_balance_into_out(self):
+        np.random.seed(0)
+        img = np.random.randint(0, 256, (48, 64, 3), dtype=np.uint8)
+        out = np.empty_like(img)
+
+        np.random.seed(1)
+        expected = apply_white_balance(img, WB_MANUAL)
+        np.random.seed(1)
+        result = apply_white_balance(img, WB_MANUAL, out=out)
+
+        assert result is out
+        np.testing.assert_array_equal(result, expected)
+
+    def test_no_software_wb_returns_input(self):
+        img = np.zeros((8, 8, 3), dtype=np.uint8)
+
+        assert apply_white_balance(img, {'mode': 'asi_auto'}, out=np.empty_like(img)) is img
+
+
+class TestPooledCapture:
+    """capture_single_frame with a fake camera"""
+
+    @pytest.mark.parametrize("bit_depth", [8, 16])
+    def test_capture_uses_pool(self, bit_depth):
+        zwo = make_camera(bit_depth=bit_depth, wb_config=dict(WB_MANUAL, bayer_domain=False))
+        img, metadata = zwo.capture_single_frame()
+
+        assert img.size == (160, 120)
+        assert metadata['RAW_RGB_NO_WB'].shape == (120, 160, 3)
+        assert (metadata['RAW_RGB_16BIT'] is not None) == (bit_depth == 16)
+        assert metadata['MEAN'] == f"{np.mean(np.asarray(img)):.1f}"
+        assert len(zwo._frame_pool) == zwo.frame_pool_slots
+
+    def test_held_frames_are_not_overwritten(self):
+        zwo = make_camera()
+        _, first = zwo.capture_single_frame()
+        snapshot = first['RAW_RGB_NO_WB'].copy()
+
+        zwo.camera.frame = bytes(len(zwo.camera.frame))  # Next frames are black
+        for _ in range(zwo.frame_pool_slots + 1):
+            zwo.capture_single_frame()
+
+        np.testing.assert_array_equal(first['RAW_RGB_NO_WB'], snapshot)
+
+    def test_pool_rebuilt_on_bit_depth_change(self):
+        zwo = make_camera(bit_depth=8)
+        zwo.capture_single_frame()
+        pool = zwo._frame_pool
+
+        zwo.camera = FakeCamera(160, 120, 16)
+        zwo._connection.current_bit_depth = 16
+        zwo.capture_single_frame()
+
+        assert zwo._frame_pool is not pool
+        assert zwo._frame_pool.bit_depth == 16
+
+
+def _legacy_capture(camera, width, height, bit_depth, wb_config):
+    """The pre-pool capture_single_frame data path (allocates every buffer)"""
+    img_data = camera.get_data_after_exposure()
+    img_rgb, img_rgb_raw16 = debayer_raw_image(img_data, width, height, 'BGGR', bit_depth,
+                                               return_raw16=(bit_depth == 16))
+    img_rgb_no_wb = img_rgb.copy()
+    img_rgb = apply_white_balance(img_rgb, wb_config)
+    img = Image.fromarray(img_rgb, mode='RGB')
+    stats = calculate_image_stats(np.array(img))
+    return img, {'RAW_RGB_NO_WB': img_rgb_no_wb, 'RAW_RGB_16BIT': img_rgb_raw16, 'MEAN': stats['mean']}
+
+
+def _peak_per_frame(capture, frames):
+    """Peak traced allocation while capturing frames and releasing each one"""
+    capture()  # Warm-up (pool allocation, cv2 init)
+    tracemalloc.start()
+    try:
+        for _ in range(frames):
+            result = capture()
+            del result
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.slow
+class TestCaptureMemoryBenchmark:
+    """Compare peak allocations of the legacy and pooled capture paths"""
+
+    @pytest.mark.parametrize("bit_depth", [8, 16])
+    def test_pooled_capture_allocates_less(self, bit_depth):
+        width, height = 1920, 1080
+        zwo = make_camera(width, height, bit_depth, wb_config=WB_MANUAL)
+        legacy_camera = FakeCamera(width, height, bit_depth)
+
+        legacy_peak = _peak_per_frame(
+            lambda: _legacy_capture(legacy_camera, width, height, bit_depth, WB_MANUAL), frames=5)
+        pooled_peak = _peak_per_frame(zwo.capture_single_frame, frames=5)
+
+        frame_bytes = width * height * 3
+        print(f"\n{bit_depth}-bit {width}x{height}: legacy peak {legacy_peak / 1e6:.1f} MB, "
+              f"pooled peak {pooled_peak / 1e6:.1f} MB")
+
+        # The pooled path never allocates the raw buffer, debayer output or pre-WB copy
+        assert pooled_peak < legacy_peak - frame_bytes
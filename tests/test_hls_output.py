@@ -0,0 +1,147 @@
+"""
+Test HLS segmenting of the stream encoder's MPEG-TS output
+"""
+import pytest
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.hls_output import TSSegmenter, HLSSegmentRing, TS_PACKET_SIZE, PTS_CLOCK_HZ
+from services.rtsp_output import RTSPStreamServer
+
+
+PMT_PID = 0x1000
+VIDEO_PID = 0x0100
+
+
+def ts_packet(pid, payload, unit_start=False, random_access=False):
+    """One 188-byte TS packet (adaptation field only for the random access flag)"""
+    header = bytes([0x47, (0x40 if unit_start else 0) | (pid >> 8), pid & 0xFF,
+                    0x30 if random_access else 0x10])
+    adaptation = bytes([1, 0x40]) if random_access else b''
+    packet = header + adaptation + payload
+    return packet + b'\xff' * (TS_PACKET_SIZE - len(packet))
+
+
+def pat():
+    section = bytes([0x00, 0xB0, 13, 0, 1, 0xC1, 0, 0, 0, 1, 0xE0 | (PMT_PID >> 8), PMT_PID & 0xFF]) + b'\0' * 4
+    return ts_packet(0, b'\0' + section, unit_start=True)
+
+
+def pmt():
+    section = bytes([0x02, 0xB0, 18, 0, 1, 0xC1, 0, 0, 0xE1, 0x00, 0xF0, 0,
+                     0x1B, 0xE0 | (VIDEO_PID >> 8), VIDEO_PID & 0xFF, 0xF0, 0]) + b'\0' * 4
+    return ts_packet(PMT_PID, b'\0' + section, unit_start=True)
+
+
+def pes_start(pts, keyframe):
+    pts_bytes = bytes([0x21 | ((pts >> 29) & 0x0E), (pts >> 22) & 0xFF, ((pts >> 14) & 0xFE) | 1,
+                       (pts >> 7) & 0xFF, ((pts << 1) & 0xFE) | 1])
+    payload = b'\x00\x00\x01\xe0\x00\x00\x80\x80\x05' + pts_bytes
+    return ts_packet(VIDEO_PID, payload, unit_start=True, random_access=keyframe)
+
+
+def stream(seconds, keyframe_every=2, frames_per_second=1):
+    """Synthetic encoder output: PAT/PMT, then one PES per frame plus a continuation packet"""
+    data = pat() + pmt()
+    for frame in range(seconds * frames_per_second):
+        pts = frame * PTS_CLOCK_HZ // frames_per_second
+        data += pes_start(pts, keyframe=frame % (keyframe_every * frames_per_second) == 0)
+        data += ts_packet(VIDEO_PID, b'\x00' * 100)
+    return data
+
+
+class TestTSSegmenter:
+    """Encoder output is cut into keyframe-aligned segments"""
+
+    def test_segments_cut_at_keyframes(self):
+        segments = []
+        segmenter = TSSegmenter(lambda data, duration: segments.append((data, duration)))
+        segmenter.feed(stream(9))
+
+        # Keyframes at 0, 2, 4, 6, 8 s: the segment starting at 8 s is still open
+        assert [duration for _, duration in segments] == [2.0, 2.0, 2.0, 2.0]
+        assert all(len(data) % TS_PACKET_SIZE == 0 for data, _ in segments)
+
+    def test_segments_start_with_pat_and_pmt(self):
+        segments = []
+        segmenter = TSSegmenter(lambda data, duration: segments.append(data))
+        segmenter.feed(stream(5))
+
+        for data in segments:
+            assert data[:TS_PACKET_SIZE] == pat()
+            assert data[TS_PACKET_SIZE:2 * TS_PACKET_SIZE] == pmt()
+            assert data[2 * TS_PACKET_SIZE:3 * TS_PACKET_SIZE][1] & 0x40  # Then the keyframe
+
+    def test_arbitrary_chunks_and_garbage(self):
+        data = b'\x00\x01' + stream(9)  # Leading garbage before the first sync byte
+        segments = []
+        segmenter = TSSegmenter(lambda data, duration: segments.append(data))
+        for i in range(0, len(data), 1000):
+            segmenter.feed(data[i:i + 1000])
+
+        reference = []
+        TSSegmenter(lambda data, duration: reference.append(data)).feed(stream(9))
+        assert segments == reference
+
+    def test_default_duration_without_timestamps(self):
+        data = pat() + pmt()
+        for _ in range(3):
+            data += ts_packet(VIDEO_PID, b'\x00' * 10, unit_start=True, random_access=True)
+        durations = []
+        TSSegmenter(lambda data, duration: durations.append(duration), default_duration=1.5).feed(data)
+
+        assert durations == [1.5, 1.5]
+
+
+class TestHLSSegmentRing:
+    """Rolling playlist and segment lookup"""
+
+    def test_playlist_lists_recent_segments(self):
+        ring = HLSSegmentRing(max_segments=3)
+        assert ring.playlist is None
+
+        for i in range(5):
+            ring.add_segment(b'segment%d' % i, 2.0)
+        lines = ring.playlist.decode('ascii').splitlines()
+
+        assert lines[0] == '#EXTM3U'
+        assert '#EXT-X-TARGETDURATION:2' in lines
+        assert '#EXT-X-MEDIA-SEQUENCE:2' in lines
+        assert [line for line in lines if not line.startswith('#')] == [ring.segment_name(i) for i in (2, 3, 4)]
+
+    def test_segment_lookup(self):
+        ring = HLSSegmentRing(max_segments=2)
+        for i in range(5):
+            ring.add_segment(b'segment%d' % i, 2.0)
+
+        assert ring.segment(ring.segment_name(4)) == b'segment4'
+        assert ring.segment(ring.segment_name(2)) == b'segment2'  # One extra kept for slow clients
+        assert ring.segment(ring.segment_name(1)) is None
+        assert ring.segment('4.ts') is None
+        assert ring.segment(ring.segment_name(4).replace('4', 'x')) is None
+        assert ring.segment_lifetime == 6
+
+    def test_new_ring_uses_new_segment_names(self):
+        assert HLSSegmentRing().segment_name(0) != HLSSegmentRing().segment_name(0)
+
+
+class TestEncoderOutputs:
+    """One encode feeds RTSP, HLS or both"""
+
+    def test_rtsp_only(self):
+        cmd = RTSPStreamServer()._build_ffmpeg_command()
+        assert cmd[-3:] == ['-f', 'rtsp', 'rtsp://0.0.0.0:8554/asiwatchdog']
+
+    def test_hls_only(self):
+        cmd = RTSPStreamServer(rtsp=False, hls=HLSSegmentRing())._build_ffmpeg_command()
+        assert cmd[-3:] == ['-f', 'mpegts', 'pipe:1']
+
+    def test_rtsp_and_hls_share_encoder(self):
+        cmd = RTSPStreamServer(hls=HLSSegmentRing())._build_ffmpeg_command()
+        assert cmd.count('libx264') == 1
+        assert cmd[-2] == 'tee'
+        assert 'f=rtsp' in cmd[-1] and 'f=mpegts' in cmd[-1] and 'pipe:1' in cmd[-1]
@@ -324,3 +324,71 @@ class TestAutoStretch:
         # If current is darker than target, midtone should be < 0.5
         midtone_stretch = _calculate_mtf_midtone(0.1, 0.25)
         assert midtone_stretch < 0.5
+
+
+class TestLutStretch:
+    """Test LUT stretch mode against the float32 stretch path"""
+    
+    @staticmethod
+    def _sky_frame():
+        """16-bit sky frame with a noise floor, a dark roof block and a bright band"""
+        import numpy as np
+        rng = np.random.default_rng(7)
+        raw = rng.normal(3000, 150, (120, 160, 3)).clip(0, 65535).astype(np.uint16)
+        raw[20:40, 20:40] = 200
+        raw[60:64] += 20000
+        raw[:, :, 2] = (raw[:, :, 2] * 1.3).astype(np.uint16)
+        img = Image.fromarray((raw // 257).astype(np.uint8), mode='RGB')
+        return raw, img
+    
+    @pytest.mark.parametrize("linked", [True, False])
+    @pytest.mark.parametrize("preserve_blacks", [True, False])
+    @pytest.mark.parametrize("normalize", [True, False])
+    @pytest.mark.parametrize("use_raw", [True, False])
+    def test_lut_matches_float_path(self, linked, preserve_blacks, normalize, use_raw):
+        """LUT output matches the float32 path for every stretch option"""
+        import numpy as np
+        from services.processor import auto_stretch_image
+        
+        raw, img = self._sky_frame()
+        config = {
+            'target_median': 0.25,
+            'linked_stretch': linked,
+            'preserve_blacks': preserve_blacks,
+            'normalize_channels': normalize,
+            'dark_scene_threshold': 0.1,
+            'saturation_boost': 1.0,
+        }
+        raw_16bit = raw if use_raw else None
+        
+        float_result = auto_stretch_image(img, dict(config, lut_stretch=False), raw_16bit=raw_16bit)
+        lut_result = auto_stretch_image(img, dict(config, lut_stretch=True), raw_16bit=raw_16bit)
+        
+        diff = np.abs(np.asarray(float_result, dtype=np.int16) - np.asarray(lut_result, dtype=np.int16))
+        assert diff.max() <= 1
+        assert np.mean(diff > 0) < 0.001
+    
+    def test_lut_grayscale(self, sample_image):
+        """Grayscale images use a single LUT"""
+        import numpy as np
+        from services.processor import auto_stretch_image
+        
+        dark_img = sample_image.convert('L').point(lambda p: p * 0.1)
+        float_result = auto_stretch_image(dark_img, {'lut_stretch': False})
+        lut_result = auto_stretch_image(dark_img, {'lut_stretch': True})
+        
+        assert lut_result.mode == 'L'
+        diff = np.abs(np.asarray(float_result, dtype=np.int16) - np.asarray(lut_result, dtype=np.int16))
+        assert diff.max() <= 1
+    
+    def test_lut_channel_is_pure_lookup(self):
+        """Equal input values always map to equal output values"""
+        import numpy as np
+        from services.stretch_lut import lut_stretch_channel
+        
+        channel = np.tile(np.arange(0, 8000, 8, dtype=np.uint16), (10, 1))
+        result = lut_stretch_channel(channel, target_median=0.25)
+        
+        assert result.dtype == np.uint8
+        assert np.all(result == result[0])
+        assert np.all(np.diff(result[0].astype(int)) >= 0)
@@ -0,0 +1,155 @@
+"""
+Parity tests for the histogram statistics engine against numpy
+"""
+import pytest
+import os
+import sys
+import numpy as np
+from PIL import Image
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.image_stats import HistogramStats, channel_stats, luminance_stats
+from services.camera_utils import calculate_brightness, calculate_image_stats
+from services.processor import auto_stretch_image
+
+
+PERCENTILES = [0, 1, 2.5, 25, 50, 75, 95, 99, 99.7, 100]
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(1234)
+
+
+class TestIntegerParity:
+    """Integer input must match numpy exactly"""
+
+    @pytest.mark.parametrize("dtype,high", [(np.uint8, 256), (np.uint16, 65536)])
+    @pytest.mark.parametrize("size", [1, 2, 5, 1000, 1001])
+    def test_percentiles_match_numpy(self, rng, dtype, high, size):
+        data = rng.integers(0, high, size=size).astype(dtype)
+        stats = HistogramStats.from_array(data)
+
+        for p in PERCENTILES:
+            assert stats.percentile(p) == pytest.approx(np.percentile(data, p))
+
+    @pytest.mark.parametrize("dtype,high", [(np.uint8, 256), (np.uint16, 65536)])
+    @pytest.mark.parametrize("size", [1, 2, 5, 1000, 1001])
+    def test_median_mad_mean_std_match_numpy(self, rng, dtype, high, size):
+        data = rng.integers(0, high, size=size).astype(dtype)
+        stats = HistogramStats.from_array(data)
+        median = np.median(data)
+
+        assert stats.median() == pytest.approx(median)
+        assert stats.mad() == pytest.approx(np.median(np.abs(data.astype(np.float64) - median)))
+        assert stats.mean() == pytest.approx(np.mean(data))
+        assert stats.std() == pytest.approx(np.std(data))
+        assert stats.min() == data.min()
+        assert stats.max() == data.max()
+
+    def test_skewed_2d_frame(self, rng):
+        """Dark sky-like frame: most pixels near black, a few bright stars"""
+        frame = (rng.random((480, 640)) ** 4 * 65535).astype(np.uint16)
+        stats = HistogramStats.from_array(frame)
+        median = np.median(frame)
+
+        assert stats.median() == pytest.approx(median)
+        assert stats.mad() == pytest.approx(np.median(np.abs(frame.astype(np.float64) - median)))
+        assert stats.percentile(1) == pytest.approx(np.percentile(frame, 1))
+
+    def test_channel_stats_match_per_channel_numpy(self, rng):
+        rgb = rng.integers(0, 65536, size=(120, 160, 3)).astype(np.uint16)
+        for c, stats in enumerate(channel_stats(rgb)):
+            assert stats.median() == pytest.approx(np.median(rgb[:, :, c]))
+            assert stats.percentile(95) == pytest.approx(np.percentile(rgb[:, :, c], 95))
+
+    def test_12bit_left_aligned_uses_4096_bins(self, rng):
+        """12-bit sensor data in RAW16 has its low 4 bits zero"""
+        frame = (rng.integers(0, 4096, size=(100, 100)) << 4).astype(np.uint16)
+        stats = HistogramStats.from_array(frame, bit_depth=12)
+
+        assert stats.bins == 4096
+        assert stats.median() == pytest.approx(np.median(frame))
+        assert stats.percentile(75) == pytest.approx(np.percentile(frame, 75))
+
+    def test_fraction_above(self, rng):
+        data = rng.integers(0, 256, size=(100, 100)).astype(np.uint8)
+        stats = HistogramStats.from_array(data)
+
+        assert stats.fraction_above(245) == pytest.approx(np.mean(data > 245))
+        assert stats.fraction_above(255) == 0.0
+        assert stats.fraction_above(-1) == 1.0
+
+
+class TestFloatParity:
+    """Float input is quantized to 16 bits"""
+
+    TOLERANCE = 1.0 / 65535
+
+    def test_float_plane(self, rng):
+        data = rng.random((200, 300)).astype(np.float32) ** 3
+        stats = HistogramStats.from_float(data)
+        median = np.median(data)
+
+        assert abs(stats.median() - median) <= self.TOLERANCE
+        assert abs(stats.mad() - np.median(np.abs(data - median))) <= 2 * self.TOLERANCE
+        assert abs(stats.percentile(1) - np.percentile(data, 1)) <= self.TOLERANCE
+        assert abs(stats.mean() - np.mean(data)) <= self.TOLERANCE
+
+    def test_float_luminance(self, rng):
+        rgb = rng.random((200, 300, 3)).astype(np.float32)
+        lum = 0.299 * rgb[:, :, 0] + 0.587 * rgb[:, :, 1] + 0.114 * rgb[:, :, 2]
+        stats = luminance_stats(rgb)
+
+        assert abs(stats.median() - np.median(lum)) <= self.TOLERANCE
+        assert abs(stats.percentile(1) - np.percentile(lum, 1)) <= self.TOLERANCE
+
+    @pytest.mark.parametrize("dtype,scale", [(np.uint8, 255.0), (np.uint16, 65535.0)])
+    def test_integer_luminance_matches_float_luminance(self, rng, dtype, scale):
+        rgb = (rng.random((150, 200, 3)) ** 2 * scale).astype(dtype)
+        lum = (0.299 * rgb[:, :, 0] + 0.587 * rgb[:, :, 1] + 0.114 * rgb[:, :, 2]) / scale
+        stats = luminance_stats(rgb)
+        median = stats.normalized(stats.median())
+
+        assert abs(median - np.median(lum)) <= self.TOLERANCE
+        assert abs(stats.normalized(stats.mad()) - np.median(np.abs(lum - np.median(lum)))) <= 2 * self.TOLERANCE
+
+
+class TestConsumers:
+    """Call sites that now use the histogram engine"""
+
+    def test_calculate_brightness_matches_numpy(self, rng):
+        img = rng.integers(0, 256, size=(120, 160, 3)).astype(np.uint8)
+
+        assert calculate_brightness(img, 'mean') == pytest.approx(np.mean(img))
+        assert calculate_brightness(img, 'median') == pytest.approx(np.median(img))
+        assert calculate_brightness(img, 'percentile', 75) == pytest.approx(np.percentile(img, 75))
+
+    def test_calculate_image_stats_matches_numpy(self, rng):
+        img = rng.integers(0, 256, size=(120, 160, 3)).astype(np.uint8)
+        stats = calculate_image_stats(img)
+
+        assert stats['mean'] == pytest.approx(np.mean(img))
+        assert stats['median'] == pytest.approx(np.median(img))
+        assert stats['min'] == int(img.min())
+        assert stats['max'] == int(img.max())
+        assert stats['std_dev'] == pytest.approx(np.std(img))
+        assert stats['p25'] == pytest.approx(np.percentile(img, 25))
+        assert stats['p75'] == pytest.approx(np.percentile(img, 75))
+        assert stats['p95'] == pytest.approx(np.percentile(img, 95))
+
+    @pytest.mark.parametrize("preserve_blacks", [True, False])
+    def test_auto_stretch_reaches_target_median(self, rng, preserve_blacks):
+        """Dark 16-bit frame stretched to the target luminance median"""
+        raw = (rng.random((240, 320, 3)) ** 3 * 4000 + 500).astype(np.uint16)
+        img = Image.fromarray((raw // 257).astype(np.uint8), mode='RGB')
+        config = {'target_median': 0.25, 'preserve_blacks': preserve_blacks, 'saturation_boost': 1.0}
+
+        result = auto_stretch_image(img, config, raw_16bit=raw)
+        result_lum = np.asarray(result.convert('L'), dtype=np.float32) / 255.0
+
+        assert result.size == img.size
+        assert np.median(result_lum) == pytest.approx(0.25, abs=0.02)
@@ -0,0 +1,143 @@
+"""
+Test the pre-encoded image variant cache behind the /latest endpoint
+"""
+import pytest
+import io
+import os
+import sys
+import time
+from PIL import Image
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.image_variants import (VariantCache, DEFAULT_PRESETS, REDUCED_WIDTH, THUMBNAIL_WIDTH,
+                                     etag_matches, make_etag, normalize_format)
+
+
+def encode(img, fmt='JPEG'):
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def frame():
+    return Image.linear_gradient('L').resize((2000, 1000)).convert('RGB')
+
+
+@pytest.fixture
+def cache():
+    cache = VariantCache(background=False)
+    yield cache
+    cache.close()
+
+
+class TestVariantSelection:
+    """Requests map onto cached variants"""
+
+    def test_no_parameters_serve_published_bytes(self, cache, frame):
+        data = encode(frame)
+        cache.update(data, 'image/jpeg', frame)
+
+        assert cache.get().data == data
+        assert cache.encode_count == 0
+
+    def test_width_rounds_up_to_preset(self, cache, frame):
+        cache.update(encode(frame), 'image/jpeg', frame)
+
+        thumb = cache.get(width=100)
+        with Image.open(io.BytesIO(thumb.data)) as img:
+            assert img.size == (THUMBNAIL_WIDTH, THUMBNAIL_WIDTH // 2)
+        assert cache.get(width=THUMBNAIL_WIDTH + 1) is cache.get(width=REDUCED_WIDTH)
+
+    def test_width_above_presets_serves_full_size(self, cache, frame):
+        data = encode(frame)
+        cache.update(data, 'image/jpeg', frame)
+
+        assert cache.get(width=5000).data == data
+
+    def test_small_frame_never_upscaled(self, cache):
+        small = Image.new('RGB', (200, 100), (10, 20, 30))
+        data = encode(small)
+        cache.update(data, 'image/jpeg', small)
+
+        assert cache.get(width=THUMBNAIL_WIDTH).data == data
+
+    def test_png_frame_converted_on_request(self, cache, frame):
+        cache.update(encode(frame, 'PNG'), 'image/png')  # No PIL image: decoded from the bytes
+
+        variant = cache.get(fmt='webp')
+        assert variant.content_type == 'image/webp'
+        with Image.open(io.BytesIO(variant.data)) as img:
+            assert img.format == 'WEBP' and img.size == frame.size
+
+    def test_format_names(self):
+        assert normalize_format('JPG') == 'jpeg'
+        assert normalize_format('gif') is None
+
+
+class TestEncodeOnce:
+    """Variants are encoded once per frame"""
+
+    def test_repeat_requests_reuse_encoding(self, cache, frame):
+        cache.update(encode(frame), 'image/jpeg', frame)
+        first = cache.get(width=REDUCED_WIDTH)
+        count = cache.encode_count
+
+        assert cache.get(width=REDUCED_WIDTH) is first
+        assert cache.encode_count == count
+
+    def test_unchanged_frame_keeps_variants(self, cache, frame):
+        data = encode(frame)
+        cache.update(data, 'image/jpeg', frame)
+        thumb = cache.get(width=THUMBNAIL_WIDTH)
+
+        assert cache.update(bytes(data), 'image/jpeg', frame) is False
+        assert cache.get(width=THUMBNAIL_WIDTH) is thumb
+
+    def test_new_frame_replaces_variants(self, cache, frame):
+        cache.update(encode(frame), 'image/jpeg', frame)
+        old = cache.get(width=THUMBNAIL_WIDTH)
+
+        flipped = frame.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+        assert cache.update(encode(flipped), 'image/jpeg', flipped) is True
+        assert cache.get(width=THUMBNAIL_WIDTH).etag != old.etag
+
+    def test_background_encoder_fills_presets(self, frame):
+        cache = VariantCache()
+        try:
+            cache.update(encode(frame, 'PNG'), 'image/png', frame)
+            deadline = time.time() + 10
+            while cache.encode_count < len(DEFAULT_PRESETS) and time.time() < deadline:
+                time.sleep(0.01)
+
+            assert cache.encode_count == len(DEFAULT_PRESETS)
+            for width, fmt in DEFAULT_PRESETS:
+                cache.get(width, fmt)
+            assert cache.encode_count == len(DEFAULT_PRESETS)
+        finally:
+            cache.close()
+
+
+class TestETags:
+    """Each variant has its own strong ETag"""
+
+    def test_variant_etags_differ(self, cache, frame):
+        cache.update(encode(frame), 'image/jpeg', frame)
+        etags = {cache.get().etag, cache.get(width=THUMBNAIL_WIDTH).etag,
+                 cache.get(width=REDUCED_WIDTH).etag, cache.get(fmt='webp').etag}
+
+        assert len(etags) == 4
+        assert all(etag.startswith('"') and etag.endswith('"') for etag in etags)
+
+    def test_if_none_match(self):
+        etag = make_etag(b'frame')
+
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", {etag}', etag)
+        assert etag_matches(etag.strip('"'), etag)
+        assert etag_matches('*', etag)
+        assert not etag_matches('"other"', etag)
+        assert not etag_matches(None, etag)
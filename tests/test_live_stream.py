@@ -0,0 +1,83 @@
+"""
+Test the live stream broadcaster behind the MJPEG and /events endpoints
+"""
+import pytest
+import os
+import sys
+import threading
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.live_stream import Broadcaster, Subscription
+
+
+class TestSubscription:
+    """Single-slot delivery"""
+
+    def test_slow_consumer_skips_to_newest(self):
+        subscription = Subscription()
+        for item in range(5):
+            subscription.offer(item)
+
+        assert subscription.next(timeout=0) == 4
+        assert subscription.next(timeout=0) is None
+        assert subscription.skipped == 4
+
+    def test_close_wakes_waiter(self):
+        subscription = Subscription()
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(subscription.next(timeout=10)))
+        waiter.start()
+
+        time.sleep(0.05)
+        subscription.close()
+        waiter.join(timeout=2)
+
+        assert not waiter.is_alive()
+        assert result == [None] and subscription.closed
+
+
+class TestBroadcaster:
+    """Fan-out to every subscriber"""
+
+    def test_every_subscriber_gets_each_item_once(self):
+        broadcaster = Broadcaster()
+        subscriptions = [broadcaster.subscribe() for _ in range(3)]
+
+        broadcaster.publish('frame-1')
+
+        assert [s.next(timeout=0) for s in subscriptions] == ['frame-1'] * 3
+        assert [s.next(timeout=0) for s in subscriptions] == [None] * 3
+
+    def test_new_subscriber_starts_with_latest(self):
+        broadcaster = Broadcaster()
+        broadcaster.publish('frame-1')
+
+        assert broadcaster.subscribe().next(timeout=0) == 'frame-1'
+        assert broadcaster.subscribe(replay_latest=False).next(timeout=0) is None
+
+    def test_publish_does_not_wait_for_consumers(self):
+        broadcaster = Broadcaster()
+        stalled = broadcaster.subscribe()  # Never reads
+
+        start = time.perf_counter()
+        for item in range(1000):
+            broadcaster.publish(item)
+
+        assert time.perf_counter() - start < 1.0
+        assert stalled.next(timeout=0) == 999
+
+    def test_subscriber_limit_and_close(self):
+        broadcaster = Broadcaster(max_subscribers=2)
+        first, second = broadcaster.subscribe(), broadcaster.subscribe()
+
+        assert broadcaster.subscribe() is None
+        broadcaster.unsubscribe(first)
+        assert broadcaster.subscriber_count == 1
+
+        broadcaster.close()
+        assert second.closed
+        assert broadcaster.subscribe() is None
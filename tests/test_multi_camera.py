@@ -0,0 +1,64 @@
+"""
+Test multi-camera capture against virtual cameras
+"""
+import pytest
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services import virtual_zwoasi
+from services.config import Config
+from services.multi_camera import MultiCameraRunner, camera_slug
+
+
+@pytest.fixture
+def runner(tmp_path):
+    runner = MultiCameraRunner(auto_stop=2, virtual_camera='')
+    runner.config = Config(str(tmp_path / 'config.json'))
+    runner.config.data.update({
+        'output_directory': str(tmp_path / 'images'),
+        'filename_pattern': 'latest_{timestamp}',
+        'output_format': 'png',
+        'zwo_interval': 0.1,
+        'zwo_exposure_priors': False,
+        'overlays': [],
+        'output': {'mode': 'file'},
+        'virtual_camera': {'cameras': 2, 'width': 128, 'height': 96, 'exposure_scale': 0.0,
+                           'readout_ms': 1.0},
+        'multi_camera': {'enabled': True, 'processing_workers': 1, 'cameras': [
+            {'name': 'ZWO ASI Virtual', 'id': 'allsky'},
+            {'name': 'ZWO ASI Virtual', 'id': 'pier', 'interval': 0.2},
+        ]},
+    })
+    yield runner
+    virtual_zwoasi.uninstall()
+
+
+class TestMultiCameraRunner:
+    """One process, one SDK, a capture thread per camera"""
+
+    def test_captures_every_camera_into_its_namespace(self, runner, tmp_path):
+        assert runner.start()
+
+        allsky, pier = runner.units
+        assert (allsky.name, pier.name) == ('ZWO ASI Virtual #1', 'ZWO ASI Virtual #2')
+        assert allsky.zwo_camera.asi is pier.zwo_camera.asi
+        assert allsky.image_count >= 5 and pier.image_count >= 3
+        assert allsky.image_count > pier.image_count  # Own intervals
+        assert os.listdir(tmp_path / 'images' / 'allsky') and os.listdir(tmp_path / 'images' / 'pier')
+        assert runner.image_count == allsky.image_count + pier.image_count
+        assert allsky.streams and not pier.streams
+
+    def test_missing_camera_skipped(self, runner):
+        runner.config.data['multi_camera']['cameras'].append({'name': 'ZWO ASI2600MC', 'id': 'spare'})
+        runner.auto_stop = 0.5
+
+        assert runner.start()
+        assert [unit.id for unit in runner.units] == ['allsky', 'pier']
+
+    def test_camera_slug(self):
+        assert camera_slug('ZWO ASI676MC') == 'zwo-asi676mc'
+        assert camera_slug('') == 'camera'
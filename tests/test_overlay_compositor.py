@@ -0,0 +1,158 @@
+"""
+Test the cached-layer overlay compositor against the direct drawing path
+"""
+import pytest
+import os
+import sys
+import numpy as np
+from PIL import Image, ImageDraw
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.processor import add_overlays, replace_tokens, calculate_position, parse_color
+from services.overlay_compositor import OverlayCompositor, load_font, DEFAULT_FONT_FAMILY
+
+
+METADATA = {'CAMERA': 'ASI676MC', 'EXPOSURE': '1.5s', 'GAIN': '100', 'TEMP': '-5.0 C'}
+
+TEXT_OVERLAYS = [
+    {'type': 'text', 'text': 'PFR Sentinel', 'anchor': 'Top-Left', 'font_size': 24, 'color': 'white'},
+    {'type': 'text', 'text': '{CAMERA}\nExp {EXPOSURE} Gain {GAIN}', 'anchor': 'Bottom-Right',
+     'font_size': 18, 'color': '#FFC800', 'background_enabled': True, 'background_color': 'black'},
+    {'type': 'text', 'text': 'Temp: {TEMP}', 'anchor': 'Center', 'offset_x': -20, 'offset_y': 5,
+     'font_size': 30, 'color': 'cyan', 'background_enabled': True, 'background_color': '#203040'},
+]
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(11)
+    return Image.fromarray(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8), mode='RGB')
+
+
+def draw_directly(img, overlays, metadata):
+    """Previous add_overlays text path: draw on a full-frame RGBA copy, flatten onto white"""
+    rgba = img.convert('RGBA')
+    draw = ImageDraw.Draw(rgba)
+    for overlay in overlays:
+        text = replace_tokens(overlay['text'], metadata)
+        font = load_font(DEFAULT_FONT_FAMILY, overlay.get('font_size', 28))
+        bbox = draw.textbbox((0, 0), text, font=font)
+        x, y = calculate_position(rgba.size, (bbox[2] - bbox[0], bbox[3] - bbox[1]),
+                                  overlay.get('anchor', 'Bottom-Left'),
+                                  overlay.get('offset_x', 10), overlay.get('offset_y', 10))
+        if overlay.get('background_enabled', False):
+            left, top, right, bottom = draw.textbbox((x, y), text, font=font)
+            draw.rectangle([left - 5, top - 5, right + 5, bottom + 5],
+                           fill=parse_color(overlay['background_color']))
+        draw.text((x, y), text, fill=parse_color(overlay.get('color', 'white')), font=font)
+    result = Image.new('RGB', rgba.size, (255, 255, 255))
+    result.paste(rgba, mask=rgba.split()[3])
+    return result
+
+
+class TestTextParity:
+    """Cached tiles must produce the same pixels as drawing directly"""
+
+    @pytest.mark.parametrize("index", range(len(TEXT_OVERLAYS)))
+    def test_single_overlay(self, frame, index):
+        overlays = [TEXT_OVERLAYS[index]]
+        expected = draw_directly(frame, overlays, METADATA)
+        result = OverlayCompositor().composite(frame, overlays, METADATA)
+
+        np.testing.assert_array_equal(np.asarray(result), np.asarray(expected))
+
+    def test_overlapping_overlays_keep_order(self, frame):
+        overlays = TEXT_OVERLAYS + [dict(TEXT_OVERLAYS[0], anchor='Center', color='red')]
+        expected = draw_directly(frame, overlays, METADATA)
+        result = add_overlays(frame, overlays, METADATA)
+
+        np.testing.assert_array_equal(np.asarray(result), np.asarray(expected))
+
+
+class TestLayerCaching:
+    """Static text renders once, token text only when its value changes"""
+
+    def test_static_text_rendered_once(self, frame):
+        compositor = OverlayCompositor()
+        compositor.composite(frame, TEXT_OVERLAYS[:1], METADATA)
+        layer = next(iter(compositor._static_layers.values()))
+        compositor.composite(frame, TEXT_OVERLAYS[:1], METADATA)
+
+        assert len(compositor._static_layers) == 1
+        assert next(iter(compositor._static_layers.values())) is layer
+        assert not compositor._dynamic_layers
+
+    def test_token_text_rerendered_on_change_only(self, frame):
+        compositor = OverlayCompositor()
+        overlays = TEXT_OVERLAYS[2:]
+        compositor.composite(frame, overlays, METADATA)
+        compositor.composite(frame, overlays, METADATA)
+        assert len(compositor._dynamic_layers) == 1
+
+        compositor.composite(frame, overlays, dict(METADATA, TEMP='-6.0 C'))
+        assert len(compositor._dynamic_layers) == 2
+
+    def test_dynamic_cache_is_bounded(self, frame):
+        compositor = OverlayCompositor(max_dynamic_layers=3)
+        for i in range(10):
+            compositor.composite(frame, TEXT_OVERLAYS[2:], dict(METADATA, TEMP=f"{i} C"))
+
+        assert len(compositor._dynamic_layers) == 3
+
+    def test_font_cache_keyed_by_family_and_size(self):
+        assert load_font(DEFAULT_FONT_FAMILY, 22) is load_font(DEFAULT_FONT_FAMILY, 22)
+
+
+class TestBaseImage:
+    """Frame handling around the composite"""
+
+    def test_input_not_modified_by_default(self, frame):
+        original = np.asarray(frame).copy()
+        result = add_overlays(frame, TEXT_OVERLAYS, METADATA)
+
+        assert result is not frame
+        np.testing.assert_array_equal(np.asarray(frame), original)
+
+    def test_in_place(self, frame):
+        result = add_overlays(frame, TEXT_OVERLAYS, METADATA, in_place=True)
+
+        assert result is frame
+
+    def test_rgba_input_flattened_onto_white(self):
+        img = Image.new('RGBA', (40, 30), (10, 20, 30, 0))
+        result = add_overlays(img, [], METADATA)
+
+        assert result.mode == 'RGB'
+        assert result.getpixel((5, 5)) == (255, 255, 255)
+
+
+class TestImageOverlay:
+    """Prepared image layers"""
+
+    def test_image_overlay_composited_with_opacity(self, frame, temp_dir):
+        logo_path = os.path.join(temp_dir, 'logo.png')
+        Image.new('RGB', (20, 10), (255, 0, 0)).save(logo_path)
+        overlay = {'type': 'image', 'image_path': logo_path, 'anchor': 'Top-Left',
+                   'offset_x': 5, 'offset_y': 7, 'opacity': 50}
+
+        result = add_overlays(frame, [overlay], METADATA)
+
+        base = np.asarray(frame, dtype=np.float64)[7:17, 5:25]
+        alpha = int(255 * 50 / 100) / 255.0
+        expected = base * (1 - alpha) + np.array([255, 0, 0]) * alpha
+        assert np.abs(np.asarray(result, dtype=np.float64)[7:17, 5:25] - expected).max() <= 1.0
+
+    def test_prepared_layer_reused(self, frame, temp_dir):
+        logo_path = os.path.join(temp_dir, 'logo.png')
+        Image.new('RGBA', (16, 16), (0, 255, 0, 255)).save(logo_path)
+        overlay = {'type': 'image', 'image_path': logo_path, 'width': 8, 'height': 8}
+        compositor = OverlayCompositor()
+
+        compositor.composite(frame, [overlay], METADATA)
+        compositor.composite(frame, [overlay], METADATA)
+
+        assert len(compositor._image_layers) == 1
+        assert next(iter(compositor._image_layers.values())).size == (8, 8)
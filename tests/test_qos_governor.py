@@ -0,0 +1,141 @@
+"""
+Test the processing-budget governor shedding and restoring optional work
+"""
+import pytest
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services import virtual_zwoasi
+from services.config import Config
+from services.headless_runner import HeadlessRunner
+from services.qos_governor import QoSGovernor
+
+
+def governor(**options):
+    options.setdefault('degrade_frames', 2)
+    options.setdefault('restore_frames', 3)
+    options.setdefault('smoothing', 1.0)  # Average = last frame
+    return QoSGovernor(**options)
+
+
+def run_frames(qos, seconds, count, interval=1.0, backlog=0):
+    """Feed count frames of the same processing time; returns the decisions"""
+    decisions = [qos.frame_done(seconds, interval, backlog) for _ in range(count)]
+    return [decision for decision in decisions if decision]
+
+
+class TestBudget:
+    """Shedding while over budget, restoring with headroom"""
+
+    def test_sheds_in_order(self):
+        messages = []
+        qos = governor(log=messages.append)
+        decisions = run_frames(qos, 2.0, 8)
+
+        assert [decision['action'] for decision in decisions] == ['ml', 'stretch', 'dev_mode', 'encode']
+        assert qos.level == 4 and qos.sheds == 4
+        assert decisions[0]['budget_ms'] == 800.0 and decisions[0]['frame_ms'] == 2000.0
+        assert messages[0].startswith("QoS: shedding ml")
+
+    def test_restores_in_reverse(self):
+        qos = governor()
+        run_frames(qos, 2.0, 4)
+        decisions = run_frames(qos, 0.1, 6)
+
+        assert [decision['action'] for decision in decisions] == ['stretch', 'ml']
+        assert [decision['decision'] for decision in decisions] == ['restore', 'restore']
+        assert qos.level == 0 and qos.restores == 2
+
+    def test_holds_between_thresholds(self):
+        qos = governor()
+        run_frames(qos, 2.0, 2)
+
+        assert run_frames(qos, 0.6, 10) == []  # Under budget, not enough headroom to restore
+        assert qos.level == 1
+
+    def test_backlog_counts_as_over_budget(self):
+        qos = governor()
+
+        assert run_frames(qos, 0.1, 2, backlog=3)[0]['action'] == 'ml'
+
+    def test_budget_follows_interval(self):
+        qos = governor()
+
+        assert run_frames(qos, 2.0, 4, interval=5.0) == []
+
+    def test_custom_order(self):
+        qos = governor(shed_order=['encode', 'bogus'])
+
+        assert qos.shed_order == ['encode']
+        assert [decision['action'] for decision in run_frames(qos, 2.0, 6)] == ['encode']
+
+
+class TestActions:
+    """What a shed step changes"""
+
+    def test_ml_on_alternate_frames(self):
+        qos = governor(shed_order=['ml'])
+        run_frames(qos, 2.0, 2)
+        skips = []
+        for _ in range(6):
+            skips.append(qos.skip('ml'))
+            qos.frame_done(2.0, 1.0)
+
+        assert skips.count(True) == 3 and skips.count(False) == 3
+        assert qos.stats()['skipped']['ml'] == 3
+
+    def test_dev_mode_skipped_while_shed(self):
+        qos = governor(shed_order=['dev_mode'])
+        assert not qos.skip('dev_mode')
+
+        run_frames(qos, 2.0, 2)
+        assert qos.skip('dev_mode') and qos.skip('dev_mode')
+
+    def test_fast_encode(self):
+        qos = governor(shed_order=['encode'])
+        assert qos.save_options('PNG', optimize=True) == {'optimize': True}
+
+        run_frames(qos, 2.0, 2)
+        assert qos.save_options('PNG', optimize=True) == {'optimize': False, 'compress_level': 1}
+        assert qos.save_options('JPEG', quality=85, optimize=True) == {'quality': 85, 'optimize': False}
+
+    def test_stage_bottleneck_in_decision(self):
+        qos = governor()
+        qos.timings.record('stretch', 1.5)
+        qos.timings.record('overlay', 0.2)
+
+        decision = run_frames(qos, 2.0, 2)[0]
+        assert (decision['bottleneck'], decision['bottleneck_ms']) == ('stretch', 1500.0)
+
+
+class TestHeadlessQoS:
+    """Headless processing sheds encode effort when it can't keep up"""
+
+    def test_sheds_fast_encode(self, tmp_path):
+        runner = HeadlessRunner(auto_stop=1.5, virtual_camera='')
+        runner.config = Config(str(tmp_path / 'config.json'))
+        runner.config.data.update({
+            'output_directory': str(tmp_path / 'images'),
+            'filename_pattern': 'latest',
+            'output_format': 'png',
+            'zwo_interval': 0.001,
+            'zwo_exposure_priors': False,
+            'overlays': [],
+            'output': {'mode': 'file'},
+            'virtual_camera': {'width': 128, 'height': 96, 'exposure_scale': 0.0, 'readout_ms': 1.0},
+            'qos': {'enabled': True, 'degrade_frames': 1},  # Default shed order
+        })
+        try:
+            assert runner.start()
+        finally:
+            virtual_zwoasi.uninstall()
+
+        qos = runner.zwo_camera.qos_governor
+        assert qos.shed_order == ['encode']
+        assert qos.degraded('encode')
+        assert qos.decisions[0]['decision'] == 'shed' and qos.decisions[0]['action'] == 'encode'
+        assert 'processing' in runner.zwo_camera.stage_timings.snapshot()
@@ -0,0 +1,155 @@
+"""
+Test RTSP output frame handling (ffmpeg replaced by an in-memory sink)
+"""
+import pytest
+import os
+import sys
+import threading
+import time
+import numpy as np
+from PIL import Image
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.rtsp_output import RTSPStreamServer, fit_to_stream
+
+
+class FakeStdin:
+    """Collects the chunks written to the encoder pipe"""
+
+    def __init__(self):
+        self.chunks = []
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        with self.lock:
+            self.chunks.append(bytes(data))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeEncoder:
+    """Stands in for the ffmpeg subprocess"""
+
+    def __init__(self):
+        self.stdin = FakeStdin()
+
+    def poll(self):
+        return None
+
+    def terminate(self):
+        pass
+
+    def wait(self, timeout=None):
+        return 0
+
+
+class SinkRTSPServer(RTSPStreamServer):
+    """RTSPStreamServer writing to a FakeEncoder instead of ffmpeg"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.encoders = []
+
+    def _check_ffmpeg(self):
+        return True
+
+    def _spawn_encoder(self):
+        self.encoders.append(FakeEncoder())
+        return self.encoders[-1]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+@pytest.fixture
+def server():
+    server = SinkRTSPServer(width=320, height=180, fps=100.0, keyframe_interval=60.0)
+    assert server.start()
+    yield server
+    server.stop()
+
+
+class TestFitToStream:
+    """Frames are letterboxed into the fixed stream size"""
+
+    def test_wide_frame_gets_bars_top_and_bottom(self):
+        img = Image.new('RGB', (400, 100), (200, 100, 50))
+        result = fit_to_stream(img, (320, 180))
+
+        assert result.size == (320, 180)
+        pixels = np.asarray(result)
+        assert tuple(pixels[90, 160]) == (200, 100, 50)
+        assert tuple(pixels[0, 160]) == (0, 0, 0)
+
+    def test_camera_frame_gets_bars_left_and_right(self):
+        img = Image.new('L', (4144, 2822), 255)
+        result = fit_to_stream(img, (1280, 720))
+
+        assert result.size == (1280, 720) and result.mode == 'RGB'
+        pixels = np.asarray(result)
+        assert pixels[360, 0].max() == 0
+        assert pixels[360, 640].min() == 255
+
+
+class TestFrameForwarding:
+    """New frames are scaled once; the encoder is never restarted"""
+
+    def test_frame_sizes_change_without_restart(self, server):
+        for size in [(640, 480), (4144, 2822), (1920, 1080)]:
+            server.update_image(Image.new('RGB', size, (10, 20, 30)))
+            count = server.frames_encoded
+            assert wait_for(lambda: server.frames_encoded > count)
+
+        chunks = server.encoders[0].stdin.chunks
+        assert len(server.encoders) == 1
+        assert [len(chunk) for chunk in chunks] == [320 * 180 * 3] * 3
+
+    def test_unchanged_frame_not_rewritten_until_keyframe_interval(self):
+        server = SinkRTSPServer(width=64, height=36, fps=100.0, keyframe_interval=0.1)
+        server.start()
+        try:
+            server.update_image(Image.new('RGB', (128, 72), (1, 2, 3)))
+            assert wait_for(lambda: server.frames_repeated >= 2)
+        finally:
+            server.stop()
+
+        stats = server.stats()
+        assert stats['frames_encoded'] == 1
+        assert stats['bytes_written'] == (1 + stats['frames_repeated']) * 64 * 36 * 3
+
+    def test_idle_stream_writes_nothing(self, server):
+        time.sleep(0.1)
+
+        assert server.encoders[0].stdin.chunks == []
+
+    def test_burst_is_coalesced_to_fps(self):
+        server = SinkRTSPServer(width=64, height=36, fps=2.0, keyframe_interval=60.0)
+        server.start()
+        try:
+            for i in range(5):
+                server.update_image(Image.new('RGB', (128, 72), (i, i, i)))
+            time.sleep(0.2)
+        finally:
+            server.stop()
+
+        assert server.frames_received == 5
+        assert server.frames_encoded <= 2
+
+    def test_update_image_does_not_wait_for_scaling(self, server):
+        big = Image.new('RGB', (4144, 2822))
+
+        start = time.perf_counter()
+        server.update_image(big)
+
+        assert time.perf_counter() - start < 0.01
@@ -0,0 +1,111 @@
+"""
+Test compiled token templates for overlay text and output filenames
+"""
+import pytest
+import os
+import re
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.processor import replace_tokens, build_output_filename
+from services.token_template import TokenTemplate, compile_template
+
+
+METADATA = {'CAMERA': 'ASI676MC', 'EXPOSURE': '1.5s', 'GAIN': '100', 'TEMP': '-5.0 C', 'SESSION': '2026-01-01',
+            'FILENAME': 'capture_001.png'}
+
+
+def regex_replace_tokens(text, metadata):
+    """Previous replace_tokens: regex scan and metadata copy per call"""
+    formatted = metadata.copy()
+    if 'EXPOSURE' in formatted:
+        exp_str = str(formatted['EXPOSURE'])
+        if exp_str.endswith('s'):
+            try:
+                formatted['EXPOSURE'] = f"{float(exp_str[:-1]):.2f}s"
+            except ValueError:
+                pass
+    result = text
+    for token in re.findall(r'\{([^}]+)\}', text):
+        result = result.replace(f'{{{token}}}', str(formatted.get(token.upper(), '?')))
+    return result
+
+
+class TestReplaceTokensParity:
+    """Compiled templates render exactly like the regex implementation"""
+
+    @pytest.mark.parametrize("text", [
+        'PFR Sentinel',
+        '{CAMERA} Exp {EXPOSURE} Gain {GAIN}',
+        '{camera} / {Temp} / {MISSING}',
+        '{GAIN}{GAIN}{GAIN}',
+        'Unclosed {CAMERA',
+        '{}{EXPOSURE}',
+        '',
+    ])
+    def test_matches_regex_implementation(self, text):
+        assert replace_tokens(text, METADATA) == regex_replace_tokens(text, METADATA)
+
+    @pytest.mark.parametrize("exposure", ['0.123456s', 'auto', 'xs', 2.5])
+    def test_exposure_formatting(self, exposure):
+        metadata = dict(METADATA, EXPOSURE=exposure)
+        assert replace_tokens('{EXPOSURE}', metadata) == regex_replace_tokens('{EXPOSURE}', metadata)
+
+    def test_overrides_do_not_modify_metadata(self):
+        metadata = dict(METADATA)
+        result = replace_tokens('{DATETIME} {CAMERA}', metadata, {'DATETIME': '2026-01-01 20:00'})
+
+        assert result == '2026-01-01 20:00 ASI676MC'
+        assert metadata == METADATA
+
+
+class TestTokenTemplate:
+    """Parsing, dependencies and memoized rendering"""
+
+    def test_segments_and_tokens(self):
+        template = TokenTemplate('Exp {exposure} Gain {GAIN}')
+
+        assert template.segments == ['Exp ', ('EXPOSURE', '{exposure}'), ' Gain ', ('GAIN', '{GAIN}')]
+        assert template.tokens == {'EXPOSURE', 'GAIN'}
+        assert not template.is_static
+        assert TokenTemplate('Static text').is_static
+
+    def test_compiled_once_per_string(self):
+        assert compile_template('{CAMERA} x') is compile_template('{CAMERA} x')
+        assert compile_template('{CAMERA} x') is not compile_template('{CAMERA} x', True)
+
+    def test_unchanged_values_reuse_previous_rendering(self):
+        template = TokenTemplate('{CAMERA} gain {GAIN}')
+        first = template.render(METADATA)
+
+        # Tokens the template does not use may change freely
+        assert template.render(dict(METADATA, TEMP='-9.0 C')) is first
+        assert template.render(dict(METADATA, GAIN='200')) == 'ASI676MC gain 200'
+
+    def test_value_type_change_re_renders(self):
+        template = TokenTemplate('{GAIN}')
+
+        assert [template.render({'GAIN': value}) for value in (1, True, 1.0)] == ['1', 'True', '1.0']
+
+    def test_missing_token_kept_when_default_none(self):
+        template = TokenTemplate('{filename}_{Unknown}', case_sensitive=True)
+
+        assert template.render({'filename': 'img'}, default=None) == 'img_{Unknown}'
+
+
+class TestBuildOutputFilename:
+    """Filename patterns go through the same compiled templates"""
+
+    def test_filename_and_session(self):
+        assert build_output_filename('{session}_{filename}', METADATA, 'PNG') == '2026-01-01_capture_001.png'
+
+    def test_tokens_are_case_sensitive(self):
+        assert build_output_filename('{FILENAME}_{filename}', METADATA, 'JPG') == '{FILENAME}_capture_001.jpg'
+
+    def test_timestamp(self):
+        result = build_output_filename('{timestamp}', METADATA, 'PNG')
+
+        assert re.fullmatch(r'\d{8}_\d{6}\.png', result)
@@ -0,0 +1,239 @@
+"""
+Test video-mode (continuous readout) capture against a simulated camera
+"""
+import pytest
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.video_capture import VideoCaptureEngine, use_video_mode, VIDEO_MODE_HYSTERESIS
+from services.frame_pool import FramePool
+from tests.fakes import FakeASI, FakeCamera, make_camera
+
+
+class SimulatedCamera(FakeCamera):
+    """
+    FakeCamera with realistic timing: snapshots pay a setup cost on top of the
+    exposure, video mode delivers one frame per exposure.
+    """
+
+    SNAPSHOT_SETUP_SEC = 0.03
+
+    def __init__(self, *args, exposure_seconds=0.01, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.exposure_seconds = exposure_seconds
+        self.video_running = False
+        self.video_starts = 0
+        self.fail_video = False
+        self._started = None
+        self._next_frame = None
+        self._frame_number = 0
+
+    def set_control_value(self, control, value):
+        if control == FakeASI.ASI_EXPOSURE:
+            self.exposure_seconds = value / 1000000
+
+    def start_exposure(self):
+        assert not self.video_running, "snapshot exposure while streaming"
+        self._started = time.monotonic()
+
+    def get_exposure_status(self):
+        if time.monotonic() - self._started < self.SNAPSHOT_SETUP_SEC + self.exposure_seconds:
+            return FakeASI.ASI_EXP_WORKING
+        return FakeASI.ASI_EXP_SUCCESS
+
+    def start_video_capture(self):
+        self.video_running = True
+        self.video_starts += 1
+        self._next_frame = time.monotonic() + self.exposure_seconds
+
+    def stop_video_capture(self):
+        self.video_running = False
+
+    def get_video_data(self, timeout=None, buffer_=None):
+        if not self.video_running or self.fail_video:
+            raise IOError("ASI_ERROR_TIMEOUT")
+        wait = self._next_frame - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._next_frame = max(self._next_frame + self.exposure_seconds, time.monotonic())
+        self._frame_number += 1
+        buffer_[:] = self.frame
+        buffer_[0] = self._frame_number % 256  # Tag frames so tests can tell them apart
+        return buffer_
+
+    def get_dropped_frames(self):
+        return 0
+
+
+@pytest.fixture
+def camera():
+    return SimulatedCamera(160, 120, 8, exposure_seconds=0.005)
+
+
+@pytest.fixture
+def engine(camera):
+    pool = FramePool(160, 120, 8, slots=4, max_slots=8)
+    engine = VideoCaptureEngine(camera, FakeASI, pool.acquire, log=lambda message: None)
+    yield engine
+    engine.stop()
+
+
+class TestModeSelection:
+    """snapshot / video / auto decision"""
+
+    def test_fixed_modes(self):
+        assert use_video_mode('video', 30.0, 1.0)
+        assert not use_video_mode('snapshot', 0.001, 1.0)
+
+    def test_auto_uses_video_for_short_exposures(self):
+        assert use_video_mode('auto', 0.5, 1.0)
+        assert not use_video_mode('auto', 2.0, 1.0)
+
+    def test_auto_hysteresis(self):
+        exposure = 1.0 * (1 + VIDEO_MODE_HYSTERESIS) / 2  # Between threshold and threshold * hysteresis
+        assert not use_video_mode('auto', exposure, 1.0, video_active=False)
+        assert use_video_mode('auto', exposure, 1.0, video_active=True)
+
+
+class TestVideoCaptureEngine:
+    """Reader thread keeps only the newest frame"""
+
+    def test_grab_returns_each_frame_once(self, engine):
+        engine.start(0.005, 100)
+        first = engine.grab(timeout=2)
+        second = engine.grab(timeout=2)
+
+        assert second.seq > first.seq
+        assert first.exposure_seconds == 0.005 and first.gain == 100
+
+    def test_slow_consumer_drops_frames(self, engine):
+        engine.start(0.005, 100)
+        engine.grab(timeout=2)
+        time.sleep(0.1)  # ~20 frames arrive while the capture loop is busy
+        frame = engine.grab(timeout=2)
+
+        assert engine.frames_dropped > 5
+        assert frame.seq == engine._seq  # Newest, not the oldest
+
+    def test_settings_change_discards_frames_in_flight(self, engine):
+        engine.start(0.005, 100)
+        engine.grab(timeout=2)
+        engine.apply_settings(0.02, 150)
+        changed_at = time.monotonic()
+        frame = engine.grab(timeout=2)
+
+        assert frame.exposure_seconds == 0.02 and frame.gain == 150
+        assert frame.received_at >= changed_at + 0.02
+
+    def test_stream_error_surfaces_in_grab(self, camera, engine):
+        camera.fail_video = True  # Before start: no frame can be read ahead of the error
+        engine.start(0.005, 100)
+
+        with pytest.raises(Exception, match="Video capture failed"):
+            engine.grab(timeout=2)
+
+    def test_stop_ends_stream(self, camera, engine):
+        engine.start(0.005, 100)
+        engine.grab(timeout=2)
+        engine.stop()
+
+        assert not camera.video_running
+        assert engine._thread is None
+
+
+class TestZWOCameraVideoMode:
+    """expose_frame switches between snapshot and video"""
+
+    def make(self, mode):
+        zwo = make_camera()
+        zwo.camera = SimulatedCamera(160, 120, 8)
+        zwo.capture_mode = mode
+        zwo.video_max_exposure = 0.05
+        zwo.exposure_seconds = 0.005
+        return zwo
+
+    def test_auto_switches_on_exposure(self):
+        zwo = self.make('auto')
+        try:
+            zwo.expose_frame()
+            assert zwo.video_active
+
+            zwo.exposure_seconds = 0.1  # Above threshold * hysteresis
+            zwo.expose_frame()
+            assert not zwo.video_active
+            assert not zwo.camera.video_running
+
+            zwo.exposure_seconds = 0.005
+            zwo.expose_frame()
+            assert zwo.video_active and zwo.camera.video_starts == 2
+        finally:
+            zwo.disconnect_camera()
+
+    def test_video_frame_develops_like_snapshot(self):
+        zwo = self.make('video')
+        try:
+            img, metadata = zwo.develop_frame(zwo.expose_frame())
+
+            assert img.size == (160, 120)
+            assert metadata['EXPOSURE'] == "0.005s"
+            assert 'expose' in metadata['STAGE_TIMINGS']
+        finally:
+            zwo.disconnect_camera()
+
+    def test_snapshot_mode_never_streams(self):
+        zwo = self.make('snapshot')
+        zwo.capture_single_frame()
+
+        assert zwo.camera.video_starts == 0
+
+    def test_disconnect_stops_stream(self):
+        zwo = self.make('video')
+        zwo.expose_frame()
+        camera = zwo.camera
+        zwo.disconnect_camera()
+
+        assert not camera.video_running
+        assert not zwo.video_active
+
+
+@pytest.mark.slow
+class TestVideoModeBenchmark:
+    """Cadence and CPU of video vs snapshot capture on the simulated camera"""
+
+    DURATION = 1.0
+
+    def run(self, mode, exposure):
+        zwo = make_camera(width=1280, height=960)
+        zwo.camera = SimulatedCamera(1280, 960, 8)
+        zwo.capture_mode = mode
+        zwo.exposure_seconds = exposure
+
+        frames = 0
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        try:
+            while time.perf_counter() - start < self.DURATION:
+                raw = zwo.expose_frame()
+                del raw
+                frames += 1
+        finally:
+            elapsed = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            zwo.disconnect_camera()
+        return frames / elapsed, cpu / max(frames, 1) * 1000
+
+    def test_video_mode_cadence(self):
+        exposure = 0.01
+        snapshot_fps, snapshot_cpu = self.run('snapshot', exposure)
+        video_fps, video_cpu = self.run('video', exposure)
+        print(f"\n{exposure * 1000:.0f}ms exposures: snapshot {snapshot_fps:.1f} fps "
+              f"({snapshot_cpu:.2f} ms CPU/frame), video {video_fps:.1f} fps ({video_cpu:.2f} ms CPU/frame)")
+
+        assert video_fps > snapshot_fps * 2
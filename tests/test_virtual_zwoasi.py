@@ -0,0 +1,204 @@
+"""
+Test the simulated zwoasi backend and capture through it without hardware
+"""
+import pytest
+import os
+import sys
+import time
+import numpy as np
+from PIL import Image
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services import virtual_zwoasi as asi
+from services.virtual_zwoasi import VirtualCameraSpec
+from services.zwo_camera import ZWOCamera
+
+
+def open_camera(**options):
+    options.setdefault('width', 64)
+    options.setdefault('height', 48)
+    options.setdefault('exposure_scale', 0.0)
+    options.setdefault('readout_seconds', 0.0)
+    asi.configure(VirtualCameraSpec(**options))
+    asi.init()
+    return asi.Camera(0)
+
+
+def snapshot(camera, exposure_us, gain=0):
+    camera.set_control_value(asi.ASI_EXPOSURE, exposure_us)
+    camera.set_control_value(asi.ASI_GAIN, gain)
+    camera.start_exposure()
+    while camera.get_exposure_status() == asi.ASI_EXP_WORKING:
+        time.sleep(0.001)
+    if camera.get_exposure_status() == asi.ASI_EXP_FAILED:
+        return None
+    start_x, start_y, width, height = camera.get_roi()
+    dtype = np.uint16 if camera.get_image_type() == asi.ASI_IMG_RAW16 else np.uint8
+    return np.frombuffer(camera.get_data_after_exposure(), dtype=dtype).reshape(height, width)
+
+
+@pytest.fixture
+def installed():
+    asi.install(VirtualCameraSpec(width=320, height=240, exposure_scale=0.0, readout_seconds=0.0))
+    yield asi
+    asi.uninstall()
+
+
+class TestVirtualSensor:
+    """Frames respond to settings like a real sensor"""
+
+    def teardown_method(self):
+        asi.uninstall()
+
+    def test_brightness_follows_exposure_and_gain(self):
+        camera = open_camera(scene_level=0.2)
+        base = snapshot(camera, 100000).mean()
+
+        assert snapshot(camera, 200000).mean() == pytest.approx(base * 2, rel=0.05)
+        assert snapshot(camera, 100000, gain=60).mean() == pytest.approx(base * 2, rel=0.05)  # +6 dB
+
+    def test_gamma_and_pedestal(self):
+        camera = open_camera(scene_level=0.1, gamma=0.5, pedestal=0.04)
+        low = snapshot(camera, 250000).mean() - 0.04 * 255
+        high = snapshot(camera, 1000000).mean() - 0.04 * 255
+
+        assert high / low == pytest.approx(2.0, rel=0.05)
+
+    def test_raw16_holds_sensor_bits_high(self):
+        camera = open_camera(bit_depth=12)
+        camera.set_image_type(asi.ASI_IMG_RAW16)
+        frame = snapshot(camera, 500000)
+
+        assert frame.dtype == np.uint16
+        assert frame.max() > 255
+        assert not (frame & 0xF).any()
+
+    def test_roi_and_binning(self):
+        camera = open_camera()
+        camera.set_roi(bins=2)
+        assert snapshot(camera, 100000).shape == (24, 32)
+
+        camera.set_roi(start_x=8, start_y=4, width=16, height=8)
+        assert snapshot(camera, 100000).shape == (8, 16)
+
+        with pytest.raises(ValueError):
+            camera.set_roi(width=12, height=8)
+
+    def test_exposure_takes_scaled_time(self):
+        camera = open_camera(exposure_scale=1.0)
+        camera.set_control_value(asi.ASI_EXPOSURE, 50000)
+        camera.start_exposure()
+
+        assert camera.get_exposure_status() == asi.ASI_EXP_WORKING
+        time.sleep(0.06)
+        assert camera.get_exposure_status() == asi.ASI_EXP_SUCCESS
+
+    def test_fills_pooled_buffer(self):
+        camera = open_camera()
+        camera.set_control_value(asi.ASI_EXPOSURE, 100000)
+        camera.start_exposure()
+        buffer_ = bytearray(64 * 48)
+
+        assert camera.get_data_after_exposure(buffer_) is buffer_
+        assert any(buffer_)
+
+
+class TestFailureInjection:
+    """Injected failures surface the way the SDK reports them"""
+
+    def teardown_method(self):
+        asi.uninstall()
+
+    def test_failed_exposures(self):
+        camera = open_camera(failure_rate=1.0)
+
+        assert snapshot(camera, 1000) is None
+        with pytest.raises(asi.ZWO_CaptureError):
+            camera.get_data_after_exposure()
+
+    def test_disconnect_after(self):
+        camera = open_camera(disconnect_after=2)
+        snapshot(camera, 1000)
+        snapshot(camera, 1000)
+
+        with pytest.raises(asi.ZWO_IOError):
+            camera.start_exposure()
+
+    def test_closed_camera(self):
+        camera = open_camera()
+        camera.close()
+
+        with pytest.raises(asi.ZWO_IOError):
+            camera.get_controls()
+
+    def test_slow_video_reader_drops_frames(self):
+        camera = open_camera(exposure_scale=1.0)
+        camera.set_control_value(asi.ASI_EXPOSURE, 5000)
+        camera.start_video_capture()
+        camera.get_video_data()
+        time.sleep(0.05)
+        camera.get_video_data()
+
+        assert camera.get_dropped_frames() >= 5
+
+    def test_video_timeout(self):
+        camera = open_camera(video_timeout_rate=1.0)
+        camera.start_video_capture()
+
+        with pytest.raises(asi.ZWO_IOError):
+            camera.get_video_data(timeout=1)
+
+
+class TestReplay:
+    """Frames from a raw_debug-style directory are replayed in order"""
+
+    def teardown_method(self):
+        asi.uninstall()
+
+    def test_replays_and_cycles_files(self, tmp_path):
+        for index, level in enumerate((40, 160)):
+            Image.fromarray(np.full((32, 48), level, np.uint8)).save(tmp_path / f'raw_{index}.png')
+        camera = open_camera(source=str(tmp_path), reference_exposure=1.0)
+
+        means = [snapshot(camera, 1000000).mean() for _ in range(3)]
+        assert means == pytest.approx([40, 160, 40], abs=1)
+        assert snapshot(camera, 500000).shape == (32, 48)
+
+    def test_rgb_frame_debayers_to_original_colour(self, tmp_path):
+        from services.camera_utils import debayer_raw_image
+        rgb = np.zeros((16, 16, 3), np.uint8)
+        rgb[...] = (200, 100, 20)
+        Image.fromarray(rgb).save(tmp_path / 'raw_rgb.png')
+        camera = open_camera(source=str(tmp_path), bayer_pattern='RGGB')
+
+        frame = snapshot(camera, 1000000)
+        img, _ = debayer_raw_image(frame.tobytes(), 16, 16, 'RGGB')
+        assert tuple(img[8, 8]) == pytest.approx((200, 100, 20), abs=2)
+
+
+class TestVirtualCameraConnection:
+    """The application connects and captures through the installed module"""
+
+    def test_connect_and_capture(self, installed):
+        zwo = ZWOCamera(sdk_path='missing/ASICamera2.dll', exposure_sec=0.05, gain=100)
+        zwo.on_log_callback = lambda message: None
+        try:
+            assert zwo.initialize_sdk()
+            assert zwo.detect_cameras()[0]['name'] == 'ZWO ASI Virtual'
+            assert zwo.connect_camera(0)
+
+            img, metadata = zwo.capture_single_frame()
+            assert img.size == (320, 240)
+            assert metadata['CAMERA'] == 'ZWO ASI Virtual'
+        finally:
+            zwo.disconnect_camera()
+
+    def test_spec_from_config(self):
+        spec = VirtualCameraSpec.from_config({'readout_ms': 50.0, 'width': 640}, source='raw_debug')
+
+        assert spec.readout_seconds == 0.05
+        assert spec.width == 640
+        assert spec.source == 'raw_debug'
@@ -0,0 +1,177 @@
+"""
+Test process-pool directory-watch processing
+"""
+import pytest
+import os
+import sys
+import threading
+import numpy as np
+from PIL import Image
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.processor import process_image, warm_overlay_caches
+from services.watch_pool import (ConfigSnapshot, OrderedDelivery, WatchProcessPool,
+                                 export_image, import_image)
+from services.watcher import ImageFileHandler
+
+
+def make_config(output_dir, **overrides):
+    data = {
+        'output_directory': output_dir,
+        'output_pattern': '{filename}',
+        'output_format': 'PNG',
+        'overlays': [{'type': 'text', 'text': 'Frame {FILENAME}', 'anchor': 'Top-Left',
+                      'font_size': 20, 'color': 'white'}],
+    }
+    data.update(overrides)
+    return ConfigSnapshot(data)
+
+
+def write_frames(directory, count, size=(96, 64)):
+    """Distinct PNG frames, returned in arrival order"""
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"frame_{i:02d}.png")
+        Image.new('RGB', size, color=(20 * i, 40, 60)).save(path)
+        paths.append(path)
+    return paths
+
+
+class TestOrderedDelivery:
+    """Results are delivered in ticket order"""
+
+    def test_out_of_order_completion(self):
+        delivered = []
+        ordered = OrderedDelivery(lambda value: delivered.append(value))
+        tickets = [ordered.reserve() for _ in range(4)]
+
+        ordered.complete(tickets[2], ('c',))
+        ordered.complete(tickets[1], ('b',))
+        assert delivered == []
+
+        ordered.complete(tickets[0], ('a',))
+        assert delivered == ['a', 'b', 'c']
+        assert ordered.pending == 1
+
+    def test_skipped_ticket_releases_later_results(self):
+        delivered = []
+        ordered = OrderedDelivery(lambda value: delivered.append(value))
+        first, second = ordered.reserve(), ordered.reserve()
+
+        ordered.complete(second, ('b',))
+        ordered.skip(first)
+
+        assert delivered == ['b']
+        assert ordered.pending == 0
+
+
+class TestSharedFrames:
+    """Processed frames cross the process boundary via shared memory"""
+
+    @pytest.mark.parametrize("mode", ['RGB', 'RGBA', 'L'])
+    def test_round_trip(self, mode):
+        rng = np.random.default_rng(5)
+        channels = {'RGB': 3, 'RGBA': 4, 'L': 1}[mode]
+        shape = (48, 64, channels) if channels > 1 else (48, 64)
+        img = Image.fromarray(rng.integers(0, 256, shape, dtype=np.uint8), mode=mode)
+
+        result = import_image(export_image(img))
+
+        assert result.mode == mode
+        np.testing.assert_array_equal(np.asarray(result), np.asarray(img))
+
+    def test_warm_overlay_caches(self, temp_dir):
+        logo = os.path.join(temp_dir, 'logo.png')
+        Image.new('RGBA', (8, 8), (255, 0, 0, 128)).save(logo)
+        cache = {}
+
+        warm_overlay_caches([{'type': 'image', 'image_path': logo},
+                             {'type': 'image', 'image_path': 'WEATHER_ICON'},
+                             {'type': 'text', 'font_size': 18}], cache)
+
+        assert list(cache) == [logo]
+        assert cache[logo].size == (8, 8)
+
+
+class TestWatchProcessPool:
+    """End-to-end processing in worker processes"""
+
+    def test_results_match_thread_mode_in_arrival_order(self, temp_dir):
+        source_dir = os.path.join(temp_dir, 'in')
+        os.makedirs(source_dir)
+        paths = write_frames(source_dir, 5)
+        config = make_config(os.path.join(temp_dir, 'out'))
+
+        results = []
+        done = threading.Event()
+
+        def on_result(filepath, success, output_path, error, processed_img):
+            results.append((filepath, success, processed_img))
+            if len(results) == len(paths):
+                done.set()
+
+        pool = WatchProcessPool(config, workers=2, on_result=on_result)
+        pool.start()
+        try:
+            tickets = [pool.reserve() for _ in paths]
+            for ticket, path in reversed(list(zip(tickets, paths))):  # Submit last-arrived first
+                pool.submit(ticket, path)
+            assert done.wait(60)
+        finally:
+            pool.shutdown()
+
+        assert [r[0] for r in results] == paths
+        for path, success, processed_img in results:
+            assert success
+            _, _, _, expected = process_image(path, config)
+            np.testing.assert_array_equal(np.asarray(processed_img), np.asarray(expected))
+
+    def test_failed_file_reports_error(self, temp_dir):
+        config = make_config(os.path.join(temp_dir, 'out'))
+        results = []
+        done = threading.Event()
+
+        pool = WatchProcessPool(config, workers=1,
+                                on_result=lambda *result: (results.append(result), done.set()))
+        pool.start()
+        try:
+            pool.submit(pool.reserve(), os.path.join(temp_dir, 'missing.png'))
+            assert done.wait(30)
+        finally:
+            pool.shutdown()
+
+        _, success, output_path, error, processed_img = results[0]
+        assert not success and error and processed_img is None
+
+
+class TestImageFileHandlerProcessMode:
+    """ImageFileHandler with watch_processing_mode='process'"""
+
+    def test_handler_delivers_in_arrival_order(self, temp_dir):
+        source_dir = os.path.join(temp_dir, 'in')
+        os.makedirs(source_dir)
+        paths = write_frames(source_dir, 3)
+        config = make_config(os.path.join(temp_dir, 'out'), watch_processing_mode='process',
+                             watch_workers=2)
+
+        delivered = []
+        done = threading.Event()
+
+        def on_image_processed(output_path, processed_img):
+            delivered.append(os.path.basename(output_path))
+            if len(delivered) == len(paths):
+                done.set()
+
+        handler = ImageFileHandler(config, on_image_processed)
+        try:
+            for path in paths:
+                handler._submit(path)
+            assert done.wait(60)
+        finally:
+            handler.shutdown()
+
+        assert delivered == [os.path.basename(p) for p in paths]
+        assert not handler.processing
@@ -7,12 +7,20 @@ import time
 import io
 import os
 import sys
+import socket
+import threading
+import http.client
+from datetime import datetime
+import numpy as np
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from services.web_output import WebOutputServer, ImageHTTPHandler
+from services.image_variants import make_etag
+from services.hls_output import HLSSegmentRing
+from services.frame import Frame
 from PIL import Image
 
 
@@ -119,7 +127,7 @@ class TestWebServerImage:
         
         try:
             # Reset handler state
-            ImageHTTPHandler.latest_image_data = None
+            ImageHTTPHandler.clear_image()
             
             time.sleep(0.2)
             response = requests.get(server.get_url(), timeout=5)
@@ -158,6 +166,38 @@ class TestWebServerImage:
             server.stop()
 
 
+@pytest.mark.requires_network
+class TestWebServerCameras:
+    """Per-camera namespaces (multi-camera mode)"""
+    
+    def test_cameras_served_separately(self, sample_image):
+        """Each camera has its own latest image and status under /cam/<name>/"""
+        server = WebOutputServer(host='127.0.0.1', port=18095)
+        server.start()
+        
+        try:
+            for camera, color in (('allsky', 'red'), ('pier', 'blue')):
+                img_bytes = io.BytesIO()
+                Image.new('RGB', (32, 24), color).save(img_bytes, format='PNG')
+                server.update_image(f"{camera}.png", img_bytes.getvalue(), content_type='image/png',
+                                    metadata={'CAMERA_ID': camera}, camera=camera)
+            
+            allsky = requests.get(server.get_url(camera='allsky'), timeout=5)
+            pier = requests.get("http://127.0.0.1:18095/cam/pier/latest", timeout=5)
+            status = requests.get("http://127.0.0.1:18095/cam/pier/status", timeout=5).json()
+            
+            assert Image.open(io.BytesIO(allsky.content)).getpixel((0, 0)) == (255, 0, 0)
+            assert Image.open(io.BytesIO(pier.content)).getpixel((0, 0)) == (0, 0, 255)
+            assert status['camera'] == 'pier'
+            assert status['metadata']['CAMERA_ID'] == 'pier'
+            
+            # Default endpoints and unknown cameras are not affected
+            assert requests.get(server.get_url(), timeout=5).status_code == 404
+            assert requests.get("http://127.0.0.1:18095/cam/roof/latest", timeout=5).status_code == 404
+        finally:
+            server.stop()
+
+
 @pytest.mark.requires_network
 class TestWebServerStatus:
     """Test status endpoint functionality"""
@@ -202,3 +242,386 @@ class TestWebServerStatus:
             
         finally:
             server.stop()
+
+
+@pytest.mark.requires_network
+class TestWebServerVariants:
+    """Test pre-encoded size/format variants of /latest"""
+    
+    def test_width_and_format_variants(self):
+        """Test ?w= and ?fmt= select differently encoded images with their own ETags"""
+        server = WebOutputServer(host='127.0.0.1', port=18089)
+        server.start()
+        
+        try:
+            img = Image.linear_gradient('L').resize((1600, 900)).convert('RGB')
+            img_bytes = io.BytesIO()
+            img.save(img_bytes, format='JPEG')
+            server.update_image("test.jpg", img_bytes.getvalue(), image=img)
+            
+            full = requests.get(server.get_url(), timeout=5)
+            thumb = requests.get(server.get_url(), params={'w': 300}, timeout=5)
+            webp = requests.get(server.get_url(), params={'fmt': 'webp'}, timeout=5)
+            
+            assert full.content == img_bytes.getvalue()
+            assert thumb.status_code == 200
+            assert Image.open(io.BytesIO(thumb.content)).width < img.width
+            assert webp.headers.get('Content-Type') == 'image/webp'
+            assert len({full.headers['ETag'], thumb.headers['ETag'], webp.headers['ETag']}) == 3
+            
+            # Each variant revalidates against its own ETag
+            response = requests.get(server.get_url(), params={'w': 300},
+                                    headers={'If-None-Match': thumb.headers['ETag']}, timeout=5)
+            assert response.status_code == 304
+            response = requests.get(server.get_url(), params={'w': 300},
+                                    headers={'If-None-Match': full.headers['ETag']}, timeout=5)
+            assert response.status_code == 200
+            
+        finally:
+            server.stop()
+    
+    def test_invalid_variant_parameters(self, sample_image):
+        """Test bad ?w= / ?fmt= values are rejected"""
+        server = WebOutputServer(host='127.0.0.1', port=18090)
+        server.start()
+        
+        try:
+            img_bytes = io.BytesIO()
+            sample_image.save(img_bytes, format='JPEG')
+            server.update_image("test.jpg", img_bytes.getvalue())
+            
+            assert requests.get(server.get_url(), params={'w': 'abc'}, timeout=5).status_code == 400
+            assert requests.get(server.get_url(), params={'fmt': 'gif'}, timeout=5).status_code == 406
+            
+        finally:
+            server.stop()
+
+
+@pytest.mark.requires_network
+class TestWebServerConcurrency:
+    """Test keep-alive, concurrent clients and atomic frame swaps"""
+    
+    def test_keep_alive_reuses_connection(self, sample_image):
+        """Test several requests are answered on one HTTP/1.1 connection"""
+        server = WebOutputServer(host='127.0.0.1', port=18091)
+        server.start()
+        
+        try:
+            img_bytes = io.BytesIO()
+            sample_image.save(img_bytes, format='JPEG')
+            server.update_image("test.jpg", img_bytes.getvalue())
+            
+            conn = http.client.HTTPConnection('127.0.0.1', 18091, timeout=5)
+            try:
+                for path in ('/latest', '/status', '/latest'):
+                    conn.request('GET', path)
+                    response = conn.getresponse()
+                    response.read()
+                    assert response.status == 200
+                    assert response.version == 11
+                    assert not response.will_close
+            finally:
+                conn.close()
+            
+        finally:
+            server.stop()
+    
+    def test_idle_client_does_not_block_others(self, sample_image):
+        """Test a connected but silent client doesn't hold up other requests"""
+        server = WebOutputServer(host='127.0.0.1', port=18092)
+        server.start()
+        idle = socket.create_connection(('127.0.0.1', 18092))
+        
+        try:
+            img_bytes = io.BytesIO()
+            sample_image.save(img_bytes, format='JPEG')
+            server.update_image("test.jpg", img_bytes.getvalue())
+            
+            response = requests.get(server.get_url(), timeout=2)
+            assert response.status_code == 200
+            
+        finally:
+            idle.close()
+            server.stop()
+    
+    def test_frames_swap_atomically(self):
+        """Test every response's ETag belongs to the bytes it was sent with"""
+        server = WebOutputServer(host='127.0.0.1', port=18093)
+        server.start()
+        frames = []
+        for i in range(8):
+            img_bytes = io.BytesIO()
+            Image.new('RGB', (640, 480), color=(30 * i, 0, 0)).save(img_bytes, format='JPEG')
+            frames.append(img_bytes.getvalue())
+        server.update_image("frame.jpg", frames[0])
+        stop = threading.Event()
+        
+        def publish():
+            i = 0
+            while not stop.is_set():
+                server.update_image("frame.jpg", frames[i % len(frames)])
+                i += 1
+        
+        publisher = threading.Thread(target=publish, daemon=True)
+        publisher.start()
+        try:
+            with requests.Session() as session:
+                for _ in range(50):
+                    response = session.get(server.get_url(), timeout=5)
+                    assert response.headers['ETag'] == make_etag(response.content)
+                    assert len(response.content) == int(response.headers['Content-Length'])
+        finally:
+            stop.set()
+            publisher.join(timeout=2)
+            server.stop()
+    
+    def test_status_payload_follows_updates(self, sample_image):
+        """Test pre-serialized status reflects the latest image and metadata"""
+        server = WebOutputServer(host='127.0.0.1', port=18094)
+        server.start()
+        
+        try:
+            img_bytes = io.BytesIO()
+            sample_image.save(img_bytes, format='JPEG')
+            server.update_image("first.jpg", img_bytes.getvalue(), metadata={'GAIN': 100})
+            server.update_image("second.jpg", img_bytes.getvalue(), metadata={'GAIN': 200})
+            
+            data = requests.get(server.get_status_url(), timeout=5).json()
+            
+            assert data['latest_image'] == 'second.jpg'
+            assert data['metadata'] == {'GAIN': 200}
+            assert data['images_served'] == 2
+            assert data['uptime_seconds'] >= 0
+            
+        finally:
+            server.stop()
+    
+    def test_status_serializes_frame_tokens(self, sample_image):
+        """Test a Frame is published as its tokens, without the image arrays"""
+        server = WebOutputServer(host='127.0.0.1', port=18101)
+        server.start()
+        
+        try:
+            frame = Frame(datetime(2026, 1, 15, 21, 30, 5), 'ZWO ASI676MC', 1.5, 200, -4.0, 6, 4,
+                          rgb16=np.zeros((4, 6, 3), np.uint16), extra={'QOS': {'level': 0}})
+            img_bytes = io.BytesIO()
+            sample_image.save(img_bytes, format='JPEG')
+            server.update_image("frame.jpg", img_bytes.getvalue(), metadata=frame)
+            
+            metadata = requests.get(server.get_status_url(), timeout=5).json()['metadata']
+            
+            assert metadata['EXPOSURE'] == "1.5s"
+            assert metadata['QOS'] == {'level': 0}
+            assert 'RAW_RGB_16BIT' not in metadata
+            
+        finally:
+            server.stop()
+
+
+def read_until(response, marker, limit=1_000_000):
+    """Read a streaming http.client response until marker has arrived"""
+    data = b''
+    while marker not in data and len(data) < limit:
+        chunk = response.read1(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+@pytest.mark.requires_network
+class TestWebServerLiveStreams:
+    """Test push-based MJPEG and Server-Sent Events endpoints"""
+    
+    def test_mjpeg_stream_pushes_frames(self):
+        """Test each published frame arrives as a JPEG part of the MJPEG stream"""
+        server = WebOutputServer(host='127.0.0.1', port=18096)
+        server.start()
+        
+        frames = []
+        for i in range(2):
+            img_bytes = io.BytesIO()
+            Image.new('RGB', (64, 48), color=(100 * i, 50, 50)).save(img_bytes, format='JPEG')
+            frames.append(img_bytes.getvalue())
+        
+        conn = http.client.HTTPConnection('127.0.0.1', 18096, timeout=5)
+        try:
+            server.update_image("first.jpg", frames[0])
+            conn.request('GET', '/stream')
+            response = conn.getresponse()
+            assert response.status == 200
+            assert response.getheader('Content-Type').startswith('multipart/x-mixed-replace')
+            
+            data = read_until(response, frames[0])
+            assert b'--frame\r\nContent-Type: image/jpeg' in data
+            assert frames[0] in data
+            
+            server.update_image("second.jpg", frames[1])
+            assert frames[1] in read_until(response, frames[1])
+            
+        finally:
+            conn.close()
+            server.stop()
+    
+    def test_events_stream_announces_frames(self, sample_image):
+        """Test /events sends one frame event per update with ETag and metadata"""
+        server = WebOutputServer(host='127.0.0.1', port=18097)
+        server.start()
+        
+        conn = http.client.HTTPConnection('127.0.0.1', 18097, timeout=5)
+        try:
+            conn.request('GET', '/events')
+            response = conn.getresponse()
+            assert response.status == 200
+            assert response.getheader('Content-Type') == 'text/event-stream'
+            assert b'retry:' in read_until(response, b'\n\n')
+            
+            img_bytes = io.BytesIO()
+            sample_image.save(img_bytes, format='JPEG')
+            server.update_image("test.jpg", img_bytes.getvalue(), metadata={'GAIN': 150})
+            
+            data = read_until(response, b'\n\n').decode('utf-8')
+            assert 'event: frame' in data
+            assert make_etag(img_bytes.getvalue()) in data.replace('\\"', '"')
+            assert '"GAIN": 150' in data
+            
+        finally:
+            conn.close()
+            server.stop()
+    
+    def test_stop_ends_open_streams(self):
+        """Test stopping the server closes connected stream clients"""
+        server = WebOutputServer(host='127.0.0.1', port=18098)
+        server.start()
+        
+        conn = http.client.HTTPConnection('127.0.0.1', 18098, timeout=5)
+        try:
+            conn.request('GET', '/events')
+            response = conn.getresponse()
+            read_until(response, b'\n\n')
+            
+            server.stop()
+            assert response.read() == b''  # Server closed the stream
+            
+        finally:
+            conn.close()
+            server.stop()
+
+
+@pytest.mark.requires_network
+class TestWebServerHLS:
+    """Test HLS playlist and segments served from an attached segment ring"""
+    
+    def test_playlist_and_segments(self):
+        """Test the playlist is revalidated and segments are cacheable"""
+        server = WebOutputServer(host='127.0.0.1', port=18099)
+        server.start()
+        
+        try:
+            assert server.get_hls_url() is None
+            response = requests.get('http://127.0.0.1:18099/hls/stream.m3u8', timeout=5)
+            assert response.status_code == 404
+            
+            ring = HLSSegmentRing(max_segments=3)
+            server.attach_hls(ring)
+            assert requests.get(server.get_hls_url(), timeout=5).status_code == 404  # No segment yet
+            
+            for i in range(3):
+                ring.add_segment(b'\x47' * 188 * (i + 1), 2.0)
+            
+            response = requests.get(server.get_hls_url(), timeout=5)
+            assert response.status_code == 200
+            assert response.headers['Content-Type'] == 'application/vnd.apple.mpegurl'
+            assert response.headers['Cache-Control'] == 'no-cache'
+            names = [line for line in response.text.splitlines() if not line.startswith('#')]
+            assert len(names) == 3
+            
+            response = requests.get(f'http://127.0.0.1:18099/hls/{names[-1]}', timeout=5)
+            assert response.status_code == 200
+            assert response.headers['Content-Type'] == 'video/mp2t'
+            assert 'max-age=6' in response.headers['Cache-Control']
+            assert response.content == b'\x47' * 188 * 3
+            
+            response = requests.get('http://127.0.0.1:18099/hls/unknown.ts', timeout=5)
+            assert response.status_code == 404
+        
+        finally:
+            server.stop()
+    
+    def test_stop_detaches_hls(self):
+        """Test a stopped server no longer serves the previous segment ring"""
+        server = WebOutputServer(host='127.0.0.1', port=18100)
+        server.start()
+        server.attach_hls(HLSSegmentRing())
+        server.stop()
+        
+        assert ImageHTTPHandler.hls is None
+
+
+@pytest.mark.slow
+@pytest.mark.requires_network
+class TestWebServerLoad:
+    """Load benchmark: several keep-alive pollers against /latest and /status"""
+    
+    CLIENTS = 8
+    DURATION = 2.0
+    
+    def test_concurrent_pollers(self):
+        """Benchmark concurrent keep-alive clients (reports requests/second)"""
+        server = WebOutputServer(host='127.0.0.1', port=18095)
+        server.start()
+        
+        try:
+            img = Image.linear_gradient('L').resize((1920, 1080)).convert('RGB')
+            img_bytes = io.BytesIO()
+            img.save(img_bytes, format='JPEG', quality=85)
+            server.update_image("bench.jpg", img_bytes.getvalue(), image=img)
+            
+            counts = []
+            errors = []
+            latencies = []
+            lock = threading.Lock()
+            deadline = time.perf_counter() + self.DURATION
+            
+            def poll(client):
+                done = 0
+                etag = None
+                with requests.Session() as session:
+                    while time.perf_counter() < deadline:
+                        start = time.perf_counter()
+                        try:
+                            if done % 4 == 3:
+                                response = session.get(server.get_status_url(), timeout=5)
+                            else:
+                                headers = {'If-None-Match': etag} if etag and client % 2 else {}
+                                response = session.get(server.get_url(), headers=headers, timeout=5)
+                                etag = response.headers.get('ETag', etag)
+                            if response.status_code not in (200, 304):
+                                raise AssertionError(response.status_code)
+                        except Exception as e:
+                            with lock:
+                                errors.append(e)
+                            return
+                        with lock:
+                            latencies.append(time.perf_counter() - start)
+                        done += 1
+                with lock:
+                    counts.append(done)
+            
+            clients = [threading.Thread(target=poll, args=(i,)) for i in range(self.CLIENTS)]
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join(timeout=self.DURATION + 10)
+            
+            assert not errors
+            assert len(counts) == self.CLIENTS and all(counts)
+            
+            latencies.sort()
+            total = sum(counts)
+            p95 = latencies[int(len(latencies) * 0.95)] * 1000
+            print(f"\n{self.CLIENTS} clients: {total / self.DURATION:.0f} req/s, "
+                  f"p95 latency {p95:.1f} ms")
+            
+        finally:
+            server.stop()
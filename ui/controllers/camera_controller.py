@@ -14,6 +14,17 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspa
 
 from services.logger import app_logger
 from services.zwo_camera import ZWOCamera
+from services.capture_schedule import CaptureSchedule
+from services.cadence_governor import CadenceGovernor
+from services.qos_governor import QoSGovernor
+from services.exposure_priors import ExposurePriorTable, prior_table_path
+from .context_fetchers import compute_exposure_context
+
+
+def needs_pre_white_balance(config):
+    """True when dev-mode raw saves or the ML models need the frame before white balance"""
+    return (config.get('dev_mode', {}).get('enabled', False)
+            or config.get('ml_models', {}).get('enabled', False))
 
 
 class CameraControllerQt(QObject):
@@ -27,7 +38,7 @@ class CameraControllerQt(QObject):
     cameras_detected = Signal(list)  # List of camera names
     capture_started = Signal()
     capture_stopped = Signal()
-    frame_ready = Signal(object, dict)  # PIL Image, metadata
+    frame_ready = Signal(object, object)  # PIL Image, Frame metadata (passed by reference)
     error = Signal(str)
     calibration_status = Signal(bool)  # True=calibrating, False=complete
     
@@ -198,10 +209,39 @@ class CameraControllerQt(QObject):
             # Set target brightness and interval
             self.zwo_camera.target_brightness = target_brightness
             self.zwo_camera.set_capture_interval(self.config.get('zwo_interval', 5.0))
+            self.zwo_camera.set_capture_schedule(CaptureSchedule.from_config(self.config))
+            
+            # Stretch the interval while the scene is stable
+            cadence = self.config.get('cadence', {})
+            if cadence.get('enabled', False):
+                self.zwo_camera.cadence_governor = CadenceGovernor.from_config(
+                    cadence, self.zwo_camera.capture_interval, log=app_logger.info)
+            
+            # Shed optional processing (ML, 16-bit stretch, dev-mode saves, encode effort) when behind
+            qos = self.config.get('qos', {})
+            if qos.get('enabled', False):
+                self.zwo_camera.qos_governor = QoSGovernor.from_config(
+                    qos, timings=self.zwo_camera.stage_timings, log=app_logger.info)
+            
+            # Overlap the next exposure with processing of the previous frame
+            self.zwo_camera.pipelined = self.config.get('zwo_pipelined_capture', False)
+            self.zwo_camera.pipeline_queue_size = self.config.get('zwo_pipeline_queue_size', 2)
+            
+            # Continuous (video mode) readout for short exposures
+            self.zwo_camera.capture_mode = self.config.get('zwo_capture_mode', 'snapshot')
+            self.zwo_camera.video_max_exposure = self.config.get('zwo_video_max_exposure_ms', 1000.0) / 1000.0
+            
+            # Binning/ROI profile for captured frames
+            self.zwo_camera.capture_profile = self.config.get('zwo_capture_profile', 'full')
+            self.zwo_camera.calibration_solver = self.config.get('zwo_calibration_solver', 'model')
+            if self.config.get('zwo_exposure_priors', True):
+                self.zwo_camera.exposure_priors = ExposurePriorTable(prior_table_path(clean_camera_name))
+                self.zwo_camera.exposure_context = compute_exposure_context
             
             # Set RAW16 mode from dev_mode config (for full bit depth capture)
             dev_mode = self.config.get('dev_mode', {})
             self.zwo_camera.use_raw16 = dev_mode.get('use_raw16', False)
+            self.zwo_camera.preserve_raw = needs_pre_white_balance(self.config)
             
             # Set error callback for disconnect recovery
             self.zwo_camera.on_error_callback = self._on_camera_error
@@ -271,7 +311,8 @@ class CameraControllerQt(QObject):
     def _on_frame_captured(self, pil_image, metadata):
         """Callback from ZWOCamera when a frame is captured.
         
-        This is called from the ZWOCamera's capture thread.
+        This is called from the ZWOCamera's capture thread (its processing
+        thread when pipelined capture is enabled).
         We emit a Qt signal to safely update the UI.
         """
         # Add UI-specific metadata fields
@@ -318,5 +359,11 @@ class CameraControllerQt(QObject):
             self.zwo_camera.target_brightness = self.config.get('zwo_target_brightness', 100)
             self.zwo_camera.max_exposure_sec = self.config.get('zwo_max_exposure_ms', 30000.0) / 1000.0
             
+            # Dev-mode raw saves and the ML models use the pre-white-balance frame
+            self.zwo_camera.preserve_raw = needs_pre_white_balance(self.config)
+            
+            # Update capture window (wakes the loop if it is sleeping outside the old one)
+            self.zwo_camera.set_capture_schedule(CaptureSchedule.from_config(self.config))
+            
         except Exception as e:
             app_logger.error(f"Failed to update camera settings: {e}")
@@ -155,6 +155,39 @@ def compute_moon_context():
         return {'available': False, 'reason': str(e)}
 
 
+def compute_exposure_context():
+    """
+    Observing conditions that key the exposure prior table.
+    
+    Sun altitude comes from astral, moon illumination from compute_moon_context
+    (0 while the moon is down) and roof state from the latest ML prediction.
+    
+    Returns:
+        dict with sun_altitude (degrees or None), moon_illumination (0-100 or
+        None) and roof_open (True/False or None when unknown)
+    """
+    from .time_context import compute_sun_altitude
+    
+    moon = compute_moon_context()
+    moon_illumination = moon.get('illumination_pct') if moon.get('available') else None
+    if moon.get('moon_is_up') is False:
+        moon_illumination = 0.0
+    
+    roof_open = None
+    try:
+        from services.ml_service import get_ml_service
+        roof_status = get_ml_service().get_last_results().get('roof_status')
+        roof_open = {'Open': True, 'Closed': False}.get(roof_status)
+    except Exception as e:
+        app_logger.debug(f"Could not get roof state for exposure context: {e}")
+    
+    return {
+        'sun_altitude': compute_sun_altitude(),
+        'moon_illumination': moon_illumination,
+        'roof_open': roof_open,
+    }
+
+
 def fetch_roof_state(nina_url="http://localhost:1888"):
     """
     Fetch roof/safety monitor state from NINA API.
@@ -6,41 +6,70 @@ from PySide6.QtCore import QObject, Signal, QThread
 from PIL import Image, ImageEnhance, ImageDraw, ImageFont
 import numpy as np
 import os
-import queue
+import time
 import traceback
+from contextlib import nullcontext
 from datetime import datetime
 
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from services.logger import app_logger
+from services.capture_pipeline import CoalescingFrameQueue
+from services.frame import Frame
+from services.debayer import cfa_planes
 from services.processor import add_overlays, auto_stretch_image
+from services.token_template import compile_template
 from services.ml_service import get_ml_service, analyze_image_for_tokens
 from .dev_mode_utils import dev_mode_saver
 
 
+# Metadata keys holding full-resolution arrays, dropped before a frame is emitted
+RAW_BUFFER_KEYS = ('RAW_RGB_16BIT', 'RAW_RGB_NO_WB', 'METER_SAMPLE', 'RAW_SAMPLE_NO_WB')
+
+
 class ImageProcessingTask:
-    """Encapsulates an image processing task"""
-    def __init__(self, img: Image.Image, metadata: dict, config: dict):
-        self.img = img.copy()  # Copy to avoid race conditions
-        self.metadata = metadata.copy() if metadata else {}
+    """Encapsulates an image processing task
+    
+    The image and the metadata arrays are held by reference, not copied:
+    every capture is a new PIL image, camera metadata is a Frame whose
+    copy() shares its pooled buffers, and a task dropped or superseded in
+    the queue releases its pixel data at once.
+    """
+    def __init__(self, img: Image.Image, metadata: dict, config: dict, preview_only: bool = False):
+        self.img = img
+        self.metadata = metadata.copy() if metadata else {}  # Shallow: the worker adds and pops keys
         self.config = config.copy() if config else {}
+        self.preview_only = preview_only  # Stretch and show only, no file output
+        self.seq = 0  # Arrival order, set when queued
+    
+    @property
+    def nbytes(self) -> int:
+        """Pixel bytes held by the task (image plus metadata arrays)"""
+        image_bytes = self.img.width * self.img.height * len(self.img.getbands())
+        if isinstance(self.metadata, Frame):
+            return image_bytes + self.metadata.nbytes  # Without formatting every token
+        return image_bytes + sum(value.nbytes for value in self.metadata.values()
+                                 if isinstance(value, np.ndarray))
 
 
 class ImageProcessorWorker(QThread):
     """Background worker for image processing"""
     
     # Signals
-    processing_complete = Signal(object, dict, str)  # processed PIL Image, metadata, output_path
+    processing_complete = Signal(object, object, str, bool)  # processed PIL Image, metadata (Frame or dict), output_path, newest frame shown so far
     preview_ready = Signal(object, dict)  # PIL Image for preview, histogram data
     error_occurred = Signal(str)
     
     def __init__(self, parent=None):
         super().__init__(parent)
-        self._queue = queue.Queue(maxsize=10)
+        self._queue = CoalescingFrameQueue()  # Ordered file-output backlog, newest preview-only frame wins
+        self._seq = 0  # Last queued task
+        self._shown_seq = 0  # Newest task shown in the live preview
         self._running = False
         self._weather_service = None
         self._main_window = None  # Reference to main window for camera access
+        self._last_ml_tokens = {}  # Reused on frames that skip ML while over the processing budget
     
     def set_weather_service(self, weather_service):
         """Set weather service for overlay tokens"""
@@ -50,24 +79,35 @@ class ImageProcessorWorker(QThread):
         """Set main window reference for camera access"""
         self._main_window = main_window
     
+    def configure_queue(self, backlog: int, max_bytes: int):
+        """
+        Set the queue limits
+        
+        Args:
+            backlog: Frames waiting for file output before the oldest is dropped
+            max_bytes: Pixel bytes queued frames may hold before the oldest is dropped
+        """
+        self._queue.backlog = max(1, int(backlog))
+        self._queue.max_bytes = max_bytes
+    
     def run(self):
         """Main processing loop"""
         self._running = True
+        if self._queue.closed:  # Restarted after stop()
+            self._queue = CoalescingFrameQueue(self._queue.backlog, self._queue.max_bytes)
         app_logger.debug("Image processing worker started")
         
         while self._running:
             try:
                 # Wait for task with timeout so we can check _running
-                try:
-                    task = self._queue.get(timeout=0.5)
-                except queue.Empty:
+                task = self._queue.get(timeout=0.5)
+                if task is None:
+                    if self._queue.closed:
+                        break
                     continue
                 
-                if task is None:  # Sentinel to stop
-                    break
-                
                 self._process_task(task)
-                self._queue.task_done()
+                del task  # Release the frame before waiting for the next one
                 
             except Exception as e:
                 app_logger.error(f"Processing worker error: {e}")
@@ -78,20 +118,144 @@ class ImageProcessorWorker(QThread):
     def stop(self):
         """Stop the worker thread"""
         self._running = False
-        try:
-            self._queue.put_nowait(None)  # Sentinel
-        except queue.Full:
-            pass
+        self._queue.close()
     
     def queue_task(self, task: ImageProcessingTask):
-        """Queue a processing task"""
-        try:
-            self._queue.put_nowait(task)
-        except queue.Full:
-            app_logger.warning("Processing queue full, dropping task")
+        """Queue a processing task, dropping superseded or oldest frames when behind"""
+        self._seq += 1
+        task.seq = self._seq
+        evicted = self._queue.put(task, task.nbytes, coalesce=task.preview_only)
+        dropped = sum(1 for old in evicted if not old.preview_only)
+        del evicted  # Release their pixel data now
+        if dropped:
+            app_logger.warning(f"Processing behind: dropped {dropped} queued frame(s) "
+                               f"({self._queue.dropped} total, {len(self._queue)} queued, "
+                               f"{self._queue.nbytes / (1024 * 1024):.0f} MB)")
+    
+    def _zwo_camera(self):
+        """The GUI's ZWOCamera, or None (watch mode, not connected)"""
+        return getattr(getattr(self._main_window, 'camera_controller', None), 'zwo_camera', None)
+    
+    @staticmethod
+    def _measure(qos, stage):
+        """Time a stage for the processing budget (no-op without a QoS governor)"""
+        return qos.measure(stage) if qos is not None else nullcontext()
+    
+    def _preview_newest(self, qos):
+        """Stretch and show the newest queued file-output frame if it is not shown yet"""
+        task = self._queue.newest()
+        if task is None or task.preview_only or task.seq <= self._shown_seq:
+            return
+        # Own metadata copy: the queued task is still processed (and saved) later
+        metadata = task.metadata.copy()
+        hist_data = self._histogram_data(self._histogram_source(task.img, metadata), metadata)
+        img = self._stretch(task.img, metadata, task.config, qos)
+        for key in RAW_BUFFER_KEYS:
+            metadata.pop(key, None)
+        self._shown_seq = task.seq
+        self.preview_ready.emit(img.copy(), hist_data)
+        self.processing_complete.emit(img, metadata, '', True)
+    
+    def _emit_preview(self, task, img, stretched_for_preview, hist_data):
+        """Show a preview-only frame (nothing saved)"""
+        for key in RAW_BUFFER_KEYS:
+            task.metadata.pop(key, None)
+        self._shown_seq = max(self._shown_seq, task.seq)
+        self.preview_ready.emit(stretched_for_preview, hist_data)
+        self.processing_complete.emit(img, task.metadata, '', True)
+    
+    @staticmethod
+    def _histogram_source(img, metadata):
+        """RAW histogram data: 16-bit raw if available, then 8-bit no-WB, then the image"""
+        raw_array = metadata.get('RAW_RGB_16BIT')  # Full 16-bit if RAW16 mode
+        if raw_array is None:
+            raw_array = metadata.get('RAW_RGB_NO_WB')  # 8-bit pre-WB fallback
+        if raw_array is None:
+            raw_array = np.asarray(img)  # Final fallback for watch mode
+        return raw_array
+    
+    def _histogram_data(self, raw_array, metadata):
+        """256-bin RGB histogram plus the auto-exposure settings shown with it
+        
+        Frames white balanced as Bayer have no pre-WB RGB image; their
+        histogram comes from the unbalanced metering sample instead.
+        """
+        # Get auto-exposure settings for histogram display
+        # Check if camera controller exists and has auto_exposure enabled
+        zwo_auto_exposure = False
+        target_brightness = 30
+        
+        if self._main_window:
+            if hasattr(self._main_window, 'camera_controller') and self._main_window.camera_controller:
+                if hasattr(self._main_window.camera_controller, 'zwo_camera') and self._main_window.camera_controller.zwo_camera:
+                    zwo_auto_exposure = self._main_window.camera_controller.zwo_camera.auto_exposure
+                    target_brightness = self._main_window.camera_controller.zwo_camera.target_brightness
+                    app_logger.debug(f"Histogram config from camera: auto_exposure={zwo_auto_exposure}, target={target_brightness}")
+        
+        sample = metadata.get('RAW_SAMPLE_NO_WB')
+        if sample is not None:
+            # Mosaic sample: red and blue sites, green averaged over its two sites
+            red, green_r, green_b, blue = cfa_planes(sample, metadata.get('BAYER_PATTERN', 'RGGB'))
+            r = np.bincount(red.ravel(), minlength=256)
+            g = (np.bincount(green_r.ravel(), minlength=256) + np.bincount(green_b.ravel(), minlength=256)) // 2
+            b = np.bincount(blue.ravel(), minlength=256)
+        else:
+            # Calculate histogram - use appropriate range based on bit depth
+            # 16-bit data needs to be scaled down for 256-bin histogram display
+            if raw_array.dtype == np.uint16:
+                # Scale 16-bit to 8-bit range for histogram display
+                hist_array = (raw_array / 257).astype(np.uint8)
+            else:
+                hist_array = raw_array
+            r = np.histogram(hist_array[:, :, 0], bins=256, range=(0, 256))[0]
+            g = np.histogram(hist_array[:, :, 1], bins=256, range=(0, 256))[0]
+            b = np.histogram(hist_array[:, :, 2], bins=256, range=(0, 256))[0]
+        
+        hist_data = {
+            'r': r,
+            'g': g,
+            'b': b,
+            'auto_exposure': zwo_auto_exposure,
+            'target_brightness': target_brightness
+        }
+        return hist_data
+    
+    def _stretch(self, img, metadata, config, qos):
+        """Resize and auto-stretch (MTF) a frame as configured"""
+        resize_percent = config.get('resize_percent', 100)
+        auto_stretch_config = config.get('auto_stretch', {})
+        
+        # Resize if needed (only for 8-bit PIL image, 16-bit handled in stretch)
+        if resize_percent < 100:
+            new_width = int(img.width * resize_percent / 100)
+            new_height = int(img.height * resize_percent / 100)
+            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        
+        # Apply auto-stretch (MTF) if enabled
+        # Use 16-bit raw data when available for higher precision stretching
+        if auto_stretch_config.get('enabled', False):
+            raw_16bit = metadata.get('RAW_RGB_16BIT')  # Will be None if RAW8 mode
+            if qos is not None and qos.degraded('stretch'):
+                # Over budget: LUT stretch of the 8-bit image (no 16-bit resize or tables)
+                raw_16bit = None
+                auto_stretch_config = dict(auto_stretch_config, lut_stretch=True)
+            if raw_16bit is not None:
+                # Resize 16-bit data if needed to match PIL image size
+                if resize_percent < 100:
+                    import cv2
+                    new_height = int(raw_16bit.shape[0] * resize_percent / 100)
+                    new_width = int(raw_16bit.shape[1] * resize_percent / 100)
+                    raw_16bit = cv2.resize(raw_16bit, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
+            with self._measure(qos, 'stretch'):
+                img = auto_stretch_image(img, auto_stretch_config, raw_16bit=raw_16bit)
+            app_logger.debug("Applied auto-stretch")
+        return img
     
     def _process_task(self, task: ImageProcessingTask):
         """Process a single image task"""
+        started = time.perf_counter()
+        zwo_camera = self._zwo_camera()
+        qos = zwo_camera.qos_governor if zwo_camera is not None else None
         try:
             img = task.img
             metadata = task.metadata
@@ -101,91 +265,50 @@ class ImageProcessorWorker(QThread):
             output_dir = config.get('output_dir', '')
             output_format = config.get('output_format', 'PNG')
             jpg_quality = config.get('jpg_quality', 85)
-            resize_percent = config.get('resize_percent', 100)
             auto_brightness = config.get('auto_brightness', False)
             brightness_factor = config.get('brightness_factor', 1.0)
             saturation_factor = config.get('saturation_factor', 1.0)
             timestamp_corner = config.get('timestamp_corner', False)
             filename_pattern = config.get('filename_pattern', '{filename}')
             overlays = config.get('overlays', [])
-            auto_stretch_config = config.get('auto_stretch', {})
             dev_mode_config = config.get('dev_mode', {})
             
             # DEBUG: Log dev mode status
             app_logger.debug(f"Dev mode config: enabled={dev_mode_config.get('enabled', False)}, save_stats={dev_mode_config.get('save_histogram_stats', True)}")
             
-            if not output_dir:
+            if not output_dir and not task.preview_only:
                 app_logger.error("Output directory not configured")
                 self.error_occurred.emit("Output directory not configured")
                 return
             
-            os.makedirs(output_dir, exist_ok=True)
+            if not task.preview_only:
+                os.makedirs(output_dir, exist_ok=True)
+            
+            # Behind on file output: show the newest queued frame now, not after the backlog
+            self._preview_newest(qos)
             
             # Calculate RAW histogram before processing
-            # For dev mode: prefer 16-bit raw if available, then 8-bit no-WB, then image
-            raw_array = metadata.get('RAW_RGB_16BIT')  # Full 16-bit if RAW16 mode
-            if raw_array is None:
-                raw_array = metadata.get('RAW_RGB_NO_WB')  # 8-bit pre-WB fallback
-            if raw_array is None:
-                raw_array = np.asarray(img)  # Final fallback for watch mode
+            raw_array = self._histogram_source(img, metadata)
             
             # === DEV MODE: Save raw image and log detailed stats ===
-            if dev_mode_config.get('enabled', False):
-                dev_mode_saver.save_dev_mode_data(img, raw_array, output_dir, metadata, dev_mode_config)
+            if (dev_mode_config.get('enabled', False) and not task.preview_only
+                    and not (qos is not None and qos.skip('dev_mode'))):
+                with self._measure(qos, 'dev_mode'):
+                    dev_mode_saver.save_dev_mode_data(img, raw_array, output_dir, metadata, dev_mode_config)
             
-            # Get auto-exposure settings for histogram display
-            # Check if camera controller exists and has auto_exposure enabled
-            zwo_auto_exposure = False
-            target_brightness = 30
-            
-            if self._main_window:
-                if hasattr(self._main_window, 'camera_controller') and self._main_window.camera_controller:
-                    if hasattr(self._main_window.camera_controller, 'zwo_camera') and self._main_window.camera_controller.zwo_camera:
-                        zwo_auto_exposure = self._main_window.camera_controller.zwo_camera.auto_exposure
-                        target_brightness = self._main_window.camera_controller.zwo_camera.target_brightness
-                        app_logger.debug(f"Histogram config from camera: auto_exposure={zwo_auto_exposure}, target={target_brightness}")
-            
-            # Calculate histogram - use appropriate range based on bit depth
-            # 16-bit data needs to be scaled down for 256-bin histogram display
-            if raw_array.dtype == np.uint16:
-                # Scale 16-bit to 8-bit range for histogram display
-                hist_array = (raw_array / 257).astype(np.uint8)
-            else:
-                hist_array = raw_array
-            
-            hist_data = {
-                'r': np.histogram(hist_array[:, :, 0], bins=256, range=(0, 256))[0],
-                'g': np.histogram(hist_array[:, :, 1], bins=256, range=(0, 256))[0],
-                'b': np.histogram(hist_array[:, :, 2], bins=256, range=(0, 256))[0],
-                'auto_exposure': zwo_auto_exposure,
-                'target_brightness': target_brightness
-            }
-            del hist_array
+            hist_data = self._histogram_data(raw_array, metadata)
             # Note: We keep metadata['RAW_RGB_16BIT'] alive for auto-stretch below
             
-            # Resize if needed (only for 8-bit PIL image, 16-bit handled in stretch)
-            if resize_percent < 100:
-                new_width = int(img.width * resize_percent / 100)
-                new_height = int(img.height * resize_percent / 100)
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Apply auto-stretch (MTF) if enabled
-            # Use 16-bit raw data when available for higher precision stretching
-            if auto_stretch_config.get('enabled', False):
-                raw_16bit = metadata.get('RAW_RGB_16BIT')  # Will be None if RAW8 mode
-                if raw_16bit is not None:
-                    # Resize 16-bit data if needed to match PIL image size
-                    if resize_percent < 100:
-                        import cv2
-                        new_height = int(raw_16bit.shape[0] * resize_percent / 100)
-                        new_width = int(raw_16bit.shape[1] * resize_percent / 100)
-                        raw_16bit = cv2.resize(raw_16bit, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-                img = auto_stretch_image(img, auto_stretch_config, raw_16bit=raw_16bit)
-                app_logger.debug("Applied auto-stretch")
+            img = self._stretch(img, metadata, config, qos)
             
             # Cache stretched image for preview
             stretched_for_preview = img.copy()
             
+            # Preview only: show the stretched frame, no ML, overlays or file output
+            if task.preview_only:
+                self._emit_preview(task, img, stretched_for_preview, hist_data)
+                return
+            
             # Apply auto brightness
             if auto_brightness:
                 gray_img = img.convert('L')
@@ -221,61 +344,87 @@ class ImageProcessorWorker(QThread):
             
             # === ML Models: Add predictions to metadata for overlay tokens ===
             ml_config = config.get('ml_models', {})
-            if ml_config.get('enabled', False):
-                try:
-                    ml_service = get_ml_service()
-                    if not ml_service.is_available():
-                        ml_service.initialize()
-                    
-                    if ml_service.is_available():
-                        # Get ML predictions formatted for overlay tokens
-                        ml_tokens = analyze_image_for_tokens(raw_array, config=ml_config)
-                        metadata.update(ml_tokens)
-                        
-                        # Store full results for preview display
-                        ml_results = ml_service.get_last_results()
-                        metadata['_ML_RESULTS'] = ml_results
+            if ml_config.get('enabled', False) and qos is not None and qos.skip('ml'):
+                # Over budget: ML runs on alternate frames, this one reuses the last predictions
+                metadata.update(self._last_ml_tokens)
+            elif ml_config.get('enabled', False):
+                with self._measure(qos, 'ml'):
+                    try:
+                        ml_service = get_ml_service()
+                        if not ml_service.is_available():
+                            ml_service.initialize()
                         
-                        app_logger.debug(f"ML predictions: roof={ml_tokens.get('ROOF_STATUS')}, sky={ml_tokens.get('SKY_CONDITION')}")
-                        
-                        # Write ASCOM Safety Monitor file if enabled
-                        ascom_config = ml_config.get('ascom_safety_file', {})
-                        if ascom_config.get('enabled', False):
-                            from services.ascom_safety import write_ascom_safety_file
-                            write_ascom_safety_file(ml_results, ascom_config)
-                except Exception as e:
-                    app_logger.debug(f"ML prediction skipped: {e}")
+                        if ml_service.is_available():
+                            # Get ML predictions formatted for overlay tokens
+                            ml_tokens = analyze_image_for_tokens(raw_array, config=ml_config)
+                            metadata.update(ml_tokens)
+                            self._last_ml_tokens = ml_tokens
+                            
+                            # Store full results for preview display
+                            ml_results = ml_service.get_last_results()
+                            metadata['_ML_RESULTS'] = ml_results
+                            
+                            app_logger.debug(f"ML predictions: roof={ml_tokens.get('ROOF_STATUS')}, sky={ml_tokens.get('SKY_CONDITION')}")
+                            
+                            # Write ASCOM Safety Monitor file if enabled
+                            ascom_config = ml_config.get('ascom_safety_file', {})
+                            if ascom_config.get('enabled', False):
+                                from services.ascom_safety import write_ascom_safety_file
+                                write_ascom_safety_file(ml_results, ascom_config)
+                    except Exception as e:
+                        app_logger.debug(f"ML prediction skipped: {e}")
             
             # Add overlays using services/processor.py function
-            img = add_overlays(img, overlays, metadata, weather_service=self._weather_service)
+            with self._measure(qos, 'overlay'):
+                img = add_overlays(img, overlays, metadata, weather_service=self._weather_service)
             
             # Generate output path
-            session = metadata.get('session', datetime.now().strftime('%Y-%m-%d'))
-            original_filename = metadata.get('FILENAME', 'capture.png')
-            base_filename = os.path.splitext(original_filename)[0]
-            output_filename = filename_pattern.replace('{filename}', base_filename)
-            output_filename = output_filename.replace('{session}', session)
-            output_filename = output_filename.replace('{timestamp}', datetime.now().strftime('%Y%m%d_%H%M%S'))
+            template = compile_template(filename_pattern, case_sensitive=True)
+            tokens = {}
+            if 'filename' in template.tokens:
+                original_filename = metadata.get('FILENAME', 'capture.png')
+                tokens['filename'] = os.path.splitext(original_filename)[0]
+            if 'session' in template.tokens:
+                tokens['session'] = metadata.get('session', datetime.now().strftime('%Y-%m-%d'))
+            if 'timestamp' in template.tokens:
+                tokens['timestamp'] = datetime.now().strftime('%Y%m%d_%H%M%S')
+            output_filename = template.render(tokens, default=None)
             output_filename += '.png' if output_format.lower() == 'png' else '.jpg'
             output_path = os.path.join(output_dir, output_filename)
             
-            # Save to disk
-            if output_format.lower() == 'png':
-                img.save(output_path, 'PNG')
-            else:
-                img.save(output_path, 'JPEG', quality=jpg_quality)
+            # Save to disk (fast encode while over the processing budget)
+            pil_format = 'PNG' if output_format.lower() == 'png' else 'JPEG'
+            save_options = {} if pil_format == 'PNG' else {'quality': jpg_quality}
+            if qos is not None:
+                save_options = qos.save_options(pil_format, **save_options)
+            with self._measure(qos, 'save'):
+                img.save(output_path, pil_format, **save_options)
             
             app_logger.info(f"Saved: {os.path.basename(output_path)}")
             
+            # Bytes written count towards the adaptive cadence report
+            if zwo_camera is not None and zwo_camera.cadence_governor is not None:
+                zwo_camera.cadence_governor.record_output(os.path.getsize(output_path))
+            
+            # Frame time against the processing budget; sheds or restores optional work
+            if qos is not None:
+                qos.frame_done(time.perf_counter() - started, config.get('capture_interval', 5.0),
+                               backlog=len(self._queue))
+                metadata['QOS'] = qos.stats()
+            
             # Clean up large arrays from metadata before emitting (avoid memory leaks)
-            metadata.pop('RAW_RGB_16BIT', None)
-            metadata.pop('RAW_RGB_NO_WB', None)
+            for key in RAW_BUFFER_KEYS:
+                metadata.pop(key, None)
             
-            # Emit preview signal with stretched image and histogram
-            self.preview_ready.emit(stretched_for_preview, hist_data)
+            # Emit preview signal with stretched image and histogram,
+            # unless a newer frame is already in the preview
+            newest = task.seq >= self._shown_seq
+            if newest:
+                self._shown_seq = task.seq
+                self.preview_ready.emit(stretched_for_preview, hist_data)
             
             # Emit completion signal
-            self.processing_complete.emit(img, metadata, output_path)
+            self.processing_complete.emit(img, metadata, output_path, newest)
             
         except Exception as e:
             app_logger.error(f"Image processing failed: {e}")
@@ -292,7 +441,7 @@ class ImageProcessor(QObject):
     """
     
     # Signals forwarded from worker
-    processing_complete = Signal(object, dict, str)  # PIL Image, metadata, output_path
+    processing_complete = Signal(object, object, str, bool)  # PIL Image, metadata (Frame or dict), output_path, newest frame shown so far
     preview_ready = Signal(object, dict)  # PIL Image for preview, histogram data
     error_occurred = Signal(str)
     
@@ -307,6 +456,7 @@ class ImageProcessor(QObject):
         
         # Reference to main window for config access
         self._main_window = None
+        self._warned_no_output = False  # Missing output directory is logged once, not per frame
         
     def set_main_window(self, main_window):
         """Set reference to main window for config access"""
@@ -314,6 +464,8 @@ class ImageProcessor(QObject):
         
         # Pass main window to worker for camera access
         self._worker.set_main_window(main_window)
+        self._worker.configure_queue(main_window.config.get('processing_backlog', 3),
+                                     main_window.config.get('processing_queue_mb', 256) * 1024 * 1024)
         
         # Pass weather service to worker
         if hasattr(main_window, 'weather_service'):
@@ -349,12 +501,14 @@ class ImageProcessor(QObject):
             # Gather config from UI
             config = self._gather_config()
             
-            if not config.get('output_dir'):
-                app_logger.error("Output directory not configured")
-                return
+            # Without an output directory the frame is still shown (preview only)
+            preview_only = not config.get('output_dir')
+            if preview_only and not self._warned_no_output:
+                app_logger.warning("Output directory not configured: frames are previewed but not saved")
+            self._warned_no_output = preview_only
             
             # Create task and queue it
-            task = ImageProcessingTask(img, metadata, config)
+            task = ImageProcessingTask(img, metadata, config, preview_only=preview_only)
             self._worker.queue_task(task)
             
         except Exception as e:
@@ -373,7 +527,8 @@ class ImageProcessor(QObject):
             'preserve_blacks': True,
             'black_point': 0.0,
             'shadow_aggressiveness': 2.8,
-            'saturation_boost': 1.5
+            'saturation_boost': 1.5,
+            'lut_stretch': True
         }
         auto_stretch_config = mw.config.get('auto_stretch', {})
         # Merge with defaults - saved config overrides defaults
@@ -396,13 +551,22 @@ class ImageProcessor(QObject):
             'overlays': mw.config.get('overlays', []),
             'dev_mode': mw.config.get('dev_mode', {'enabled': False, 'raw_folder': 'raw_debug', 'save_histogram_stats': True}),
             'ml_models': mw.config.get('ml_models', {'enabled': False}),
+            'capture_interval': self._capture_interval(),
         }
         
         return config
     
-    def _on_processing_complete(self, img, metadata, output_path):
+    def _capture_interval(self) -> float:
+        """Current capture interval, the processing budget's time base"""
+        controller = getattr(self._main_window, 'camera_controller', None)
+        zwo_camera = getattr(controller, 'zwo_camera', None)
+        if zwo_camera is not None:
+            return zwo_camera.next_capture_interval()
+        return self._main_window.config.get('zwo_interval', 5.0)
+    
+    def _on_processing_complete(self, img, metadata, output_path, newest):
         """Forward processing complete signal"""
-        self.processing_complete.emit(img, metadata, output_path)
+        self.processing_complete.emit(img, metadata, output_path, newest)
     
     def _on_preview_ready(self, img, hist_data):
         """Forward preview ready signal"""
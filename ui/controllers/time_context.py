@@ -46,6 +46,27 @@ def compute_time_context() -> dict:
     return _compute_simple_time_context(now)
 
 
+def compute_sun_altitude():
+    """
+    Current sun altitude at the configured location.
+    
+    Returns:
+        Degrees above the horizon (negative below), or None if astral is not
+        installed or no location is configured
+    """
+    lat, lon, _ = _get_configured_location()
+    if not ASTRAL_AVAILABLE or lat is None or lon is None:
+        return None
+    
+    try:
+        from astral import Observer
+        from astral.sun import elevation
+        return elevation(Observer(latitude=lat, longitude=lon))
+    except Exception as e:
+        app_logger.debug(f"Could not compute sun altitude: {e}")
+        return None
+
+
 def _get_configured_location():
     """
     Get latitude/longitude from weather config.
@@ -24,6 +24,8 @@ from app_config import APP_DISPLAY_NAME, APP_SUBTITLE, APP_AUTHOR
 from services.config import Config
 from services.logger import app_logger
 from services.web_output import WebOutputServer
+from services.rtsp_output import RTSPStreamServer
+from services.hls_output import HLSSegmentRing
 from version import __version__
 
 from .theme import apply_theme, get_stylesheet
@@ -956,14 +958,29 @@ class MainWindow(QMainWindow):
         # Emit signal for other components
         self.image_captured.emit(pil_image)
     
-    def _on_image_processed(self, processed_image, metadata: dict, output_path: str):
-        """Handle processed image from image processor"""
+    def _on_image_processed(self, processed_image, metadata: dict, output_path: str, newest: bool = True):
+        """Handle processed image from image processor
+        
+        Args:
+            processed_image: Processed PIL Image
+            metadata: Frame metadata
+            output_path: Saved file, '' for a preview of a frame not saved (yet)
+            newest: False when a newer frame is already in the live preview
+                    (file output catching up on its backlog)
+        """
+        # Preview of a frame with nothing saved to publish
+        if not output_path:
+            self.live_panel.update_preview(processed_image, metadata)
+            self.app_bar.set_status('waiting' if self.is_capturing else None)
+            return
+        
         # Store for preview access
         self.last_processed_image = output_path
         self.preview_metadata = metadata
         
         # Update preview with FINAL processed image (with overlays)
-        self.live_panel.update_preview(processed_image, metadata)
+        if newest:
+            self.live_panel.update_preview(processed_image, metadata)
         
         # Check if any output servers are enabled
         config = self.config
@@ -972,6 +989,7 @@ class MainWindow(QMainWindow):
         has_outputs = (
             output_config.get('webserver_enabled', False) or
             output_config.get('rtsp_enabled', False) or
+            output_config.get('hls_enabled', False) or
             discord_config.get('enabled', False)
         )
         
@@ -1035,6 +1053,11 @@ class MainWindow(QMainWindow):
         if output_config.get('webserver_enabled', False):
             if not self.web_server or not self.web_server.running:
                 self._start_web_server()
+        
+        # Start RTSP stream (also the HLS encoder) if enabled and not running
+        if output_config.get('rtsp_enabled', False) or output_config.get('hls_enabled', False):
+            if not self.rtsp_server or not self.rtsp_server.running:
+                self._start_rtsp_server()
     
     def _start_web_server(self):
         """Start web server with current settings"""
@@ -1045,7 +1068,9 @@ class MainWindow(QMainWindow):
         image_path = output_config.get('webserver_path', '/latest')
         status_path = output_config.get('webserver_status_path', '/status')
         
-        self.web_server = WebOutputServer(host, port, image_path, status_path)
+        jpeg_quality = output_config.get('jpg_quality', 85)
+        
+        self.web_server = WebOutputServer(host, port, image_path, status_path, jpeg_quality=jpeg_quality)
         if self.web_server.start():
             url = self.web_server.get_url()
             status_url = self.web_server.get_status_url()
@@ -1070,6 +1095,53 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 app_logger.error(f"Error stopping web server: {e}")
     
+    def _start_rtsp_server(self):
+        """Start RTSP stream with current settings (and HLS from the same encoder)"""
+        output_config = self.config.get('output', {})
+        
+        # HLS segments are served by the web server, so it needs to be running
+        hls = None
+        if output_config.get('hls_enabled', False):
+            if self.web_server and self.web_server.running:
+                hls = HLSSegmentRing(output_config.get('hls_segments', 6))
+            else:
+                app_logger.warning("HLS output requires the web server; HLS disabled")
+        rtsp_enabled = output_config.get('rtsp_enabled', False)
+        if not rtsp_enabled and hls is None:
+            return
+        
+        self.rtsp_server = RTSPStreamServer(
+            host=output_config.get('rtsp_host', '127.0.0.1'),
+            port=output_config.get('rtsp_port', 8554),
+            stream_name=output_config.get('rtsp_stream_name', 'asiwatchdog'),
+            fps=output_config.get('rtsp_fps', 1.0),
+            width=output_config.get('rtsp_width', 1280),
+            height=output_config.get('rtsp_height', 720),
+            keyframe_interval=output_config.get('rtsp_keyframe_interval', 2.0),
+            rtsp=rtsp_enabled,
+            hls=hls
+        )
+        if self.rtsp_server.start():
+            if rtsp_enabled:
+                app_logger.info(f"RTSP stream started: {self.rtsp_server.get_url()}")
+            if hls is not None:
+                self.web_server.attach_hls(hls)
+                app_logger.info(f"HLS stream started: {self.web_server.get_hls_url()}")
+        else:
+            app_logger.error("Failed to start RTSP stream")
+            self.rtsp_server = None
+    
+    def _stop_rtsp_server(self):
+        """Stop the RTSP stream if running"""
+        if self.rtsp_server:
+            try:
+                if self.rtsp_server.hls is not None and self.web_server:
+                    self.web_server.attach_hls(None)
+                self.rtsp_server.stop()
+                self.rtsp_server = None
+            except Exception as e:
+                app_logger.error(f"Error stopping RTSP server: {e}")
+    
     def _push_to_output_servers(self, image_path: str, processed_img):
         """Push processed image to active output servers
         
@@ -1082,31 +1154,38 @@ class MainWindow(QMainWindow):
         try:
             # Push to web server if running
             if self.web_server and self.web_server.running:
-                img_bytes = io.BytesIO()
-                
-                # Use configured output format and quality
-                output_config = self.config.get('output', {})
-                output_format = output_config.get('output_format', 'PNG').upper()
-                
-                if output_format in ('JPG', 'JPEG'):
-                    quality = output_config.get('jpg_quality', 85)
-                    processed_img.save(img_bytes, format='JPEG', quality=quality, optimize=True)
-                    content_type = 'image/jpeg'
+                # Serve the file already encoded to disk; other sizes/formats are
+                # encoded from processed_img in the background
+                if self.web_server.update_image_from_file(image_path, metadata=self.preview_metadata,
+                                                          image=processed_img):
+                    app_logger.debug("Pushed saved image to web server")
                 else:
-                    processed_img.save(img_bytes, format='PNG', optimize=True)
-                    content_type = 'image/png'
-                
-                self.web_server.update_image(
-                    image_path,
-                    img_bytes.getvalue(),
-                    metadata=self.preview_metadata,
-                    content_type=content_type
-                )
-                app_logger.debug(f"Pushed image to web server ({content_type})")
+                    img_bytes = io.BytesIO()
+                    
+                    # Use configured output format and quality
+                    output_config = self.config.get('output', {})
+                    output_format = output_config.get('output_format', 'PNG').upper()
+                    
+                    if output_format in ('JPG', 'JPEG'):
+                        quality = output_config.get('jpg_quality', 85)
+                        processed_img.save(img_bytes, format='JPEG', quality=quality)
+                        content_type = 'image/jpeg'
+                    else:
+                        processed_img.save(img_bytes, format='PNG')
+                        content_type = 'image/png'
+                    
+                    self.web_server.update_image(
+                        image_path,
+                        img_bytes.getvalue(),
+                        metadata=self.preview_metadata,
+                        content_type=content_type,
+                        image=processed_img
+                    )
+                    app_logger.debug(f"Pushed image to web server ({content_type})")
             
-            # TODO: Push to RTSP server if running
-            # if self.rtsp_server and self.rtsp_server.running:
-            #     self.rtsp_server.update_image(processed_img)
+            # Push to RTSP stream if running (scaled and encoded on its own thread)
+            if self.rtsp_server and self.rtsp_server.running:
+                self.rtsp_server.update_image(processed_img)
             
             # Send to Discord if enabled and periodic posting is on
             discord_config = self.config.get('discord', {})